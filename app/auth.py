@@ -1,10 +1,10 @@
 
 import hashlib
-from .database import DB
+from .database import get_db
 
 class LoginManager:
-    def __init__(self):
-        self.db = DB()
+    def __init__(self, db=None):
+        self.db = db or get_db()
 
     def _hash(self, password):
         """Return SHA256 hash of the password."""
@@ -0,0 +1,110 @@
+"""
+Cart model behind OrderPage and PurchaseInvoicePage: the invoice lines and its
+adjustments (discount, tax, shipping), with the totals kept as running sums.
+
+The pages used to re-add every row's total label (and, for manufacturing
+purchases, every qty entry) on each keystroke. Each row now holds the key of its
+CartLine; editing a row calls update(), which takes the line's old contribution
+off the sums and adds the new one, so subtotal / qty / net cost the same for 5
+lines or 500. No Tk here (benchmarks/bench_cart.py drives it directly).
+
+    key = cart.add()                                   # new empty row
+    cart.update(key, sku_id=7, base_price=250)         # scanned
+    cart.update(key, markup=50)                        # HD design: price = base + markup
+    cart.update(key, qty=to_float(entry.get()))        # typed
+    cart.net, cart.lines[key].total
+"""
+from itertools import count
+
+
+def to_float(text, default=0.0):
+    """Entry text -> float; blank or half-typed text ("", "-", ".") counts as default."""
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return default
+
+
+def _sum(total, delta):
+    # Rounded so adding and taking back the same lines can't leave a -0.00 behind
+    return round(total + delta, 6) + 0.0
+
+
+class CartLine:
+    __slots__ = ("sku_id", "qty", "price", "base_price", "markup")
+
+    def __init__(self, sku_id=None, qty=1.0, price=0.0, base_price=0.0, markup=0.0):
+        self.sku_id, self.qty, self.price, self.base_price, self.markup = sku_id, qty, price, base_price, markup
+
+    @property
+    def total(self):
+        return self.qty * self.price
+
+
+class Cart:
+    def __init__(self):
+        self.discount = 0.0     # fixed amount (LE), taken off before tax
+        self.tax_pct = 0.0
+        self.shipping = 0.0
+        self._keys = count(1)
+        self.clear()
+
+    def clear(self):
+        """Drops every line (the adjustments stay)."""
+        self.lines = {}         # key -> CartLine, in the order added
+        self.subtotal = 0.0     # sum of qty * price
+        self.qty = 0.0          # units on lines with a SKU (manufacturing cost is split over these)
+        self.markup = 0.0       # sum of qty * HD design markup
+
+    def _count(self, line, sign):
+        self.subtotal = _sum(self.subtotal, sign * line.total)
+        self.markup = _sum(self.markup, sign * line.qty * line.markup)
+        if line.sku_id:
+            self.qty = _sum(self.qty, sign * line.qty)
+
+    def add(self, sku_id=None, qty=1.0, price=0.0, base_price=None, markup=0.0):
+        """New line; returns its key. base_price defaults to price."""
+        key = next(self._keys)
+        line = self.lines[key] = CartLine(sku_id, qty, price, price if base_price is None else base_price, markup)
+        self._count(line, 1)
+        return key
+
+    def update(self, key, **changes):
+        """
+        Changes some of sku_id / qty / price / base_price / markup of one line. Changing
+        base_price or markup (without an explicit price) reprices it to base_price + markup.
+        """
+        line = self.lines[key]
+        self._count(line, -1)
+        for name, value in changes.items():
+            setattr(line, name, value)
+        if "price" not in changes and ("base_price" in changes or "markup" in changes):
+            line.price = line.base_price + line.markup
+        self._count(line, 1)
+        return line
+
+    def remove(self, key):
+        line = self.lines.pop(key, None)
+        if line is not None:
+            self._count(line, -1)
+        if not self.lines:
+            self.clear()
+
+    @property
+    def after_discount(self):
+        return self.subtotal - self.discount
+
+    @property
+    def tax(self):
+        return self.after_discount * self.tax_pct / 100
+
+    @property
+    def net(self):
+        return self.after_discount + self.tax + self.shipping
+
+    def unit_cost(self, amount):
+        """amount spread over the cart's units (manufacturing: material + labour per piece)."""
+        return amount / self.qty if self.qty > 0 else 0.0
+
+    def __len__(self):
+        return len(self.lines)
@@ -0,0 +1,235 @@
+"""
+In-memory barcode -> SKU index for the checkout scan path.
+
+OrderPage and PurchaseInvoicePage resolve every scanned barcode here instead of
+joining item_details/items/colors/sizes per scan: lookup() is a dict hit plus a
+few array reads, no SQL. At login the DB worker restores the last session's copy
+(app/snapshot.py) or, failing that, loads it from the tables. It is kept current
+from the catalog_changes log (app/rollups.py): refresh() reads the change counter
+and reloads only the SKUs changed since, whichever process changed them.
+refresh() runs after local edits (InventoryApp.refresh_views), every POLL_MS,
+and once on a barcode that isn't in the index (so a SKU added a moment ago at
+another till still scans).
+
+Rows are stored column-wise so large catalogs stay small: one array per numeric
+column, item/color/size names interned once, and the barcode dict pointing at the
+row number. Rows are in SKU id order (AUTOINCREMENT), so an id finds its row by
+bisection.
+"""
+import threading
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from itertools import islice
+from .database import get_read_db
+
+SKU_SQL = """SELECT d.id, d.barcode, i.name, c.name, s.name, IFNULL(d.sell_price, 0), IFNULL(d.buy_price, 0)
+             FROM item_details d JOIN items i ON d.item_id = i.id
+             LEFT JOIN colors c ON d.color_id = c.id LEFT JOIN sizes s ON d.size_id = s.id"""
+
+# How often (ms) the app checks the change counter for edits made by other tills
+POLL_MS = 5000
+
+# A refresh touching more SKUs than this (or a quarter of the catalog) reloads everything
+RELOAD_AT = 2000
+
+LOAD_CHUNK = 5000
+
+# The columns swapped in by a full load; COLUMNS are the ones saved (index and string_ix are rebuilt from them)
+COLUMNS = ("ids", "codes", "names", "colors", "sizes", "sell", "buy", "strings")
+STATE = COLUMNS + ("index", "string_ix")
+
+
+class Sku(namedtuple("Sku", "id barcode name color size sell_price buy_price")):
+    __slots__ = ()
+
+    @property
+    def is_design(self):
+        """HD... barcodes are print designs (priced on top of the garment), not stock items."""
+        return self.barcode[:2].upper() == "HD"
+
+
+class Catalog:
+    def __init__(self, db=None):
+        self._db = db
+        self.lock = threading.Lock()            # readers vs. the update being applied
+        self.update_lock = threading.RLock()    # one load/refresh at a time
+        self.loaded = False
+        self.seq = 0        # catalog_changes counter the index reflects
+        self.clear()
+
+    @property
+    def db(self):
+        return self._db or get_read_db()
+
+    def clear(self):
+        self.index = {}                 # barcode -> row
+        self.ids = array("q")           # row -> SKU id (ascending)
+        self.codes = []                 # row -> barcode (None once deleted)
+        self.names = array("i")         # row -> string pool index, for item / color / size
+        self.colors = array("i")
+        self.sizes = array("i")
+        self.sell = array("d")
+        self.buy = array("d")
+        self.strings = [None]           # pool; 0 is "no value"
+        self.string_ix = {None: 0}
+
+    def _intern(self, text):
+        ix = self.string_ix.get(text)
+        if ix is None:
+            ix = self.string_ix[text] = len(self.strings)
+            self.strings.append(text)
+        return ix
+
+    def _row(self, sku_id):
+        row = bisect_left(self.ids, sku_id)
+        return row if row < len(self.ids) and self.ids[row] == sku_id else None
+
+    def _put(self, r):
+        sku_id, code, name, color, size, sell, buy = r
+        row = self._row(sku_id)
+        if row is None:
+            if self.ids and sku_id < self.ids[-1]:
+                return False  # out of id order: caller reloads
+            row = len(self.ids)
+            self.ids.append(sku_id); self.codes.append(None)
+            for col in (self.names, self.colors, self.sizes): col.append(0)
+            self.sell.append(0); self.buy.append(0)
+        self._drop(row)
+        self.names[row], self.colors[row], self.sizes[row] = self._intern(name), self._intern(color), self._intern(size)
+        self.sell[row], self.buy[row] = float(sell), float(buy)
+        if code:
+            self.codes[row] = code
+            self.index[code] = row
+        return True
+
+    def _extend(self, rows):
+        """Appends rows already in id order (full load), a column at a time."""
+        start = len(self.ids)
+        ids, codes, names, colors, sizes, sell, buy = zip(*rows)
+        self.ids.extend(ids)
+        self.codes.extend(code or None for code in codes)
+        for col, values in ((self.names, names), (self.colors, colors), (self.sizes, sizes)):
+            col.extend(map(self._intern, values))
+        self.sell.extend(map(float, sell))
+        self.buy.extend(map(float, buy))
+        self.index.update((code, row) for row, code in enumerate(codes, start) if code)
+
+    def _drop(self, row):
+        code = self.codes[row]
+        if code is not None:
+            if self.index.get(code) == row: del self.index[code]
+            self.codes[row] = None
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            with self.update_lock:
+                if not self.loaded: self.load()
+
+    def _swap(self, fresh, seq):
+        with self.lock:
+            for name in STATE:
+                setattr(self, name, getattr(fresh, name))
+            self.seq, self.loaded = seq, True
+
+    def dump(self):
+        """Copy of the columns and their change counter, for the warm-start snapshot (app/snapshot.py)."""
+        with self.lock:
+            state = {name: getattr(self, name)[:] for name in COLUMNS}
+            state["seq"] = self.seq
+            return state
+
+    def restore(self, state):
+        """Installs a dump(); refresh() afterwards applies the changes made since it was taken."""
+        fresh = Catalog(self._db)
+        for name in COLUMNS:
+            setattr(fresh, name, state[name])
+        fresh.index = dict(zip(fresh.codes, range(len(fresh.codes))))
+        fresh.index.pop(None, None)  # deleted rows / no barcode
+        fresh.string_ix = dict(zip(fresh.strings, range(len(fresh.strings))))
+        with self.update_lock:
+            self._swap(fresh, state["seq"])
+
+    def load(self):
+        """Full (re)build from the catalog tables. Returns the number of scannable SKUs."""
+        with self.update_lock:
+            db = self.db
+            seq = db.fetch_one("SELECT IFNULL(MAX(seq), 0) FROM catalog_changes")[0]
+            # Built aside and swapped in, so scans keep using the old index meanwhile
+            fresh = Catalog(self._db)
+            rows = db.fetch_iter(SKU_SQL + " ORDER BY d.id", chunk_size=LOAD_CHUNK)
+            while True:
+                batch = list(islice(rows, LOAD_CHUNK))
+                if not batch: break
+                fresh._extend(batch)
+            self._swap(fresh, seq)
+            return len(self.index)
+
+    def refresh(self):
+        """Applies catalog changes committed since the last load/refresh. Returns the number of SKUs reloaded."""
+        with self.update_lock:
+            if not self.loaded:
+                return self.load()
+            db = self.db
+            # Counter first: a change committed while reading is picked up again next time (re-applying is harmless)
+            seq = db.fetch_one("SELECT IFNULL(MAX(seq), 0) FROM catalog_changes")[0]
+            if seq == self.seq:
+                return 0
+            changed = [r[0] for r in db.fetch_all("SELECT sku_id FROM catalog_changes WHERE seq > ?", (self.seq,))]
+            if len(changed) > min(RELOAD_AT, max(len(self.ids) // 4, 100)):
+                return self.load()
+            rows = sorted(db.fetch_all_in(SKU_SQL + " WHERE d.id IN ({in})", changed))
+            with self.lock:
+                for sku_id in changed:
+                    row = self._row(sku_id)
+                    if row is not None: self._drop(row)
+                in_order = all([self._put(r) for r in rows])
+                self.seq = seq
+            if not in_order:
+                return self.load()
+            return len(changed)
+
+    def get(self, barcode):
+        """The SKU for an exact barcode, from memory only; None if unknown."""
+        with self.lock:
+            row = self.index.get(barcode)
+            if row is None:
+                return None
+            s = self.strings
+            return Sku(self.ids[row], self.codes[row], s[self.names[row]], s[self.colors[row]], s[self.sizes[row]],
+                       self.sell[row], self.buy[row])
+
+    def lookup(self, barcode):
+        """Scan path: get(), with one refresh() on a miss (the SKU may be newer than the index)."""
+        self.ensure_loaded()
+        sku = self.get(barcode)
+        if sku is None and barcode:
+            try:
+                if self.refresh(): sku = self.get(barcode)
+            except Exception as e:
+                print(f"❌ Catalog Refresh Error: {e}")
+        return sku
+
+    def designs(self):
+        """(id, name, sell price, barcode) of every HD design, in id order, from memory."""
+        self.ensure_loaded()
+        with self.lock:
+            rows = [r for code, r in self.index.items() if code[:2].upper() == "HD"]
+            return [(self.ids[r], self.strings[self.names[r]], self.sell[r], self.codes[r]) for r in sorted(rows)]
+
+    def __len__(self):
+        return len(self.index)
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    """The app's barcode catalog (empty until loaded; the first lookup loads it if login's preload hasn't)."""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = Catalog()
+    return _catalog
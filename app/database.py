@@ -1,57 +1,489 @@
 import sqlite3
 import os
-import shutil
+import re
 import glob
+import threading
+from contextlib import contextmanager, closing
+from time import perf_counter, sleep
 from datetime import datetime
 from .config import DB_PATH
+from .config_manager import ConfigManager
+from .migrations import run_migrations
+from . import query_stats
+
+# Connection tuning (override any key via "db_pragmas" in config.json)
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",       # readers don't block the writer
+    "synchronous": "NORMAL",     # safe with WAL, one fsync per checkpoint instead of per commit
+    "cache_size": -20000,        # negative = KiB -> ~20 MB page cache
+    "mmap_size": 268435456,      # 256 MB memory-mapped I/O
+    "busy_timeout": 5000,        # ms to wait on a locked database before failing
+}
+
+# Analytic readers (see DB.reader()) skip journal_mode: it's a write, and WAL is already set by the writer
+READER_SKIP_PRAGMAS = {"journal_mode"}
+
+# Writes that still find the database locked after busy_timeout are retried this many
+# times, waiting db_retry_wait_ms * attempt in between ("db_write_retries" / "db_retry_wait_ms")
+_cfg = ConfigManager()
+WRITE_RETRIES = int(_cfg.get("db_write_retries", 3) or 0)
+RETRY_WAIT_MS = float(_cfg.get("db_retry_wait_ms", 200) or 0)
+
+def is_locked(e):
+    return isinstance(e, sqlite3.OperationalError) and ("locked" in str(e) or "busy" in str(e))
+
+def retry_locked(fn, conn=None):
+    """Runs fn(), retrying on "database is locked". conn (if given) is rolled back before each retry."""
+    for attempt in range(WRITE_RETRIES + 1):
+        try:
+            return fn()
+        except sqlite3.OperationalError as e:
+            if not is_locked(e) or attempt == WRITE_RETRIES:
+                raise
+            if conn is not None and conn.in_transaction:
+                conn.rollback()  # a stale WAL read snapshot can never be upgraded to a write
+            print(f"⚠️ Database busy, retrying write ({attempt + 1}/{WRITE_RETRIES})...")
+            sleep(RETRY_WAIT_MS * (attempt + 1) / 1000)
+
+# One long-lived connection per (thread, db file). sqlite3 connections must
+# not be shared across threads, so each thread lazily opens its own.
+_local = threading.local()
+
+# Database files already migrated in this process (schema work runs once, not per DB())
+_migrated = set()
+_migrate_lock = threading.Lock()
+
+PLAN_CHECK = bool(_cfg.get("db_plan_check", False))
+_plan_checked = set()
+
+# Add (or, with a negative delta, deduct) stock for one store; creates the row on first movement
+STOCK_UPSERT = """INSERT INTO store_stock (store_id, item_detail_id, quantity) VALUES (?,?,?)
+                  ON CONFLICT(store_id, item_detail_id) DO UPDATE SET quantity = quantity + excluded.quantity"""
+
+# SQLite caps bound variables per statement (999 before 3.32), so IN-lists go in chunks
+IN_CHUNK = 500
+
+def chunks(values, size=IN_CHUNK):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+def in_query(query, n):
+    """Expands the {in} marker to n placeholders: 'WHERE id IN ({in})' -> 'WHERE id IN (?,?,?)'."""
+    return query.replace("{in}", ",".join("?" * n))
+
+# Dimension tables: small name -> id lookups resolved on every save. Each is loaded
+# whole on first use (DB.dim_map) and dropped when any statement writes to it.
+DIM_TABLES = ("stores", "safes", "colors", "sizes", "units", "categories", "suppliers", "customers")
+_dims = {}          # (db file, table) -> {name: id}
+_dims_gen = {}      # (db file, table) -> invalidation counter, so a load racing a write isn't kept
+_dims_lock = threading.Lock()
+_WRITE_TARGET = re.compile(r"^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+(\w+)", re.I)
+_write_targets = {}  # sql -> dimension table it writes to, or None
+
+def dim_written(query):
+    """'UPDATE safes SET ...' -> 'safes'; None for statements that don't touch a dimension table."""
+    table = _write_targets.get(query, False)
+    if table is False:
+        m = _WRITE_TARGET.match(query)
+        table = m.group(1).lower() if m and m.group(1).lower() in DIM_TABLES else None
+        if len(_write_targets) < 5000:
+            _write_targets[query] = table
+    return table
+
+def invalidate_dims(name, table=None):
+    """Drops the cached lookup of one dimension table (all of them if table is None) for a db file."""
+    with _dims_lock:
+        for key in [k for k in _dims_gen if k[0] == name] if table is None else [(name, table)]:
+            _dims.pop(key, None)
+            _dims_gen[key] = _dims_gen.get(key, 0) + 1
+        if table is not None:
+            # Inside a transaction: drop it again on commit/rollback (another thread may reload in between)
+            pending = getattr(_local, "dims_pending", None)
+            if pending is not None: pending.add((name, table))
+
+class Transaction:
+    """Handle yielded by DB.transaction(). Errors propagate so the block rolls back."""
+    def __init__(self, conn, name=None):
+        self.conn = conn
+        self.name = name
+
+    def touched(self, query):
+        table = dim_written(query)
+        if table: invalidate_dims(self.name, table)
+
+    def execute(self, query, params=()):
+        t0 = perf_counter()
+        cursor = self.conn.execute(query, params)
+        query_stats.record(self.conn, query, params, perf_counter() - t0, cursor.rowcount)
+        self.touched(query)
+        return cursor.lastrowid
+
+    def move_stock(self, item_detail_id, store_id, delta):
+        self.execute(STOCK_UPSERT, (store_id, item_detail_id, delta))
+
+    def move_stock_many(self, moves):
+        """moves: iterable of (item_detail_id, store_id, delta)."""
+        t0 = perf_counter()
+        cursor = self.conn.executemany(STOCK_UPSERT, [(s, d, q) for d, s, q in moves])
+        query_stats.record(self.conn, STOCK_UPSERT, (), perf_counter() - t0, cursor.rowcount)
+
+    def execute_many(self, query, seq_of_params):
+        """One prepared statement run for every params tuple. Returns the affected row count."""
+        t0 = perf_counter()
+        cursor = self.conn.executemany(query, seq_of_params)
+        query_stats.record(self.conn, query, (), perf_counter() - t0, cursor.rowcount)
+        self.touched(query)
+        return cursor.rowcount
+
+    def insert_many(self, table, rows, columns=None):
+        """
+        Batched INSERT. rows are dicts (columns = keys of the first row) or tuples in
+        `columns` order. Returns the new ids in row order.
+        """
+        rows = list(rows)
+        if not rows:
+            return []
+        if columns is None:
+            columns = list(rows[0].keys())
+            rows = [tuple(r[c] for c in columns) for r in rows]
+        self.execute_many(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({','.join('?' * len(columns))})", rows)
+        if "id" in columns:
+            i = list(columns).index("id")
+            return [r[i] for r in rows]
+        # We hold the write lock for the whole batch, so its rowids were handed out consecutively
+        last = self.conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        return list(range(last - len(rows) + 1, last + 1))
+
+    def execute_in(self, query, values, params=()):
+        """UPDATE/DELETE with an `IN ({in})` list of any length (params bind before the list)."""
+        total = 0
+        for chunk in chunks(values):
+            total += max(self.execute_many(in_query(query, len(chunk)), [tuple(params) + tuple(chunk)]), 0)
+        return total
+
+    def fetch_all(self, query, params=()):
+        t0 = perf_counter()
+        rows = self.conn.execute(query, params).fetchall()
+        query_stats.record(self.conn, query, params, perf_counter() - t0, len(rows))
+        return rows
+
+    def fetch_all_in(self, query, values, params=()):
+        rows = []
+        for chunk in chunks(values):
+            rows.extend(self.fetch_all(in_query(query, len(chunk)), tuple(params) + tuple(chunk)))
+        return rows
+
+    def fetch_one(self, query, params=()):
+        t0 = perf_counter()
+        row = self.conn.execute(query, params).fetchone()
+        query_stats.record(self.conn, query, params, perf_counter() - t0, 1 if row else 0)
+        return row
 
 class DB:
-    def __init__(self):
-        self.name = DB_PATH
+    def __init__(self, db_path=None, read_only=False):
+        self.name = db_path or DB_PATH
+        self.read_only = read_only
+        # Connections (and transaction depth) are tracked per file and mode
+        self.key = self.name + ("#ro" if read_only else "")
         # Ensure the data directory exists
         db_dir = os.path.dirname(self.name)
         if not os.path.exists(db_dir):
             os.makedirs(db_dir)
             
-        print(f"🔌 Database Path: {self.name}")
-        
-        self.initialize_schema()
-        self.patch_missing_columns()
+        if self.name not in _migrated:
+            print(f"🔌 Database Path: {self.name}")
+        if not read_only:
+            self.ensure_schema()
+
+    def reader(self):
+        """
+        Read-only twin of this DB for analytics (reports, dashboard): its own connections with
+        PRAGMA query_only, so a long aggregate only holds a WAL read snapshot and never competes
+        with the till's writes for the lock.
+        """
+        return DB(self.name, read_only=True)
     
     def get_connection(self):
-        return sqlite3.connect(self.name)
+        conns = getattr(_local, "conns", None)
+        if conns is None:
+            conns = _local.conns = {}
+        conn = conns.get(self.key)
+        if conn is None:
+            conn = sqlite3.connect(self.name)
+            self.apply_pragmas(conn)
+            conns[self.key] = conn
+        return conn
+
+    def apply_pragmas(self, conn):
+        pragmas = dict(DEFAULT_PRAGMAS)
+        try: pragmas.update(_cfg.get("db_pragmas", {}) or {})
+        except Exception as e: print(f"⚠️ db_pragmas config error: {e}")
+        if self.read_only:
+            pragmas = {k: v for k, v in pragmas.items() if k not in READER_SKIP_PRAGMAS}
+            pragmas["query_only"] = "ON"
+        for key, value in pragmas.items():
+            try: conn.execute(f"PRAGMA {key}={value}")
+            except sqlite3.Error as e: print(f"⚠️ PRAGMA {key} failed: {e}")
+
+    def close_connection(self):
+        """Closes this thread's connection (call on app exit / before replacing the DB file)."""
+        conns = getattr(_local, "conns", None) or {}
+        conn = conns.pop(self.key, None)
+        if conn is not None:
+            try: conn.close()
+            except sqlite3.Error: pass
+
+    def explain(self, query, params=()):
+        """EXPLAIN QUERY PLAN detail lines for a query (without running it)."""
+        return query_stats.explain(self.get_connection(), query, params)
+
+    def full_scans(self, query, params=()):
+        """Tables (or aliases) the planner reads top-to-bottom without any index."""
+        scans = []
+        for detail in self.explain(query, params):
+            parts = detail.split()
+            # "SCAN x USING (COVERING) INDEX ..." still walks an index, "SCAN x" walks the table
+            if parts[0] == "SCAN" and len(parts) == 2 and parts[1] != "CONSTANT":
+                scans.append(parts[1])
+        return scans
+
+    def check_plan(self, query, params=()):
+        """Dev aid ("db_plan_check": true in config.json): warn once per query about full table scans."""
+        if query in _plan_checked:
+            return
+        _plan_checked.add(query)
+        try:
+            scans = self.full_scans(query, params)
+            if scans:
+                print(f"⚠️ Full scan on {', '.join(scans)}\nQuery: {' '.join(query.split())}")
+        except sqlite3.Error:
+            pass
+
+    def in_transaction(self):
+        depths = getattr(_local, "tx_depth", None) or {}
+        return depths.get(self.key, 0) > 0
+
+    @contextmanager
+    def snapshot(self):
+        """
+        Consistent read: every query inside sees the database as of the first one
+        (one WAL snapshot), e.g. all the totals of a dashboard refresh. Joins an open one.
+        """
+        conn = self.get_connection()
+        if conn.in_transaction:
+            yield
+            return
+        conn.execute("BEGIN")
+        try:
+            yield
+        finally:
+            if conn.in_transaction: conn.rollback()  # nothing to commit, just releases the snapshot
+
+    @contextmanager
+    def transaction(self):
+        """
+        Unit of work: everything inside runs on one connection and is committed once.
+
+            with db.transaction() as tx:
+                inv_id = tx.execute("INSERT INTO invoices ...", (...))
+                tx.execute("UPDATE store_stock ...", (...))
+
+        Any exception rolls the whole block back and is re-raised. Nested blocks
+        join the outer transaction, and plain db.execute()/fetch_*() calls made
+        on the same thread inside the block take part in it too (no auto-commit).
+        """
+        conn = self.get_connection()
+        if not hasattr(_local, "tx_depth"):
+            _local.tx_depth = {}
+        depth = _local.tx_depth.get(self.key, 0)
+        if depth == 0:
+            _local.dims_pending = set()
+        if depth == 0 and not conn.in_transaction:
+            # IMMEDIATE takes the write lock up front so read-then-write steps can't race;
+            # if another connection holds it past busy_timeout, wait and try again
+            retry_locked(lambda: conn.execute("BEGIN IMMEDIATE"), conn)
+        _local.tx_depth[self.key] = depth + 1
+        try:
+            yield Transaction(conn, self.name)
+        except BaseException:
+            _local.tx_depth[self.key] = depth
+            if depth == 0:
+                conn.rollback()
+                self.flush_dims()
+            raise
+        _local.tx_depth[self.key] = depth
+        if depth == 0:
+            conn.commit()
+            self.flush_dims()
+
+    def flush_dims(self):
+        pending, _local.dims_pending = getattr(_local, "dims_pending", None), None
+        for name, table in pending or ():
+            invalidate_dims(name, table)
+
+    def dim_map(self, table):
+        """
+        name -> id for a dimension table (DIM_TABLES), loaded once and kept until
+        the table is written to. Duplicate names (safes, suppliers): lowest id wins.
+        """
+        if table not in DIM_TABLES:
+            raise ValueError(f"Not a dimension table: {table}")
+        key = (self.name, table)
+        names = _dims.get(key)
+        if names is None:
+            gen = _dims_gen.get(key, 0)
+            names = self.read_dim(table)
+            with _dims_lock:
+                if _dims_gen.get(key, 0) == gen:
+                    _dims[key] = names
+        return names
+
+    def read_dim(self, table):
+        """name -> id straight from the table (what dim_map caches)."""
+        names = {}
+        for id_, name in self.fetch_all(f"SELECT id, name FROM {table} ORDER BY id"):
+            names.setdefault(name, id_)
+        return names
+
+    def prime_dims(self, maps):
+        """Installs saved lookups {table: {name: id}} (warm start, app/snapshot.py) for tables not loaded yet."""
+        with _dims_lock:
+            for table, names in maps.items():
+                if table in DIM_TABLES:
+                    _dims.setdefault((self.name, table), names)
+
+    def dim_names(self, table):
+        """Sorted names of a dimension table, for combo boxes (cached like dim_map)."""
+        return sorted(name for name in self.dim_map(table) if name)
+
+    def dim_id(self, table, name):
+        """Cached `SELECT id FROM <table> WHERE name=?`; None if there's no such row."""
+        if not name: return None
+        return self.dim_map(table).get(name)
+
+    def dim_get_or_create(self, table, name):
+        """id for name, inserting the row on first use (colors, sizes, ...). Joins an open transaction."""
+        id_ = self.dim_id(table, name)
+        if id_ is None:
+            id_ = self.execute(f"INSERT INTO {table} (name) VALUES (?)", (name,))
+        return id_
 
     def execute(self, query, params=()):
+        conn = self.get_connection()
         try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(query, params)
-                conn.commit()
-                return cursor.lastrowid
+            t0 = perf_counter()
+            if self.in_transaction():
+                cursor = conn.execute(query, params)
+            else:
+                def run():
+                    cur = conn.execute(query, params)
+                    conn.commit()
+                    return cur
+                cursor = retry_locked(run, conn)
+            table = dim_written(query)
+            if table: invalidate_dims(self.name, table)
+            query_stats.record(conn, query, params, perf_counter() - t0, cursor.rowcount)
+            return cursor.lastrowid
         except sqlite3.Error as e:
+            if not self.in_transaction(): conn.rollback()
             print(f"❌ SQL Execute Error: {e}\nQuery: {query}\nParams: {params}")
             raise e
 
     def fetch_all(self, query, params=()):
+        if PLAN_CHECK: self.check_plan(query, params)
         try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(query, params)
-                return cursor.fetchall()
+            conn = self.get_connection()
+            t0 = perf_counter()
+            rows = conn.execute(query, params).fetchall()
+            query_stats.record(conn, query, params, perf_counter() - t0, len(rows))
+            return rows
         except sqlite3.Error as e:
             print(f"❌ SQL FetchAll Error: {e}\nQuery: {query}")
+            if self.in_transaction(): raise
             return []
 
+    def fetch_iter(self, query, params=(), chunk_size=500):
+        """
+        Streams a result set chunk_size rows at a time instead of building one list,
+        so memory stays flat however many rows match. Consume it on the thread that
+        started it (e.g. inside a DB worker job); the read snapshot is held until it ends.
+        """
+        if PLAN_CHECK: self.check_plan(query, params)
+        conn = self.get_connection()
+        elapsed, count = 0.0, 0
+        try:
+            t0 = perf_counter()
+            cursor = conn.execute(query, params)
+            elapsed += perf_counter() - t0
+        except sqlite3.Error as e:
+            print(f"❌ SQL FetchIter Error: {e}\nQuery: {query}")
+            if self.in_transaction(): raise
+            return
+        try:
+            while True:
+                t0 = perf_counter()
+                rows = cursor.fetchmany(chunk_size)
+                elapsed += perf_counter() - t0  # time in SQLite only, not in the consumer
+                if not rows:
+                    break
+                count += len(rows)
+                yield from rows
+        finally:
+            cursor.close()
+            query_stats.record(conn, query, params, elapsed, count)
+
     def fetch_one(self, query, params=()):
+        if PLAN_CHECK: self.check_plan(query, params)
         try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(query, params)
-                return cursor.fetchone()
+            conn = self.get_connection()
+            t0 = perf_counter()
+            row = conn.execute(query, params).fetchone()
+            query_stats.record(conn, query, params, perf_counter() - t0, 1 if row else 0)
+            return row
         except sqlite3.Error as e:
             print(f"❌ SQL FetchOne Error: {e}\nQuery: {query}")
+            if self.in_transaction(): raise
             return None
 
+    def execute_many(self, query, seq_of_params):
+        """executemany in one transaction (joins an open one). Returns the affected row count."""
+        with self.transaction() as tx:
+            return tx.execute_many(query, seq_of_params)
+
+    def insert_many(self, table, rows, columns=None):
+        """Batched INSERT in one transaction; returns the new ids in row order (see Transaction.insert_many)."""
+        with self.transaction() as tx:
+            return tx.insert_many(table, rows, columns)
+
+    def execute_in(self, query, values, params=()):
+        """
+        Runs `query` over any number of values without hitting SQLite's variable limit:
+
+            db.execute_in("UPDATE item_details SET sell_price=? WHERE id IN ({in})", ids, (price,))
+
+        All chunks commit together.
+        """
+        with self.transaction() as tx:
+            return tx.execute_in(query, values, params)
+
+    def fetch_all_in(self, query, values, params=()):
+        """SELECT counterpart of execute_in: rows of every chunk, concatenated (ORDER BY applies per chunk)."""
+        rows = []
+        for chunk in chunks(values):
+            rows.extend(self.fetch_all(in_query(query, len(chunk)), tuple(params) + tuple(chunk)))
+        return rows
+
+    def move_stock(self, item_detail_id, store_id, delta):
+        """Single stock movement (delta < 0 deducts). Joins an open transaction if there is one."""
+        with self.transaction() as tx:
+            tx.move_stock(item_detail_id, store_id, delta)
+
+    def move_stock_many(self, moves):
+        """Batched form: iterable of (item_detail_id, store_id, delta), one commit."""
+        with self.transaction() as tx:
+            tx.move_stock_many(moves)
+
     def backup_database(self):
         try:
             base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -65,7 +497,10 @@ class DB:
             backup_path = os.path.join(backup_dir, backup_filename)
             
             if os.path.exists(self.name):
-                shutil.copy2(self.name, backup_path)
+                # WAL keeps recent commits in inventory.db-wal, so a plain file copy
+                # could miss them -> use SQLite's online backup instead
+                with closing(sqlite3.connect(backup_path)) as dest:  # closing(): a bare connection's `with` doesn't close it
+                    self.get_connection().backup(dest)
                 print(f"✅ Backup created: {backup_path}")
                 self.cleanup_old_backups(backup_dir)
         except Exception as e:
@@ -81,176 +516,57 @@ class DB:
                     except: pass
         except: pass
 
-    def initialize_schema(self):
-        """
-        Initializes the database schema.
-        
-        FUTURE-PROOFING:
-        To add a new table, simply add its 'CREATE TABLE IF NOT EXISTS' statement below.
-        The app will automatically create it on the next run without affecting existing data.
-        """
-        try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                # Create Tables if they don't exist
-                cursor.execute("""CREATE TABLE IF NOT EXISTS invoices (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT, customer_id INTEGER, net_total REAL,
-                    store_id INTEGER, safe_id INTEGER, payment_method TEXT, delegate_name TEXT, channel TEXT
-                )""")
-                cursor.execute("""CREATE TABLE IF NOT EXISTS customers (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, phone TEXT, address TEXT
-                )""")
-                cursor.execute("""CREATE TABLE IF NOT EXISTS returns (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT, invoice_id INTEGER, 
-                    item_detail_id INTEGER, qty REAL, refund_amount REAL, notes TEXT
-                )""")
-                for table in ['categories', 'colors', 'sizes', 'units', 'stores']:
-                    cursor.execute(f"CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE)")
-                cursor.execute("""CREATE TABLE IF NOT EXISTS items (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, 
-                    category_id INTEGER, unit_id INTEGER, code TEXT
-                )""")
-                cursor.execute("""CREATE TABLE IF NOT EXISTS item_details (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT, item_id INTEGER, barcode TEXT UNIQUE,
-                    color_id INTEGER, size_id INTEGER, buy_price REAL DEFAULT 0, 
-                    sell_price REAL DEFAULT 0, stock_qty REAL DEFAULT 0,
-                    FOREIGN KEY(item_id) REFERENCES items(id)
-                )""")
-                cursor.execute("""CREATE TABLE IF NOT EXISTS store_stock (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT, store_id INTEGER, 
-                    item_detail_id INTEGER, quantity REAL DEFAULT 0
-                )""")
-                cursor.execute("""CREATE TABLE IF NOT EXISTS invoice_details (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT, invoice_id INTEGER, 
-                    item_detail_id INTEGER, qty REAL, price REAL, total REAL, 
-                    returned_qty REAL DEFAULT 0
-                )""")
-                cursor.execute("""CREATE TABLE IF NOT EXISTS transfers (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT, from_safe_id INTEGER, 
-                    to_safe_id INTEGER, amount REAL, notes TEXT
-                )""")
-                cursor.execute("""CREATE TABLE IF NOT EXISTS vouchers (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT, voucher_type TEXT,
-                    safe_id INTEGER, amount REAL, description TEXT,
-                    customer_id INTEGER, supplier_id INTEGER,
-                    FOREIGN KEY (safe_id) REFERENCES safes(id)
-                )""")
-                cursor.execute("""CREATE TABLE IF NOT EXISTS safes (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT)""")
-                cursor.execute("""CREATE TABLE IF NOT EXISTS users (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE NOT NULL, password TEXT NOT NULL, role TEXT NOT NULL DEFAULT 'Sales'
-                )""")
-                cursor.execute("""CREATE TABLE IF NOT EXISTS suppliers (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, phone TEXT, address TEXT, email TEXT, notes TEXT
-                )""")
-                cursor.execute("""CREATE TABLE IF NOT EXISTS purchases (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT, supplier_id INTEGER, 
-                    store_id INTEGER, safe_id INTEGER, payment_method TEXT, net_total REAL,
-                    tax_percent REAL DEFAULT 0, discount_percent REAL DEFAULT 0,
-                    discount_value REAL DEFAULT 0, shipping_cost REAL DEFAULT 0, notes TEXT,
-                    FOREIGN KEY (supplier_id) REFERENCES suppliers(id)
-                )""")
-                cursor.execute("""CREATE TABLE IF NOT EXISTS purchase_details (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT, purchase_id INTEGER, item_detail_id INTEGER,
-                    qty REAL, buy_price REAL, total REAL, returned_qty REAL DEFAULT 0,
-                    FOREIGN KEY (purchase_id) REFERENCES purchases(id) ON DELETE CASCADE,
-                    FOREIGN KEY (item_detail_id) REFERENCES item_details(id)
-                )""")
-                cursor.execute("""CREATE TABLE IF NOT EXISTS purchase_returns (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT, purchase_id INTEGER,
-                    qty REAL, refund_amount REAL, notes TEXT,
-                    FOREIGN KEY (purchase_id) REFERENCES purchases(id)
-                )""")
-                cursor.execute("""CREATE TABLE IF NOT EXISTS purchase_return_details (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT, purchase_return_id INTEGER,
-                    purchase_detail_id INTEGER, qty REAL,
-                    FOREIGN KEY (purchase_return_id) REFERENCES purchase_returns(id) ON DELETE CASCADE,
-                    FOREIGN KEY (purchase_detail_id) REFERENCES purchase_details(id)
-                )""")
-                conn.commit()
-        except Exception as e:
-            print(f"❌ Schema Init Error: {e}")
+    def ensure_schema(self):
+        """Runs pending migrations once per process; afterwards it's a set lookup."""
+        if self.name in _migrated:
+            return
+        with _migrate_lock:
+            if self.name in _migrated:
+                return
+            try:
+                run_migrations(self.get_connection())
+                _migrated.add(self.name)
+            except Exception as e:
+                print(f"❌ Schema Migration Error: {e}")
 
-    def patch_missing_columns(self):
-        try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # 1. Patch Invoices
-                cursor.execute("PRAGMA table_info(invoices)")
-                cols = [info[1] for info in cursor.fetchall()]
-                new_cols = {
-                    "tax_percent": "REAL DEFAULT 0", "discount_percent": "REAL DEFAULT 0",
-                    "shipping_cost": "REAL DEFAULT 0", "notes": "TEXT",
-                    "paid_amount": "REAL DEFAULT 0", "remaining_amount": "REAL DEFAULT 0"
-                }
-                for col, dtype in new_cols.items():
-                    if col not in cols:
-                        print(f"🔧 Patching 'invoices': Adding {col}...")
-                        cursor.execute(f"ALTER TABLE invoices ADD COLUMN {col} {dtype}")
-
-                # 2. Patch Purchases (Fixed in previous step)
-                cursor.execute("PRAGMA table_info(purchases)")
-                p_cols = [info[1] for info in cursor.fetchall()]
-                p_new_cols = {
-                    "tax_percent": "REAL DEFAULT 0",
-                    "discount_percent": "REAL DEFAULT 0",
-                    "discount_value": "REAL DEFAULT 0",
-                    "shipping_cost": "REAL DEFAULT 0",
-                    "notes": "TEXT",
-                    "paid_amount": "REAL DEFAULT 0",
-                    "remaining_amount": "REAL DEFAULT 0"
-                }
-                for col, dtype in p_new_cols.items():
-                    if col not in p_cols:
-                        print(f"🔧 Patching 'purchases': Adding {col}...")
-                        cursor.execute(f"ALTER TABLE purchases ADD COLUMN {col} {dtype}")
-
-                # 3. Patch Purchase Details (THE NEW FIX)
-                cursor.execute("PRAGMA table_info(purchase_details)")
-                pd_cols = [info[1] for info in cursor.fetchall()]
-                pd_new_cols = {
-                    "buy_price": "REAL DEFAULT 0",
-                    "returned_qty": "REAL DEFAULT 0",
-                    "total": "REAL DEFAULT 0"
-                }
-                for col, dtype in pd_new_cols.items():
-                    if col not in pd_cols:
-                        print(f"🔧 Patching 'purchase_details': Adding {col}...")
-                        cursor.execute(f"ALTER TABLE purchase_details ADD COLUMN {col} {dtype}")
-
-                # 4. Patch Returns (For 'no such column: r.invoice_id' error)
-                cursor.execute("PRAGMA table_info(returns)")
-                r_cols = [info[1] for info in cursor.fetchall()]
-                if "invoice_id" not in r_cols:
-                    print(f"🔧 Patching 'returns': Adding invoice_id...")
-                    cursor.execute("ALTER TABLE returns ADD COLUMN invoice_id INTEGER")
-
-                # 5. Patch Purchase Returns
-                cursor.execute("PRAGMA table_info(purchase_returns)")
-                pr_cols = [info[1] for info in cursor.fetchall()]
-                if "purchase_detail_id" not in pr_cols:
-                    cursor.execute("ALTER TABLE purchase_returns ADD COLUMN purchase_detail_id INTEGER")
-
-                # 6. Patch invoice_details (Add cost_at_sale for accurate profit calculation)
-                cursor.execute("PRAGMA table_info(invoice_details)")
-                id_cols = [info[1] for info in cursor.fetchall()]
-                id_new_cols = {
-                    "cost_at_sale": "REAL DEFAULT 0",
-                    "item_note": "TEXT"
-                }
-                for col, dtype in id_new_cols.items():
-                    if col not in id_cols:
-                        print(f"🔧 Patching 'invoice_details': Adding {col}...")
-                        cursor.execute(f"ALTER TABLE invoice_details ADD COLUMN {col} {dtype}")
-
-                # 7. Patch purchases (Add parent_purchase_id for manufacturing linkage)
-                cursor.execute("PRAGMA table_info(purchases)")
-                pur_cols = [info[1] for info in cursor.fetchall()]
-                if "parent_purchase_id" not in pur_cols:
-                    print(f"🔧 Patching 'purchases': Adding parent_purchase_id...")
-                    cursor.execute("ALTER TABLE purchases ADD COLUMN parent_purchase_id INTEGER")
-
-                conn.commit()
-                # print("✅ Database Schema Patched Successfully.")
-        except Exception as e:
-            print(f"⚠️ Patch Error: {e}")
\ No newline at end of file
+
+# --- Shared service -------------------------------------------------------
+# The app uses one DB for its whole lifetime: InventoryApp owns it and hands it
+# to every page (db=...). Created on first use so migrations run once, before
+# the first query, not at import time.
+_shared = None
+_reader = None
+_shared_lock = threading.Lock()
+
+
+def get_db():
+    """The process-wide DB (created lazily). Pages get it injected; this is the fallback."""
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = DB()
+    return _shared
+
+
+def get_read_db():
+    """The shared read-only DB for analytic reads (the DB worker uses it, see DB.reader())."""
+    global _reader
+    if _reader is None:
+        db = get_db()  # writer first: migrations must run before anyone reads
+        with _shared_lock:
+            if _reader is None:
+                _reader = db.reader()
+    return _reader
+
+
+def close_db():
+    """End of the app lifecycle: closes the calling thread's connections (WAL checkpoint) and drops the service."""
+    global _shared, _reader
+    with _shared_lock:
+        if _reader is not None:
+            _reader.close_connection()
+            _reader = None
+        if _shared is not None:
+            _shared.close_connection()
+            _shared = None
@@ -0,0 +1,144 @@
+import threading
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from .database import get_read_db
+from . import query_stats
+
+# How often (ms) the Tk thread checks whether a queued job has finished
+POLL_MS = 15
+
+
+class DBWorker:
+    """
+    Runs DB work on one background thread so the Tk main loop never waits on SQL.
+
+        worker.call(widget, lambda db: db.fetch_all(sql), on_done, key="reports")
+
+    A job is any callable taking the DB (or a ("all"|"one", sql, params) tuple).
+    Results come back on the Tk thread: the widget polls the future with after(),
+    so Tk is never touched from the worker. A new job with the same key cancels
+    the previous one, and results for destroyed widgets are dropped.
+
+    Jobs get the read-only DB (get_read_db) and each runs inside one snapshot, so
+    reports see consistent totals and never hold a lock the till needs. Writes
+    belong on the Tk thread's DB.
+    """
+    def __init__(self, db=None, name="db-worker"):
+        self.db = db or get_read_db()
+        # One thread: jobs run in order and share a single (thread-local) connection
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+        self.latest = {}  # key -> Future of the job whose result is still wanted
+
+    def as_job(self, job):
+        if callable(job):
+            return job
+        kind, query, params = job
+        if kind == "one":
+            return lambda db: db.fetch_one(query, params)
+        return lambda db: db.fetch_all(query, params)
+
+    def submit(self, job, label=None):
+        """Queues a job; returns a concurrent.futures.Future (no Tk delivery)."""
+        fn = self.as_job(job)
+        label = label or query_stats.caller()  # slow-query log names the page, not this thread
+
+        def run(db):
+            with query_stats.caller_label(label), db.snapshot():
+                return fn(db)
+        return self.executor.submit(run, self.db)
+
+    def pending(self, key):
+        return key in self.latest
+
+    def cancel(self, key):
+        """Drops the pending job for key (e.g. the user changed filters). A query already running finishes, its result is ignored."""
+        fut = self.latest.pop(key, None)
+        if fut is not None:
+            fut.cancel()
+
+    def call(self, widget, job, on_done, on_error=None, key=None, label=None):
+        if key is not None:
+            self.cancel(key)
+        fut = self.submit(job, label)
+        if key is not None:
+            self.latest[key] = fut
+        self._poll(widget, fut, on_done, on_error, key)
+        return fut
+
+    def run_steps(self, widget, steps, on_error=None, key=None):
+        """
+        Drives a generator on the Tk thread. Every value it yields is a job; the job runs
+        on the worker and its result is sent back into the generator:
+
+            data = yield ("all", sql, params)
+        """
+        if key is not None:
+            self.cancel(key)
+
+        def fail(err):
+            steps.close()
+            if on_error: on_error(err)
+            else: print(f"❌ DB Worker Error: {err}")
+
+        def advance(result=None):
+            try:
+                job = steps.send(result)
+            except StopIteration:
+                return
+            self.call(widget, job, advance, on_error=fail, key=key, label=query_stats.frame_label(steps.gi_frame))
+
+        advance()
+
+    def _poll(self, widget, fut, on_done, on_error, key):
+        if not fut.done():
+            try:
+                widget.after(POLL_MS, self._poll, widget, fut, on_done, on_error, key)
+            except tk.TclError:  # widget (or app) destroyed while waiting
+                fut.cancel()
+            return
+        if key is not None:
+            if self.latest.get(key) is not fut:
+                return  # superseded by a newer job
+            del self.latest[key]
+        if fut.cancelled():
+            return
+        try:
+            if not widget.winfo_exists():
+                return
+        except tk.TclError:
+            return
+        err = fut.exception()
+        if err is not None:
+            if on_error: on_error(err)
+            else: print(f"❌ DB Worker Error: {err}")
+            return
+        on_done(fut.result())
+
+    def shutdown(self):
+        for key in list(self.latest):
+            self.cancel(key)
+        # Close the worker thread's own connection, then let the thread exit
+        self.executor.submit(lambda: self.db.close_connection())
+        self.executor.shutdown(wait=True)
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_worker():
+    """The app's DB worker (started on first use, bound to the shared read-only DB)."""
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = DBWorker()
+    return _worker
+
+
+def shutdown_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is not None:
+            _worker.shutdown()
+            _worker = None
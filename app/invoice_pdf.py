@@ -0,0 +1,224 @@
+"""
+Sales invoice PDF (A5), laid out from the saved invoice alone: no Tk here, so the
+PDF queue (app/pdf_queue.py) renders it on its own thread while the till moves on
+to the next customer.
+"""
+import os
+import urllib.parse
+from app.utils import REPORTLAB_AVAILABLE
+from app.pdf_resources import paragraph_style, logo_image
+
+if REPORTLAB_AVAILABLE:
+    from app.utils import SimpleDocTemplate, A5, Table, TableStyle, Paragraph, Spacer, colors
+
+
+def whatsapp_url(phone, invoice_id):
+    """whatsapp:// link to the customer's chat, with the invoice number as the message."""
+    phone = phone.replace(" ", "").replace("-", "")
+    if not phone.startswith("+"):
+        phone = f"+{phone}"
+    encoded_msg = urllib.parse.quote(f"Invoice #{invoice_id}")
+    return f"whatsapp://send?phone={phone}&text={encoded_msg}"
+
+
+def render_invoice_pdf(db, invoice_id, save_dir):
+    """Writes Inv_<id>_<customer>.pdf into save_dir from the saved invoice; returns its path."""
+    # Helper to fetch data (unchanged)
+    sql = """SELECT i.date, c.name, c.phone, c.address, s.name, i.payment_method, i.delegate_name, i.discount_percent, i.tax_percent, i.shipping_cost, i.notes, i.paid_amount, i.remaining_amount, i.net_total FROM invoices i LEFT JOIN customers c ON i.customer_id=c.id LEFT JOIN stores s ON i.store_id=s.id WHERE i.id=?"""
+    inv_data = db.fetch_one(sql, (invoice_id,))
+    if not inv_data:
+        raise LookupError(f"Invoice #{invoice_id} not found")
+
+    cust_name = inv_data[1] or "Client"
+    safe_cust_name = "".join([c for c in cust_name if c.isalnum() or c in (' ', '_', '-')]).strip()
+    pdf_filename = f"Inv_{invoice_id}_{safe_cust_name}.pdf"
+    pdf_path = os.path.join(save_dir, pdf_filename)
+
+    # Updated query to fetch item_note
+    items = db.fetch_all("""SELECT d.barcode, i.name, c.name, s.name, id.qty, id.price, id.total, id.item_note FROM invoice_details id JOIN item_details d ON id.item_detail_id = d.id JOIN items i ON d.item_id = i.id LEFT JOIN colors c ON d.color_id = c.id LEFT JOIN sizes s ON d.size_id = s.id WHERE id.invoice_id = ?""", (invoice_id,))
+
+    # --- Professional PDF Design using ReportLab (A5) ---
+    doc = SimpleDocTemplate(pdf_path, pagesize=A5, rightMargin=20, leftMargin=20, topMargin=20, bottomMargin=20)
+    elements = []
+
+    # Styles (built once per session, app/pdf_resources.py)
+    normal_center = paragraph_style('NormalCenter', fontName='Helvetica', fontSize=10, alignment=1, textColor=colors.black)
+
+    # --- 1. Header Section ---
+    # Logo (Left) | Invoice Info (Right) - 2 Columns
+    logo_obj = logo_image(80)
+    if not logo_obj:
+        logo_obj = Paragraph("<b>HISTORIA</b>", paragraph_style('LogoText', fontName='Helvetica-Bold', fontSize=18, textColor=colors.HexColor("#2C3E50")))
+
+    date_str = inv_data[0]
+    inv_num_text = Paragraph(f"<b>INVOICE #{invoice_id}</b><br/>Date: {date_str}", 
+                             paragraph_style('InvNum', fontName='Helvetica', fontSize=11, alignment=2, leading=14))
+
+    # Header Table (2 Cols: Logo, Info)
+    # Total A5 width ~420. Margins 20+20=40. Usable ~380.
+    # Logo Col: 190, Info Col: 190
+    header_data = [[logo_obj, inv_num_text]]
+    header_table = Table(header_data, colWidths=[190, 190])
+    header_table.setStyle(TableStyle([
+        ('ALIGN', (0,0), (0,0), 'LEFT'),   # Logo
+        ('ALIGN', (1,0), (1,0), 'RIGHT'),  # Info
+        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+    ]))
+    elements.append(header_table)
+    elements.append(Spacer(1, 10))
+    elements.append(Paragraph("_"*65, normal_center)) 
+    elements.append(Spacer(1, 10))
+
+    # --- 2. Information Section (2 Columns) ---
+    cust_name = inv_data[1] or 'Unknown'
+    cust_phone = inv_data[2] or '-'
+    cust_addr = inv_data[3] or '-'
+
+    store_name = inv_data[4] or 'Main Branch'
+    pay_method = inv_data[5] or 'Cash'
+
+    # Left: Customer, Right: Store/Payment (Swapped for English LTR flow)
+    # Actually standard English invoice: Customer on Left usually.
+
+    left_col_text = [
+        f"<b>Customer:</b> {cust_name}",
+        f"<b>Phone:</b> {cust_phone}",
+        f"<b>Address:</b> {cust_addr}"
+    ]
+    right_col_text = [
+        f"<b>Store:</b> {store_name}",
+        f"<b>Payment:</b> {pay_method}"
+    ]
+
+    p_left = Paragraph("<br/>".join(left_col_text), paragraph_style('InfoLeft', fontName='Helvetica', fontSize=10, leading=14, alignment=0))
+    p_right = Paragraph("<br/>".join(right_col_text), paragraph_style('InfoRight', fontName='Helvetica', fontSize=10, leading=14, alignment=2)) # Align right for balance
+
+    # 2 Columns of ~190 each
+    info_data = [[p_left, p_right]]
+    info_table = Table(info_data, colWidths=[190, 190])
+    info_table.setStyle(TableStyle([
+        ('VALIGN', (0,0), (-1,-1), 'TOP'),
+        ('LEFTPADDING', (0,0), (-1,-1), 5),
+        ('RIGHTPADDING', (0,0), (-1,-1), 5),
+    ]))
+    elements.append(info_table)
+    elements.append(Spacer(1, 15))
+
+    # --- 3. Items Grid ---
+    headers = ["Item", "Color", "Size", "Qty", "Price", "Total"]
+    table_data = [headers]
+
+    subtotal = 0
+    for item in items:
+        barcode, name, color, size, qty, price, total, item_note = item
+
+        # Append item_note if exists
+        display_name = name
+        if item_note:
+            display_name += f" {item_note}"
+
+        row = [
+            # name[:20] + '..' if len(name)>20 else name, # Item Name (Barcode removed to save space or merge?)
+            # User requested: "Item", "Color", "Size", "Qty", "Price", "Total"
+            # I will put Item Name in first col.
+            display_name[:30] + '..' if len(display_name)>30 else display_name,
+            color or '-',
+            size or '-',
+            str(int(qty)),
+            f"{price:.2f}",
+            f"{total:.2f}"
+        ]
+        table_data.append(row)
+        subtotal += total
+
+    # Adjusted Column Widths for A5 (Total ~380)
+    # [130, 45, 35, 35, 60, 75] = 380
+    col_widths = [130, 45, 35, 35, 60, 75]
+    t = Table(table_data, colWidths=col_widths, repeatRows=1)
+
+    t.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#2C3E50")),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, 0), 10), 
+        ('FONTSIZE', (0, 1), (-1, -1), 9), 
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.whitesmoke]),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+        ('TOPPADDING', (0, 0), (-1, -1), 4),
+    ]))
+    elements.append(t)
+    elements.append(Spacer(1, 15))
+
+    # --- 4. Totals Footer ---
+    discount_amount = inv_data[7] or 0 # Correct index check? 
+    # SQL: date, c.name, c.phone, c.address, s.name, i.payment_method, i.delegate_name, i.discount_percent...
+    # Indices: 0, 1, 2, 3, 4, 5, 6, 7 (disc), 8 (tax), 9 (ship), 10 (notes), 11 (paid), 12 (rem), 13 (net)
+
+    tax_percent = inv_data[8] or 0
+    shipping_cost = inv_data[9] or 0
+
+    # Discount is Fixed Amount (LE)
+    discount_value = discount_amount
+    after_discount = subtotal - discount_value
+    tax_value = after_discount * (tax_percent / 100)
+    net_total = after_discount + tax_value + shipping_cost
+    # Align totals to the Left (or visual right for Arabic, but let's stack them nicely)
+
+    totals_data = []
+    totals_data.append(["Subtotal:", f"{subtotal:,.2f}"])
+
+    # Always show Discount, Shipping, Tax
+    disc_str = f"-{discount_value:,.2f}" if discount_value > 0 else "0.00"
+    totals_data.append(["Discount:", disc_str])
+
+    totals_data.append(["Shipping:", f"{shipping_cost:,.2f}"])
+    totals_data.append(["Tax:", f"{tax_value:,.2f}"])
+
+    totals_data.append(["NET TOTAL:", f"{net_total:,.2f}"])
+
+    totals_table = Table(totals_data, colWidths=[100, 120])
+    totals_table.setStyle(TableStyle([
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+        ('ALIGN', (0, 0), (0, -1), 'RIGHT'), # Labels
+        ('ALIGN', (1, 0), (1, -1), 'LEFT'),  # Values
+        ('FONTSIZE', (0, 0), (-1, -2), 10),
+        ('FONTSIZE', (0, -1), (-1, -1), 14), # Net Total Big
+        ('TEXTCOLOR', (0, -1), (-1, -1), colors.HexColor("#2C3E50")),
+        ('LINEABOVE', (0, -1), (-1, -1), 1, colors.black),
+        ('TOPPADDING', (0, -1), (-1, -1), 5),
+        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+    ]))
+
+    # Wrap totals table
+    wrapper_table = Table([[None, totals_table]], colWidths=[160, 220])
+    wrapper_table.setStyle(TableStyle([('VALIGN', (0,0), (-1,-1), 'TOP')]))
+    elements.append(wrapper_table)
+
+    # Paid/Remaining
+    elements.append(Spacer(1, 10))
+    paid_amount = inv_data[11] or 0
+    remaining_amount = inv_data[12] or 0
+    if paid_amount > 0 or remaining_amount > 0:
+        payment_info = [
+            f"Paid: {paid_amount:,.2f}",
+            f"Remaining: {remaining_amount:,.2f}"
+        ]
+        elements.append(Paragraph("  |  ".join(payment_info), paragraph_style('PayInfo', fontName='Helvetica', fontSize=11, alignment=1)))
+
+    # Notes
+    if inv_data[10]:
+        elements.append(Spacer(1, 10))
+        elements.append(Paragraph(f"Notes: {inv_data[10]}", paragraph_style('Notes', fontName='Helvetica', fontSize=10, textColor=colors.grey)))
+
+    # --- 5. Footer Slogan ---
+    elements.append(Spacer(1, 20))
+    elements.append(Paragraph("_"*65, normal_center))
+    elements.append(Spacer(1, 10))
+    elements.append(Paragraph("Thank you for shopping with HISTORIA", paragraph_style('Footer1', fontName='Helvetica', fontSize=10, alignment=1)))
+    elements.append(Spacer(1, 15)) # Increased spacing as requested
+    elements.append(Paragraph("Fashion that tells a story", paragraph_style('FooterEn', fontName='Helvetica-Oblique', fontSize=10, alignment=1, textColor=colors.grey)))
+
+    doc.build(elements)
+    return pdf_path
@@ -0,0 +1,138 @@
+"""
+Sales invoice lines written as one batch (OrderPage.save_invoice).
+
+The page turns its cart into SaleLine tuples before opening the transaction;
+write_sale_lines() then costs every SKU with one query, inserts all the
+invoice_details rows with one executemany and applies the stock movements with
+one batched upsert: each SKU leaves the sales store and each HD design leaves
+the Main Stock store, with repeats of the same SKU summed into one movement.
+No Tk here, so benchmarks/bench_save_invoice.py drives it directly.
+
+stock_shortfalls() is the matching pre-save check: one query for the whole cart.
+Editing a saved invoice goes through edit_sale_lines(), which diffs the cart
+against the saved lines and writes only what changed.
+"""
+from collections import namedtuple
+
+# design_id: the HD design SKU printed on this line (deducted from Main Stock), or None
+# detail_id: the invoice_details row the line was reloaded from when editing, None for a new line
+SaleLine = namedtuple("SaleLine", "item_detail_id qty price note design_id detail_id", defaults=(None,))
+# An invoice_details row already saved (id = its row id), as edit_sale_lines() diffs it
+SavedLine = namedtuple("SavedLine", "id item_detail_id qty price note returned_qty")
+
+# Stock available per SKU in one store; lines of the invoice being edited (first ?) count as available
+# when it was sold from that same store, since saving the edit puts them back first
+STOCK_CHECK_SQL = """SELECT d.id, IFNULL(s.quantity, 0) + IFNULL((SELECT SUM(l.qty) FROM invoice_details l JOIN invoices i ON i.id = l.invoice_id
+                         WHERE l.invoice_id = ? AND l.item_detail_id = d.id AND i.store_id = ?), 0)
+                     FROM item_details d LEFT JOIN store_stock s ON s.store_id = ? AND s.item_detail_id = d.id
+                     WHERE d.id IN ({in})"""
+
+DETAIL_COLUMNS = ("invoice_id", "item_detail_id", "qty", "price", "total", "item_note", "cost_at_sale")
+
+
+def stock_shortfalls(db, store_id, wanted, editing_id=None):
+    """
+    wanted: {SKU id: total qty in the cart}. Returns [(SKU id, wanted, available)]
+    for every SKU the store can't cover, in cart order.
+    """
+    if not wanted:
+        return []
+    available = dict(db.fetch_all_in(STOCK_CHECK_SQL, list(wanted), (editing_id or 0, store_id, store_id)))
+    return [(sku_id, qty, available.get(sku_id, 0)) for sku_id, qty in wanted.items() if available.get(sku_id, 0) < qty]
+
+
+def sale_costs(tx, sku_ids):
+    """{SKU id: buy_price} for cost_at_sale (historical profit), one query for the whole invoice."""
+    return dict(tx.fetch_all_in("SELECT id, buy_price FROM item_details WHERE id IN ({in})", set(sku_ids)))
+
+
+def net_moves(moves):
+    """Sums (item_detail_id, store_id, delta) movements per (SKU, store), dropping the ones that cancel out."""
+    net = {}
+    for did, sid, delta in moves:
+        net[(did, sid)] = net.get((did, sid), 0) + delta
+    return [(did, sid, delta) for (did, sid), delta in net.items() if delta]
+
+
+def sale_moves(lines, store_id, design_store_id):
+    """The stock a sale takes: each SKU from the sales store, each HD design from design_store_id."""
+    for line in lines:
+        yield line.item_detail_id, store_id, -line.qty
+        if line.design_id:
+            yield line.design_id, design_store_id, -line.qty
+
+
+def insert_sale_lines(tx, invoice_id, lines):
+    """invoice_details rows for lines, costed at today's buy_price. Returns their ids."""
+    if not lines:
+        return []
+    costs = sale_costs(tx, (line.item_detail_id for line in lines))
+    return tx.insert_many("invoice_details", [
+        (invoice_id, line.item_detail_id, line.qty, line.price, line.qty * line.price, line.note,
+         costs.get(line.item_detail_id, 0)) for line in lines], DETAIL_COLUMNS)
+
+
+def write_sale_lines(tx, invoice_id, store_id, lines, design_store_id):
+    """Inserts the invoice's details and deducts their stock inside tx. Returns the detail row ids."""
+    lines = list(lines)
+    ids = insert_sale_lines(tx, invoice_id, lines)
+    tx.move_stock_many(net_moves(sale_moves(lines, store_id, design_store_id)))
+    return ids
+
+
+def match_lines(old_rows, lines):
+    """
+    Pairs the edited cart with the invoice's saved lines by detail_id (the invoice_details
+    row a line was loaded from); lines without one, or rescanned to another SKU, are new.
+    Returns (pairs, new lines, unmatched old rows).
+    """
+    saved = {row.id: row for row in old_rows}
+    pairs, added = [], []
+    for line in lines:
+        row = saved.get(line.detail_id)
+        if row is not None and row.item_detail_id == line.item_detail_id:
+            del saved[row.id]; pairs.append((row, line))
+        else:
+            added.append(line)
+    return pairs, added, list(saved.values())
+
+
+def edit_sale_lines(tx, invoice_id, old_store_id, store_id, lines, design_store_id):
+    """
+    Applies an edited cart to a saved invoice inside tx as a diff (match_lines): kept
+    lines are updated only if their qty or price changed (keeping their cost_at_sale,
+    item_note and returned_qty), new ones inserted, dropped ones deleted, and the stock
+    moved by the net change per SKU and store. A line can't go below what was already
+    returned (ValueError). Returns (inserted, updated, deleted).
+    """
+    old_rows = [SavedLine(*r) for r in tx.fetch_all(
+        """SELECT id, item_detail_id, qty, price, IFNULL(item_note, ''), IFNULL(returned_qty, 0)
+           FROM invoice_details WHERE invoice_id=? ORDER BY id""", (invoice_id,))]
+    pairs, added, dropped = match_lines(old_rows, lines)
+
+    for row, line in pairs:
+        if line.qty < row.returned_qty:
+            raise ValueError(f"Qty {line.qty:g} is below the {row.returned_qty:g} already returned (line #{row.id})")
+    for row in dropped:
+        if row.returned_qty:
+            raise ValueError(f"Line #{row.id} can't be removed: {row.returned_qty:g} already returned")
+
+    # Saved lines go back to the store they were sold from; designs were taken when saved, so only their change moves
+    moves = [(row.item_detail_id, old_store_id, row.qty) for row in old_rows]
+    moves += sale_moves(added, store_id, design_store_id)
+    for row, line in pairs:
+        moves.append((line.item_detail_id, store_id, -line.qty))
+        if line.design_id:
+            moves.append((line.design_id, design_store_id, row.qty - line.qty))
+    changed = [(line.qty, line.price, line.qty * line.price, row.id) for row, line in pairs
+               if (line.qty, line.price) != (row.qty, row.price)]
+
+    if dropped:
+        tx.execute_in("DELETE FROM invoice_details WHERE id IN ({in})", [row.id for row in dropped])
+    if changed:
+        tx.execute_many("UPDATE invoice_details SET qty=?, price=?, total=? WHERE id=?", changed)
+    insert_sale_lines(tx, invoice_id, added)
+    moves = net_moves(moves)
+    if moves:
+        tx.move_stock_many(moves)
+    return len(added), len(changed), len(dropped)
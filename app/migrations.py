@@ -0,0 +1,258 @@
+"""
+Schema migrations, tracked with SQLite's PRAGMA user_version.
+
+Each step is (version, description, function(cursor)). Steps run in order, each
+inside its own transaction together with the user_version bump, so a crash
+mid-step leaves the database on the previous version and the step re-runs.
+
+FUTURE-PROOFING:
+To change the schema, append a new step with the next version number.
+Never edit a step that has already shipped - existing databases won't re-run it.
+"""
+from .rollups import (create_safe_balances, rebuild_safe_balances, create_stock_totals, rebuild_stock_totals,
+                      create_sales_daily, rebuild_sales_daily, create_catalog_log,
+                      create_change_counters)
+from .search import create_item_search, rebuild_item_search
+
+
+def add_missing_columns(cursor, table, columns):
+    cursor.execute(f"PRAGMA table_info({table})")
+    existing = [info[1] for info in cursor.fetchall()]
+    for col, dtype in columns.items():
+        if col not in existing:
+            print(f"🔧 Patching '{table}': Adding {col}...")
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {col} {dtype}")
+
+
+def m001_base_schema(cursor):
+    """Base tables (idempotent: databases created before versioning already have them)."""
+    cursor.execute("""CREATE TABLE IF NOT EXISTS invoices (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT, customer_id INTEGER, net_total REAL,
+        store_id INTEGER, safe_id INTEGER, payment_method TEXT, delegate_name TEXT, channel TEXT
+    )""")
+    cursor.execute("""CREATE TABLE IF NOT EXISTS customers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, phone TEXT, address TEXT
+    )""")
+    cursor.execute("""CREATE TABLE IF NOT EXISTS returns (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT, invoice_id INTEGER,
+        item_detail_id INTEGER, qty REAL, refund_amount REAL, notes TEXT
+    )""")
+    for table in ['categories', 'colors', 'sizes', 'units', 'stores']:
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE)")
+    cursor.execute("""CREATE TABLE IF NOT EXISTS items (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL,
+        category_id INTEGER, unit_id INTEGER, code TEXT
+    )""")
+    cursor.execute("""CREATE TABLE IF NOT EXISTS item_details (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, item_id INTEGER, barcode TEXT UNIQUE,
+        color_id INTEGER, size_id INTEGER, buy_price REAL DEFAULT 0,
+        sell_price REAL DEFAULT 0, stock_qty REAL DEFAULT 0,
+        FOREIGN KEY(item_id) REFERENCES items(id)
+    )""")
+    cursor.execute("""CREATE TABLE IF NOT EXISTS store_stock (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, store_id INTEGER,
+        item_detail_id INTEGER, quantity REAL DEFAULT 0
+    )""")
+    cursor.execute("""CREATE TABLE IF NOT EXISTS invoice_details (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, invoice_id INTEGER,
+        item_detail_id INTEGER, qty REAL, price REAL, total REAL,
+        returned_qty REAL DEFAULT 0
+    )""")
+    cursor.execute("""CREATE TABLE IF NOT EXISTS transfers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT, from_safe_id INTEGER,
+        to_safe_id INTEGER, amount REAL, notes TEXT
+    )""")
+    cursor.execute("""CREATE TABLE IF NOT EXISTS vouchers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT, voucher_type TEXT,
+        safe_id INTEGER, amount REAL, description TEXT,
+        customer_id INTEGER, supplier_id INTEGER,
+        FOREIGN KEY (safe_id) REFERENCES safes(id)
+    )""")
+    cursor.execute("""CREATE TABLE IF NOT EXISTS safes (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT)""")
+    cursor.execute("""CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE NOT NULL, password TEXT NOT NULL, role TEXT NOT NULL DEFAULT 'Sales'
+    )""")
+    cursor.execute("""CREATE TABLE IF NOT EXISTS suppliers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, phone TEXT, address TEXT, email TEXT, notes TEXT
+    )""")
+    cursor.execute("""CREATE TABLE IF NOT EXISTS purchases (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT, supplier_id INTEGER,
+        store_id INTEGER, safe_id INTEGER, payment_method TEXT, net_total REAL,
+        tax_percent REAL DEFAULT 0, discount_percent REAL DEFAULT 0,
+        discount_value REAL DEFAULT 0, shipping_cost REAL DEFAULT 0, notes TEXT,
+        FOREIGN KEY (supplier_id) REFERENCES suppliers(id)
+    )""")
+    cursor.execute("""CREATE TABLE IF NOT EXISTS purchase_details (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, purchase_id INTEGER, item_detail_id INTEGER,
+        qty REAL, buy_price REAL, total REAL, returned_qty REAL DEFAULT 0,
+        FOREIGN KEY (purchase_id) REFERENCES purchases(id) ON DELETE CASCADE,
+        FOREIGN KEY (item_detail_id) REFERENCES item_details(id)
+    )""")
+    cursor.execute("""CREATE TABLE IF NOT EXISTS purchase_returns (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT, purchase_id INTEGER,
+        qty REAL, refund_amount REAL, notes TEXT,
+        FOREIGN KEY (purchase_id) REFERENCES purchases(id)
+    )""")
+    cursor.execute("""CREATE TABLE IF NOT EXISTS purchase_return_details (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, purchase_return_id INTEGER,
+        purchase_detail_id INTEGER, qty REAL,
+        FOREIGN KEY (purchase_return_id) REFERENCES purchase_returns(id) ON DELETE CASCADE,
+        FOREIGN KEY (purchase_detail_id) REFERENCES purchase_details(id)
+    )""")
+
+
+def m002_patch_columns(cursor):
+    """Columns added after the first release (was DB.patch_missing_columns)."""
+    add_missing_columns(cursor, "invoices", {
+        "tax_percent": "REAL DEFAULT 0", "discount_percent": "REAL DEFAULT 0",
+        "shipping_cost": "REAL DEFAULT 0", "notes": "TEXT",
+        "paid_amount": "REAL DEFAULT 0", "remaining_amount": "REAL DEFAULT 0"
+    })
+    add_missing_columns(cursor, "purchases", {
+        "tax_percent": "REAL DEFAULT 0", "discount_percent": "REAL DEFAULT 0",
+        "discount_value": "REAL DEFAULT 0", "shipping_cost": "REAL DEFAULT 0",
+        "notes": "TEXT", "paid_amount": "REAL DEFAULT 0", "remaining_amount": "REAL DEFAULT 0",
+        "parent_purchase_id": "INTEGER"  # manufacturing linkage
+    })
+    add_missing_columns(cursor, "purchase_details", {
+        "buy_price": "REAL DEFAULT 0", "returned_qty": "REAL DEFAULT 0", "total": "REAL DEFAULT 0"
+    })
+    add_missing_columns(cursor, "returns", {"invoice_id": "INTEGER"})
+    add_missing_columns(cursor, "purchase_returns", {"purchase_detail_id": "INTEGER"})
+    # cost_at_sale keeps historical profit accurate when buy_price changes later
+    add_missing_columns(cursor, "invoice_details", {"cost_at_sale": "REAL DEFAULT 0", "item_note": "TEXT"})
+
+
+# (name, table, columns) - trailing columns make the hot SUM()/lookup queries index-only
+INDEXES = [
+    # Sales
+    ("idx_invoice_details_invoice", "invoice_details", "invoice_id, item_detail_id"),
+    ("idx_invoice_details_item", "invoice_details", "item_detail_id, invoice_id"),
+    ("idx_invoices_date", "invoices", "date, store_id"),
+    ("idx_invoices_safe", "invoices", "safe_id, paid_amount"),
+    ("idx_invoices_customer", "invoices", "customer_id, date"),
+    ("idx_returns_invoice", "returns", "invoice_id"),
+    ("idx_returns_date", "returns", "date"),
+    ("idx_customers_phone", "customers", "phone"),
+    # Stock
+    ("idx_store_stock_item_store", "store_stock", "item_detail_id, store_id, quantity"),
+    ("idx_store_stock_store", "store_stock", "store_id, quantity"),
+    ("idx_item_details_item", "item_details", "item_id"),
+    # Money
+    ("idx_vouchers_safe_type", "vouchers", "safe_id, voucher_type, amount"),
+    ("idx_vouchers_type_date", "vouchers", "voucher_type, date"),
+    ("idx_vouchers_customer", "vouchers", "customer_id, voucher_type, date"),
+    ("idx_transfers_to_safe", "transfers", "to_safe_id, amount"),
+    ("idx_transfers_from_safe", "transfers", "from_safe_id, amount"),
+    # Purchases
+    ("idx_purchases_safe", "purchases", "safe_id, net_total"),
+    ("idx_purchases_date", "purchases", "date"),
+    ("idx_purchases_supplier", "purchases", "supplier_id, date"),
+    ("idx_purchase_details_purchase", "purchase_details", "purchase_id"),
+    ("idx_purchase_returns_purchase", "purchase_returns", "purchase_id"),
+    ("idx_purchase_return_details_return", "purchase_return_details", "purchase_return_id"),
+]
+
+
+def m003_indexes(cursor):
+    """Secondary indexes for report, dashboard and safe-balance filters (see benchmarks/check_query_plans.py)."""
+    for name, table, cols in INDEXES:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({cols})")
+    cursor.execute("ANALYZE")  # give the planner row estimates so it actually picks them
+
+
+def m004_store_stock_unique(cursor):
+    """One row per (store, SKU): merge duplicates, then enforce it so DB.move_stock can upsert."""
+    cursor.execute("""UPDATE store_stock SET quantity = (
+                          SELECT SUM(s2.quantity) FROM store_stock s2
+                          WHERE s2.store_id = store_stock.store_id AND s2.item_detail_id = store_stock.item_detail_id)
+                      WHERE id IN (SELECT MIN(id) FROM store_stock GROUP BY store_id, item_detail_id HAVING COUNT(*) > 1)""")
+    cursor.execute("DELETE FROM store_stock WHERE id NOT IN (SELECT MIN(id) FROM store_stock GROUP BY store_id, item_detail_id)")
+    if cursor.rowcount > 0:
+        print(f"🔧 Merged {cursor.rowcount} duplicate store_stock rows")
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_store_stock_store_item ON store_stock (store_id, item_detail_id)")
+
+
+def m005_safe_balances(cursor):
+    """Trigger-maintained per-safe money totals (see app/rollups.py), filled from existing rows."""
+    create_safe_balances(cursor)
+    rebuild_safe_balances(cursor)
+
+
+
+def m006_stock_totals(cursor):
+    """item_details.stock_qty becomes the trigger-maintained SUM(store_stock) of the SKU (see app/rollups.py)."""
+    fixed = rebuild_stock_totals(cursor)
+    if fixed > 0:
+        print(f"🔧 Reconciled stock_qty of {fixed} items with store_stock")
+    create_stock_totals(cursor)
+
+
+def m007_sales_daily(cursor):
+    """Daily sales fact table for the dashboard and date-range reports (see app/rollups.py), backfilled from history."""
+    create_sales_daily(cursor)
+    rows = rebuild_sales_daily(cursor)
+    if rows > 0:
+        print(f"🔧 Backfilled sales_daily: {rows} rows")
+
+
+def m008_item_search(cursor):
+    """FTS5 search index over item name, color, size, code and barcode (see app/search.py)."""
+    create_item_search(cursor)
+    rows = rebuild_item_search(cursor)
+    if rows > 0:
+        print(f"🔧 Indexed {rows} items for search")
+
+
+def m009_catalog_log(cursor):
+    """Change log of barcodes, prices and names for the in-memory catalog (see app/rollups.py, app/catalog.py)."""
+    create_catalog_log(cursor)
+
+
+def m010_change_counters(cursor):
+    """Per-table change counters for the lookup tables kept in the warm-start snapshot (see app/snapshot.py)."""
+    create_change_counters(cursor, ("stores", "safes", "colors", "sizes", "units", "categories", "suppliers", "customers"))
+
+
+MIGRATIONS = [
+    (1, "base schema", m001_base_schema),
+    (2, "patch legacy columns", m002_patch_columns),
+    (3, "secondary indexes", m003_indexes),
+    (4, "unique store_stock rows", m004_store_stock_unique),
+    (5, "safe balance ledger", m005_safe_balances),
+    (6, "stock totals per SKU", m006_stock_totals),
+    (7, "daily sales rollup", m007_sales_daily),
+    (8, "item search index", m008_item_search),
+    (9, "catalog change log", m009_catalog_log),
+    (10, "change counters", m010_change_counters),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def run_migrations(conn):
+    """Brings the database up to SCHEMA_VERSION. Returns the list of versions applied."""
+    if get_version(conn) >= SCHEMA_VERSION:
+        return []
+    applied = []
+    for version, desc, step in MIGRATIONS:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-read under the write lock: another process may have migrated meanwhile
+            if get_version(conn) >= version:
+                conn.rollback()
+                continue
+            print(f"🔧 Migrating database to v{version}: {desc}...")
+            cursor = conn.cursor()
+            step(cursor)
+            cursor.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+            applied.append(version)
+        except Exception:
+            conn.rollback()
+            raise
+    return applied
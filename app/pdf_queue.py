@@ -0,0 +1,67 @@
+"""
+Invoice PDFs rendered in the background (OrderPage.save_invoice).
+
+The page commits the invoice, queues its id and resets for the next customer;
+the PDF (reportlab layout, logo, Arabic shaping) is written on the queue's own
+thread and the page hears back on the Tk thread:
+
+    get_pdf_queue().render(widget, invoice_id, save_dir, on_done, on_error)
+
+A DBWorker of its own, separate from the shared one, so a long render never holds
+up report queries: jobs run one at a time in the order saved, against the read-only
+DB (the invoice is committed before it is queued). jobs / failed are what the
+page's queue indicator shows.
+"""
+import threading
+import traceback
+from .db_worker import DBWorker
+from .invoice_pdf import render_invoice_pdf
+
+
+class PDFQueue(DBWorker):
+    def __init__(self, db=None):
+        super().__init__(db, name="pdf-worker")
+        self.jobs = []      # invoice ids queued or rendering, oldest first
+        self.failed = {}    # invoice id -> error of its last attempt
+
+    def render(self, widget, invoice_id, save_dir, on_done=None, on_error=None):
+        """Queues the invoice's PDF; on_done(path) / on_error(err) run on the Tk thread."""
+        self.jobs.append(invoice_id)
+        self.failed.pop(invoice_id, None)
+
+        def done(path):
+            self.jobs.remove(invoice_id)
+            if on_done: on_done(path)
+
+        def fail(err):
+            self.jobs.remove(invoice_id)
+            self.failed[invoice_id] = err
+            print(f"❌ Invoice PDF #{invoice_id} failed: {err}")
+            traceback.print_exception(type(err), err, err.__traceback__)
+            if on_error: on_error(err)
+
+        return self.call(widget, lambda db: render_invoice_pdf(db, invoice_id, save_dir), done, fail,
+                         label=f"invoice_pdf #{invoice_id}")
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_pdf_queue():
+    """The app's PDF queue (started on first use, bound to the shared read-only DB)."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = PDFQueue()
+    return _queue
+
+
+def shutdown_pdf_queue():
+    """Lets the queued PDFs finish (no half-written files), then stops the thread."""
+    global _queue
+    with _queue_lock:
+        if _queue is not None:
+            _queue.shutdown()
+            _queue = None
@@ -0,0 +1,113 @@
+"""
+Shared reportlab resources for the app's PDFs (sales invoice, report export, barcode
+labels), built once per session instead of once per document:
+
+    pdf_font()                  # "ArabicFont", registered on first use (else "Helvetica")
+    paragraph_style("Title", parent="Title", fontName=pdf_font(), fontSize=18)
+    logo_image(80)              # new Image flowable over the logo decoded once
+
+The font is Arial / Tahoma from Windows, or the DejaVu Sans bundled in assets/fonts
+(Linux, or a Windows box without them). Styles are cached by their arguments; the
+logo is scaled to LOGO_DPI at its printed width and kept as a JPEG, which reportlab
+embeds as-is; re-encoding the full 1280 px RGBA PNG was most of the cost of every invoice.
+
+Safe to call from the PDF queue's thread and the Tk thread alike.
+"""
+import io
+import os
+import threading
+from functools import lru_cache
+from app.utils import REPORTLAB_AVAILABLE, PILLOW_AVAILABLE
+
+if REPORTLAB_AVAILABLE:
+    from app.utils import getSampleStyleSheet, ParagraphStyle, pdfmetrics, TTFont, RLImage
+    from reportlab.lib.utils import ImageReader
+if PILLOW_AVAILABLE:
+    from PIL import Image
+
+FONT_NAME = "ArabicFont"
+FONT_PATHS = (
+    "C:\\Windows\\Fonts\\arial.ttf",
+    "C:\\Windows\\Fonts\\tahoma.ttf",
+    os.path.join("assets", "fonts", "DejaVuSans.ttf"),  # bundled fallback (has Arabic glyphs)
+)
+LOGO_PATH = os.path.join("assets", "logo.png")
+LOGO_DPI = 300
+
+_lock = threading.Lock()
+_font = None
+_styles = {}    # (name, parent, options) -> ParagraphStyle
+_logos = {}     # width -> (JPEG bytes or path, height), False without a usable logo
+
+
+def pdf_font():
+    """The Arabic-capable font name, registered with reportlab the first time (Helvetica if none is found)."""
+    global _font
+    if _font is None:
+        with _lock:
+            if _font is None:
+                name = "Helvetica"
+                for path in FONT_PATHS:
+                    if not os.path.exists(path): continue
+                    try:
+                        pdfmetrics.registerFont(TTFont(FONT_NAME, path))
+                        name = FONT_NAME
+                        break
+                    except Exception as e:
+                        print(f"⚠️ PDF font {path} failed: {e}")
+                _font = name
+    return _font
+
+
+@lru_cache(maxsize=None)
+def sample_styles():
+    return getSampleStyleSheet()
+
+
+def paragraph_style(name, parent=None, **options):
+    """ParagraphStyle built once per (name, parent, options); parent names a sample style ("Title", "Normal")."""
+    key = (name, parent, tuple(sorted(options.items())))
+    style = _styles.get(key)
+    if style is None:
+        if parent:
+            options["parent"] = sample_styles()[parent]
+        style = _styles[key] = ParagraphStyle(name=name, **options)
+    return style
+
+
+def logo_image(width):
+    """A new Image flowable of the logo, width points wide; None without assets/logo.png."""
+    logo = _logos.get(width)
+    if logo is None:
+        with _lock:
+            logo = _logos.get(width)
+            if logo is None:
+                logo = _logos[width] = _load_logo(width)
+    if not logo:
+        return None
+    src, height = logo
+    return RLImage(io.BytesIO(src) if isinstance(src, bytes) else src, width=width, height=height)
+
+
+def _load_logo(width):
+    if not os.path.exists(LOGO_PATH):
+        return False
+    try:
+        if not PILLOW_AVAILABLE:
+            iw, ih = ImageReader(LOGO_PATH).getSize()
+            return LOGO_PATH, width * ih / float(iw)
+        with Image.open(LOGO_PATH) as img:
+            img = img.convert("RGBA")
+            height = width * img.height / float(img.width)
+            px = round(width / 72 * LOGO_DPI)
+            if img.width > px:
+                img = img.resize((px, max(1, round(px * img.height / img.width))), Image.Resampling.LANCZOS)
+            # White page anyway: no alpha channel (JPEG has none, and it would be a second image to encode)
+            flat = Image.new("RGB", img.size, (255, 255, 255))
+            flat.paste(img, mask=img.split()[3])
+            buf = io.BytesIO()
+            flat.save(buf, "JPEG", quality=90)
+            return buf.getvalue(), height
+    except Exception as e:
+        print(f"⚠️ Logo load failed: {e}")
+        return False
@@ -0,0 +1,181 @@
+"""
+Query instrumentation for DB: per-shape timing, a rolling slow-query log and plan capture.
+
+Every statement run through DB / Transaction is timed and folded into a
+"shape" (SQL with literals and whitespace normalized). Settings in config.json:
+
+    "db_profile": true        print every statement with its time, rows and caller
+    "db_slow_ms": 200         statements at/above this go to data/slow_queries.log (0 = off)
+    "db_slow_explain": true   add the EXPLAIN QUERY PLAN of slow statements to the log
+    "db_slow_log_kb": 512     log size before it rolls over (3 old files kept)
+"""
+import os
+import re
+import sys
+import csv
+import threading
+import logging
+from logging.handlers import RotatingFileHandler
+from contextlib import contextmanager
+from .config import DATA_DIR
+from .config_manager import ConfigManager
+
+_cfg = ConfigManager()
+PROFILE = bool(_cfg.get("db_profile", False))
+SLOW_MS = float(_cfg.get("db_slow_ms", 200) or 0)
+SLOW_EXPLAIN = bool(_cfg.get("db_slow_explain", True))
+SLOW_LOG_PATH = os.path.join(DATA_DIR, "slow_queries.log")
+SLOW_LOG_KB = int(_cfg.get("db_slow_log_kb", 512) or 512)
+
+# Frames from these files are plumbing, not "the caller"
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+_INTERNAL = {"database.py", "query_stats.py", "db_worker.py"}
+
+_lock = threading.Lock()
+_ctx = threading.local()
+_stats = {}          # shape -> QueryStat
+_shapes = {}         # raw sql -> shape (the same strings repeat, so normalize once)
+_slow_log = None
+
+_STR = re.compile(r"'(?:[^']|'')*'")
+_NUM = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WS = re.compile(r"\s+")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+class QueryStat:
+    def __init__(self, shape):
+        self.shape = shape
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.caller = ""
+        self.sample = ("", ())  # last raw (sql, params), used by the admin view's Explain
+
+    @property
+    def avg_ms(self):
+        return self.total_ms / self.calls if self.calls else 0.0
+
+
+def normalize(sql):
+    """'SELECT * FROM t WHERE id = 5 AND x IN (?,?,?)' -> 'SELECT * FROM t WHERE id = ? AND x IN (?...)'"""
+    shape = _shapes.get(sql)
+    if shape is None:
+        shape = _STR.sub("?", sql)
+        shape = _NUM.sub("?", shape)
+        shape = _WS.sub(" ", shape).strip()
+        shape = _IN_LIST.sub("(?...)", shape)
+        if len(_shapes) < 5000:
+            _shapes[sql] = shape
+    return shape
+
+
+def frame_label(frame):
+    """'reports_page:ReportsPage.report_steps' for a frame."""
+    module = os.path.splitext(os.path.basename(frame.f_code.co_filename))[0]
+    owner = frame.f_locals.get("self")
+    func = frame.f_code.co_name
+    if owner is not None:
+        func = f"{type(owner).__name__}.{func}"
+    return f"{module}:{func}"
+
+
+def caller():
+    """The page/function that issued the statement (first app frame outside the DB plumbing)."""
+    label = getattr(_ctx, "label", None)
+    if label:
+        return label  # running on the DB worker on behalf of a page
+    frame = sys._getframe(1)
+    while frame is not None:
+        path = frame.f_code.co_filename
+        if path.startswith(_APP_DIR) and os.path.basename(path) not in _INTERNAL:
+            return frame_label(frame)
+        frame = frame.f_back
+    return "?"
+
+
+@contextmanager
+def caller_label(label):
+    """Attributes statements run in this block (on this thread) to label."""
+    prev = getattr(_ctx, "label", None)
+    _ctx.label = label
+    try:
+        yield
+    finally:
+        _ctx.label = prev
+
+
+def explain(conn, query, params=()):
+    """EXPLAIN QUERY PLAN detail lines for a query (without running it)."""
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + query, params).fetchall()]
+
+
+def record(conn, query, params, seconds, rows):
+    ms = seconds * 1000
+    shape = normalize(query)
+    slow = SLOW_MS > 0 and ms >= SLOW_MS
+    who = caller() if (slow or PROFILE) else None
+    with _lock:
+        st = _stats.get(shape)
+        if st is None:
+            st = _stats[shape] = QueryStat(shape)
+        st.calls += 1
+        st.total_ms += ms
+        st.rows += max(rows, 0)
+        if ms > st.max_ms: st.max_ms = ms
+        if who: st.caller = who
+        st.sample = (query, params)
+    if PROFILE:
+        print(f"⏱️ {ms:8.2f} ms | {rows:>6} rows | {who} | {shape[:120]}")
+    if slow:
+        log_slow(conn, query, params, ms, rows, who)
+
+
+def get_slow_log():
+    global _slow_log
+    if _slow_log is None:
+        with _lock:
+            if _slow_log is None:
+                logger = logging.getLogger("historia.slow_queries")
+                logger.propagate = False
+                logger.setLevel(logging.INFO)
+                os.makedirs(DATA_DIR, exist_ok=True)
+                handler = RotatingFileHandler(SLOW_LOG_PATH, maxBytes=SLOW_LOG_KB * 1024, backupCount=3,
+                                              encoding="utf-8", delay=True)
+                handler.setFormatter(logging.Formatter("%(asctime)s | %(message)s"))
+                logger.addHandler(handler)
+                _slow_log = logger
+    return _slow_log
+
+
+def log_slow(conn, query, params, ms, rows, who):
+    try:
+        msg = f"{ms:.1f} ms | {rows} rows | {who} | {' '.join(query.split())} | params={params!r:.200}"
+        verb = query.split(None, 1)[0].upper() if query.strip() else ""
+        if SLOW_EXPLAIN and verb in ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE"):
+            try: msg += "\n    plan: " + "; ".join(explain(conn, query, params))
+            except Exception as e: msg += f"\n    plan: n/a ({e})"
+        get_slow_log().info(msg)
+    except Exception as e:
+        print(f"⚠️ Slow query log error: {e}")
+
+
+def top(n=20, key="total_ms"):
+    """Top-N query shapes, slowest first (key: total_ms, avg_ms, max_ms or calls)."""
+    with _lock:
+        stats = list(_stats.values())
+    return sorted(stats, key=lambda s: getattr(s, key), reverse=True)[:n]
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+def export_csv(path, n=100):
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        w = csv.writer(f)
+        w.writerow(["shape", "calls", "total_ms", "avg_ms", "max_ms", "rows", "caller"])
+        for s in top(n):
+            w.writerow([s.shape, s.calls, f"{s.total_ms:.1f}", f"{s.avg_ms:.2f}", f"{s.max_ms:.1f}", s.rows, s.caller])
@@ -0,0 +1,367 @@
+"""
+Materialised totals kept current by SQLite triggers.
+
+safe_balances holds, per safe, the running total of every money movement that
+used to be recomputed with one SUM() per source table on each refresh:
+
+    sales_in            invoices.paid_amount
+    voucher_in/out      vouchers.amount (Receipt / Payment)
+    transfer_in/out     transfers.amount (to_safe_id / from_safe_id)
+    purchase_out        purchases.net_total
+    purchase_return_in  purchase_returns.refund_amount (safe of the purchase)
+    sales_return_out    returns.refund_amount (safe of the invoice)
+
+The triggers add NEW and subtract OLD, so inserts, edits and deletes (including
+moving an invoice or purchase to another safe) all stay in step. The tables are
+created by migration v5; rebuild_safe_balances() recomputes them from scratch and
+check_safe_balances() compares them with the source tables.
+
+item_details.stock_qty is the on-hand total of a SKU across all stores, kept equal
+to SUM(store_stock.quantity) by triggers on store_stock (migration v6). The per
+store quantity is the store_stock row itself (one per store and SKU since v4).
+Code moves stock only through store_stock (DB.move_stock) and reads totals from
+stock_qty; rebuild_stock_totals() / check_stock_totals() reconcile the two.
+
+sales_daily is the sales fact table (migration v7), one row per date, store,
+channel, delegate, payment method and SKU. item_detail_id = 0 rows carry the
+invoice-level figures (invoice count, net_total; refunds by return date), SKU
+rows the line figures (qty, revenue, cogs from cost_at_sale, returned qty).
+Triggers on invoices, invoice_details and returns keep it current, so every
+save, edit, return and delete flow updates it; rebuild_sales_daily() is the
+backfill and check_sales_daily() the comparison with the raw tables:
+
+    python benchmarks/check_rollups.py [--rebuild]
+
+catalog_changes is the change log of the sellable catalog (migration v9): one row
+per SKU with the sequence number of its last change (insert, barcode/price edit,
+rename of its item, color or size, delete). MAX(seq) is the catalog's change
+counter; in-memory copies (app/catalog.py) reload only the SKUs with a newer seq.
+change_counters does the same per table for the small lookup tables (migration
+v10): its seq goes up on every insert, update and delete, so a saved copy
+(app/snapshot.py) can tell whether it is still current.
+
+Functions here take a raw sqlite3 connection or cursor (migrations use them too).
+"""
+
+SAFE_COLUMNS = ("sales_in", "voucher_in", "voucher_out", "transfer_in", "transfer_out",
+                "purchase_out", "purchase_return_in", "sales_return_out")
+
+# Cash in the safe (SafesPage formula): sales returns are paid through a Payment voucher, so they're in voucher_out
+SAFE_BALANCE = "(sales_in + voucher_in + transfer_in + purchase_return_in) - (voucher_out + transfer_out + purchase_out)"
+
+# Every safe with its balance and its sales refunds, in one query
+SAFE_BALANCES_SQL = f"""SELECT s.id, s.name, IFNULL({SAFE_BALANCE}, 0), IFNULL(sales_return_out, 0)
+                        FROM safes s LEFT JOIN safe_balances b ON b.safe_id = s.id ORDER BY s.id"""
+
+# (source table, column, safe of row {r}, amount of row {r}, extra condition, columns whose update matters)
+# Rows referencing another table's safe are also listed under that table, so moving an
+# invoice/purchase to another safe (or deleting it) moves its returns with it.
+SAFE_SOURCES = [
+    ("invoices", "sales_in", "{r}.safe_id", "{r}.paid_amount", None, ("safe_id", "paid_amount")),
+    ("invoices", "sales_return_out", "{r}.safe_id",
+     "(SELECT SUM(refund_amount) FROM returns WHERE invoice_id = {r}.id)", None, ("id", "safe_id")),
+    ("vouchers", "voucher_in", "{r}.safe_id", "{r}.amount", "{r}.voucher_type = 'Receipt'", ("safe_id", "amount", "voucher_type")),
+    ("vouchers", "voucher_out", "{r}.safe_id", "{r}.amount", "{r}.voucher_type = 'Payment'", ("safe_id", "amount", "voucher_type")),
+    ("transfers", "transfer_in", "{r}.to_safe_id", "{r}.amount", None, ("to_safe_id", "amount")),
+    ("transfers", "transfer_out", "{r}.from_safe_id", "{r}.amount", None, ("from_safe_id", "amount")),
+    ("purchases", "purchase_out", "{r}.safe_id", "{r}.net_total", None, ("safe_id", "net_total")),
+    ("purchases", "purchase_return_in", "{r}.safe_id",
+     "(SELECT SUM(refund_amount) FROM purchase_returns WHERE purchase_id = {r}.id)", None, ("id", "safe_id")),
+    ("purchase_returns", "purchase_return_in", "(SELECT safe_id FROM purchases WHERE id = {r}.purchase_id)",
+     "{r}.refund_amount", None, ("purchase_id", "refund_amount")),
+    ("returns", "sales_return_out", "(SELECT safe_id FROM invoices WHERE id = {r}.invoice_id)",
+     "{r}.refund_amount", None, ("invoice_id", "refund_amount")),
+]
+
+# The same totals computed from the source tables: (column, SELECT safe_id, total ... GROUP BY safe)
+SAFE_TOTALS = [
+    ("sales_in", "SELECT safe_id, SUM(paid_amount) FROM invoices GROUP BY safe_id"),
+    ("voucher_in", "SELECT safe_id, SUM(amount) FROM vouchers WHERE voucher_type = 'Receipt' GROUP BY safe_id"),
+    ("voucher_out", "SELECT safe_id, SUM(amount) FROM vouchers WHERE voucher_type = 'Payment' GROUP BY safe_id"),
+    ("transfer_in", "SELECT to_safe_id, SUM(amount) FROM transfers GROUP BY to_safe_id"),
+    ("transfer_out", "SELECT from_safe_id, SUM(amount) FROM transfers GROUP BY from_safe_id"),
+    ("purchase_out", "SELECT safe_id, SUM(net_total) FROM purchases GROUP BY safe_id"),
+    ("purchase_return_in", """SELECT p.safe_id, SUM(pr.refund_amount) FROM purchase_returns pr
+                              JOIN purchases p ON pr.purchase_id = p.id GROUP BY p.safe_id"""),
+    ("sales_return_out", """SELECT i.safe_id, SUM(r.refund_amount) FROM returns r
+                            JOIN invoices i ON r.invoice_id = i.id GROUP BY i.safe_id"""),
+]
+
+
+def _apply(column, safe, amount, cond, sign):
+    """One trigger statement: add sign * amount to column of safe (skips NULL safes and zero amounts)."""
+    where = "s IS NOT NULL AND a IS NOT NULL AND a <> 0" + (f" AND {cond}" if cond else "")
+    return (f"INSERT INTO safe_balances (safe_id, {column}) "
+            f"SELECT s, {sign}a FROM (SELECT {safe} AS s, {amount} AS a) WHERE {where} "
+            f"ON CONFLICT(safe_id) DO UPDATE SET {column} = {column} + excluded.{column};")
+
+
+def safe_balance_triggers():
+    """CREATE TRIGGER statements for every source table (insert, update, delete)."""
+    tables = {}
+    for table, column, safe, amount, cond, watched in SAFE_SOURCES:
+        tables.setdefault(table, []).append((column, safe, amount, cond, watched))
+    statements = []
+    for table, specs in tables.items():
+        for event, rows in (("INSERT", ("NEW",)), ("DELETE", ("OLD",)), ("UPDATE", ("OLD", "NEW"))):
+            body = []
+            for column, safe, amount, cond, _ in specs:
+                for r in rows:
+                    body.append(_apply(column, safe.format(r=r), amount.format(r=r),
+                                       cond.format(r=r) if cond else None, "-" if r == "OLD" else ""))
+            of = ""
+            if event == "UPDATE":
+                watched = sorted({c for spec in specs for c in spec[4]})
+                of = f" OF {', '.join(watched)}"
+            statements.append(f"""CREATE TRIGGER IF NOT EXISTS trg_safe_bal_{table}_{event.lower()}
+                AFTER {event}{of} ON {table} BEGIN
+                    {chr(10).join(body)}
+                END""")
+    return statements
+
+
+def create_safe_balances(cursor):
+    cols = ", ".join(f"{c} REAL NOT NULL DEFAULT 0" for c in SAFE_COLUMNS)
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS safe_balances (safe_id INTEGER PRIMARY KEY, {cols})")
+    for sql in safe_balance_triggers():
+        cursor.execute(sql)
+
+
+def safe_totals(cursor):
+    """{safe_id: {column: total}} straight from the source tables."""
+    totals = {}
+    for column, sql in SAFE_TOTALS:
+        for safe_id, total in cursor.execute(sql).fetchall():
+            if safe_id is not None and total:
+                totals.setdefault(safe_id, dict.fromkeys(SAFE_COLUMNS, 0.0))[column] = total
+    return totals
+
+
+def rebuild_safe_balances(cursor):
+    """Recomputes safe_balances from the source tables (run inside a transaction)."""
+    cursor.execute("DELETE FROM safe_balances")
+    rows = [(sid,) + tuple(t[c] for c in SAFE_COLUMNS) for sid, t in safe_totals(cursor).items()]
+    cursor.executemany(f"INSERT INTO safe_balances (safe_id, {', '.join(SAFE_COLUMNS)}) "
+                       f"VALUES ({','.join('?' * (len(SAFE_COLUMNS) + 1))})", rows)
+    return len(rows)
+
+
+def check_safe_balances(cursor, tolerance=0.005):
+    """[(safe_id, column, stored, actual)] for every total that drifted from the source tables."""
+    actual = safe_totals(cursor)
+    stored = {r[0]: dict(zip(SAFE_COLUMNS, r[1:])) for r in
+              cursor.execute(f"SELECT safe_id, {', '.join(SAFE_COLUMNS)} FROM safe_balances").fetchall()}
+    diffs = []
+    for sid in sorted(set(actual) | set(stored)):
+        for c in SAFE_COLUMNS:
+            a = actual.get(sid, {}).get(c, 0.0)
+            s = stored.get(sid, {}).get(c, 0.0)
+            if abs(a - s) > tolerance:
+                diffs.append((sid, c, s, a))
+    return diffs
+
+
+# --- On-hand stock per SKU --------------------------------------------------
+
+STOCK_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS trg_stock_qty_insert AFTER INSERT ON store_stock BEGIN
+           UPDATE item_details SET stock_qty = IFNULL(stock_qty, 0) + NEW.quantity WHERE id = NEW.item_detail_id;
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_stock_qty_delete AFTER DELETE ON store_stock BEGIN
+           UPDATE item_details SET stock_qty = IFNULL(stock_qty, 0) - OLD.quantity WHERE id = OLD.item_detail_id;
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_stock_qty_update AFTER UPDATE OF quantity, item_detail_id ON store_stock BEGIN
+           UPDATE item_details SET stock_qty = IFNULL(stock_qty, 0) - OLD.quantity WHERE id = OLD.item_detail_id;
+           UPDATE item_details SET stock_qty = IFNULL(stock_qty, 0) + NEW.quantity WHERE id = NEW.item_detail_id;
+       END""",
+]
+
+STOCK_TOTALS_SQL = """SELECT d.id, IFNULL(d.stock_qty, 0), IFNULL(SUM(ss.quantity), 0)
+                      FROM item_details d LEFT JOIN store_stock ss ON ss.item_detail_id = d.id GROUP BY d.id"""
+
+
+def create_stock_totals(cursor):
+    for sql in STOCK_TRIGGERS:
+        cursor.execute(sql)
+
+
+def rebuild_stock_totals(cursor):
+    """Sets every item_details.stock_qty to its store_stock sum. Returns the number of SKUs corrected."""
+    cursor.execute("""UPDATE item_details SET stock_qty = (
+                          SELECT IFNULL(SUM(quantity), 0) FROM store_stock WHERE item_detail_id = item_details.id)
+                      WHERE IFNULL(stock_qty, 0) IS NOT (
+                          SELECT IFNULL(SUM(quantity), 0) FROM store_stock WHERE item_detail_id = item_details.id)""")
+    return cursor.rowcount
+
+
+def check_stock_totals(cursor, tolerance=0.0001):
+    """[(item_detail_id, stock_qty, store_stock sum)] for every SKU whose total drifted."""
+    return [r for r in cursor.execute(STOCK_TOTALS_SQL).fetchall() if abs(r[1] - r[2]) > tolerance]
+
+
+# --- Daily sales rollup -------------------------------------------------------
+
+SALES_KEYS = ("date", "store_id", "channel", "delegate_name", "payment_method", "item_detail_id")
+SALES_MEASURES = ("invoices", "net_total", "qty", "revenue", "cogs", "returned_qty", "returns", "refunds")
+
+
+def _inv_keys(r):
+    """Key columns taken from invoice row r (NULLs folded so the upsert key always matches)."""
+    return [f"IFNULL({r}.date, '')", f"IFNULL({r}.store_id, 0)", f"IFNULL({r}.channel, '')",
+            f"IFNULL({r}.delegate_name, '')", f"IFNULL({r}.payment_method, '')"]
+
+
+def _sales_upsert(keys, measures, tail, sign="", table="sales_daily"):
+    """INSERT ... SELECT keys, sign * measures {tail} that adds onto existing rows."""
+    cols = [f"{sign}IFNULL({measures[m]}, 0)" if m in measures else "0" for m in SALES_MEASURES]
+    updates = ", ".join(f"{m} = {m} + excluded.{m}" for m in SALES_MEASURES)
+    return (f"INSERT INTO {table} ({', '.join(SALES_KEYS + SALES_MEASURES)}) "
+            f"SELECT {', '.join(keys + cols)} {tail} "
+            f"ON CONFLICT({', '.join(SALES_KEYS)}) DO UPDATE SET {updates};")
+
+
+def _invoice_rows(r, sign, table="sales_daily"):
+    """
+    Everything invoice row r contributes: its header, its lines and its returns.
+    r is NEW/OLD inside a trigger; r = "inv" gives the same statements over every invoice (backfill).
+    """
+    if r == "inv":
+        header = "FROM invoices inv WHERE 1"
+        lines = "FROM invoice_details l JOIN invoices inv ON inv.id = l.invoice_id WHERE 1 GROUP BY inv.id, IFNULL(l.item_detail_id, 0)"
+        returns = "FROM returns t JOIN invoices inv ON inv.id = t.invoice_id WHERE 1 GROUP BY inv.id, IFNULL(t.date, '')"
+    else:
+        header = "WHERE 1"
+        lines = f"FROM invoice_details l WHERE l.invoice_id = {r}.id GROUP BY IFNULL(l.item_detail_id, 0)"
+        returns = f"FROM returns t WHERE t.invoice_id = {r}.id GROUP BY IFNULL(t.date, '')"
+    return [
+        _sales_upsert(_inv_keys(r) + ["0"], {"invoices": "1", "net_total": f"{r}.net_total"}, header, sign, table),
+        _sales_upsert(_inv_keys(r) + ["IFNULL(l.item_detail_id, 0)"],
+                      {"qty": "SUM(l.qty)", "revenue": "SUM(l.total)", "cogs": "SUM(l.qty * l.cost_at_sale)",
+                       "returned_qty": "SUM(l.returned_qty)"}, lines, sign, table),
+        _sales_upsert(["IFNULL(t.date, '')"] + _inv_keys(r)[1:] + ["0"],
+                      {"returns": "COUNT(*)", "refunds": "SUM(t.refund_amount)"}, returns, sign, table),
+    ]
+
+
+def _line_row(r, sign):
+    return _sales_upsert(_inv_keys("inv") + [f"IFNULL({r}.item_detail_id, 0)"],
+                         {"qty": f"{r}.qty", "revenue": f"{r}.total", "cogs": f"{r}.qty * {r}.cost_at_sale",
+                          "returned_qty": f"{r}.returned_qty"},
+                         f"FROM invoices inv WHERE inv.id = {r}.invoice_id", sign)
+
+
+def _return_row(r, sign):
+    return _sales_upsert([f"IFNULL({r}.date, '')"] + _inv_keys("inv")[1:] + ["0"],
+                         {"returns": "1", "refunds": f"{r}.refund_amount"},
+                         f"FROM invoices inv WHERE inv.id = {r}.invoice_id", sign)
+
+
+# table -> (row statements, columns whose update matters). Lines and returns only count while
+# their invoice exists; the invoice triggers add/remove them together with the header.
+SALES_SOURCES = {
+    "invoices": (_invoice_rows, ("id", "date", "store_id", "channel", "delegate_name", "payment_method", "net_total")),
+    "invoice_details": (lambda r, sign: [_line_row(r, sign)],
+                        ("invoice_id", "item_detail_id", "qty", "total", "cost_at_sale", "returned_qty")),
+    "returns": (lambda r, sign: [_return_row(r, sign)], ("date", "invoice_id", "refund_amount")),
+}
+
+
+def sales_daily_triggers():
+    statements = []
+    for table, (rows, watched) in SALES_SOURCES.items():
+        for event, body in (("INSERT", rows("NEW", "")), ("DELETE", rows("OLD", "-")),
+                            ("UPDATE", rows("OLD", "-") + rows("NEW", ""))):
+            of = f" OF {', '.join(watched)}" if event == "UPDATE" else ""
+            statements.append(f"""CREATE TRIGGER IF NOT EXISTS trg_sales_daily_{table}_{event.lower()}
+                AFTER {event}{of} ON {table} BEGIN
+                    {chr(10).join(body)}
+                END""")
+    return statements
+
+
+def create_sales_daily(cursor, table="sales_daily", temp=False):
+    keys = "date TEXT NOT NULL, store_id INTEGER NOT NULL, channel TEXT NOT NULL, delegate_name TEXT NOT NULL, " \
+           "payment_method TEXT NOT NULL, item_detail_id INTEGER NOT NULL"
+    measures = ", ".join(f"{m} REAL NOT NULL DEFAULT 0" for m in SALES_MEASURES)
+    cursor.execute(f"CREATE {'TEMP ' if temp else ''}TABLE IF NOT EXISTS {table} ({keys}, {measures}, "
+                   f"PRIMARY KEY ({', '.join(SALES_KEYS)}))")
+    if not temp:
+        for sql in sales_daily_triggers():
+            cursor.execute(sql)
+
+
+def rebuild_sales_daily(cursor, table="sales_daily"):
+    """Backfill: recomputes the rollup from invoices, invoice_details and returns. Returns the row count."""
+    cursor.execute(f"DELETE FROM {table}")
+    for sql in _invoice_rows("inv", "", table):
+        cursor.execute(sql)
+    return cursor.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def check_sales_daily(cursor, tolerance=0.005):
+    """[(key, measure, stored, actual)] for every rollup figure that drifted from the raw tables."""
+    create_sales_daily(cursor, "temp_sales_daily_check", temp=True)
+    rebuild_sales_daily(cursor, "temp_sales_daily_check")
+    cols = ", ".join(SALES_KEYS + SALES_MEASURES)
+    n = len(SALES_KEYS)
+    read = lambda t: {r[:n]: r[n:] for r in cursor.execute(f"SELECT {cols} FROM {t}").fetchall()}
+    stored, actual = read("sales_daily"), read("temp_sales_daily_check")
+    cursor.execute("DROP TABLE temp_sales_daily_check")
+    zero = (0.0,) * len(SALES_MEASURES)
+    diffs = []
+    for key in sorted(set(stored) | set(actual), key=repr):
+        for m, s, a in zip(SALES_MEASURES, stored.get(key, zero), actual.get(key, zero)):
+            if abs(s - a) > tolerance:
+                diffs.append((key, m, s, a))
+    return diffs
+
+
+# --- Catalog change log -------------------------------------------------------
+
+_NEXT_SEQ = "(SELECT IFNULL(MAX(seq), 0) + 1 FROM catalog_changes)"
+
+
+def _log_skus(cond):
+    """Logs every SKU matching cond (a WHERE on item_details)."""
+    return f"INSERT OR REPLACE INTO catalog_changes (sku_id, seq) SELECT id, {_NEXT_SEQ} FROM item_details WHERE {cond};"
+
+
+def _log_sku(sku):
+    return f"INSERT OR REPLACE INTO catalog_changes (sku_id, seq) VALUES ({sku}, {_NEXT_SEQ});"
+
+
+# (table, event, statements). Stock moves don't touch these columns, so sales don't fill the log.
+CATALOG_SOURCES = [
+    ("item_details", "INSERT", [_log_sku("NEW.id")]),
+    ("item_details", "UPDATE OF item_id, color_id, size_id, barcode, sell_price, buy_price", [_log_sku("NEW.id")]),
+    ("item_details", "DELETE", [_log_sku("OLD.id")]),
+    ("items", "UPDATE OF name", [_log_skus("item_id = NEW.id")]),
+    ("items", "DELETE", [_log_skus("item_id = OLD.id")]),
+    ("colors", "UPDATE OF name", [_log_skus("color_id = NEW.id")]),
+    ("colors", "DELETE", [_log_skus("color_id = OLD.id")]),
+    ("sizes", "UPDATE OF name", [_log_skus("size_id = NEW.id")]),
+    ("sizes", "DELETE", [_log_skus("size_id = OLD.id")]),
+]
+
+
+def create_catalog_log(cursor):
+    cursor.execute("CREATE TABLE IF NOT EXISTS catalog_changes (sku_id INTEGER PRIMARY KEY, seq INTEGER NOT NULL)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_catalog_changes_seq ON catalog_changes (seq)")
+    for table, event, body in CATALOG_SOURCES:
+        cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_catalog_changes_{table}_{event.split()[0].lower()}
+            AFTER {event} ON {table} BEGIN
+                {chr(10).join(body)}
+            END""")
+
+
+# --- Change counters ------------------------------------------------------------
+
+def create_change_counters(cursor, tables):
+    cursor.execute("CREATE TABLE IF NOT EXISTS change_counters (tbl TEXT PRIMARY KEY, seq INTEGER NOT NULL DEFAULT 0)")
+    for table in tables:
+        cursor.execute("INSERT OR IGNORE INTO change_counters (tbl, seq) VALUES (?, 0)", (table,))
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_change_counters_{table}_{event.lower()}
+                AFTER {event} ON {table} BEGIN
+                    UPDATE change_counters SET seq = seq + 1 WHERE tbl = '{table}';
+                END""")
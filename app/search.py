@@ -0,0 +1,113 @@
+"""
+Item search index: an FTS5 table over every SKU (item_details row), kept current
+by SQLite triggers (migration v8).
+
+item_search has one row per SKU, rowid = item_details.id, with the item name,
+color, size, item code and barcode. Arabic text is stored normalised so a search
+doesn't depend on how the name was typed: alef forms (أ إ آ ٱ) become ا, ة becomes
+ه, ى becomes ي, and diacritics/tatweel are dropped. The tokenizer folds case.
+
+Searching is by word prefix, every word required:
+
+    sql += f" AND {SEARCH_FILTER}"; params.append(search_match(text))
+
+finds "قميص أسود" when the user types "قميص اس". rebuild_item_search() is the
+backfill and check_item_search() the comparison with the catalog tables
+(python benchmarks/check_rollups.py [--rebuild]).
+
+Functions here take a raw sqlite3 connection or cursor (migrations use them too).
+"""
+import re
+
+# Arabic spelling variants folded to one form (chars mapped to "" are removed)
+AR_FOLD = [("أ", "ا"), ("إ", "ا"), ("آ", "ا"), ("ٱ", "ا"), ("ة", "ه"), ("ى", "ي")] + \
+          [(chr(c), "") for c in range(0x064B, 0x0653)] + [("ٰ", ""), ("ـ", "")]
+_AR_TABLE = str.maketrans({a: b or None for a, b in AR_FOLD})
+
+SEARCH_COLUMNS = ("name", "color", "size", "code", "barcode")
+
+# SKUs matching search_match(text); d = item_details
+SEARCH_FILTER = "d.id IN (SELECT rowid FROM item_search WHERE item_search MATCH ?)"
+
+
+def normalize(text):
+    """The same folding the triggers apply (AR_FOLD), for Python-side text."""
+    return (text or "").translate(_AR_TABLE)
+
+
+def search_match(text):
+    """FTS5 MATCH expression for what the user typed: each word as a prefix, all required. None if no words."""
+    words = re.findall(r"[^\W_]+", normalize(text))
+    return " ".join(f'"{w}"*' for w in words) or None
+
+
+def _norm_sql(expr):
+    for a, b in AR_FOLD:
+        expr = f"REPLACE({expr}, '{a}', '{b}')"
+    return expr
+
+
+def _index_rows(cond, table="item_search", key="rowid"):
+    """INSERT of the search rows of the SKUs matching cond (d = item_details)."""
+    return f"""INSERT INTO {table} ({key}, {', '.join(SEARCH_COLUMNS)})
+        SELECT d.id, {_norm_sql("i.name")}, {_norm_sql("c.name")}, {_norm_sql("s.name")}, {_norm_sql("i.code")}, d.barcode
+        FROM item_details d LEFT JOIN items i ON d.item_id = i.id
+        LEFT JOIN colors c ON d.color_id = c.id LEFT JOIN sizes s ON d.size_id = s.id
+        WHERE {cond};"""
+
+
+def _reindex(cond):
+    return [f"DELETE FROM item_search WHERE rowid IN (SELECT d.id FROM item_details d WHERE {cond});", _index_rows(cond)]
+
+
+# (table, event, statements). Renaming an item, color or size re-indexes every SKU using it.
+SEARCH_SOURCES = [
+    ("item_details", "INSERT", [_index_rows("d.id = NEW.id")]),
+    ("item_details", "UPDATE OF item_id, color_id, size_id, barcode",
+     ["DELETE FROM item_search WHERE rowid = OLD.id;", _index_rows("d.id = NEW.id")]),
+    ("item_details", "DELETE", ["DELETE FROM item_search WHERE rowid = OLD.id;"]),
+    ("items", "UPDATE OF name, code", _reindex("d.item_id = NEW.id")),
+    ("items", "DELETE", _reindex("d.item_id = OLD.id")),
+    ("colors", "UPDATE OF name", _reindex("d.color_id = NEW.id")),
+    ("colors", "DELETE", _reindex("d.color_id = OLD.id")),
+    ("sizes", "UPDATE OF name", _reindex("d.size_id = NEW.id")),
+    ("sizes", "DELETE", _reindex("d.size_id = OLD.id")),
+]
+
+
+def item_search_triggers():
+    statements = []
+    for table, event, body in SEARCH_SOURCES:
+        statements.append(f"""CREATE TRIGGER IF NOT EXISTS trg_item_search_{table}_{event.split()[0].lower()}
+            AFTER {event} ON {table} BEGIN
+                {chr(10).join(body)}
+            END""")
+    return statements
+
+
+def create_item_search(cursor):
+    # prefix indexes make 2-3 letter prefixes (what people type first) a direct lookup
+    cursor.execute(f"""CREATE VIRTUAL TABLE IF NOT EXISTS item_search USING fts5(
+        {', '.join(SEARCH_COLUMNS)}, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')""")
+    for sql in item_search_triggers():
+        cursor.execute(sql)
+
+
+def rebuild_item_search(cursor):
+    """Backfill: re-indexes every SKU from the catalog tables. Returns the row count."""
+    cursor.execute("DELETE FROM item_search")
+    cursor.execute(_index_rows("1"))
+    cursor.execute("INSERT INTO item_search (item_search) VALUES ('optimize')")
+    return cursor.execute("SELECT COUNT(*) FROM item_search").fetchone()[0]
+
+
+def check_item_search(cursor):
+    """[(sku id, stored, actual)] for every SKU whose search row differs from the catalog tables."""
+    cols = ", ".join(SEARCH_COLUMNS)
+    cursor.execute(f"CREATE TEMP TABLE temp_item_search_check (sku_id INTEGER PRIMARY KEY, {cols})")
+    cursor.execute(_index_rows("1", "temp_item_search_check", "sku_id"))
+    read = lambda sql: {r[0]: r[1:] for r in cursor.execute(sql).fetchall()}
+    stored = read(f"SELECT rowid, {cols} FROM item_search")
+    actual = read(f"SELECT sku_id, {cols} FROM temp_item_search_check")
+    cursor.execute("DROP TABLE temp_item_search_check")
+    return [(k, stored.get(k), actual.get(k)) for k in sorted(set(stored) | set(actual)) if stored.get(k) != actual.get(k)]
@@ -0,0 +1,80 @@
+"""
+Warm start: the in-memory caches saved next to the database and loaded back at login.
+
+data/inventory.cache holds the barcode catalog (app/catalog.py, which the HD
+design list is built from too) and the dimension lookups (DB.dim_map: stores,
+safes, colors, sizes, units, categories, suppliers, customers), pickled together
+with the change counters they were built at (app/rollups.py). restore():
+
+  - catalog: installed from the file, then refresh() applies only the SKUs
+    changed since (catalog_changes). If the counter went backwards (another
+    database file) it is rebuilt from the tables instead.
+  - lookups: a table is used only if its change_counters seq is unchanged;
+    the others load from the database on first use as before.
+
+A missing, unreadable or older-format file just means a full rebuild. save()
+rewrites it at exit (written to a temp file and renamed, so a crash mid-write
+leaves the previous one).
+"""
+import os
+import pickle
+from time import perf_counter
+from .catalog import get_catalog
+from .database import DIM_TABLES
+from .migrations import SCHEMA_VERSION
+
+# Bump when the saved layout changes (older files are then ignored)
+VERSION = 1
+
+
+def snapshot_path(db):
+    return os.path.splitext(db.name)[0] + ".cache"
+
+
+def catalog_seq(db):
+    return db.fetch_one("SELECT IFNULL(MAX(seq), 0) FROM catalog_changes")[0]
+
+
+def save(db, catalog=None):
+    """Writes the caches to snapshot_path(db). db: any DB on the same file (the read-only one is fine)."""
+    catalog = get_catalog() if catalog is None else catalog
+    t0 = perf_counter()
+    # Lookups are re-read (not taken from memory) so they match the counters saved with them
+    with db.snapshot():
+        seqs = dict(db.fetch_all("SELECT tbl, seq FROM change_counters"))
+        dims = {table: (seqs[table], db.read_dim(table)) for table in DIM_TABLES if table in seqs}
+    state = {"version": VERSION, "schema": SCHEMA_VERSION, "db": os.path.abspath(db.name),
+             "catalog": catalog.dump() if catalog.loaded else None, "dims": dims}
+    path = snapshot_path(db)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    print(f"💾 Cache snapshot saved ({len(catalog)} SKUs, {(perf_counter() - t0) * 1000:.0f} ms)")
+
+
+def restore(db, catalog=None):
+    """Loads the snapshot into the caches (see module doc). Returns True if the catalog came from it."""
+    catalog = get_catalog() if catalog is None else catalog
+    t0 = perf_counter()
+    try:
+        with open(snapshot_path(db), "rb") as f:
+            state = pickle.load(f)
+    except FileNotFoundError:
+        return False
+    except Exception as e:
+        print(f"⚠️ Cache snapshot unreadable, rebuilding: {e}")
+        return False
+    if (state.get("version"), state.get("schema"), state.get("db")) != (VERSION, SCHEMA_VERSION, os.path.abspath(db.name)):
+        return False
+
+    seqs = dict(db.fetch_all("SELECT tbl, seq FROM change_counters"))
+    db.prime_dims({table: names for table, (seq, names) in state["dims"].items() if seqs.get(table) == seq})
+
+    saved = state.get("catalog")
+    if saved is None or saved["seq"] > catalog_seq(db):
+        return False
+    catalog.restore(saved)
+    changed = catalog.refresh()
+    print(f"⚡ Warm start: {len(catalog)} SKUs from snapshot, {changed} updated ({(perf_counter() - t0) * 1000:.0f} ms)")
+    return True
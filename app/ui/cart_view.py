@@ -0,0 +1,293 @@
+"""
+Virtualized cart grid for OrderPage and PurchaseInvoicePage.
+
+A cart row is data (CartRow: a dict of Fields plus the page's own keys such as
+"id" and "line"); widgets exist only for the rows on screen. CartView keeps a pool
+of row widget sets ("slots"), as many as fit in its height, and binds the visible
+rows to them as the cart scrolls. Opening a 500-line invoice builds rows of
+Fields, not 500 x 9 CTk widgets, and reset/load rebind the same slots instead of
+destroying and rebuilding them.
+
+A Field answers the CTkEntry / CTkComboBox / CTkLabel calls the pages make
+(get, insert, delete, set, configure, cget, focus). While its row is on screen
+they go to the widget; otherwise to the stored text and options, which are
+applied to whichever slot shows the row next. focus() scrolls its row into view.
+"""
+import sys
+from collections import namedtuple
+import customtkinter as ctk
+
+# kind: "entry" | "combo" | "label" | "button". options go to the widget's constructor;
+# for entry/combo/label, "state" / "values" / "text_color" are per row (Field options)
+Column = namedtuple("Column", "key kind width options")
+
+ROW_HEIGHT = 37     # slot height incl. padding (rows are 35 px, pady=2 as before)
+PER_ROW_OPTIONS = ("state", "values", "text_color")
+
+
+class Field:
+    __slots__ = ("text", "options", "cell", "row")
+
+    def __init__(self, text="", options=None):
+        self.text = str(text)
+        self.options = dict(options or {})
+        self.cell = None    # the slot cell showing it, None while scrolled away
+        self.row = None
+
+    def get(self):
+        return self.cell.read() if self.cell else self.text
+
+    def set(self, text):
+        self.delete(0, "end"); self.insert(0, text)
+
+    def insert(self, index, text):
+        if self.cell:
+            self.cell.widget.insert(index, text)
+        else:
+            i = len(self.text) if index == "end" else int(index)
+            self.text = self.text[:i] + str(text) + self.text[i:]
+
+    def delete(self, first, last=None):
+        if self.cell:
+            self.cell.widget.delete(first, last)
+        else:
+            i = len(self.text) if first == "end" else int(first)
+            j = i + 1 if last is None else len(self.text) if last == "end" else int(last)
+            self.text = self.text[:i] + self.text[j:]
+
+    def configure(self, **kwargs):
+        if "text" in kwargs:
+            self.text = str(kwargs["text"])
+        self.options.update((k, v) for k, v in kwargs.items() if k != "text")
+        if self.cell:
+            self.cell.widget.configure(**kwargs)
+
+    def cget(self, key):
+        if key == "text":
+            return self.get()
+        return self.cell.widget.cget(key) if self.cell else self.options.get(key)
+
+    def focus(self):
+        view = self.row.view if self.row else None
+        if view is not None:
+            view.scroll_to(self.row)
+        if self.cell:
+            self.cell.widget.focus()
+
+
+class CartRow(dict):
+    """One cart row: Field per column (row["qty"].get()) plus whatever the page stores (row["id"], ...)."""
+    def __init__(self, view, **values):
+        super().__init__(values)
+        self.view = view
+        self.slot = None
+
+
+class Cell:
+    __slots__ = ("widget", "kind", "defaults", "field")
+
+    def __init__(self, widget, kind, defaults):
+        self.widget, self.kind, self.defaults, self.field = widget, kind, defaults, None
+
+    def read(self):
+        return self.widget.cget("text") if self.kind == "label" else self.widget.get()
+
+    def show(self, field):
+        self.field = field
+        field.cell = self
+        options = {**self.defaults, **field.options}
+        state = options.pop("state", None)
+        if self.kind == "label":
+            self.widget.configure(text=field.text, **options)
+            return
+        self.widget.configure(state="normal", **options)
+        if self.kind == "combo":
+            self.widget.set(field.text)
+        else:
+            self.widget.delete(0, "end")
+            if field.text: self.widget.insert(0, field.text)
+        if state and state != "normal":
+            self.widget.configure(state=state)
+
+    def hide(self):
+        if self.field is not None:
+            self.field.text = self.read()
+            self.field.cell = None
+            self.field = None
+
+
+class Slot:
+    """One pooled row of widgets; shows whichever CartRow it is bound to."""
+    def __init__(self, view):
+        self.view = view
+        self.row = None
+        self.focused = None     # (row, <FocusOut> handler) while such a cell has focus
+        self.frame = ctk.CTkFrame(view, height=ROW_HEIGHT - 2, fg_color="transparent")
+        self.frame.pack_propagate(False)
+        self.cells = {}
+        for col in view.columns:
+            options = {k: v for k, v in col.options.items() if k not in PER_ROW_OPTIONS}
+            if col.kind == "button":
+                command = view.commands.get(col.key)
+                widget = ctk.CTkButton(self.frame, width=col.width, command=lambda c=command: c(self.row) if c and self.row is not None else None, **options)
+            elif col.kind == "combo":
+                command = view.commands.get(col.key)
+                widget = ctk.CTkComboBox(self.frame, width=col.width, command=lambda val, c=command: c(self.row, val) if c and self.row is not None else None, **options)
+            elif col.kind == "label":
+                widget = ctk.CTkLabel(self.frame, width=col.width, **options)
+            else:
+                widget = ctk.CTkEntry(self.frame, width=col.width, **options)
+            widget.pack(side="left", padx=2)
+            for sequence, handler in view.bindings.get(col.key, {}).items():
+                if sequence == "<FocusOut>":
+                    # Tk delivers it after the fact, when a scroll or reset may have rebound the slot
+                    widget.bind("<FocusIn>", lambda e, h=handler: setattr(self, "focused", (self.row, h)) if self.row is not None else None)
+                    widget.bind(sequence, lambda e: self.focus_out())
+                else:
+                    widget.bind(sequence, lambda e, h=handler: h(self.row) if self.row is not None else None)
+            if col.kind != "button":
+                # Per-row options start from the column's own (a red barcode doesn't carry over to the next row)
+                defaults = {k: col.options[k] for k in PER_ROW_OPTIONS if k in col.options}
+                if col.kind == "entry":
+                    defaults.setdefault("state", "normal")
+                    defaults.setdefault("text_color", widget.cget("text_color"))
+                self.cells[col.key] = Cell(widget, col.kind, defaults)
+            view.bind_wheel(widget)
+        view.bind_wheel(self.frame)
+
+    def bind_row(self, row):
+        if row is self.row:
+            return
+        self.unbind()
+        self.row = row
+        if row is not None:
+            row.slot = self
+            for key, cell in self.cells.items():
+                cell.show(row[key])
+
+    def focus_out(self, flush=True):
+        """Runs the focused cell's <FocusOut> handler for the row it was focused on, if the slot still shows it."""
+        if self.focused is not None:
+            row, handler = self.focused
+            self.focused = None
+            if flush and row is self.row:
+                handler(row)
+
+    def unbind(self, flush=True):
+        """Releases the row; flush=False drops a pending <FocusOut> (the row is being deleted)."""
+        self.focus_out(flush)
+        if self.row is not None:
+            for cell in self.cells.values():
+                cell.hide()
+            self.row.slot = None
+            self.row = None
+
+
+class CartView(ctk.CTkFrame):
+    """
+    Scrolling grid of cart rows. columns: Column list; commands: {key: fn(row)} for
+    buttons, fn(row, value) for combos; bindings: {key: {"<Return>": fn(row)}}.
+    """
+    def __init__(self, parent, columns, commands=None, bindings=None, height=200, **kwargs):
+        super().__init__(parent, height=height, **kwargs)
+        self.columns = columns
+        self.commands = commands or {}
+        self.bindings = bindings or {}
+        self.rows = []
+        self.slots = []
+        self.top = 0
+        self.visible = max(1, height // ROW_HEIGHT)
+        self.scrollbar = ctk.CTkScrollbar(self, command=self.yview)
+        self.scrollbar.place(relx=1.0, rely=0, relheight=1.0, anchor="ne")
+        self.bind("<Configure>", self._on_resize)
+        self.bind_wheel(self)
+
+    # --- rows ---
+    def new_row(self, values=None, options=None, **extra):
+        """Appends a row: values {key: text} and options {key: {"state": ...}} per column, extra page keys."""
+        values, options = values or {}, options or {}
+        row = CartRow(self, **extra)
+        for col in self.columns:
+            if col.kind != "button":
+                field = row[col.key] = Field(values.get(col.key, ""), options.get(col.key))
+                field.row = row
+        self.rows.append(row)
+        self.render()
+        return row
+
+    def remove(self, row):
+        if row.slot is not None:
+            row.slot.unbind(flush=False)
+        self.rows.remove(row)
+        row.view = None
+        self.render()
+
+    def clear(self):
+        """Drops every row; the slots stay for the next invoice."""
+        for slot in self.slots:
+            slot.unbind(flush=False)
+        for row in self.rows:
+            row.view = None
+        self.rows.clear()  # in place: pages keep self.cart_items = view.rows
+        self.top = 0
+        self.render()
+
+    # --- scrolling ---
+    def render(self):
+        n = len(self.rows)
+        self.top = max(0, min(self.top, n - self.visible))
+        while len(self.slots) < min(n, self.visible):
+            self.slots.append(Slot(self))
+        for i, slot in enumerate(self.slots):
+            r = self.top + i
+            if i < self.visible and r < n:
+                slot.bind_row(self.rows[r])
+                slot.frame.place(x=0, y=i * ROW_HEIGHT, relwidth=1.0)
+            else:
+                slot.unbind()
+                slot.frame.place_forget()
+        self.scrollbar.lift()
+        if n > self.visible:
+            self.scrollbar.set(self.top / n, (self.top + self.visible) / n)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def scroll_to(self, row):
+        if row.view is not self:
+            return
+        i = self.rows.index(row)
+        if i < self.top:
+            self.top = i
+        elif i >= self.top + self.visible:
+            self.top = i - self.visible + 1
+        else:
+            return
+        self.render()
+
+    def yview(self, action, value, units=None):
+        if action == "moveto":
+            self.top = round(float(value) * len(self.rows))
+        else:
+            self.top += int(value) * (self.visible if units == "pages" else 1)
+        self.render()
+
+    def bind_wheel(self, widget):
+        if sys.platform.startswith("linux"):
+            widget.bind("<Button-4>", lambda e: self.yview("scroll", -2))
+            widget.bind("<Button-5>", lambda e: self.yview("scroll", 2))
+        else:
+            widget.bind("<MouseWheel>", self._on_wheel)
+
+    def _on_wheel(self, event):
+        step = event.delta // 120 if sys.platform.startswith("win") else event.delta
+        self.yview("scroll", -2 if step > 0 else 2)
+
+    def _on_resize(self, event):
+        # event sizes are in screen pixels, ROW_HEIGHT in CTk's unscaled units
+        visible = max(1, int(event.height // (ROW_HEIGHT * self._get_widget_scaling())))
+        if visible != self.visible:
+            self.visible = visible
+            self.render()
+
+    def __len__(self):
+        return len(self.rows)
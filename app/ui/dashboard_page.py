@@ -2,7 +2,9 @@ import customtkinter as ctk
 from tkinter import ttk, messagebox
 import sqlite3
 from datetime import date, timedelta
-from app.database import DB
+from app.database import get_db
+from app.db_worker import get_worker
+from app.rollups import SAFE_BALANCES_SQL
 from app.utils import fix_text, MATPLOTLIB_AVAILABLE
 from app.ui.inventory.store_details_popup import StoreDetailsPopup
 
@@ -11,10 +13,11 @@ if MATPLOTLIB_AVAILABLE:
     from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
 class DashboardPage(ctk.CTkScrollableFrame):
-    def __init__(self, parent, controller=None):
+    def __init__(self, parent, controller=None, db=None):
         super().__init__(parent, fg_color="transparent")
         self.controller = controller
-        self.db = DB()
+        self.db = db or get_db()
+        self.worker = get_worker()
         
         # Configure grid expansion for the scrollable content
         self.grid_columnconfigure(0, weight=1)
@@ -22,27 +25,66 @@ class DashboardPage(ctk.CTkScrollableFrame):
 
     def load(self):
         # Clear existing content
+        for widget in self.winfo_children():
+            widget.destroy()
+        ctk.CTkLabel(self, text=fix_text("جاري التحميل..."), font=("Segoe UI", 16), text_color="gray60").pack(pady=60)
+        # All queries run on the DB worker; render() builds the widgets once the numbers are back
+        self.worker.call(self, self.fetch_data, self.render, on_error=self.show_error, key="dashboard")
+
+    def fetch_data(self, db):
+        """Runs on the DB worker thread: only SQL and arithmetic, no widgets."""
+        d = {}
+        # --- 1. STATISTICS (Cards) ---
+        d["i_count"] = db.fetch_one("SELECT COUNT(*) FROM items")[0]
+        d["v_count"] = db.fetch_one("SELECT SUM(stock_qty * buy_price) FROM item_details")[0] or 0
+        
+        # Calculate Estimated Net Profit (All Time)
+        # Sales, refunds and COGS (historical cost_at_sale) come from the sales_daily rollup
+        total_sales, total_ret, total_cogs = [v or 0 for v in db.fetch_one("SELECT SUM(net_total), SUM(refunds), SUM(cogs) FROM sales_daily")]
+        total_exp = db.fetch_one("SELECT SUM(amount) FROM vouchers WHERE voucher_type='Payment'")[0] or 0
+        
+        d["total_sales"] = total_sales
+        d["est_net_profit"] = total_sales - total_ret - total_cogs - total_exp
+
+        # --- 2. CHARTS DATA ---
+        if MATPLOTLIB_AVAILABLE:
+            d["sales_7"] = db.fetch_all("""SELECT date, SUM(net_total) FROM sales_daily WHERE date >= date('now', '-7 days') GROUP BY date HAVING SUM(invoices) > 0""")
+            d["top_items"] = db.fetch_all("""
+                SELECT i.name, SUM(sd.qty) as total_qty
+                FROM sales_daily sd
+                JOIN item_details d ON sd.item_detail_id = d.id
+                JOIN items i ON d.item_id = i.id
+                WHERE sd.date >= date('now', '-30 days')
+                GROUP BY i.name
+                ORDER BY total_qty DESC
+                LIMIT 5
+            """)
+            income_receipts = db.fetch_one("SELECT SUM(amount) FROM vouchers WHERE voucher_type='Receipt'")[0] or 0
+            total_purchases = db.fetch_one("SELECT SUM(net_total) FROM purchases")[0] or 0
+            d["total_income"] = total_sales + income_receipts
+            d["total_out"] = total_purchases + total_exp
+            d["pay_data"] = db.fetch_all("""SELECT NULLIF(payment_method, ''), SUM(net_total) FROM sales_daily WHERE date >= date('now', '-30 days') GROUP BY payment_method HAVING SUM(invoices) > 0""")
+
+        # --- 3. TREASURY (Safes) ---
+        # Dashboard also deducts the refunds of the safe's invoices
+        d["safes"] = [(name, bal - sales_ret) for sid, name, bal, sales_ret in db.fetch_all(SAFE_BALANCES_SQL)]
+
+        # --- 4. STORE DETAILS ---
+        d["store_stats"] = db.fetch_all("""SELECT s.id, s.name, IFNULL(SUM(ss.quantity), 0) FROM stores s LEFT JOIN store_stock ss ON s.id=ss.store_id GROUP BY s.id""")
+        return d
+
+    def show_error(self, e):
+        for widget in self.winfo_children():
+            widget.destroy()
+        ctk.CTkLabel(self, text=f"Error loading dashboard: {e}", text_color="red").pack()
+
+    def render(self, d):
         for widget in self.winfo_children():
             widget.destroy()
 
         # --- 1. STATISTICS (Cards) ---
         try:
-            i_count = self.db.fetch_one("SELECT COUNT(*) FROM items")[0]
-            q_count = self.db.fetch_one("SELECT SUM(quantity) FROM store_stock")[0] or 0
-            v_count = self.db.fetch_one("SELECT SUM(ss.quantity * d.buy_price) FROM store_stock ss JOIN item_details d ON ss.item_detail_id=d.id")[0] or 0
-            
-            # Calculate Estimated Net Profit (All Time)
-            total_sales = self.db.fetch_one("SELECT SUM(net_total) FROM invoices")[0] or 0
-            total_exp = self.db.fetch_one("SELECT SUM(amount) FROM vouchers WHERE voucher_type='Payment'")[0] or 0
-            total_ret = self.db.fetch_one("SELECT SUM(refund_amount) FROM returns")[0] or 0
-            
-            # COGS - FIXED: Use cost_at_sale (historical cost) instead of current buy_price
-            total_cogs = self.db.fetch_one("""
-                SELECT SUM(id.qty * id.cost_at_sale) 
-                FROM invoice_details id
-            """)[0] or 0
-            
-            est_net_profit = total_sales - total_ret - total_cogs - total_exp
+            est_net_profit = d["est_net_profit"]
             
             # Title Header Frame
             header_frame = ctk.CTkFrame(self, fg_color="transparent")
@@ -59,10 +101,10 @@ class DashboardPage(ctk.CTkScrollableFrame):
             f.pack(fill="x", padx=20)
             
             stats = [
-                (fix_text("الأصناف"), i_count, "#3B8ED0"), 
+                (fix_text("الأصناف"), d["i_count"], "#3B8ED0"), 
                 (fix_text("صافي الربح (تقريبي)"), f"{est_net_profit:,.0f}", "#27AE60" if est_net_profit >= 0 else "#C0392B"),
-                (fix_text("قيمة المخزون"), f"{v_count:,.0f}", "#E67E22"),
-                (fix_text("إجمالي المبيعات"), f"{total_sales:,.0f}", "#8E44AD")
+                (fix_text("قيمة المخزون"), f"{d['v_count']:,.0f}", "#E67E22"),
+                (fix_text("إجمالي المبيعات"), f"{d['total_sales']:,.0f}", "#8E44AD")
             ]
             
             for idx, (t, val, col) in enumerate(stats):
@@ -79,10 +121,10 @@ class DashboardPage(ctk.CTkScrollableFrame):
                 charts_frame.pack(fill="x", padx=20, pady=20)
                 
                 # Chart 1: Sales Last 7 Days
-                self.create_chart_frame(charts_frame, 0, 0, fix_text("المبيعات (آخر 7 أيام)"), self.plot_sales_7_days)
+                self.create_chart_frame(charts_frame, 0, 0, fix_text("المبيعات (آخر 7 أيام)"), lambda ax: self.plot_sales_7_days(ax, d["sales_7"]))
                 
                 # Chart 2: Top 5 Selling Items
-                self.create_chart_frame(charts_frame, 0, 1, fix_text("الأكثر مبيعاً (Top 5)"), self.plot_top_items)
+                self.create_chart_frame(charts_frame, 0, 1, fix_text("الأكثر مبيعاً (Top 5)"), lambda ax: self.plot_top_items(ax, d["top_items"]))
                 
                 charts_frame.grid_columnconfigure(0, weight=1)
                 charts_frame.grid_columnconfigure(1, weight=1)
@@ -92,10 +134,10 @@ class DashboardPage(ctk.CTkScrollableFrame):
                 charts_row2.pack(fill="x", padx=20, pady=0)
                 
                 # Chart 3: Income vs Expenses
-                self.create_chart_frame(charts_row2, 0, 0, fix_text("المصروفات vs المبيعات"), lambda ax: self.plot_income_vs_expense(ax, total_sales, total_exp))
+                self.create_chart_frame(charts_row2, 0, 0, fix_text("المصروفات vs المبيعات"), lambda ax: self.plot_income_vs_expense(ax, d["total_income"], d["total_out"]))
                 
                 # Chart 4: Payment Methods
-                self.create_chart_frame(charts_row2, 0, 1, fix_text("طرق الدفع (آخر 30 يوم)"), self.plot_payment_methods)
+                self.create_chart_frame(charts_row2, 0, 1, fix_text("طرق الدفع (آخر 30 يوم)"), lambda ax: self.plot_payment_methods(ax, d["pay_data"]))
 
                 charts_row2.grid_columnconfigure(0, weight=1)
                 charts_row2.grid_columnconfigure(1, weight=1)
@@ -105,23 +147,8 @@ class DashboardPage(ctk.CTkScrollableFrame):
             t_frame = ctk.CTkFrame(self, fg_color="transparent")
             t_frame.pack(fill="x", padx=20, pady=(0,20))
             
-            safes = self.db.fetch_all("SELECT id, name FROM safes")
-            for idx, (sid, name) in enumerate(safes):
+            for idx, (name, balance) in enumerate(d["safes"]):
                 name_fixed = fix_text(name)
-                inc = self.db.fetch_one("SELECT SUM(paid_amount) FROM invoices WHERE safe_id=?", (sid,))[0] or 0
-                v_in = self.db.fetch_one("SELECT SUM(amount) FROM vouchers WHERE safe_id=? AND voucher_type='Receipt'", (sid,))[0] or 0
-                tin = self.db.fetch_one("SELECT SUM(amount) FROM transfers WHERE to_safe_id=?", (sid,))[0] or 0
-                ret = self.db.fetch_one("SELECT SUM(r.refund_amount) FROM returns r JOIN invoices i ON r.invoice_id=i.id WHERE i.safe_id=?", (sid,))[0] or 0
-                pur = self.db.fetch_one("SELECT SUM(net_total) FROM purchases WHERE safe_id=?", (sid,))[0] or 0
-                v_out = self.db.fetch_one("SELECT SUM(amount) FROM vouchers WHERE safe_id=? AND voucher_type='Payment'", (sid,))[0] or 0
-                tout = self.db.fetch_one("SELECT SUM(amount) FROM transfers WHERE from_safe_id=?", (sid,))[0] or 0
-                
-                # FIX: Add purchase returns (money returned from suppliers)
-                pur_ret = self.db.fetch_one("SELECT SUM(pr.refund_amount) FROM purchase_returns pr JOIN purchases p ON pr.purchase_id=p.id WHERE p.safe_id=?", (sid,))[0] or 0
-                
-                # Updated formula: includes purchase returns as incoming cash
-                balance = (inc + v_in + tin + pur_ret) - (ret + pur + v_out + tout)
-                
                 c = ctk.CTkFrame(t_frame, height=100, fg_color="#2C3E50", corner_radius=10)
                 c.grid(row=idx//3, column=idx%3, sticky="ew", padx=10, pady=5)
                 t_frame.grid_columnconfigure(idx%3, weight=1)
@@ -134,9 +161,7 @@ class DashboardPage(ctk.CTkScrollableFrame):
             sf = ctk.CTkFrame(self, fg_color="transparent")
             sf.pack(fill="x", padx=20, pady=(0, 20))
             
-            store_stats = self.db.fetch_all("""SELECT s.id, s.name, IFNULL(SUM(ss.quantity), 0) FROM stores s LEFT JOIN store_stock ss ON s.id=ss.store_id GROUP BY s.id""")
-            
-            for idx, (sid, n, q) in enumerate(store_stats):
+            for idx, (sid, n, q) in enumerate(d["store_stats"]):
                 btn = ctk.CTkButton(sf, text=f"{fix_text(n)}\n{int(q)} Items", height=80, 
                                     fg_color="gray25", border_width=1, border_color="gray40", 
                                     font=("Segoe UI", 16, "bold"), 
@@ -169,26 +194,14 @@ class DashboardPage(ctk.CTkScrollableFrame):
         canvas.get_tk_widget().pack(padx=10, pady=10, fill="both", expand=True)
         plt.close(fig)
 
-    def plot_sales_7_days(self, ax):
+    def plot_sales_7_days(self, ax, sales_data):
         dates_list = [(date.today() - timedelta(days=i)).strftime('%Y-%m-%d') for i in range(6, -1, -1)]
-        sales_data = self.db.fetch_all("""SELECT date, SUM(net_total) FROM invoices WHERE date >= date('now', '-7 days') GROUP BY date""")
         sales_dict = {row[0]: row[1] for row in sales_data}
         final_sales = [sales_dict.get(d, 0) for d in dates_list]
         short_dates = [d[5:] for d in dates_list]
         ax.bar(short_dates, final_sales, color='#3498DB', alpha=0.8)
 
-    def plot_top_items(self, ax):
-        top_items = self.db.fetch_all("""
-            SELECT i.name, SUM(id.qty) as total_qty
-            FROM invoice_details id
-            JOIN item_details d ON id.item_detail_id = d.id
-            JOIN items i ON d.item_id = i.id
-            JOIN invoices inv ON id.invoice_id = inv.id
-            WHERE inv.date >= date('now', '-30 days')
-            GROUP BY i.name
-            ORDER BY total_qty DESC
-            LIMIT 5
-        """)
+    def plot_top_items(self, ax, top_items):
         if top_items:
             i_names = [fix_text(row[0]) for row in top_items]
             i_qtys = [row[1] for row in top_items]
@@ -197,12 +210,7 @@ class DashboardPage(ctk.CTkScrollableFrame):
         else:
             ax.text(0.5, 0.5, "No Data", ha='center', va='center', color='gray')
 
-    def plot_income_vs_expense(self, ax, total_sales, total_exp):
-        income_receipts = self.db.fetch_one("SELECT SUM(amount) FROM vouchers WHERE voucher_type='Receipt'")[0] or 0
-        total_income = total_sales + income_receipts
-        total_purchases = self.db.fetch_one("SELECT SUM(net_total) FROM purchases")[0] or 0
-        total_out = total_purchases + total_exp
-        
+    def plot_income_vs_expense(self, ax, total_income, total_out):
         labels = [fix_text('دخل (Income)'), fix_text('مصروفات (Exp)')]
         sizes = [total_income, total_out]
         colors = ['#27AE60', '#C0392B']
@@ -211,8 +219,7 @@ class DashboardPage(ctk.CTkScrollableFrame):
         else:
              ax.text(0.5, 0.5, "No Data", ha='center', va='center', color='gray')
 
-    def plot_payment_methods(self, ax):
-        pay_data = self.db.fetch_all("""SELECT payment_method, SUM(net_total) FROM invoices WHERE date >= date('now', '-30 days') GROUP BY payment_method""")
+    def plot_payment_methods(self, ax, pay_data):
         if pay_data:
             lbls = [fix_text(r[0] or "?") for r in pay_data]
             vals = [r[1] for r in pay_data]
@@ -1,13 +1,13 @@
 
 import customtkinter as ctk
 from tkinter import ttk, messagebox
-from app.database import DB
+from app.database import get_db
 
 class PendingPage(ctk.CTkFrame):
-    def __init__(self, parent, controller=None):
+    def __init__(self, parent, controller=None, db=None):
         super().__init__(parent)
         self.controller = controller
-        self.db = DB()
+        self.db = db or get_db()
         
         # Header
         header = ctk.CTkFrame(self, height=50, fg_color="gray20")
@@ -199,8 +199,7 @@ class PendingPage(ctk.CTkFrame):
                 
                 # Get Safe ID
                 s_name = cb_safe.get()
-                s_id_res = self.db.fetch_one("SELECT id FROM safes WHERE name=?", (s_name,))
-                final_safe_id = s_id_res[0] if s_id_res else safe_id
+                final_safe_id = self.db.dim_id("safes", s_name) or safe_id
                 
                 new_paid = paid + pay_now
                 new_rem = max(0, net_total - new_paid)
@@ -2,23 +2,48 @@
 import customtkinter as ctk
 from tkinter import ttk, messagebox, filedialog
 import pandas as pd
+from openpyxl import Workbook
 from datetime import date
-import os
-from app.database import DB
+from app.database import get_db
+from app.db_worker import get_worker
 from app.utils import fix_text, REPORTLAB_AVAILABLE
+from app.pdf_resources import pdf_font, paragraph_style
 
 # Conditional imports for ReportLab
 if REPORTLAB_AVAILABLE:
     from app.utils import (
-        SimpleDocTemplate, A4, Table, TableStyle, Paragraph, Spacer, 
-        colors, getSampleStyleSheet, ParagraphStyle, pdfmetrics, TTFont
+        SimpleDocTemplate, A4, Table, TableStyle, Paragraph, Spacer, colors, pdfmetrics
     )
 
+# Flat reports keep at most this many rows in the Treeview; totals and exports cover all rows
+MAX_TREE_ROWS = 5000
+# PDF export lays flat reports out as Tables of this many rows (header repeated on every page)
+PDF_CHUNK_ROWS = 1000
+
+
+class FlowableFeed(list):
+    """
+    doc.build() input that pulls flowables from a generator as the document consumes them
+    (build only looks at the head of its list), so a streamed report never holds every row.
+    """
+    def __init__(self, flowables):
+        super().__init__()
+        self.source = iter(flowables)
+
+    def __len__(self):
+        while super().__len__() < 2:
+            flowable = next(self.source, None)
+            if flowable is None: break
+            self.append(flowable)
+        return super().__len__()
+
+
 class ReportsPage(ctk.CTkFrame):
-    def __init__(self, parent, user_role="Admin"):
+    def __init__(self, parent, user_role="Admin", db=None):
         super().__init__(parent)
         self.user_role = user_role
-        self.db = DB()
+        self.db = db or get_db()
+        self.worker = get_worker()
         
         # Fonts
         self.AR_FONT = ("Segoe UI", 12)
@@ -79,23 +104,27 @@ class ReportsPage(ctk.CTkFrame):
         # Default to first of month
         first_of_month = date.today().replace(day=1)
         self.ent_date_from.insert(0, str(first_of_month))
+        for ent in (self.ent_date_from, self.ent_date_to):
+            ent.bind("<KeyRelease>", lambda e: self.cancel_report())
         
         # Store Filter (Optional)
         self.store_label = ctk.CTkLabel(filters, text=fix_text(":المخزن"), font=self.AR_FONT)
         self.store_label.pack(side="right", padx=5)
-        self.cb_store = ctk.CTkComboBox(filters, width=150, font=self.AR_FONT, justify="right")
+        self.cb_store = ctk.CTkComboBox(filters, width=150, font=self.AR_FONT, justify="right",
+                                        command=lambda _: self.cancel_report())
         self.cb_store.pack(side="right", padx=5)
         
         # HD Filter Checkbox (Global)
         self.cb_include_hd = ctk.CTkCheckBox(filters, text=fix_text("تضمين التصميمات (HD)"), 
-                                              font=self.AR_FONT)
+                                              font=self.AR_FONT, command=self.cancel_report)
         self.cb_include_hd.pack(side="right", padx=5)
         self.cb_include_hd.select()  # Checked by default (include HD)
         
         # Safe Filter (for Cash Flow)
         self.safe_label = ctk.CTkLabel(filters, text=fix_text(":الخزينة"), font=self.AR_FONT)
         self.safe_label.pack_forget()  # Hidden by default
-        self.cb_safe = ctk.CTkComboBox(filters, width=150, font=self.AR_FONT, justify="right")
+        self.cb_safe = ctk.CTkComboBox(filters, width=150, font=self.AR_FONT, justify="right",
+                                       command=lambda _: self.cancel_report())
         self.cb_safe.pack_forget()  # Hidden by default
         
         # Dead Stock - Days Entry (Hidden by default)
@@ -134,7 +163,8 @@ class ReportsPage(ctk.CTkFrame):
         self.lbl_total.pack(side="right", padx=20)
         
         self.load_stores()
-        self.current_data = [] # To store raw data for export
+        self.current_data = [] # To store raw data for export (reports that aren't streamed)
+        self.current_query = None # (sql, params, display) of a streamed report, re-run on export
         self.current_columns = []
         self.current_report_type = ""
 
@@ -145,6 +175,7 @@ class ReportsPage(ctk.CTkFrame):
         self.cb_store.set(stores[0])
 
     def toggle_filters(self, choice):
+        self.cancel_report()
         # Hide all dynamic filters first
         self.safe_label.pack_forget()
         self.cb_safe.pack_forget()
@@ -172,8 +203,7 @@ class ReportsPage(ctk.CTkFrame):
         elif choice == fix_text("كشف حساب عميل"):
             self.customer_label.pack(side="right", padx=5, after=self.cb_report)
             self.cb_customer.pack(side="right", padx=5, after=self.customer_label)
-            custs = self.db.fetch_all("SELECT name FROM customers ORDER BY name")
-            vals = [c[0] for c in custs]
+            vals = self.db.dim_names("customers")
             self.cb_customer.configure(values=vals)
             if vals: self.cb_customer.set(vals[0])
             self.date_frame.pack(side="right", padx=10, after=self.cb_customer)
@@ -199,9 +229,56 @@ class ReportsPage(ctk.CTkFrame):
         else: return f" AND {table_alias}.barcode NOT LIKE 'HD%'"
 
     def generate_report(self):
+        # Queries run on the DB worker; report_steps() resumes on the Tk thread with each result
+        self.worker.run_steps(self, self.report_steps(), on_error=self.report_failed, key="reports")
+
+    def cancel_report(self):
+        """Filters changed: drop the report still loading so its stale rows never land in the table."""
+        if self.worker.pending("reports"):
+            self.worker.cancel("reports")
+            self.current_query = None  # nothing to export: its rows never came back
+            self.lbl_total.configure(text="")
+
+    def report_failed(self, e):
+        self.current_query = None
+        self.lbl_total.configure(text="")
+        messagebox.showerror("Error", f"Report failed: {e}")
+
+    def scan(self, sql, params, display=None, sum_cols=()):
+        """
+        Worker job for the flat reports: streams the result (DB.fetch_iter), keeps only the first
+        MAX_TREE_ROWS display rows and sums sum_cols over every row. The full result is never
+        held in memory; exports re-run the query and stream it to the file. The job hands the
+        query back with its rows, so report_steps sets self.current_query only once they arrive.
+        """
+        query = (sql, params, display)
+
+        def job(db):
+            shown, count, sums = [], 0, [0.0] * len(sum_cols)
+            for row in db.fetch_iter(sql, params):
+                count += 1
+                for i, c in enumerate(sum_cols):
+                    sums[i] += row[c] or 0
+                if count <= MAX_TREE_ROWS:
+                    shown.append(display(row) if display else list(row))
+            return shown, count, sums, query
+        return job
+
+    def show_rows(self, rows):
+        for row in rows:
+            self.tree.insert("", "end", values=row)
+
+    def shown_note(self, count):
+        if count <= MAX_TREE_ROWS: return ""
+        return fix_text(f"  (معروض أول {MAX_TREE_ROWS:,} من {count:,} - التصدير يشمل الكل)")
+
+    def report_steps(self):
+        """Generator: each `yield` hands a query to the DB worker and receives its rows."""
         # Clear Tree
         self.tree.delete(*self.tree.get_children())
         self.current_data = []
+        self.current_query = None
+        self.lbl_total.configure(text=fix_text("جاري التحميل..."), text_color="#F39C12")
         
         report_type = self.cb_report.get()
         self.current_report_type = report_type
@@ -239,23 +316,21 @@ class ReportsPage(ctk.CTkFrame):
                 params.append(store)
             
             sql += " GROUP BY i.id ORDER BY i.date DESC"
-            data = self.db.fetch_all(sql, tuple(params))
+            
+            def display(row):
+                display_row = list(row)
+                if row[2]: display_row[2] = fix_text(row[2])
+                if row[7]: display_row[7] = fix_text(row[7])
+                return display_row
+            data, count, (total_sales,), self.current_query = yield self.scan(sql, tuple(params), display, sum_cols=(4,))
             
             self.tree["columns"] = self.current_columns
             for col, name in zip(self.current_columns, cols_ar):
                 self.tree.heading(col, text=fix_text(name))
                 self.tree.column(col, width=100, anchor="center")
+            self.show_rows(data)
             
-            total_sales = 0
-            for row in data:
-                display_row = list(row)
-                if row[2]: display_row[2] = fix_text(row[2])
-                if row[7]: display_row[7] = fix_text(row[7])
-                self.tree.insert("", "end", values=display_row)
-                self.current_data.append(display_row)
-                total_sales += row[4]
-            
-            self.lbl_total.configure(text=fix_text(f"إجمالي المبيعات: {total_sales:,.2f} ج.م"))
+            self.lbl_total.configure(text=fix_text(f"إجمالي المبيعات: {total_sales:,.2f} ج.م") + self.shown_note(count))
 
         # 2. STOCK REPORT
         elif report_type == fix_text("تقرير جرد المخزون"):
@@ -280,27 +355,24 @@ class ReportsPage(ctk.CTkFrame):
                 params.append(store)
                 
             sql += " ORDER BY i.name"
-            data = self.db.fetch_all(sql, tuple(params))
             
-            self.tree["columns"] = self.current_columns
-            for col, name in zip(self.current_columns, cols_ar):
-                self.tree.heading(col, text=fix_text(name))
-                self.tree.column(col, width=100, anchor="center")
-            self.tree.column("Name", width=200)
-            
-            total_val = 0
-            for row in data:
+            def display(row):
                 display_row = list(row)
                 display_row[1] = fix_text(display_row[1]) # Name
                 display_row[2] = fix_text(display_row[2]) # Color
                 display_row[3] = fix_text(display_row[3]) # Size
                 display_row[4] = fix_text(display_row[4]) # Store Name
+                return display_row
+            data, count, (total_val,), self.current_query = yield self.scan(sql, tuple(params), display, sum_cols=(7,))
+            
+            self.tree["columns"] = self.current_columns
+            for col, name in zip(self.current_columns, cols_ar):
+                self.tree.heading(col, text=fix_text(name))
+                self.tree.column(col, width=100, anchor="center")
+            self.tree.column("Name", width=200)
+            self.show_rows(data)
                 
-                self.tree.insert("", "end", values=display_row)
-                self.current_data.append(display_row)
-                total_val += row[7] if row[7] else 0
-                
-            self.lbl_total.configure(text=fix_text(f"قيمة المخزون: {total_val:,.2f} ج.م"))
+            self.lbl_total.configure(text=fix_text(f"قيمة المخزون: {total_val:,.2f} ج.م") + self.shown_note(count))
 
         # 3. LOW STOCK
         elif report_type == fix_text("تقرير النواقص (Low Stock)"):
@@ -322,60 +394,57 @@ class ReportsPage(ctk.CTkFrame):
                 sql += " AND s.name = ?"
                 params.append(store)
             
-            data = self.db.fetch_all(sql, tuple(params))
+            def display(row):
+                d_row = list(row)
+                d_row[1] = fix_text(d_row[1])
+                d_row[2] = fix_text(d_row[2])
+                return d_row
+            data, count, _, self.current_query = yield self.scan(sql, tuple(params), display)
             
             self.tree["columns"] = self.current_columns
             for col, name in zip(self.current_columns, cols_ar):
                 self.tree.heading(col, text=fix_text(name))
                 self.tree.column(col, width=150, anchor="center")
-            
-            for row in data:
-                d_row = list(row)
-                d_row[1] = fix_text(d_row[1])
-                d_row[2] = fix_text(d_row[2])
-                self.tree.insert("", "end", values=d_row)
-                self.current_data.append(d_row)
+            self.show_rows(data)
                 
-            self.lbl_total.configure(text=fix_text(f"عدد النواقص: {len(data)} صنف"))
+            self.lbl_total.configure(text=fix_text(f"عدد النواقص: {count} صنف") + self.shown_note(count))
         
         # 4. PROFIT REPORT (Approx) - FIXED: Uses historical cost_at_sale
         elif report_type == fix_text("تقرير الأرباح (تقريبي)"):
             self.current_columns = ["Item", "Sold_Qty", "Cost_at_Sale", "Sell_Price", "Profit"]
             cols_ar = ["الصنف", "الكمية المباعة", "تكلفة البيع", "سعر البيع", "الربح"]
             
-            sql = """SELECT i.name, SUM(id.qty), AVG(id.cost_at_sale), AVG(id.price), SUM((id.price - id.cost_at_sale) * id.qty)
-                     FROM invoice_details id
-                     JOIN item_details d ON id.item_detail_id = d.id
+            # From the sales_daily rollup; unit cost/price are quantity-weighted averages
+            sql = """SELECT i.name, SUM(sd.qty), SUM(sd.cogs) / NULLIF(SUM(sd.qty), 0), SUM(sd.revenue) / NULLIF(SUM(sd.qty), 0),
+                            SUM(sd.revenue - sd.cogs)
+                     FROM sales_daily sd
+                     JOIN item_details d ON sd.item_detail_id = d.id
                      JOIN items i ON d.item_id = i.id
-                     JOIN invoices inv ON id.invoice_id = inv.id
-                     WHERE inv.date BETWEEN ? AND ?"""
+                     WHERE sd.date BETWEEN ? AND ?"""
             params = [d_from, d_to]
             
             hd_filter = self.get_hd_filter_sql("d")
             sql += hd_filter
             
             if store != fix_text("كل المخازن"):
-                sql += " AND inv.store_id = (SELECT id FROM stores WHERE name = ?)"
-                params.append(store)
+                sql += " AND sd.store_id = ?"
+                params.append(self.db.dim_id("stores", store))
             
-            sql += " GROUP BY i.id ORDER BY SUM((id.price - id.cost_at_sale) * id.qty) DESC"
-            data = self.db.fetch_all(sql, tuple(params))
+            sql += " GROUP BY i.id HAVING SUM(sd.qty) <> 0 ORDER BY SUM(sd.revenue - sd.cogs) DESC"
+            
+            def display(row):
+                d_row = list(row)
+                d_row[0] = fix_text(d_row[0])
+                return d_row
+            data, count, (total_profit,), self.current_query = yield self.scan(sql, tuple(params), display, sum_cols=(4,))
             
             self.tree["columns"] = self.current_columns
             for col, name in zip(self.current_columns, cols_ar):
                 self.tree.heading(col, text=fix_text(name))
                 self.tree.column(col, width=120, anchor="center")
+            self.show_rows(data)
             
-            total_profit = 0
-            for row in data:
-                d_row = list(row)
-                d_row[0] = fix_text(d_row[0])
-                profit = d_row[4] if d_row[4] else 0
-                total_profit += profit
-                self.tree.insert("", "end", values=d_row)
-                self.current_data.append(d_row)
-            
-            self.lbl_total.configure(text=fix_text(f"إجمالي الأرباح: {total_profit:,.2f} ج.م"))
+            self.lbl_total.configure(text=fix_text(f"إجمالي الأرباح: {total_profit:,.2f} ج.م") + self.shown_note(count))
         
         # 5. CUSTOMERS REPORT
         elif report_type == fix_text("تقرير العملاء"):
@@ -389,20 +458,20 @@ class ReportsPage(ctk.CTkFrame):
             params = [d_from, d_to]
             
             sql += " GROUP BY c.id ORDER BY SUM(i.net_total) DESC"
-            data = self.db.fetch_all(sql, tuple(params))
+            
+            def display(row):
+                d_row = list(row)
+                if d_row[1]: d_row[1] = fix_text(d_row[1])
+                return d_row
+            data, count, _, self.current_query = yield self.scan(sql, tuple(params), display)
             
             self.tree["columns"] = self.current_columns
             for col, name in zip(self.current_columns, cols_ar):
                 self.tree.heading(col, text=fix_text(name))
                 self.tree.column(col, width=120, anchor="center")
+            self.show_rows(data)
             
-            for row in data:
-                d_row = list(row)
-                if d_row[1]: d_row[1] = fix_text(d_row[1])
-                self.tree.insert("", "end", values=d_row)
-                self.current_data.append(d_row)
-            
-            self.lbl_total.configure(text=fix_text(f"عدد العملاء: {len(data)}"))
+            self.lbl_total.configure(text=fix_text(f"عدد العملاء: {count}") + self.shown_note(count))
         
         # 6. SUPPLIERS REPORT
         elif report_type == fix_text("تقرير الموردين"):
@@ -416,20 +485,20 @@ class ReportsPage(ctk.CTkFrame):
             params = [d_from, d_to]
             
             sql += " GROUP BY s.id ORDER BY SUM(p.net_total) DESC"
-            data = self.db.fetch_all(sql, tuple(params))
+            
+            def display(row):
+                d_row = list(row)
+                if d_row[1]: d_row[1] = fix_text(d_row[1])
+                return d_row
+            data, count, _, self.current_query = yield self.scan(sql, tuple(params), display)
             
             self.tree["columns"] = self.current_columns
             for col, name in zip(self.current_columns, cols_ar):
                 self.tree.heading(col, text=fix_text(name))
                 self.tree.column(col, width=120, anchor="center")
+            self.show_rows(data)
             
-            for row in data:
-                d_row = list(row)
-                if d_row[1]: d_row[1] = fix_text(d_row[1])
-                self.tree.insert("", "end", values=d_row)
-                self.current_data.append(d_row)
-            
-            self.lbl_total.configure(text=fix_text(f"عدد الموردين: {len(data)}"))
+            self.lbl_total.configure(text=fix_text(f"عدد الموردين: {count}") + self.shown_note(count))
         
         # 7. PENDING INVOICES REPORT
         elif report_type == fix_text("تقرير الفواتير الآجلة"):
@@ -441,26 +510,24 @@ class ReportsPage(ctk.CTkFrame):
                      LEFT JOIN customers c ON i.customer_id = c.id
                      WHERE i.remaining_amount > 0.01"""
             
+            params = []
             if store != fix_text("كل المخازن"):
-                sql += " AND i.store_id = (SELECT id FROM stores WHERE name = ?)"
-                data = self.db.fetch_all(sql, (store,))
-            else:
-                data = self.db.fetch_all(sql)
+                sql += " AND i.store_id = ?"
+                params.append(self.db.dim_id("stores", store))
+            
+            def display(row):
+                d_row = list(row)
+                if d_row[2]: d_row[2] = fix_text(d_row[2])
+                return d_row
+            data, count, (total_remaining,), self.current_query = yield self.scan(sql, tuple(params), display, sum_cols=(5,))
             
             self.tree["columns"] = self.current_columns
             for col, name in zip(self.current_columns, cols_ar):
                 self.tree.heading(col, text=fix_text(name))
                 self.tree.column(col, width=120, anchor="center")
+            self.show_rows(data)
             
-            total_remaining = 0
-            for row in data:
-                d_row = list(row)
-                if d_row[2]: d_row[2] = fix_text(d_row[2])
-                self.tree.insert("", "end", values=d_row)
-                self.current_data.append(d_row)
-                total_remaining += row[5] if row[5] else 0
-            
-            self.lbl_total.configure(text=fix_text(f"إجمالي المتبقي: {total_remaining:,.2f} ج.م"))
+            self.lbl_total.configure(text=fix_text(f"إجمالي المتبقي: {total_remaining:,.2f} ج.م") + self.shown_note(count))
         
         # 8. CASH FLOW REPORT
         elif report_type == fix_text("تقرير حركة الخزنة (Cash Flow)"):
@@ -470,10 +537,9 @@ class ReportsPage(ctk.CTkFrame):
             safe = self.cb_safe.get()
             safe_id = None
             if safe != fix_text("كل الخزائن"):
-                safe_res = self.db.fetch_one("SELECT id FROM safes WHERE name=?", (safe,))
-                if safe_res: safe_id = safe_res[0]
+                safe_id = self.db.dim_id("safes", safe)
             
-            movements = []
+            queries = []
             
             # Invoices
             sql_invoices = """SELECT 'مبيعات', i.date, ('فاتورة #' || i.id || ' - ' || COALESCE(c.name, 'غير معروف')), i.paid_amount, NULL
@@ -487,7 +553,7 @@ class ReportsPage(ctk.CTkFrame):
             else:
                 sql_invoices += " AND i.safe_id IS NOT NULL"
             
-            movements.extend(self.db.fetch_all(sql_invoices, tuple(params_inv)))
+            queries.append((sql_invoices, tuple(params_inv)))
             
             # Receipts
             sql_receipts = """SELECT 'سند قبض', date, description, amount, NULL
@@ -497,7 +563,7 @@ class ReportsPage(ctk.CTkFrame):
             if safe_id:
                 sql_receipts += " AND safe_id = ?"
                 params_rec.append(safe_id)
-            movements.extend(self.db.fetch_all(sql_receipts, tuple(params_rec)))
+            queries.append((sql_receipts, tuple(params_rec)))
             
             # Purchases
             sql_purchases = """SELECT 'مشتريات', p.date, ('فاتورة شراء #' || p.id || ' - ' || COALESCE(s.name, 'غير معروف')), -p.net_total, NULL
@@ -511,7 +577,7 @@ class ReportsPage(ctk.CTkFrame):
             else:
                 sql_purchases += " AND p.safe_id IS NOT NULL"
             
-            movements.extend(self.db.fetch_all(sql_purchases, tuple(params_pur)))
+            queries.append((sql_purchases, tuple(params_pur)))
             
             # Payments
             sql_payments = """SELECT 'سند صرف', date, description, -amount, NULL
@@ -521,7 +587,7 @@ class ReportsPage(ctk.CTkFrame):
             if safe_id:
                 sql_payments += " AND safe_id = ?"
                 params_pay.append(safe_id)
-            movements.extend(self.db.fetch_all(sql_payments, tuple(params_pay)))
+            queries.append((sql_payments, tuple(params_pay)))
             
             # Returns
             sql_returns = """SELECT 'مرتجع مبيعات', r.date, ('مرتجع فاتورة #' || r.invoice_id), -r.refund_amount, NULL
@@ -532,8 +598,9 @@ class ReportsPage(ctk.CTkFrame):
             if safe_id:
                 sql_returns += " AND i.safe_id = ?"
                 params_ret.append(safe_id)
-            movements.extend(self.db.fetch_all(sql_returns, tuple(params_ret)))
+            queries.append((sql_returns, tuple(params_ret)))
             
+            movements = yield lambda db: [m for q, prm in queries for m in db.fetch_all(q, prm)]
             movements.sort(key=lambda x: x[1] if x[1] else "")
             
             balance = 0.0
@@ -569,79 +636,65 @@ class ReportsPage(ctk.CTkFrame):
             self.current_columns = ["Item", "Qty_Sold", "Revenue", "Avg_Price"]
             cols_ar = ["الصنف", "الكمية المباعة", "إجمالي المبيعات", "متوسط السعر"]
             
-            sql = """SELECT i.name, SUM(id.qty), SUM(id.total), AVG(id.price)
-                     FROM invoice_details id
-                     JOIN item_details d ON id.item_detail_id = d.id
+            sql = """SELECT i.name, SUM(sd.qty), SUM(sd.revenue), SUM(sd.revenue) / NULLIF(SUM(sd.qty), 0)
+                     FROM sales_daily sd
+                     JOIN item_details d ON sd.item_detail_id = d.id
                      JOIN items i ON d.item_id = i.id
-                     JOIN invoices inv ON id.invoice_id = inv.id
-                     WHERE inv.date BETWEEN ? AND ?"""
+                     WHERE sd.date BETWEEN ? AND ?"""
             params = [d_from, d_to]
             
             hd_filter = self.get_hd_filter_sql("d")
             sql += hd_filter
             
             if store != fix_text("كل المخازن"):
-                sql += " AND inv.store_id = (SELECT id FROM stores WHERE name = ?)"
-                params.append(store)
+                sql += " AND sd.store_id = ?"
+                params.append(self.db.dim_id("stores", store))
             
-            sql += " GROUP BY i.id ORDER BY SUM(id.qty) DESC LIMIT 50"
-            data = self.db.fetch_all(sql, tuple(params))
+            sql += " GROUP BY i.id HAVING SUM(sd.qty) <> 0 ORDER BY SUM(sd.qty) DESC LIMIT 50"
+            
+            def display(row):
+                d_row = list(row)
+                d_row[0] = fix_text(d_row[0]) 
+                return d_row
+            data, count, (total_revenue,), self.current_query = yield self.scan(sql, tuple(params), display, sum_cols=(2,))
             
             self.tree["columns"] = self.current_columns
             for col, name in zip(self.current_columns, cols_ar):
                 self.tree.heading(col, text=fix_text(name))
                 self.tree.column(col, width=150, anchor="center")
+            self.show_rows(data)
             
-            for row in data:
-                d_row = list(row)
-                d_row[0] = fix_text(d_row[0]) 
-                self.tree.insert("", "end", values=d_row)
-                self.current_data.append(d_row)
-            
-            total_revenue = sum(r[2] for r in data if r[2])
-            self.lbl_total.configure(text=fix_text(f"عدد الأصناف: {len(data)} | إجمالي المبيعات: {total_revenue:,.2f} ج.م"))
+            self.lbl_total.configure(text=fix_text(f"عدد الأصناف: {count} | إجمالي المبيعات: {total_revenue:,.2f} ج.م"))
         
         # 10. DAILY SALES
         elif report_type == fix_text("تقرير المبيعات اليومية"):
             self.current_columns = ["Date", "Invoices", "Items", "Total_Sales", "Avg_Invoice"]
             cols_ar = ["التاريخ", "عدد الفواتير", "عدد الأصناف", "إجمالي المبيعات", "متوسط الفاتورة"]
             
+            # Invoice rows of sales_daily (item 0) carry the count and net total, SKU rows the quantities
             include_hd = self.cb_include_hd.get()
-            if not include_hd:
-                sql = """SELECT inv.date, COUNT(DISTINCT inv.id), 
-                        SUM(CASE WHEN d.barcode NOT LIKE 'HD%' THEN id.qty ELSE 0 END), 
-                        SUM(inv.net_total), AVG(inv.net_total)
-                        FROM invoices inv
-                        LEFT JOIN invoice_details id ON inv.id = id.invoice_id
-                        LEFT JOIN item_details d ON id.item_detail_id = d.id
-                        WHERE inv.date BETWEEN ? AND ?"""
-            else:
-                sql = """SELECT inv.date, COUNT(DISTINCT inv.id), SUM(id.qty), SUM(inv.net_total), AVG(inv.net_total)
-                         FROM invoices inv
-                         LEFT JOIN invoice_details id ON inv.id = id.invoice_id
-                         WHERE inv.date BETWEEN ? AND ?"""
+            qty = "SUM(sd.qty)" if include_hd else "SUM(CASE WHEN d.barcode NOT LIKE 'HD%' THEN sd.qty ELSE 0 END)"
+            sql = f"""SELECT sd.date, SUM(sd.invoices), {qty}, SUM(sd.net_total), SUM(sd.net_total) / NULLIF(SUM(sd.invoices), 0)
+                      FROM sales_daily sd
+                      LEFT JOIN item_details d ON sd.item_detail_id = d.id
+                      WHERE sd.date BETWEEN ? AND ?"""
             params = [d_from, d_to]
             
             if store != fix_text("كل المخازن"):
-                sql += " AND inv.store_id = (SELECT id FROM stores WHERE name = ?)"
-                params.append(store)
+                sql += " AND sd.store_id = ?"
+                params.append(self.db.dim_id("stores", store))
             
-            sql += " GROUP BY inv.date ORDER BY inv.date DESC"
-            data = self.db.fetch_all(sql, tuple(params))
+            sql += " GROUP BY sd.date HAVING SUM(sd.invoices) > 0 ORDER BY sd.date DESC"
+            data, count, (total_sales,), self.current_query = yield self.scan(sql, tuple(params), sum_cols=(3,))
             
             self.tree["columns"] = self.current_columns
             for col, name in zip(self.current_columns, cols_ar):
                 self.tree.heading(col, text=fix_text(name))
                 self.tree.column(col, width=120, anchor="center")
+            self.show_rows(data)
             
-            total_sales = 0
-            for row in data:
-                self.tree.insert("", "end", values=row)
-                self.current_data.append(row)
-                total_sales += row[3] if row[3] else 0
-            
-            avg_daily = total_sales / len(data) if data else 0
-            self.lbl_total.configure(text=fix_text(f"إجمالي المبيعات: {total_sales:,.2f} ج.م | متوسط يومي: {avg_daily:,.2f} ج.م"))
+            avg_daily = total_sales / count if count else 0
+            self.lbl_total.configure(text=fix_text(f"إجمالي المبيعات: {total_sales:,.2f} ج.م | متوسط يومي: {avg_daily:,.2f} ج.م") + self.shown_note(count))
         
         # 11. SALES RETURNS REPORT
         elif report_type == fix_text("تقرير مرتجع المبيعات"):
@@ -656,26 +709,24 @@ class ReportsPage(ctk.CTkFrame):
             params = [d_from, d_to]
             
             if store != fix_text("كل المخازن"):
-                sql += " AND i.store_id = (SELECT id FROM stores WHERE name = ?)"
-                params.append(store)
+                sql += " AND i.store_id = ?"
+                params.append(self.db.dim_id("stores", store))
             
             sql += " GROUP BY r.id ORDER BY r.date DESC"
-            data = self.db.fetch_all(sql, tuple(params))
+            
+            def display(row):
+                d_row = list(row)
+                if d_row[3]: d_row[3] = fix_text(d_row[3])
+                return d_row
+            data, count, (total_refunds,), self.current_query = yield self.scan(sql, tuple(params), display, sum_cols=(5,))
             
             self.tree["columns"] = self.current_columns
             for col, name in zip(self.current_columns, cols_ar):
                 self.tree.heading(col, text=fix_text(name))
                 self.tree.column(col, width=120, anchor="center")
+            self.show_rows(data)
             
-            total_refunds = 0
-            for row in data:
-                d_row = list(row)
-                if d_row[3]: d_row[3] = fix_text(d_row[3])
-                self.tree.insert("", "end", values=d_row)
-                self.current_data.append(d_row)
-                total_refunds += row[5] if row[5] else 0
-            
-            self.lbl_total.configure(text=fix_text(f"إجمالي المرتجعات: {total_refunds:,.2f} ج.م | عدد المرتجعات: {len(data)}"))
+            self.lbl_total.configure(text=fix_text(f"إجمالي المرتجعات: {total_refunds:,.2f} ج.م | عدد المرتجعات: {count}") + self.shown_note(count))
         
         # 12. DEAD STOCK REPORT
         elif report_type == fix_text("تقرير المخزون الراكد (Dead Stock)"):
@@ -705,53 +756,44 @@ class ReportsPage(ctk.CTkFrame):
             if store != fix_text("كل المخازن"):
                 sql_base += " AND s.name = ?"
                 sql = sql_base + " GROUP BY d.id, ss.store_id HAVING days_since > ? OR last_sale_date IS NULL ORDER BY days_since DESC"
-                data = self.db.fetch_all(sql, (store, days_threshold))
+                params = (store, days_threshold)
             else:
                 sql = sql_base + " GROUP BY d.id, ss.store_id HAVING days_since > ? OR last_sale_date IS NULL ORDER BY days_since DESC"
-                data = self.db.fetch_all(sql, (days_threshold,))
-            
-            self.tree["columns"] = self.current_columns
-            for col, name in zip(self.current_columns, cols_ar):
-                self.tree.heading(col, text=fix_text(name))
-                self.tree.column(col, width=120, anchor="center")
-            self.tree.column("Name", width=200)
+                params = (days_threshold,)
             
-            for row in data:
+            def display(row):
                 d_row = list(row)
                 d_row[1] = fix_text(d_row[1])  # Name
                 d_row[2] = fix_text(d_row[2])  # Store
                 if d_row[4]: d_row[4] = str(d_row[4])
                 else: d_row[4] = fix_text("لم يباع")
                 d_row[5] = int(d_row[5]) if d_row[5] else 9999
-                self.tree.insert("", "end", values=d_row)
-                self.current_data.append(d_row)
+                return d_row
+            data, count, (total_stock_value,), self.current_query = yield self.scan(sql, params, display, sum_cols=(3,))
             
-            total_stock_value = sum(r[3] for r in data if r[3])
-            self.lbl_total.configure(text=fix_text(f"عدد الأصناف الراكدة: {len(data)} | إجمالي الكمية: {total_stock_value}"))
+            self.tree["columns"] = self.current_columns
+            for col, name in zip(self.current_columns, cols_ar):
+                self.tree.heading(col, text=fix_text(name))
+                self.tree.column(col, width=120, anchor="center")
+            self.tree.column("Name", width=200)
+            self.show_rows(data)
+            
+            self.lbl_total.configure(text=fix_text(f"عدد الأصناف الراكدة: {count} | إجمالي الكمية: {total_stock_value:g}") + self.shown_note(count))
 
         # 14. NET PROFIT REPORT - FIXED: Uses historical cost_at_sale
         elif report_type == fix_text("تقرير صافي الربح (Net Profit)"):
             self.current_columns = ["Item", "Type", "Amount"]
             cols_ar = ["البند", "النوع", "القيمة"]
             
-            sql_sales = "SELECT SUM(net_total) FROM invoices WHERE date BETWEEN ? AND ?"
-            total_sales = self.db.fetch_one(sql_sales, (d_from, d_to))[0] or 0
-            
-            # FIXED: Use cost_at_sale instead of buy_price
-            sql_cogs = """SELECT SUM(id.qty * id.cost_at_sale)
-                          FROM invoice_details id
-                          JOIN invoices i ON id.invoice_id = i.id
-                          WHERE i.date BETWEEN ? AND ?"""
-            total_cogs = self.db.fetch_one(sql_cogs, (d_from, d_to))[0] or 0
+            # Sales, COGS (historical cost_at_sale) and refunds (by return date) from the sales_daily rollup
+            sql_sales = "SELECT SUM(net_total), SUM(cogs), SUM(refunds) FROM sales_daily WHERE date BETWEEN ? AND ?"
             
             sql_expenses = "SELECT SUM(amount) FROM vouchers WHERE voucher_type='Payment' AND date BETWEEN ? AND ?"
-            total_expenses = self.db.fetch_one(sql_expenses, (d_from, d_to))[0] or 0
-            
-            sql_returns = """SELECT SUM(r.refund_amount) 
-                             FROM returns r 
-                             WHERE r.date BETWEEN ? AND ?"""
-            total_returns = self.db.fetch_one(sql_returns, (d_from, d_to))[0] or 0
-            
+
+            # One worker job for the four totals
+            total_sales, total_cogs, total_returns, total_expenses = yield lambda db: [
+                v or 0 for v in db.fetch_one(sql_sales, (d_from, d_to)) + db.fetch_one(sql_expenses, (d_from, d_to))]
+
             net_sales = total_sales - total_returns
             gross_profit = net_sales - total_cogs
             net_profit = gross_profit - total_expenses
@@ -809,7 +851,7 @@ class ReportsPage(ctk.CTkFrame):
             
             sql += self.get_hd_filter_sql("d")
             sql += " GROUP BY i.id, c.id, d.size_id ORDER BY i.name, c.name"
-            raw_data = self.db.fetch_all(sql, tuple(params))
+            raw_data = yield ("all", sql, tuple(params))
             
             hierarchy = {}
             for row in raw_data:
@@ -862,57 +904,56 @@ class ReportsPage(ctk.CTkFrame):
             
             include_hd = self.cb_include_hd.get()
             if not include_hd:
-                sql = """SELECT i.channel, i.delegate_name, COUNT(DISTINCT i.id), 
-                        COALESCE(SUM(CASE WHEN d.barcode NOT LIKE 'HD%' THEN id.total ELSE 0 END), 0)
-                        FROM invoices i
-                        LEFT JOIN invoice_details id ON i.id = id.invoice_id
-                        LEFT JOIN item_details d ON id.item_detail_id = d.id
-                        WHERE i.date BETWEEN ? AND ?"""
+                revenue = "SUM(CASE WHEN d.barcode NOT LIKE 'HD%' THEN sd.revenue ELSE 0 END)"
+                sql = f"""SELECT NULLIF(sd.channel, ''), NULLIF(sd.delegate_name, ''), SUM(sd.invoices), {revenue}
+                          FROM sales_daily sd
+                          LEFT JOIN item_details d ON sd.item_detail_id = d.id
+                          WHERE sd.date BETWEEN ? AND ?"""
                 params = [d_from, d_to]
                 if store != fix_text("كل المخازن"):
-                    sql += " AND i.store_id = (SELECT id FROM stores WHERE name = ?)"
-                    params.append(store)
-                sql += " GROUP BY i.channel, i.delegate_name HAVING COALESCE(SUM(CASE WHEN d.barcode NOT LIKE 'HD%' THEN id.total ELSE 0 END), 0) > 0 ORDER BY COALESCE(SUM(CASE WHEN d.barcode NOT LIKE 'HD%' THEN id.total ELSE 0 END), 0) DESC"
+                    sql += " AND sd.store_id = ?"
+                    params.append(self.db.dim_id("stores", store))
+                sql += f" GROUP BY sd.channel, sd.delegate_name HAVING {revenue} > 0 ORDER BY {revenue} DESC"
             else:
-                sql = """SELECT i.channel, i.delegate_name, COUNT(DISTINCT i.id), SUM(i.net_total)
-                         FROM invoices i
-                         WHERE i.date BETWEEN ? AND ?"""
+                sql = """SELECT NULLIF(sd.channel, ''), NULLIF(sd.delegate_name, ''), SUM(sd.invoices), SUM(sd.net_total)
+                         FROM sales_daily sd
+                         WHERE sd.date BETWEEN ? AND ?"""
                 params = [d_from, d_to]
                 if store != fix_text("كل المخازن"):
-                    sql += " AND i.store_id = (SELECT id FROM stores WHERE name = ?)"
-                    params.append(store)
-                sql += " GROUP BY i.channel, i.delegate_name ORDER BY SUM(i.net_total) DESC"
+                    sql += " AND sd.store_id = ?"
+                    params.append(self.db.dim_id("stores", store))
+                sql += " GROUP BY sd.channel, sd.delegate_name HAVING SUM(sd.invoices) > 0 ORDER BY SUM(sd.net_total) DESC"
             
-            data = self.db.fetch_all(sql, tuple(params))
+            def display(row):
+                d_row = list(row)
+                if d_row[0]: d_row[0] = fix_text(d_row[0])
+                if d_row[1]: d_row[1] = fix_text(d_row[1])
+                return d_row
+            data, count, (total_revenue,), self.current_query = yield self.scan(sql, tuple(params), display, sum_cols=(3,))
             
             self.tree["columns"] = self.current_columns
             for col, name in zip(self.current_columns, cols_ar):
                 self.tree.heading(col, text=fix_text(name))
                 self.tree.column(col, width=150, anchor="center")
+            self.show_rows(data)
             
-            for row in data:
-                d_row = list(row)
-                if d_row[0]: d_row[0] = fix_text(d_row[0])
-                if d_row[1]: d_row[1] = fix_text(d_row[1])
-                self.tree.insert("", "end", values=d_row)
-                self.current_data.append(d_row)
-            
-            total_revenue = sum(r[3] for r in data if r[3])
-            self.lbl_total.configure(text=fix_text(f"إجمالي المبيعات: {total_revenue:,.2f} ج.م | عدد المجموعات: {len(data)}"))
+            self.lbl_total.configure(text=fix_text(f"إجمالي المبيعات: {total_revenue:,.2f} ج.م | عدد المجموعات: {count}") + self.shown_note(count))
         
         # 14. CUSTOMER STATEMENT
         elif report_type == fix_text("كشف حساب عميل"):
             customer_name = self.cb_customer.get().strip()
             if not customer_name:
                 messagebox.showerror("Error", "Please select customer")
+                self.lbl_total.configure(text="")
                 return
             
             self.current_columns = ["Date", "Type", "Reference", "Debit", "Credit", "Balance"]
             cols_ar = ["التاريخ", "نوع العملية", "رقم المرجع", "مدين", "دائن", "الرصيد"]
             
-            cust_res = self.db.fetch_one("SELECT id FROM customers WHERE name LIKE ?", (f"%{customer_name}%",))
+            cust_res = yield ("one", "SELECT id FROM customers WHERE name LIKE ?", (f"%{customer_name}%",))
             if not cust_res:
                 messagebox.showerror("Error", f"Customer not found: {customer_name}")
+                self.lbl_total.configure(text="")
                 return
             
             cust_id = cust_res[0]
@@ -921,7 +962,7 @@ class ReportsPage(ctk.CTkFrame):
                               FROM invoices
                               WHERE customer_id = ? AND date BETWEEN ? AND ?
                               ORDER BY date, id"""
-            invoices = self.db.fetch_all(sql_invoices, (cust_id, d_from, d_to))
+            invoices = yield ("all", sql_invoices, (cust_id, d_from, d_to))
             
             sql_returns = """SELECT r.date, 'مرتجع', r.invoice_id, 0, r.refund_amount, NULL
                              FROM returns r
@@ -929,13 +970,13 @@ class ReportsPage(ctk.CTkFrame):
                              WHERE i.customer_id = ? AND r.date BETWEEN ? AND ?
                              GROUP BY r.id
                              ORDER BY r.date, r.id"""
-            returns = self.db.fetch_all(sql_returns, (cust_id, d_from, d_to))
+            returns = yield ("all", sql_returns, (cust_id, d_from, d_to))
             
             sql_receipts = """SELECT date, 'سند قبض', ('سند #' || id || ' - ' || COALESCE(description, '')), 0, amount, NULL
                               FROM vouchers
                               WHERE customer_id = ? AND voucher_type = 'Receipt' AND date BETWEEN ? AND ?
                               ORDER BY date, id"""
-            receipts = self.db.fetch_all(sql_receipts, (cust_id, d_from, d_to))
+            receipts = yield ("all", sql_receipts, (cust_id, d_from, d_to))
                          
             all_transactions = []
             for inv in invoices: all_transactions.append(list(inv))
@@ -967,12 +1008,36 @@ class ReportsPage(ctk.CTkFrame):
             total_credit = sum(t[4] for t in all_transactions)
             self.lbl_total.configure(text=fix_text(f"إجمالي المدين: {total_debit:,.2f} | إجمالي الدائن: {total_credit:,.2f} | الرصيد النهائي: {final_balance:,.2f} ج.م"))
 
+    def export_rows(self, query=None, db=None):
+        """All rows of the current report: re-streamed from the DB for flat reports, else current_data."""
+        query = query or self.current_query
+        if query is None:
+            yield from self.current_data
+            return
+        sql, params, display = query
+        for row in (db or self.db).fetch_iter(sql, params):
+            yield display(row) if display else list(row)
+
     def export_excel(self):
-        if not self.current_data: 
+        if not self.current_data and not self.current_query: 
             messagebox.showerror("Error", "No data to export")
             return
         path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel", "*.xlsx")])
-        if path:
+        if path and self.current_query:
+            # Streamed report: write row by row on the DB worker (write-only workbook, flat memory)
+            headers = [self.tree.heading(c)["text"] for c in self.current_columns]
+            query = self.current_query
+
+            def job(db):
+                wb = Workbook(write_only=True)
+                ws = wb.create_sheet()
+                ws.append(headers)
+                for row in self.export_rows(query, db):
+                    ws.append(row)
+                wb.save(path)
+            self.worker.call(self, job, lambda _: messagebox.showinfo("Success", "Excel file saved successfully"),
+                             on_error=lambda e: messagebox.showerror("Error", f"Export failed: {e}"))
+        elif path:
             try:
                 export_list = []
                 if self.current_report_type == fix_text("تقرير جرد تفصيلي (Grouping)"):
@@ -990,7 +1055,7 @@ class ReportsPage(ctk.CTkFrame):
                 messagebox.showerror("Error", f"Export failed: {e}")
 
     def export_pdf(self):
-        if not self.current_data: 
+        if not self.current_data and not self.current_query: 
             messagebox.showerror("Error", "No data to export")
             return
         
@@ -1001,91 +1066,102 @@ class ReportsPage(ctk.CTkFrame):
         path = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF", "*.pdf")])
         if not path: return
         
-        try:
-            # Register Font
-            font_path = "C:\\Windows\\Fonts\\arial.ttf" 
-            if not os.path.exists(font_path): font_path = "C:\\Windows\\Fonts\\tahoma.ttf"
-            
-            if os.path.exists(font_path):
-                pdfmetrics.registerFont(TTFont('ArabicFont', font_path))
-                font_name = 'ArabicFont'
-            else:
-                font_name = 'Helvetica'
-            
-            try:
-               doc = SimpleDocTemplate(path, pagesize=A4)
-            except NameError:
-               # In case imports failed but REPORTLAB_AVAILABLE is True (edge case)
-               from app.utils import SimpleDocTemplate, A4, Table, TableStyle, Paragraph, Spacer, colors, getSampleStyleSheet, ParagraphStyle
-               doc = SimpleDocTemplate(path, pagesize=A4)
+        # Everything Tk is read here; the PDF is laid out and written on the DB worker
+        font_name = pdf_font()  # registered once per session (app/pdf_resources.py)
+        title = self.current_report_type
+        total_text = self.lbl_total.cget("text")
+        grouping = self.current_report_type == fix_text("تقرير جرد تفصيلي (Grouping)")
+        headers = [self.tree.heading(c)["text"] for c in self.current_columns if c != "Level"]
+        query = self.current_query
+        data = list(self.current_data)
 
-            elements = []
-            styles = getSampleStyleSheet()
-            title_style = ParagraphStyle(name='ArabicTitle', parent=styles['Title'], fontName=font_name, fontSize=18, alignment=1)
-            elements.append(Paragraph(self.current_report_type, title_style))
-            elements.append(Spacer(1, 20))
-            
-            if self.current_report_type == fix_text("تقرير جرد تفصيلي (Grouping)"):
-                data_rows = [["Description / Item", "Quantity"]]
-                
-                table_styles = [
-                    ('FONTNAME', (0, 0), (-1, -1), font_name),
-                    ('ALIGN', (1, 0), (1, -1), 'CENTER'),
-                    ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-                    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ]
+        def job(db):
+            rows = self.export_rows(query, db) if query else data
+            flowables = self.pdf_flowables(title, headers, rows, font_name, total_text, grouping)
+            SimpleDocTemplate(path, pagesize=A4).build(FlowableFeed(flowables))
+        self.worker.call(self, job, lambda _: messagebox.showinfo("Success", "PDF saved successfully!"),
+                         on_error=lambda e: messagebox.showerror("Print Error", f"Make sure file is closed if open.\nError: {e}"))
+
+    def pdf_flowables(self, title, headers, rows, font_name, total_text, grouping=False):
+        """
+        Generator of the report PDF's flowables (runs on the worker, no Tk). Flat reports come as
+        Tables of PDF_CHUNK_ROWS rows, header repeated per page, all with the first chunk's column widths.
+        """
+        title_style = paragraph_style('ArabicTitle', parent='Title', fontName=font_name, fontSize=18, alignment=1)
+        yield Paragraph(title, title_style)
+        yield Spacer(1, 20)
+        
+        if grouping:
+            data_rows = [["Description / Item", "Quantity"]]
+            
+            table_styles = [
+                ('FONTNAME', (0, 0), (-1, -1), font_name),
+                ('ALIGN', (1, 0), (1, -1), 'CENTER'),
+                ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+                ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ]
+            
+            for idx, row in enumerate(rows):
+                desc, qty, level = row
+                row_idx = idx + 1
+                data_rows.append([desc, str(qty)])
                 
-                for idx, row in enumerate(self.current_data):
-                    desc, qty, level = row
-                    row_idx = idx + 1
-                    data_rows.append([desc, str(qty)])
-                    
-                    if level == 0:
-                        table_styles.append(('BACKGROUND', (0, row_idx), (-1, row_idx), colors.lightgrey))
-                        table_styles.append(('FONTSIZE', (0, row_idx), (-1, row_idx), 12))
-                        table_styles.append(('TEXTCOLOR', (0, row_idx), (-1, row_idx), colors.black))
-                        table_styles.append(('BottomPadding', (0, row_idx), (-1, row_idx), 6))
-                    elif level == 1:
-                        table_styles.append(('BACKGROUND', (0, row_idx), (-1, row_idx), colors.whitesmoke))
-                        table_styles.append(('TEXTCOLOR', (0, row_idx), (-1, row_idx), colors.darkblue))
-                        table_styles.append(('LEFTPADDING', (0, row_idx), (0, row_idx), 20))
-                    elif level == 2:
-                        table_styles.append(('TEXTCOLOR', (0, row_idx), (-1, row_idx), colors.black))
-                        table_styles.append(('LEFTPADDING', (0, row_idx), (0, row_idx), 40))
+                if level == 0:
+                    table_styles.append(('BACKGROUND', (0, row_idx), (-1, row_idx), colors.lightgrey))
+                    table_styles.append(('FONTSIZE', (0, row_idx), (-1, row_idx), 12))
+                    table_styles.append(('TEXTCOLOR', (0, row_idx), (-1, row_idx), colors.black))
+                    table_styles.append(('BottomPadding', (0, row_idx), (-1, row_idx), 6))
+                elif level == 1:
+                    table_styles.append(('BACKGROUND', (0, row_idx), (-1, row_idx), colors.whitesmoke))
+                    table_styles.append(('TEXTCOLOR', (0, row_idx), (-1, row_idx), colors.darkblue))
+                    table_styles.append(('LEFTPADDING', (0, row_idx), (0, row_idx), 20))
+                elif level == 2:
+                    table_styles.append(('TEXTCOLOR', (0, row_idx), (-1, row_idx), colors.black))
+                    table_styles.append(('LEFTPADDING', (0, row_idx), (0, row_idx), 40))
 
-                t = Table(data_rows, colWidths=[350, 100])
-                t.setStyle(TableStyle(table_styles))
-                elements.append(t)
+            t = Table(data_rows, colWidths=[350, 100])
+            t.setStyle(TableStyle(table_styles))
+            yield t
 
-            else:
-                headers = [self.tree.heading(c)["text"] for c in self.current_columns if c != "Level"]
-                data_rows = [headers]
-                for row in self.current_data:
-                    data_rows.append([str(c) for c in row])
-                
-                t = Table(data_rows, repeatRows=1)
-                t.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, -1), font_name),
-                    ('FONTSIZE', (0, 0), (-1, 0), 12),
-                    ('FONTSIZE', (0, 1), (-1, -1), 10),
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ]))
-                elements.append(t)
-            
-            if self.lbl_total.cget("text"):
-                elements.append(Spacer(1, 20))
-                elements.append(Paragraph(self.lbl_total.cget("text"), ParagraphStyle(name='Sum', fontName=font_name, alignment=1)))
-            
-            doc.build(elements)
-            messagebox.showinfo("Success", "PDF saved successfully!")
-            
-        except Exception as e:
-            messagebox.showerror("Print Error", f"Make sure file is closed if open.\nError: {e}")
+        else:
+            table_style = TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                ('FONTNAME', (0, 0), (-1, -1), font_name),
+                ('FONTSIZE', (0, 0), (-1, 0), 12),
+                ('FONTSIZE', (0, 1), (-1, -1), 10),
+                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+                ('GRID', (0, 0), (-1, -1), 1, colors.black),
+                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ])
+            widths = None
+            chunk = []
+            for row in rows:
+                chunk.append([str(c) for c in row])
+                if len(chunk) < PDF_CHUNK_ROWS: continue
+                widths = widths or self.pdf_col_widths(headers, chunk, font_name)
+                yield self.pdf_table(headers, chunk, widths, table_style)
+                chunk = []
+            if chunk or widths is None:
+                yield self.pdf_table(headers, chunk, widths or self.pdf_col_widths(headers, chunk, font_name), table_style)
+        
+        if total_text:
+            yield Spacer(1, 20)
+            yield Paragraph(total_text, paragraph_style('Sum', fontName=font_name, alignment=1))
+
+    def pdf_table(self, headers, chunk, widths, table_style):
+        t = Table([headers] + chunk, colWidths=widths, repeatRows=1)
+        t.setStyle(table_style)
+        return t
+
+    def pdf_col_widths(self, headers, chunk, font_name):
+        """Column widths fitting the header and the first chunk (12pt header, 10pt rows, 6pt padding each side)."""
+        widths = [pdfmetrics.stringWidth(str(h), font_name, 12) for h in headers]
+        for row in chunk:
+            for i, cell in enumerate(row[:len(widths)]):
+                widths[i] = max(widths[i], pdfmetrics.stringWidth(cell, font_name, 10))
+        return [w + 12 for w in widths]
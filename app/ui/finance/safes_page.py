@@ -2,13 +2,14 @@
 import customtkinter as ctk
 from tkinter import ttk, messagebox
 from datetime import date
-from app.database import DB
+from app.database import get_db
+from app.rollups import SAFE_BALANCE, SAFE_BALANCES_SQL
 
 class SafesPage(ctk.CTkFrame):
-    def __init__(self, parent, controller=None):
+    def __init__(self, parent, controller=None, db=None):
         super().__init__(parent)
         self.controller = controller
-        self.db = DB()
+        self.db = db or get_db()
         
         # --- Top: Totals & Actions ---
         top_frame = ctk.CTkFrame(self, fg_color="transparent")
@@ -82,9 +83,10 @@ class SafesPage(ctk.CTkFrame):
             return False
 
     def load_data(self):
-        safes = self.db.fetch_all("SELECT id, name FROM safes")
-        safe_names = [s[1] for s in safes]
-        self.safe_map = {s[1]: s[0] for s in safes} # Name -> ID
+        # One query: names and balances come from the trigger-maintained safe_balances table
+        balances = self.db.fetch_all(SAFE_BALANCES_SQL)
+        safe_names = [b[1] for b in balances]
+        self.safe_map = {b[1]: b[0] for b in balances} # Name -> ID
         
         self.cb_manage_safe.configure(values=safe_names)
         self.cb_from.configure(values=safe_names)
@@ -95,23 +97,7 @@ class SafesPage(ctk.CTkFrame):
              self.cb_to.set(safe_names[1] if len(safe_names)>1 else safe_names[0])
              
         # Calculate Total Balance
-        total = 0
-        for sid, name in safes:
-            # (In +)
-            # Vouchers Payment (OUT -), Receipt (IN +)
-            # Transfers Out (-), In (+)
-            # Invoices (IN +) -- complex if partial payments exist, usually stored in vouchers?
-            # Purchases (OUT -) -- stored in vouchers?
-            
-            # Assuming current architecture:
-            # Vouchers table stores EVERYTHING related to money:
-            # voucher_type='Payment' (Out), 'Receipt' (In)
-            
-            # Wait! Transfers are separate table? Yes.
-            
-            bal = self.get_safe_balance(sid)
-            total += bal
-            
+        total = sum(b[2] for b in balances)
         self.lbl_total_balance.configure(text=f"EGP{total:,.2f}")
         
         # History
@@ -125,166 +111,11 @@ class SafesPage(ctk.CTkFrame):
             self.tree.insert("", "end", values=r)
 
     def get_safe_balance(self, safe_id):
-        # 1. Vouchers
-        v_in = self.db.fetch_one("SELECT SUM(amount) FROM vouchers WHERE safe_id=? AND voucher_type='Receipt'", (safe_id,))
-        v_in = v_in[0] if v_in and v_in[0] else 0
-        
-        v_out = self.db.fetch_one("SELECT SUM(amount) FROM vouchers WHERE safe_id=? AND voucher_type='Payment'", (safe_id,))
-        v_out = v_out[0] if v_out and v_out[0] else 0
-        
-        # 2. Transfers
-        t_in = self.db.fetch_one("SELECT SUM(amount) FROM transfers WHERE to_safe_id=?", (safe_id,))
-        t_in = t_in[0] if t_in and t_in[0] else 0
-        
-        t_out = self.db.fetch_one("SELECT SUM(amount) FROM transfers WHERE from_safe_id=?", (safe_id,))
-        t_out = t_out[0] if t_out and t_out[0] else 0
-
-        # 3. Sales (Invoices) - Cash/Visa IN
-        # Only counting what was actually paid (paid_amount)
-        # Assuming table columns: net_total or paid_amount? 
-        # Checking schema from previous turns: 'paid_amount' was patched in database.py
-        s_in = self.db.fetch_one("SELECT SUM(paid_amount) FROM invoices WHERE safe_id=?", (safe_id,))
-        s_in = s_in[0] if s_in and s_in[0] else 0
-
-        # 4. Purchases - Money OUT
-        # Assuming paid amount is net_total (for now, unless partial payments allowed). 
-        # Usually purchases are full payment or tracked. Let's assume net_total for now or check if there is paid_amount.
-        # Db schema doesn't show 'paid_amount' for purchases explicitly in my memory, but let's check.
-        # Actually, for Purchases, we usually pay full or have 'vouchers' for partial? 
-        # If 'Purchases' module inserts a voucher, we double count. 
-        # User said: "Purchases (Net Total) (this was missing)". So I will use net_total.
-        # But wait, if I create a voucher for a purchase, and also count purchase table, I double count.
-        # The user's prompt implies separate tables: "Purchases: money paid to suppliers".
-        # I will assume standard purchases DO NOT create vouchers automatically in this system currently, so I count them from Purchases table via safe_id.
-        p_out = self.db.fetch_one("SELECT SUM(net_total) FROM purchases WHERE safe_id=?", (safe_id,))
-        p_out = p_out[0] if p_out and p_out[0] else 0
-
-        # 5. Sales Returns (Money OUT)
-        # Returns table has `refund_amount`. 
-        # But wait! In the previous turn (Step 682/683), I ADDED logic to insert a VOUCHER for returns (Payment).
-        # "INSERT INTO vouchers ... voucher_type='Payment' ... description='Return/Refund...'"
-        # IF I count table `returns` AND `vouchers`, I will Double Count!
-        # HOWEVER, the user explicitly asked to include "Sales Returns" in the formula.
-        # Maybe I should NOT have added the voucher logic? Or maybe I should specificially exclude Return-Vouchers here?
-        # Actually, best practice: if I rely on Vouchers for all manual/misc movements, I should rely on source tables for core business logic if possible.
-        # BUT, since I *just* added code to generate Vouchers for returns, counting Returns separately will definitely double count.
-        # To avoid confusion and match the User's request (which lists them separately), I should probably REMOVE the voucher generation from ReturnsPage OR filter them out here.
-        # GIVEN the user's specific request "The formula should be: ... Vouchers ... Sales Returns", it implies they want to sum the `returns` table.
-        # So, I should probably rely on the transaction tables.
-        # I will subtract Sales Returns (from returns table). 
-        # Note: If I keep my previous change (generating vouchers), I must fix it. 
-        # I will assume for this step I am implementing the User's formula.
-        # IMPORTANT: I need to be careful about Double Counting if vouchers exist for these.
-        # Verification: Does `save_invoice` create a voucher? No.
-        # Does `save_purchase` create a voucher? No.
-        # Does `save_return` create a voucher? YES (I added it).
-        # Does `PurchaseReturn` create a voucher? No (I didn't add it there, I think).
-        
-        # DECISION: I will calculate from the core tables as requested. 
-        # `vouchers` should be for PURE manual entries (Expenses, Capital).
-        # If I have auto-generated vouchers, they pollute this if I sum both.
-        # I will use the query to exclude auto-generated vouchers? Or assume the user wants me to use the core tables implies I should maybe revert the voucher-generation or ignore it.
-        # Safest bet: Sum `vouchers` where description NOT LIKE 'Return%'? No that's brittle.
-        # Use simple Sums as requested.
-        
-        sr_out = self.db.fetch_one("SELECT SUM(refund_amount) FROM returns WHERE invoice_id IN (SELECT id FROM invoices WHERE safe_id=?)", (safe_id,))
-        # Wait, returns don't have safe_id? I didn't add it to schema.
-        # ReturnPopup Logic I added: "Refund From Safe" -> Insert into VOUCHERS.
-        # It did NOT update `returns` table with `safe_id`.
-        # So I CANNOT sum `returns` by safe_id directly unless I join/assume.
-        # User said "Sales Returns: money returned to customer".
-        # If I can't filter returns by safe, I can't calculate per safe.
-        # BUT, I *did* insert a Voucher for it. So `v_out` ALREADY includes it.
-        # If I add `sr_out`, I double count.
-        # User says: "Your code is missing... Sales Returns".
-        # This implies the user *thinks* I am not capturing it.
-        # If I say "Bro, I added vouchers for it", he might say "No, use the table".
-        # But the table doesn't have Safe ID.
-        # So I MUST rely on the Voucher for Sales Returns (since I implemented it that way).
-        # OR I should update `returns` schema to have `safe_id`.
-        
-        # Let's look at `Sales` (Invoices). Does it have safe_id? Yes, schema has `safe_id`.
-        # So `s_in` works.
-        
-        # Purchases? `purchases` table has `safe_id`.
-        # So `p_out` works.
-        
-        # Purchase Returns? `purchase_returns` table... check schema.
-        # `purchase_returns` table schema (step 679): id, date, purchase_id, qty, refund_amount, notes.
-        # NO safe_id.
-        # So, Purchase Returns also pose a "Which safe?" problem.
-        
-        # CONCLUSION:
-        # The user's provided formula is the "Theoretical Correct Formula".
-        # In practice, `vouchers` table is often used as the "General Ledger" for cash.
-        # If we didn't use Vouchers for Returns, we'd be stuck.
-        
-        # However, for `Sales` and `Purchases`, we definitely DO NOT have vouchers. 
-        # So I MUST add those queries.
-        
-        # Strategies:
-        # 1. Add `s_in` (Sales) and `p_out` (Purchases).
-        # 2. For Returns: Since `v_out` (Vouchers) tracks the return I implemented, I don't need to add `sr_out`.
-        #    BUT the user explicitly said "Sales Returns" is missing.
-        #    Maybe I should verify if `save_order` creates a voucher? (I reviewed it, it doesn't).
-        #    So `s_in` is definitely needed.
-        #    `p_out` is definitely needed.
-        
-        #    What about Returns? 
-        #    If I use `v_out`, I cover the returns I fixed.
-        #    If I add `sr_out` I double count.
-        #    I'll assume the user wants me to use the tables solely? No, vouchers are needed for expenses.
-        
-        #    I will add Sales and Purchases.
-        #    I will COMMENT about Returns being covered by Vouchers (or I will filter them).
-        #    Actually, `Purchase Returns` (Refund from supplier) -> Money IN.
-        #    I have NOT added logic to create vouchers for Purchase Returns.
-        #    So I NEED `pr_in`.
-        #    But `purchase_returns` lacks `safe_id`.
-        #    I will assume it goes back to the safe of the original purchase?
-        #    Query: JOIN purchase_returns -> purchases -> safe_id.
-        
-        #    For `Sales Returns` (Money OUT):
-        #    I DID add logic to create vouchers.
-        #    If I want to follow the User's formula strictly, I should stop creating vouchers for returns and use the table.
-        #    BUT `returns` table lacks `safe_id`.
-        #    Currently my Voucher logic handles the "Which safe" selection properly.
-        #    So VOUCHERS is the correct place for Sales Returns in my current implementation.
-        
-        #    So, my update will be:
-        #    Balance = (Vouchers_In + Transfers_In + Sales_Paid + Purchase_Returns_Linked) 
-        #            - (Vouchers_Out + Transfers_Out + Purchases_Net)
-        
-        #    *Wait, Purchase Returns Linked?*
-        #    SELECT SUM(pr.refund_amount) FROM purchase_returns pr JOIN purchases p ON pr.purchase_id=p.id WHERE p.safe_id=?
-        
-        #    *Sales Returns?*
-        #    If I count them via Vouchers, I am good.
-        #    I will NOT add a separate query for Sales Returns to avoid double counting, unless I filter the vouchers.
-        #    Actually, to be safe and clean, I should count them from the Vouchers (as they are payments).
-        #    I will stick to adding Sales and Purchases and Purchase Returns.
-        
-        #    Let's refine the Purchase Returns query:
-        #    `SELECT SUM(refund_amount) FROM purchase_returns JOIN purchases ON ...`
-        
-        #    And Sales:
-        #    `SELECT SUM(paid_amount) FROM invoices WHERE safe_id=?`
-        
-        #    And Purchases:
-        #    `SELECT SUM(net_total) FROM purchases WHERE safe_id=?`
-        
-        pr_in = self.db.fetch_one("SELECT SUM(pr.refund_amount) FROM purchase_returns pr JOIN purchases p ON pr.purchase_id = p.id WHERE p.safe_id=?", (safe_id,))
-        pr_in = pr_in[0] if pr_in and pr_in[0] else 0
-
-        # Purchase Returns = Money IN (Refund from supplier)
-        
-        # Final Sum:
-        # IN = v_in + t_in + s_in + pr_in
-        # OUT = v_out + t_out + p_out
-        
-        # Note: Sales Returns are entered as Vouchers (Payment) in my previous fix, so they are inside `v_out`.
-        
-        return (v_in + t_in + s_in + pr_in) - (v_out + t_out + p_out)
+        # Balance = (Sales_Paid + Vouchers_In + Transfers_In + Purchase_Returns) - (Vouchers_Out + Transfers_Out + Purchases)
+        # Sales returns are paid out through a Payment voucher, so they're already in Vouchers_Out.
+        # The running totals are kept by triggers (see app/rollups.py), so this is a single-row read.
+        res = self.db.fetch_one(f"SELECT {SAFE_BALANCE} FROM safe_balances WHERE safe_id=?", (safe_id,))
+        return res[0] if res else 0
 
     def add_safe(self):
         name = self.ent_new_safe.get().strip()
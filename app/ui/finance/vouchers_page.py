@@ -2,13 +2,13 @@
 import customtkinter as ctk
 from tkinter import ttk, messagebox
 from datetime import date
-from app.database import DB
+from app.database import get_db
 
 class VouchersPage(ctk.CTkFrame):
-    def __init__(self, parent, controller=None):
+    def __init__(self, parent, controller=None, db=None):
         super().__init__(parent)
         self.controller = controller
-        self.db = DB()
+        self.db = db or get_db()
         
         # --- Header ---
         header = ctk.CTkFrame(self, height=50)
@@ -87,12 +87,11 @@ class VouchersPage(ctk.CTkFrame):
         v_type = self.var_type.get()
         if v_type == "Receipt":
             self.lbl_party.configure(text="العميل (اختياري):")
-            data = self.db.fetch_all("SELECT name FROM customers ORDER BY name")
+            vals = self.db.dim_names("customers")
         else:
             self.lbl_party.configure(text="المورد (اختياري):")
-            data = self.db.fetch_all("SELECT name FROM suppliers ORDER BY name")
+            vals = self.db.dim_names("suppliers")
         
-        vals = [d[0] for d in data]
         vals.insert(0, "") # Option for no party
         self.cb_party.configure(values=vals)
         self.cb_party.set("")
@@ -126,9 +125,8 @@ class VouchersPage(ctk.CTkFrame):
         if not desc: return messagebox.showerror("Error", "Enter description or reason")
         
         safe_name = self.cb_safe.get()
-        safe_res = self.db.fetch_one("SELECT id FROM safes WHERE name=?", (safe_name,))
-        if not safe_res: return messagebox.showerror("Error", "Select safe")
-        safe_id = safe_res[0]
+        safe_id = self.db.dim_id("safes", safe_name)
+        if not safe_id: return messagebox.showerror("Error", "Select safe")
         
         v_type = self.var_type.get()
         party_name = self.cb_party.get()
@@ -137,11 +135,9 @@ class VouchersPage(ctk.CTkFrame):
         
         if party_name:
             if v_type == "Receipt":
-                res = self.db.fetch_one("SELECT id FROM customers WHERE name=?", (party_name,))
-                if res: cust_id = res[0]
+                cust_id = self.db.dim_id("customers", party_name)
             else:
-                 res = self.db.fetch_one("SELECT id FROM suppliers WHERE name=?", (party_name,))
-                 if res: supp_id = res[0]
+                 supp_id = self.db.dim_id("suppliers", party_name)
         
         self.db.execute("INSERT INTO vouchers (date, voucher_type, safe_id, amount, description, customer_id, supplier_id) VALUES (?,?,?,?,?,?,?)",
                        (date.today(), v_type, safe_id, amount, desc, cust_id, supp_id))
@@ -3,13 +3,13 @@ import customtkinter as ctk
 from tkinter import filedialog, messagebox
 import pandas as pd
 from datetime import date
-from app.database import DB
+from app.database import get_db
 from app.utils import fix_text
 
 class ImportDataPage(ctk.CTkFrame):
-    def __init__(self, parent, controller=None):
+    def __init__(self, parent, controller=None, db=None):
         super().__init__(parent)
-        self.db = DB()
+        self.db = db or get_db()
         self.controller = controller
         
         # Fonts
@@ -181,6 +181,11 @@ class ImportDataPage(ctk.CTkFrame):
         errors = []
         success_inv = 0
         total_items = 0
+
+        # Resolve every store / barcode in the file up front (chunked IN) instead of one query per row
+        store_map = self.db.dim_map("stores")
+        barcodes = {str(bc).strip().upper() for bc in df["Barcode"].dropna()} if "Barcode" in df.columns else set()
+        bc_map = dict(self.db.fetch_all_in("SELECT barcode, id FROM item_details WHERE barcode IN ({in})", barcodes))
         
         for ref, group in grouped:
             ref_str = str(ref)
@@ -194,20 +199,19 @@ class ImportDataPage(ctk.CTkFrame):
             first = group.iloc[0]
             store = str(first.get("Store", "")).strip()
             
-            store_res = self.db.fetch_one("SELECT id FROM stores WHERE name=?", (store,))
-            if not store_res:
+            store_id = store_map.get(store)
+            if not store_id:
                 valid_invoice = False; invoice_error = f"Store '{store}' not found"
             else:
-                store_id = store_res[0]
                 for _, row in group.iterrows():
                     bc = str(row.get("Barcode", "")).strip().upper()
-                    item_res = self.db.fetch_one("SELECT id FROM item_details WHERE barcode=?", (bc,))
-                    if not item_res:
+                    did = bc_map.get(bc)
+                    if not did:
                         valid_invoice = False; invoice_error = f"Barcode '{bc}' not found"
                         break
                     try: q = float(row.get("Qty", 0)); p = float(row.get("Price", 0))
                     except: valid_invoice = False; invoice_error = "Invalid Qty/Price"; break
-                    valid_items.append({"did": item_res[0], "qty": q, "p": p, "bc": bc})
+                    valid_items.append({"did": did, "qty": q, "p": p, "bc": bc})
 
             if not valid_invoice:
                 self.log(f"XX Ref {ref}: Rejected ({invoice_error})")
@@ -216,9 +220,6 @@ class ImportDataPage(ctk.CTkFrame):
                     errors.append(err_row)
             else:
                 cust_name = str(first.get("Customer", "General")).strip()
-                cust_id = self.db.fetch_one("SELECT id FROM customers WHERE name=?", (cust_name,))
-                if not cust_id: cust_id = self.db.execute("INSERT INTO customers (name) VALUES (?)", (cust_name,))
-                else: cust_id = cust_id[0]
                 
                 d_val = first.get("Date", date.today())
                 try: d_str = pd.to_datetime(d_val, dayfirst=True).date()
@@ -229,16 +230,20 @@ class ImportDataPage(ctk.CTkFrame):
                 pay_method = str(first.get("Payment_Method", "Cash")).strip()
                 total = sum(x["qty"]*x["p"] for x in valid_items)
                 
-                inv_id = self.db.execute("""INSERT INTO invoices (date, customer_id, net_total, paid_amount, remaining_amount, store_id, safe_id, payment_method, channel, delegate_name, notes) 
-                                            VALUES (?,?,?,?,0,?,1,?,?,?,?)""", 
-                                       (str(d_str), cust_id, total, total, store_id, pay_method, channel, delegate, f"Ref: {ref_str}"))
-                
-                for item in valid_items:
-                    self.db.execute("INSERT INTO invoice_details (invoice_id, item_detail_id, qty, price, total) VALUES (?,?,?,?,?)", 
-                                   (inv_id, item["did"], item["qty"], item["p"], item["qty"]*item["p"]))
-                    has_stock = self.db.fetch_one("SELECT 1 FROM store_stock WHERE item_detail_id=? AND store_id=?", (item["did"], store_id))
-                    if has_stock: self.db.execute("UPDATE store_stock SET quantity=quantity-? WHERE item_detail_id=? AND store_id=?", (item["qty"], item["did"], store_id))
-                    else: self.db.execute("INSERT INTO store_stock (item_detail_id, store_id, quantity) VALUES (?,?,?)", (item["did"], store_id, -item["qty"]))
+                # One transaction per invoice: header, batched details and stock land together
+                with self.db.transaction() as tx:
+                    cust_id = tx.fetch_one("SELECT id FROM customers WHERE name=?", (cust_name,))
+                    if not cust_id: cust_id = tx.execute("INSERT INTO customers (name) VALUES (?)", (cust_name,))
+                    else: cust_id = cust_id[0]
+
+                    inv_id = tx.execute("""INSERT INTO invoices (date, customer_id, net_total, paid_amount, remaining_amount, store_id, safe_id, payment_method, channel, delegate_name, notes) 
+                                           VALUES (?,?,?,?,0,?,1,?,?,?,?)""", 
+                                        (str(d_str), cust_id, total, total, store_id, pay_method, channel, delegate, f"Ref: {ref_str}"))
+                    
+                    tx.insert_many("invoice_details",
+                                   [(inv_id, x["did"], x["qty"], x["p"], x["qty"]*x["p"]) for x in valid_items],
+                                   ("invoice_id", "item_detail_id", "qty", "price", "total"))
+                    tx.move_stock_many((x["did"], store_id, -x["qty"]) for x in valid_items)
                 
                 success_inv += 1; total_items += len(valid_items)
                 self.log(f"OK Ref {ref}: Imported ({len(valid_items)} items)")
@@ -249,7 +254,8 @@ class ImportDataPage(ctk.CTkFrame):
         self.txt_log.delete("1.0", "end")
         self.log("Mode: Vouchers (Receipts/Payments)")
         errors = []
-        count = 0
+        rows = []
+        safe_map = self.db.dim_map("safes")
         
         for idx, row in df.iterrows():
             try:
@@ -262,9 +268,8 @@ class ImportDataPage(ctk.CTkFrame):
 
                 # Safe Validation
                 safe_name = str(row.get("Safe", "")).strip()
-                safe_res = self.db.fetch_one("SELECT id FROM safes WHERE name=?", (safe_name,))
-                if not safe_res: raise ValueError(f"Safe '{safe_name}' not found")
-                safe_id = safe_res[0]
+                safe_id = safe_map.get(safe_name)
+                if not safe_id: raise ValueError(f"Safe '{safe_name}' not found")
 
                 # Date
                 d_val = row.get("Date", date.today())
@@ -275,9 +280,7 @@ class ImportDataPage(ctk.CTkFrame):
                 amount = float(row.get("Amount", 0))
                 desc = str(row.get("Description", "Imported"))
 
-                self.db.execute("INSERT INTO vouchers (date, voucher_type, safe_id, amount, description) VALUES (?,?,?,?,?)",
-                               (str(d_str), db_type, safe_id, amount, desc))
-                count += 1
+                rows.append((str(d_str), db_type, safe_id, amount, desc))
                 self.log(f"Row {idx+2}: Imported {db_type} - {amount}")
 
             except Exception as e:
@@ -285,6 +288,12 @@ class ImportDataPage(ctk.CTkFrame):
                 err_row = row.to_dict(); err_row["Error_Reason"] = str(e)
                 errors.append(err_row)
 
+        # Valid rows go in as one batch (one transaction)
+        count = 0
+        try:
+            count = len(self.db.insert_many("vouchers", rows, ("date", "voucher_type", "safe_id", "amount", "description")))
+        except Exception as e:
+            self.log(f"Insert failed ({e}), no vouchers were saved")
         self.finish_process(errors, f"Imported: {count} Vouchers")
 
     def process_transfers(self, df):
@@ -292,6 +301,9 @@ class ImportDataPage(ctk.CTkFrame):
         self.log("Mode: Stock Transfers (Between Stores)")
         errors = []
         count = 0
+        store_map = self.db.dim_map("stores")
+        barcodes = {str(bc).strip().upper() for bc in df["Barcode"].dropna()} if "Barcode" in df.columns else set()
+        bc_map = dict(self.db.fetch_all_in("SELECT barcode, id FROM item_details WHERE barcode IN ({in})", barcodes))
 
         for idx, row in df.iterrows():
             try:
@@ -299,40 +311,32 @@ class ImportDataPage(ctk.CTkFrame):
                 from_s = str(row.get("From_Store", "")).strip()
                 to_s = str(row.get("To_Store", "")).strip()
                 
-                s1 = self.db.fetch_one("SELECT id FROM stores WHERE name=?", (from_s,))
-                s2 = self.db.fetch_one("SELECT id FROM stores WHERE name=?", (to_s,))
+                s1 = store_map.get(from_s)
+                s2 = store_map.get(to_s)
                 
                 if not s1: raise ValueError(f"From_Store '{from_s}' not found")
                 if not s2: raise ValueError(f"To_Store '{to_s}' not found")
-                if s1[0] == s2[0]: raise ValueError("Source and Destination stores are the same")
+                if s1 == s2: raise ValueError("Source and Destination stores are the same")
 
                 # Validate Item
                 bc = str(row.get("Barcode", "")).strip().upper()
-                item_res = self.db.fetch_one("SELECT id FROM item_details WHERE barcode=?", (bc,))
-                if not item_res: raise ValueError(f"Barcode '{bc}' not found")
-                did = item_res[0]
+                did = bc_map.get(bc)
+                if not did: raise ValueError(f"Barcode '{bc}' not found")
 
                 # Qty
                 qty = float(row.get("Qty", 0))
                 if qty <= 0: raise ValueError("Qty must be positive")
 
                 # Check Stock in Source
-                stock_res = self.db.fetch_one("SELECT quantity FROM store_stock WHERE item_detail_id=? AND store_id=?", (did, s1[0]))
+                stock_res = self.db.fetch_one("SELECT quantity FROM store_stock WHERE item_detail_id=? AND store_id=?", (did, s1))
                 current_stock = stock_res[0] if stock_res else 0
                 
                 if current_stock < qty:
                     raise ValueError(f"Insufficient stock in '{from_s}'. Has {current_stock}, Requested {qty}")
 
                 # EXECUTE TRANSFER
-                # 1. Deduct from Source
-                self.db.execute("UPDATE store_stock SET quantity=quantity-? WHERE item_detail_id=? AND store_id=?", (qty, did, s1[0]))
-                
-                # 2. Add to Destination
-                has_dest = self.db.fetch_one("SELECT 1 FROM store_stock WHERE item_detail_id=? AND store_id=?", (did, s2[0]))
-                if has_dest:
-                    self.db.execute("UPDATE store_stock SET quantity=quantity+? WHERE item_detail_id=? AND store_id=?", (qty, did, s2[0]))
-                else:
-                    self.db.execute("INSERT INTO store_stock (item_detail_id, store_id, quantity) VALUES (?,?,?)", (did, s2[0], qty))
+                # Deduct from Source, add to Destination (one commit)
+                self.db.move_stock_many([(did, s1, -qty), (did, s2, qty)])
 
                 count += 1
                 self.log(f"Row {idx+2}: Transferred {qty} of {bc}")
@@ -3,13 +3,14 @@ import customtkinter as ctk
 from tkinter import ttk, messagebox, filedialog
 import os
 
-from app.database import DB
+from app.database import get_db
+from app.search import SEARCH_FILTER, search_match
 from app.utils import fix_text, REPORTLAB_AVAILABLE, BARCODE_AVAILABLE
+from app.pdf_resources import pdf_font, paragraph_style
 
 if REPORTLAB_AVAILABLE:
     from app.utils import (
-        SimpleDocTemplate, A4, Table, TableStyle, Paragraph, Spacer, 
-        colors, getSampleStyleSheet, ParagraphStyle, pdfmetrics, TTFont
+        SimpleDocTemplate, A4, Table, TableStyle, Paragraph, Spacer, colors
     )
     from reportlab.platypus import Image as RLImage
 
@@ -17,11 +18,11 @@ if BARCODE_AVAILABLE:
     from app.utils import barcode, ImageWriter
 
 class StockPage(ctk.CTkFrame):
-    def __init__(self, parent, user_role="Admin", controller=None):
+    def __init__(self, parent, user_role="Admin", controller=None, db=None):
         super().__init__(parent)
         self.user_role = user_role
         self.controller = controller
-        self.db = DB()
+        self.db = db or get_db()
         
         # Fonts
         self.AR_FONT = ("Segoe UI", 12, "bold")
@@ -41,7 +42,7 @@ class StockPage(ctk.CTkFrame):
         
         # Search
         ctk.CTkButton(ctrl_frame, text=fix_text("بحث"), command=self.load, font=self.AR_FONT, width=60).pack(side="right", padx=5)
-        self.ent_search = ctk.CTkEntry(ctrl_frame, placeholder_text=fix_text("بحث بالاسم أو الباركود..."), width=200, font=self.AR_FONT_NORM, justify="right")
+        self.ent_search = ctk.CTkEntry(ctrl_frame, placeholder_text=fix_text("بحث بالاسم أو اللون أو الباركود..."), width=200, font=self.AR_FONT_NORM, justify="right")
         self.ent_search.pack(side="right", padx=5)
         self.ent_search.bind("<KeyRelease>", lambda e: self.load())
         
@@ -111,22 +112,27 @@ class StockPage(ctk.CTkFrame):
         sql = """
             SELECT d.id, d.barcode, i.name, 
                    IFNULL(c.name, '-'), IFNULL(s.name, '-'), 
-                   IFNULL(SUM(ss.quantity), 0), d.buy_price, d.sell_price 
+                   IFNULL(d.stock_qty, 0), d.buy_price, d.sell_price 
             FROM item_details d 
             JOIN items i ON d.item_id=i.id 
             LEFT JOIN colors c ON d.color_id=c.id 
             LEFT JOIN sizes s ON d.size_id=s.id 
-            LEFT JOIN store_stock ss ON ss.item_detail_id=d.id 
-            WHERE (i.name LIKE ? OR d.barcode LIKE ?)
+            WHERE 1=1
         """
+        params = []
+        
+        # Name / color / size / code / barcode prefix search through the item_search index
+        match = search_match(search)
+        if match:
+            sql += f" AND {SEARCH_FILTER}"
+            params.append(match)
         
         if filter_mode == "Products": sql += " AND d.barcode NOT LIKE 'HD%'"
         elif filter_mode == "Designs": sql += " AND d.barcode LIKE 'HD%'"
             
-        sql += " GROUP BY d.id ORDER BY d.id DESC"
+        sql += " ORDER BY d.id DESC"
         
-        param = f"%{search}%"
-        for r in self.db.fetch_all(sql, (param, param)):
+        for r in self.db.fetch_all(sql, params):
             row_data = list(r)
             row_data[2] = fix_text(row_data[2]) # Name
             row_data[3] = fix_text(row_data[3]) # Color
@@ -142,8 +148,8 @@ class StockPage(ctk.CTkFrame):
         if not ids: return
         if not messagebox.askyesno(fix_text("تأكيد"), fix_text(f"هل أنت متأكد من تحديث سعر {len(ids)} صنف؟")): return
         
-        placeholders = ','.join('?' * len(ids))
-        self.db.execute(f"UPDATE item_details SET sell_price = ? WHERE id IN ({placeholders})", [p] + ids)
+        # Chunked so large catalogs don't exceed SQLite's bound-variable limit
+        self.db.execute_in("UPDATE item_details SET sell_price = ? WHERE id IN ({in})", ids, (p,))
         messagebox.showinfo("Success", "Prices updated"); self.load()
         if hasattr(self.controller, 'refresh_views'): self.controller.refresh_views()
     
@@ -199,18 +205,12 @@ class StockPage(ctk.CTkFrame):
             barcode_instance.save(f"temp_barcode_{barcode_val}", options={'format': 'PNG', 'module_width': 0.5, 'module_height': 10})
             os.rename(f"temp_barcode_{barcode_val}.png", temp_barcode_path)
             
-            font_path = "C:\\Windows\\Fonts\\arial.ttf"
-            if not os.path.exists(font_path): font_path = "C:\\Windows\\Fonts\\tahoma.ttf"
-            if os.path.exists(font_path):
-                pdfmetrics.registerFont(TTFont('ArabicFont', font_path))
-                font_name = 'ArabicFont'
-            else: font_name = 'Helvetica'
+            font_name = pdf_font()  # registered once per session (app/pdf_resources.py)
             
             doc = SimpleDocTemplate(path, pagesize=A4)
             elements = []
-            styles = getSampleStyleSheet()
-            title_style = ParagraphStyle(name='ArabicTitle', parent=styles['Title'], fontName=font_name, fontSize=16, alignment=1)
-            normal_style = ParagraphStyle(name='ArabicNormal', parent=styles['Normal'], fontName=font_name, fontSize=12, alignment=1)
+            title_style = paragraph_style('ArabicTitle', parent='Title', fontName=font_name, fontSize=16, alignment=1)
+            normal_style = paragraph_style('ArabicNormal', parent='Normal', fontName=font_name, fontSize=12, alignment=1)
             
             from reportlab.lib.units import mm
             label_width = 90 * mm
@@ -317,14 +317,10 @@ class StockPage(ctk.CTkFrame):
                 i_id = res[0] if res else self.db.execute("INSERT INTO items (name) VALUES (?)", (name,))
                 
                 color = e_color.get().strip(); c_id = None
-                if color:
-                    res = self.db.fetch_one("SELECT id FROM colors WHERE name=?", (color,))
-                    c_id = res[0] if res else self.db.execute("INSERT INTO colors (name) VALUES (?)", (color,))
+                if color: c_id = self.db.dim_get_or_create("colors", color)
                 
                 size = e_size.get().strip(); s_id = None
-                if size:
-                    res = self.db.fetch_one("SELECT id FROM sizes WHERE name=?", (size,))
-                    s_id = res[0] if res else self.db.execute("INSERT INTO sizes (name) VALUES (?)", (size,))
+                if size: s_id = self.db.dim_get_or_create("sizes", size)
                 
                 cost = float(e_cost.get() or 0); price = float(e_price.get() or 0)
                 
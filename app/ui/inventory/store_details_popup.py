@@ -1,14 +1,14 @@
 
 import customtkinter as ctk
 from tkinter import ttk
-from app.database import DB
+from app.database import get_db
 
 class StoreDetailsPopup(ctk.CTkToplevel):
     def __init__(self, parent, store_id, store_name):
         super().__init__(parent)
         self.title(f"Stock Details: {store_name}")
         self.geometry("900x600")
-        self.db = DB()
+        self.db = get_db()
         self.grab_set() 
         header = ctk.CTkFrame(self, height=50, fg_color="gray20")
         header.pack(fill="x", padx=10, pady=10)
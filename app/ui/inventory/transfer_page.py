@@ -1,13 +1,14 @@
 
 import customtkinter as ctk
 from tkinter import messagebox
-from app.database import DB
+from app.database import get_db
+from app.search import SEARCH_FILTER, search_match
 
 class TransferPage(ctk.CTkFrame):
-    def __init__(self, parent, controller=None):
+    def __init__(self, parent, controller=None, db=None):
         super().__init__(parent)
         self.controller = controller
-        self.db = DB()
+        self.db = db or get_db()
         self.detail_id = None
         # Header
         header = ctk.CTkFrame(self, height=60, fg_color="transparent")
@@ -74,8 +75,13 @@ class TransferPage(ctk.CTkFrame):
     def lookup(self, e):
         code = self.ent_code.get().strip()
         store = self.cb_from.get()
-        sql = """SELECT d.id, i.name, c.name, s.name, ss.quantity FROM item_details d JOIN items i ON d.item_id=i.id LEFT JOIN colors c ON d.color_id=c.id LEFT JOIN sizes s ON d.size_id=s.id LEFT JOIN store_stock ss ON (ss.item_detail_id=d.id AND ss.store_id=(SELECT id FROM stores WHERE name=?)) WHERE d.barcode=?"""
-        res = self.db.fetch_one(sql, (store, code))
+        sql = """SELECT d.id, i.name, c.name, s.name, ss.quantity FROM item_details d JOIN items i ON d.item_id=i.id LEFT JOIN colors c ON d.color_id=c.id LEFT JOIN sizes s ON d.size_id=s.id LEFT JOIN store_stock ss ON (ss.item_detail_id=d.id AND ss.store_id=?) WHERE {where} LIMIT 2"""
+        store_id = self.db.dim_id("stores", store)
+        rows = self.db.fetch_all(sql.format(where="d.barcode=?"), (store_id, code))
+        if not rows and search_match(code):
+            # Not a barcode: accept a name/color/size search that identifies exactly one SKU
+            rows = self.db.fetch_all(sql.format(where=SEARCH_FILTER), (store_id, search_match(code)))
+        res = rows[0] if len(rows) == 1 else None
         if res:
             self.detail_id = res[0]
             stock = res[4] if res[4] else 0
@@ -91,14 +97,11 @@ class TransferPage(ctk.CTkFrame):
         except: return messagebox.showerror("Error", "Invalid Qty")
         f, t = self.cb_from.get(), self.cb_to.get()
         if f == t: return messagebox.showerror("Error", "Stores must be different")
-        s_f = self.db.fetch_one("SELECT id FROM stores WHERE name=?", (f,))[0]
-        s_t = self.db.fetch_one("SELECT id FROM stores WHERE name=?", (t,))[0]
+        s_f, s_t = self.db.dim_id("stores", f), self.db.dim_id("stores", t)
         cur = self.db.fetch_one("SELECT quantity FROM store_stock WHERE item_detail_id=? AND store_id=?", (self.detail_id, s_f))
         if not cur or cur[0] < qty: return messagebox.showerror("Error", "Insufficient Stock")
-        self.db.execute("UPDATE store_stock SET quantity = quantity - ? WHERE item_detail_id=? AND store_id=?", (qty, self.detail_id, s_f))
-        exists = self.db.fetch_one("SELECT 1 FROM store_stock WHERE item_detail_id=? AND store_id=?", (self.detail_id, s_t))
-        if exists: self.db.execute("UPDATE store_stock SET quantity = quantity + ? WHERE item_detail_id=? AND store_id=?", (qty, self.detail_id, s_t))
-        else: self.db.execute("INSERT INTO store_stock (item_detail_id, store_id, quantity) VALUES (?,?,?)", (self.detail_id, s_t, qty))
+        with self.db.transaction() as tx:
+            tx.move_stock_many([(self.detail_id, s_f, -qty), (self.detail_id, s_t, qty)])
         messagebox.showinfo("Success", "Transfer Complete")
         self.lookup(None)
         if hasattr(self.controller, 'refresh_views'): self.controller.refresh_views()
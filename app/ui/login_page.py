@@ -1,15 +1,14 @@
 import customtkinter as ctk
 from tkinter import messagebox
 from app.utils import fix_text
-from app.database import DB
 from app.auth import LoginManager
 
 class LoginPage(ctk.CTkFrame):
-    def __init__(self, parent, on_login_success):
+    def __init__(self, parent, on_login_success, db=None):
         super().__init__(parent)
         self.on_login_success = on_login_success
         self.current_user_role = None
-        self.auth = LoginManager()
+        self.auth = LoginManager(db)
         
         # Configure to fill parent
         self.pack(fill="both", expand=True)
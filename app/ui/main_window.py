@@ -6,6 +6,11 @@ from app.config_manager import ConfigManager
 from app.utils import fix_text
 from app.config import ASSETS_DIR
 from app.config import ICON_PATH
+from app.database import get_db, get_read_db, close_db
+from app.db_worker import get_worker, shutdown_worker
+from app.pdf_queue import shutdown_pdf_queue
+from app.catalog import get_catalog, POLL_MS as CATALOG_POLL_MS
+from app import snapshot
 
 # Import all Pages
 from .sales.order_page import OrderPage
@@ -46,6 +51,7 @@ class InventoryApp(ctk.CTk):
         self.center_window(400, 350)
         
         self.user_role = None
+        self._db = None  # shared DB service, opened on first use and closed in on_closing
         
         # Page References for Auto-Refresh
         self.customers_page = None
@@ -63,24 +69,42 @@ class InventoryApp(ctk.CTk):
         
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
 
+    @property
+    def db(self):
+        """The one DB every page shares (runs migrations on first access)."""
+        if self._db is None:
+            self._db = get_db()
+        return self._db
+
     def on_closing(self):
         try:
-            from app.database import DB
-            db = DB()
             print("💾 Creating Auto-Backup before exit...")
-            db.backup_database()
+            self.db.backup_database()
         except Exception as e:
             print(f"Backup Error: {e}")
         finally:
+            self._db = None
+            shutdown_pdf_queue()  # queued invoice PDFs finish first
+            shutdown_worker()
+            self.save_caches()
+            close_db()  # checkpoints the WAL back into inventory.db
             self.destroy()
 
+    def save_caches(self):
+        """Warm-start snapshot of the catalog and lookups for the next launch (app/snapshot.py)."""
+        if not get_catalog().loaded: return
+        try:
+            snapshot.save(get_read_db())
+        except Exception as e:
+            print(f"❌ Cache Snapshot Error: {e}")
+
     def center_window(self, w, h):
         x = (self.winfo_screenwidth() // 2) - (w // 2)
         y = (self.winfo_screenheight() // 2) - (h // 2)
         self.geometry(f"{w}x{h}+{x}+{y}")
 
     def show_login(self):
-        self.login_frame = LoginPage(self, self.on_login_success)
+        self.login_frame = LoginPage(self, self.on_login_success, db=self.db)
         self.login_frame.pack(fill="both", expand=True)
 
     def on_login_success(self, user_role):
@@ -95,6 +119,21 @@ class InventoryApp(ctk.CTk):
         self.minsize(1024, 768)
         
         self.setup_ui()
+        
+        # Barcode catalog for the scan path: last session's snapshot (or a full build) on the worker, then kept current
+        get_worker().call(self, self.warm_start, lambda n: print(f"📦 Barcode catalog: {n} SKUs"), key="catalog")
+        self.after(CATALOG_POLL_MS, self.poll_catalog)
+
+    def warm_start(self, db):
+        if not snapshot.restore(db):
+            get_catalog().ensure_loaded()
+        return len(get_catalog())
+
+    def poll_catalog(self):
+        """Picks up barcode/price edits made by other tills (see app/catalog.py)."""
+        if not get_worker().pending("catalog"):
+            get_worker().call(self, lambda db: get_catalog().refresh(), lambda n: None, key="catalog")
+        self.after(CATALOG_POLL_MS, self.poll_catalog)
 
     def setup_ui(self):
         # Main Layout: Sidebar + Content
@@ -181,7 +220,7 @@ class InventoryApp(ctk.CTk):
     def create_page(self, key):
         # Special case for Dashboard: No TabView, direct instantiation
         if key == "dashboard":
-            self.dashboard_page = DashboardPage(self.content_area, controller=self)
+            self.dashboard_page = DashboardPage(self.content_area, controller=self, db=self.db)
             return self.dashboard_page
 
         # For strict layouts, we use a container frame
@@ -198,15 +237,15 @@ class InventoryApp(ctk.CTk):
             tabs.add("أرشيف الفواتير")
             tabs.add("المرتجعات")
             
-            OrderPage(tabs.tab("فاتورة جديدة"), self).pack(fill="both", expand=True)
+            OrderPage(tabs.tab("فاتورة جديدة"), self, db=self.db).pack(fill="both", expand=True)
             
-            self.customers_page = CustomersPage(tabs.tab("العملاء"))
+            self.customers_page = CustomersPage(tabs.tab("العملاء"), db=self.db)
             self.customers_page.pack(fill="both", expand=True)
             
-            self.history_page = HistoryPage(tabs.tab("أرشيف الفواتير"), controller=self)
+            self.history_page = HistoryPage(tabs.tab("أرشيف الفواتير"), controller=self, db=self.db)
             self.history_page.pack(fill="both", expand=True)
             
-            self.sales_return_page = ReturnsPage(tabs.tab("المرتجعات"), controller=self)
+            self.sales_return_page = ReturnsPage(tabs.tab("المرتجعات"), controller=self, db=self.db)
             self.sales_return_page.pack(fill="both", expand=True)
             
         elif key == "inventory":
@@ -214,29 +253,29 @@ class InventoryApp(ctk.CTk):
             tabs.add("التحويلات")
             tabs.add("الموردين")
             
-            self.stock_page = StockPage(tabs.tab("المخزون"), user_role=self.user_role, controller=self)
+            self.stock_page = StockPage(tabs.tab("المخزون"), user_role=self.user_role, controller=self, db=self.db)
             self.stock_page.pack(fill="both", expand=True)
             
-            TransferPage(tabs.tab("التحويلات"), controller=self).pack(fill="both", expand=True)
+            TransferPage(tabs.tab("التحويلات"), controller=self, db=self.db).pack(fill="both", expand=True)
             
-            self.suppliers_page = SuppliersPage(tabs.tab("الموردين"), controller=self)
+            self.suppliers_page = SuppliersPage(tabs.tab("الموردين"), controller=self, db=self.db)
             self.suppliers_page.pack(fill="both", expand=True)
             
             if self.user_role == "Admin":
                 tabs.add("استيراد بيانات")
-                ImportDataPage(tabs.tab("استيراد بيانات"), self).pack(fill="both", expand=True)
+                ImportDataPage(tabs.tab("استيراد بيانات"), self, db=self.db).pack(fill="both", expand=True)
                 
         elif key == "finance":
             tabs.add("الخزائن")
             tabs.add("السندات")
             tabs.add("الفواتير الآجلة")
             
-            self.safes_page = SafesPage(tabs.tab("الخزائن"), controller=self)
+            self.safes_page = SafesPage(tabs.tab("الخزائن"), controller=self, db=self.db)
             self.safes_page.pack(fill="both", expand=True)
             
-            VouchersPage(tabs.tab("السندات"), controller=self).pack(fill="both", expand=True)
+            VouchersPage(tabs.tab("السندات"), controller=self, db=self.db).pack(fill="both", expand=True)
             
-            self.pending_page = PendingPage(tabs.tab("الفواتير الآجلة"), controller=self)
+            self.pending_page = PendingPage(tabs.tab("الفواتير الآجلة"), controller=self, db=self.db)
             self.pending_page.pack(fill="both", expand=True)
             
         elif key == "purchases":
@@ -244,25 +283,30 @@ class InventoryApp(ctk.CTk):
             tabs.add("مرتجع مشتريات")
             tabs.add("أرشيف المشتريات")
             
-            PurchaseInvoicePage(tabs.tab("فاتورة مشتريات"), controller=self).pack(fill="both", expand=True)
+            PurchaseInvoicePage(tabs.tab("فاتورة مشتريات"), controller=self, db=self.db).pack(fill="both", expand=True)
             
-            self.purchase_return_page = PurchaseReturnPage(tabs.tab("مرتجع مشتريات"), controller=self)
+            self.purchase_return_page = PurchaseReturnPage(tabs.tab("مرتجع مشتريات"), controller=self, db=self.db)
             self.purchase_return_page.pack(fill="both", expand=True)
             
-            self.purchase_history_page = PurchaseHistoryPage(tabs.tab("أرشيف المشتريات"), self)
+            self.purchase_history_page = PurchaseHistoryPage(tabs.tab("أرشيف المشتريات"), self, db=self.db)
             self.purchase_history_page.pack(fill="both", expand=True)
             
         elif key == "analysis":
             tabs.add("التقارير")
-            ReportsPage(tabs.tab("التقارير"), user_role=self.user_role).pack(fill="both", expand=True)
+            ReportsPage(tabs.tab("التقارير"), user_role=self.user_role, db=self.db).pack(fill="both", expand=True)
             
         elif key == "users":
             tabs.add("إدارة المستخدمين")
-            UsersPage(tabs.tab("إدارة المستخدمين"), controller=self).pack(fill="both", expand=True)
+            UsersPage(tabs.tab("إدارة المستخدمين"), controller=self, db=self.db).pack(fill="both", expand=True)
 
         return frame
 
     def logout(self):
+        self._db = None
+        shutdown_pdf_queue()
+        shutdown_worker()
+        self.save_caches()
+        close_db()
         self.destroy()
     
     def edit_old_invoice(self, invoice_id):
@@ -289,6 +333,11 @@ class InventoryApp(ctk.CTk):
         
     def refresh_views(self):
         """Refreshes data in all stored page references"""
+        try:
+            get_catalog().refresh()
+        except Exception as e:
+            print(f"❌ Catalog Refresh Error: {e}")
+        
         pages_to_refresh = [
             (self.dashboard_page, 'load'),
             (self.customers_page, 'load'),
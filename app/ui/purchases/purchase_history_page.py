@@ -1,12 +1,12 @@
 import customtkinter as ctk
 from tkinter import ttk, messagebox
-from app.database import DB
+from app.database import get_db
 
 class PurchaseHistoryPage(ctk.CTkFrame):
-    def __init__(self, parent, controller=None):
+    def __init__(self, parent, controller=None, db=None):
         super().__init__(parent)
         self.controller = controller
-        self.db = DB()  
+        self.db = db or get_db()
         
         header = ctk.CTkFrame(self, height=50)
         header.pack(fill="x", padx=10, pady=10)
@@ -89,32 +89,35 @@ class PurchaseHistoryPage(ctk.CTkFrame):
             sid = store_res[0] if store_res else 1
             
             # Reduce Stock (Reverse the Purchase) - Only for Material invoices or standalone
+            moves = []
             if not parent_id:  # If this is NOT a factory invoice
                 for did, qty in self.db.fetch_all("SELECT item_detail_id, qty FROM purchase_details WHERE purchase_id=?", (iid,)):
                     current_qty = self.db.fetch_one("SELECT quantity FROM store_stock WHERE item_detail_id=? AND store_id=?", (did, sid))
                     if current_qty and current_qty[0] < qty:
                         if not messagebox.askyesno("Warning", f"Insufficient stock to reverse item {did}. Continue anyway? (Stock will become negative)"):
                             return
-                    
-                    self.db.execute("UPDATE store_stock SET quantity = quantity - ? WHERE item_detail_id=? AND store_id=?", (qty, did, sid))
-            
-            # Delete linked invoices
-            if child_invoice:
-                # Delete child Factory invoice first
-                self.db.execute("DELETE FROM purchases WHERE id=?", (child_invoice[0],))
-                self.db.execute("DELETE FROM purchase_details WHERE purchase_id=?", (child_invoice[0],))
+                    moves.append((did, sid, -qty))
             
-            if parent_id:
-                # Delete parent Material invoice AND its stock
-                for did, qty in self.db.fetch_all("SELECT item_detail_id, qty FROM purchase_details WHERE purchase_id=?", (parent_id,)):
-                    self.db.execute("UPDATE store_stock SET quantity = quantity - ? WHERE item_detail_id=? AND store_id=?", (qty, did, sid))
+            # Confirmations are done -> reverse stock and delete everything in one commit
+            with self.db.transaction() as tx:
+                tx.move_stock_many(moves)
                 
-                self.db.execute("DELETE FROM purchases WHERE id=?", (parent_id,))
-                self.db.execute("DELETE FROM purchase_details WHERE purchase_id=?", (parent_id,))
-            
-            # Delete main invoice
-            self.db.execute("DELETE FROM purchases WHERE id=?", (iid,))
-            self.db.execute("DELETE FROM purchase_details WHERE purchase_id=?", (iid,))
+                # Delete linked invoices
+                if child_invoice:
+                    # Delete child Factory invoice first
+                    tx.execute("DELETE FROM purchases WHERE id=?", (child_invoice[0],))
+                    tx.execute("DELETE FROM purchase_details WHERE purchase_id=?", (child_invoice[0],))
+                
+                if parent_id:
+                    # Delete parent Material invoice AND its stock
+                    tx.move_stock_many((did, sid, -qty) for did, qty in tx.fetch_all("SELECT item_detail_id, qty FROM purchase_details WHERE purchase_id=?", (parent_id,)))
+                    
+                    tx.execute("DELETE FROM purchases WHERE id=?", (parent_id,))
+                    tx.execute("DELETE FROM purchase_details WHERE purchase_id=?", (parent_id,))
+                
+                # Delete main invoice
+                tx.execute("DELETE FROM purchases WHERE id=?", (iid,))
+                tx.execute("DELETE FROM purchase_details WHERE purchase_id=?", (iid,))
             
             messagebox.showinfo("Success", "Purchase Deleted and Stock Reversed")
             self.load()
@@ -2,17 +2,20 @@
 import customtkinter as ctk
 from tkinter import ttk, messagebox
 from datetime import date
-from app.database import DB
-from app.database import DB
+from app.database import get_db
+from app.catalog import get_catalog
+from app.cart import Cart, to_float
+from app.ui.cart_view import CartView, Column
 from app.config import COLS
 from app.ui.sales.item_search_popup import ItemSearchPopup
 
 class PurchaseInvoicePage(ctk.CTkFrame):
-    def __init__(self, parent, controller):
+    def __init__(self, parent, controller, db=None):
         super().__init__(parent)
         self.controller = controller
-        self.db = DB()
-        self.cart_items = []
+        self.db = db or get_db()
+        self.catalog = get_catalog()
+        self.cart = Cart()  # lines + running totals; each row dict holds its line key in d["line"]
         self.editing_id = None
         
         # Setup validation command early (needed for entry fields below)
@@ -106,9 +109,25 @@ class PurchaseInvoicePage(ctk.CTkFrame):
                             ("الإجمالي", COLS["total"]), ("حذف", COLS["action"])]:
             ctk.CTkLabel(self.grid_header, text=text, width=width, font=("Arial", 12, "bold")).pack(side="left", padx=2)
         
-        # Scrollable Items Area
-        self.scroll_frame = ctk.CTkScrollableFrame(self, height=250)
-        self.scroll_frame.pack(fill="both", expand=True, padx=15, pady=5)
+        # Scrollable Items Area: widgets only for the visible lines, pooled across invoices (app/ui/cart_view.py)
+        entry = {"height": 28, "font": ("Arial", 11)}
+        self.cart_view = CartView(self, [
+            Column("barcode", "entry", COLS["barcode"]-35, {**entry, "placeholder_text": "Scan"}),
+            # Search Button (Magnifying Glass)
+            Column("search", "button", 30, {"text": "🔍", "height": 28, "fg_color": "#3498DB", "font": ("Arial", 12)}),
+            Column("name", "entry", COLS["name"], {**entry, "state": "readonly"}),
+            Column("color", "entry", COLS["color"], {**entry, "state": "readonly"}),
+            Column("size", "entry", COLS["size"], {**entry, "state": "readonly"}),
+            Column("qty", "entry", COLS["qty"], {**entry, "validate": "key", "validatecommand": self.vcmd}),
+            Column("price", "entry", COLS["price"], {**entry, "validate": "key", "validatecommand": self.vcmd}),
+            Column("total_lbl", "label", COLS["total"], {"font": ("Arial", 11)}),
+            Column("delete", "button", 30, {"text": "X", "height": 25, "fg_color": "#C0392B", "font": ("Arial", 10)}),
+        ], commands={"search": self.open_search_popup, "delete": self.del_row},
+           bindings={"barcode": {"<Return>": self.lookup},
+                     "qty": {"<KeyRelease>": self.calc_row}, "price": {"<KeyRelease>": self.calc_row}},
+           height=250)
+        self.cart_view.pack(fill="both", expand=True, padx=15, pady=5)
+        self.cart_items = self.cart_view.rows  # row dicts: Fields + "id" / "line"
         
         # Footer with totals
         self.footer = ctk.CTkFrame(self, height=180, fg_color="gray20", border_width=1, border_color="gray40")
@@ -237,13 +256,8 @@ class PurchaseInvoicePage(ctk.CTkFrame):
         try:
             mat = float(self.ent_mat_cost.get() or 0)
             lab = float(self.ent_lab_cost.get() or 0)
-            total_qty = sum(float(item['qty'].get()) for item in self.cart_items)
-            
-            if total_qty > 0:
-                unit_cost = (mat + lab) / total_qty
-                self.lbl_mfg_unit_cost.configure(text=f"{unit_cost:.2f}")
-            else:
-                self.lbl_mfg_unit_cost.configure(text="0.00")
+            # cart.qty is the running total of units, no re-sum of the qty entries
+            self.lbl_mfg_unit_cost.configure(text=f"{self.cart.unit_cost(mat + lab):.2f}")
         except:
              self.lbl_mfg_unit_cost.configure(text="Err")
     
@@ -288,59 +302,16 @@ class PurchaseInvoicePage(ctk.CTkFrame):
             self.supplier_id = None
     
     def add_row(self, e=None):
-        row = ctk.CTkFrame(self.scroll_frame, height=35, fg_color="transparent")
-        row.pack(fill="x", pady=2)
-        row.pack_propagate(False)
-        
-        entries = {}
-        def mk(key, w, state="normal", ph=""):
-            e = ctk.CTkEntry(row, width=w, height=28, state=state, placeholder_text=ph, font=("Arial", 11))
-            e.pack(side="left", padx=2)
-            entries[key] = e
-            return e
-        
-        d = {"frame": row, "id": None}
-        
-        # Barcode + Search Button Container
-        barcode_frame = ctk.CTkFrame(row, fg_color="transparent", width=COLS["barcode"])
-        barcode_frame.pack(side="left", padx=2); barcode_frame.pack_propagate(False)
-        
-        d["barcode"] = ctk.CTkEntry(barcode_frame, width=COLS["barcode"]-35, height=28, placeholder_text="Scan", font=("Arial", 11))
-        d["barcode"].pack(side="left", padx=2)
-        
-        # Search Button (Magnifying Glass)
-        ctk.CTkButton(barcode_frame, text="🔍", width=30, height=28, fg_color="#3498DB", command=lambda: self.open_search_popup(d), font=("Arial", 12)).pack(side="left", padx=2)
-
-        d["name"] = mk("name", COLS["name"], "readonly")
-        d["color"] = mk("color", COLS["color"], "readonly")
-        d["size"] = mk("size", COLS["size"], "readonly")
-        d["qty"] = mk("qty", COLS["qty"])
-        d["qty"].configure(validate="key", validatecommand=self.vcmd)
-        d["qty"].insert(0, "1")
-        d["price"] = mk("price", COLS["price"])
-        d["price"].configure(validate="key", validatecommand=self.vcmd)
-        lbl = ctk.CTkLabel(row, text="0.00", width=COLS["total"], font=("Arial", 11))
-        lbl.pack(side="left", padx=2)
-        d["total_lbl"] = lbl
-        ctk.CTkButton(row, text="X", width=30, height=25, fg_color="#C0392B", command=lambda: self.del_row(d), font=("Arial", 10)).pack(side="left", padx=2)
-        self.cart_items.append(d)
-        d["barcode"].bind("<Return>", lambda x: self.lookup(d))
-        d["qty"].bind("<KeyRelease>", lambda x: self.calc_row(d))
-        d["price"].bind("<KeyRelease>", lambda x: self.calc_row(d))
+        d = self.cart_view.new_row({"qty": "1", "total_lbl": "0.00"}, id=None, line=self.cart.add())
         d["barcode"].focus()
     
     def lookup(self, d):
         code = d['barcode'].get().strip()
-        sql = """SELECT d.id, i.name, c.name, s.name, d.buy_price 
-                 FROM item_details d 
-                 JOIN items i ON d.item_id=i.id 
-                 LEFT JOIN colors c ON d.color_id=c.id 
-                 LEFT JOIN sizes s ON d.size_id=s.id 
-                 WHERE d.barcode=?"""
-        res = self.db.fetch_one(sql, (code,))
+        res = self.catalog.lookup(code)  # in-memory barcode index (app/catalog.py), no SQL per scan
         if res:
-            d['id'] = res[0]
-            for k, v in zip(["name", "color", "size"], [res[1], res[2], res[3]]):
+            d['id'] = res.id
+            self.cart.update(d["line"], sku_id=res.id, qty=to_float(d['qty'].get()))
+            for k, v in zip(["name", "color", "size"], [res.name, res.color, res.size]):
                 d[k].configure(state="normal")
                 d[k].delete(0, "end")
                 d[k].insert(0, str(v or "-"))
@@ -356,20 +327,14 @@ class PurchaseInvoicePage(ctk.CTkFrame):
                 try:
                     mat_cost = float(self.ent_mat_cost.get() or 0)
                     lab_cost = float(self.ent_lab_cost.get() or 0)
-                    total_qty = sum(float(item['qty'].get()) for item in self.cart_items if item.get('id'))
-                    
-                    if total_qty > 0:
-                        calculated_unit_cost = (mat_cost + lab_cost) / total_qty
-                        d['price'].insert(0, f"{calculated_unit_cost:.2f}")
-                    else:
-                        # Fallback if no quantity yet
-                        d['price'].insert(0, "0")
-                except (ValueError, ZeroDivisionError):
+                    # 0 if no quantity yet
+                    d['price'].insert(0, f"{self.cart.unit_cost(mat_cost + lab_cost):.2f}")
+                except ValueError:
                     # Fallback to database price if calculation fails
-                    d['price'].insert(0, str(res[4] or 0))
+                    d['price'].insert(0, str(res.buy_price or 0))
             else:
                 # Standard Mode: Use database price
-                d['price'].insert(0, str(res[4] or 0))
+                d['price'].insert(0, str(res.buy_price or 0))
             
             self.calc_row(d)
             d['qty'].focus()
@@ -387,22 +352,20 @@ class PurchaseInvoicePage(ctk.CTkFrame):
                 try:
                     mat_cost = float(self.ent_mat_cost.get() or 0)
                     lab_cost = float(self.ent_lab_cost.get() or 0)
-                    total_qty = sum(float(item['qty'].get()) for item in self.cart_items if item.get('id'))
+                    self.cart.update(d["line"], qty=to_float(d['qty'].get()))
                     
-                    if total_qty > 0:
-                        calculated_unit_cost = (mat_cost + lab_cost) / total_qty
+                    if self.cart.qty > 0:
                         # Update THIS row's price
                         d['price'].delete(0, "end")
-                        d['price'].insert(0, f"{calculated_unit_cost:.2f}")
-                except (ValueError, ZeroDivisionError):
+                        d['price'].insert(0, f"{self.cart.unit_cost(mat_cost + lab_cost):.2f}")
+                except ValueError:
                     pass  # Keep existing price if calculation fails
             
             # ========================================
-            # Calculate Row Total
+            # Calculate Row Total (O(1) update of the cart's running totals)
             # ========================================
-            q = float(d['qty'].get())
-            p = float(d['price'].get())
-            d['total_lbl'].configure(text=f"{q*p:.2f}")
+            line = self.cart.update(d["line"], qty=to_float(d['qty'].get()), price=to_float(d['price'].get()))
+            d['total_lbl'].configure(text=f"{line.total:.2f}")
             
             # Update grand total and manufacturing unit cost label
             self.grand_total()
@@ -412,34 +375,23 @@ class PurchaseInvoicePage(ctk.CTkFrame):
             pass
     
     def del_row(self, d):
-        d['frame'].destroy()
-        self.cart_items.remove(d)
+        self.cart_view.remove(d)
+        self.cart.remove(d["line"])
         self.grand_total()
         if self.var_is_manufacturing.get():
             self.calc_mfg_unit_cost()
     
     def grand_total(self, e=None):
         try:
-            sub = sum(float(i['total_lbl'].cget('text')) for i in self.cart_items)
-            self.update_field(self.out_subtotal, sub)
-            try:
-                disc_val = float(self.ent_disc_pct.get())
-            except:
-                disc_val = 0.0
-            self.update_field(self.out_discount, disc_val)
-            after_disc = sub - disc_val
-            try:
-                tax_pct = float(self.ent_tax_pct.get())
-            except:
-                tax_pct = 0.0
-            tax_val = after_disc * (tax_pct / 100)
-            self.update_field(self.out_tax, tax_val)
-            try:
-                ship_val = float(self.ent_shipping.get())
-            except:
-                ship_val = 0.0
-            net = after_disc + tax_val + ship_val
-            self.update_field(self.out_net, net)
+            # Totals are running sums in the cart model, nothing is re-added per keystroke
+            cart = self.cart
+            cart.discount = to_float(self.ent_disc_pct.get())
+            cart.tax_pct = to_float(self.ent_tax_pct.get())
+            cart.shipping = to_float(self.ent_shipping.get())
+            self.update_field(self.out_subtotal, cart.subtotal)
+            self.update_field(self.out_discount, cart.discount)
+            self.update_field(self.out_tax, cart.tax)
+            self.update_field(self.out_net, cart.net)
         except:
             pass
     
@@ -458,17 +410,16 @@ class PurchaseInvoicePage(ctk.CTkFrame):
                 return messagebox.showerror("Error", "Cart is empty")
             
             store_name = self.cb_store.get()
-            store_res = self.db.fetch_one("SELECT id FROM stores WHERE name=?", (store_name,))
-            if not store_res: return messagebox.showerror("Error", "Select a store")
-            store_id = store_res[0]
+            store_id = self.db.dim_id("stores", store_name)
+            if not store_id: return messagebox.showerror("Error", "Select a store")
 
             notes = self.txt_notes.get("1.0", "end").strip()
             today_date = date.today()
 
             # Helper for Supplies
             def get_supp_id(name, phone="", addr=""):
-                res = self.db.fetch_one("SELECT id FROM suppliers WHERE name=?", (name,))
-                if res: return res[0]
+                supp_id = self.db.dim_id("suppliers", name)
+                if supp_id: return supp_id
                 return self.db.execute("INSERT INTO suppliers (name, phone, address) VALUES (?,?,?)", (name, phone, addr))
 
             if is_mfg:
@@ -478,9 +429,6 @@ class PurchaseInvoicePage(ctk.CTkFrame):
                 if not mat_name or not fac_name:
                     return messagebox.showerror("Error", "Material supplier and factory must be selected")
                 
-                mat_supp_id = get_supp_id(mat_name)
-                fac_supp_id = get_supp_id(fac_name)
-
                 try:
                     mat_cost = float(self.ent_mat_cost.get() or 0)
                     lab_cost = float(self.ent_lab_cost.get() or 0)
@@ -500,32 +448,37 @@ class PurchaseInvoicePage(ctk.CTkFrame):
                 unit_lab = lab_cost / total_qty
                 unit_full = unit_mat + unit_lab
 
-                # Transaction A: Material Purchase
-                pid_mat = self.db.execute("""INSERT INTO purchases 
-                    (date, supplier_id, net_total, store_id, payment_method, notes) 
-                    VALUES (?, ?, ?, ?, 'نقدي', ?)""", 
-                    (today_date, mat_supp_id, mat_cost, store_id, f"Mfg Mat: {notes}"))
+                # Both linked purchases, their details and all stock/WAC updates in one commit
+                with self.db.transaction() as tx:
+                    mat_supp_id = get_supp_id(mat_name)
+                    fac_supp_id = get_supp_id(fac_name)
 
-                # Transaction B: Factory Purchase (LINKED to Material via parent_purchase_id)
-                pid_fac = self.db.execute("""INSERT INTO purchases 
-                    (date, supplier_id, net_total, store_id, payment_method, notes, parent_purchase_id) 
-                    VALUES (?, ?, ?, ?, 'نقدي', ?, ?)""", 
-                    (today_date, fac_supp_id, lab_cost, store_id, f"Mfg Factory: {notes}", pid_mat))
+                    # Transaction A: Material Purchase
+                    pid_mat = tx.execute("""INSERT INTO purchases 
+                        (date, supplier_id, net_total, store_id, payment_method, notes) 
+                        VALUES (?, ?, ?, ?, 'نقدي', ?)""", 
+                        (today_date, mat_supp_id, mat_cost, store_id, f"Mfg Mat: {notes}"))
 
-                # Process Items associated with Material Invoice
-                for item in self.cart_items:
-                    did = item['id']
-                    qty = float(item['qty'].get())
-                    
-                    # Insert Detail (Linked to Material Invoice, with Material Price Portion)
-                    # NOTE: We only track material cost in this invoice detail, but stock is updated fully.
-                    self.db.execute("""INSERT INTO purchase_details 
-                        (purchase_id, item_detail_id, qty, buy_price, total, returned_qty) 
-                        VALUES (?, ?, ?, ?, ?, 0)""", 
-                        (pid_mat, did, qty, unit_mat, qty * unit_mat))
-                    
-                    # WAC & Stock Update with FULL Cost
-                    self.apply_wac_and_stock(did, qty, unit_full, store_id)
+                    # Transaction B: Factory Purchase (LINKED to Material via parent_purchase_id)
+                    pid_fac = tx.execute("""INSERT INTO purchases 
+                        (date, supplier_id, net_total, store_id, payment_method, notes, parent_purchase_id) 
+                        VALUES (?, ?, ?, ?, 'نقدي', ?, ?)""", 
+                        (today_date, fac_supp_id, lab_cost, store_id, f"Mfg Factory: {notes}", pid_mat))
+
+                    # Process Items associated with Material Invoice
+                    details = []
+                    for item in self.cart_items:
+                        did = item['id']
+                        qty = float(item['qty'].get())
+                        
+                        # Detail (Linked to Material Invoice, with Material Price Portion)
+                        # NOTE: We only track material cost in this invoice detail, but stock is updated fully.
+                        details.append((pid_mat, did, qty, unit_mat, qty * unit_mat, 0))
+                        
+                        # WAC & Stock Update with FULL Cost
+                        self.apply_wac_and_stock(did, qty, unit_full, store_id)
+                    tx.insert_many("purchase_details", details,
+                                   ("purchase_id", "item_detail_id", "qty", "buy_price", "total", "returned_qty"))
 
             else:
                 # --- Standard Mode ---
@@ -537,35 +490,36 @@ class PurchaseInvoicePage(ctk.CTkFrame):
                 if len(phone) != 13:
                     return messagebox.showerror("Error", "Invalid phone number")
                 
-                supp_id = get_supp_id(supp_name, phone, self.ent_supplier_addr.get().strip())
-                self.db.execute("UPDATE suppliers SET phone=?, address=? WHERE id=?", 
-                                (phone, self.ent_supplier_addr.get(), supp_id))
-                
                 # Totals
                 net = float(self.out_net.get() or 0)
                 tax = float(self.ent_tax_pct.get() or 0)
                 disc = float(self.ent_disc_pct.get() or 0)
                 ship = float(self.ent_shipping.get() or 0)
                 
-                pid = self.db.execute("""INSERT INTO purchases 
-                    (date, supplier_id, net_total, store_id, payment_method, 
-                     tax_percent, discount_percent, discount_value, shipping_cost, notes, paid_amount) 
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""", 
-                    (today_date, supp_id, net, store_id, self.cb_pay_method.get(), 
-                     tax, disc, disc, ship, notes, net if self.cb_pay_method.get() != "أجل" else 0))
-                
-                for item in self.cart_items:
-                    did = item['id']
-                    qty = float(item['qty'].get())
-                    price = float(item['price'].get())
+                with self.db.transaction() as tx:
+                    supp_id = get_supp_id(supp_name, phone, self.ent_supplier_addr.get().strip())
+                    tx.execute("UPDATE suppliers SET phone=?, address=? WHERE id=?", 
+                               (phone, self.ent_supplier_addr.get(), supp_id))
                     
-                    self.db.execute("""INSERT INTO purchase_details 
-                        (purchase_id, item_detail_id, qty, buy_price, total, returned_qty) 
-                        VALUES (?, ?, ?, ?, ?, 0)""", 
-                        (pid, did, qty, price, qty * price))
+                    pid = tx.execute("""INSERT INTO purchases 
+                        (date, supplier_id, net_total, store_id, payment_method, 
+                         tax_percent, discount_percent, discount_value, shipping_cost, notes, paid_amount) 
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""", 
+                        (today_date, supp_id, net, store_id, self.cb_pay_method.get(), 
+                         tax, disc, disc, ship, notes, net if self.cb_pay_method.get() != "أجل" else 0))
                     
-                    # WAC & Stock Update
-                    self.apply_wac_and_stock(did, qty, price, store_id)
+                    details = []
+                    for item in self.cart_items:
+                        did = item['id']
+                        qty = float(item['qty'].get())
+                        price = float(item['price'].get())
+                        
+                        details.append((pid, did, qty, price, qty * price, 0))
+                        
+                        # WAC & Stock Update
+                        self.apply_wac_and_stock(did, qty, price, store_id)
+                    tx.insert_many("purchase_details", details,
+                                   ("purchase_id", "item_detail_id", "qty", "buy_price", "total", "returned_qty"))
 
             messagebox.showinfo("Success", "Invoice saved successfully")
             if hasattr(self.controller, 'refresh_views'):
@@ -583,140 +537,101 @@ class PurchaseInvoicePage(ctk.CTkFrame):
         CRITICAL: This must fetch CURRENT stock BEFORE any updates to calculate correct WAC.
         """
         try:
-            # ==========================================
-            # STEP 1: FETCH CURRENT STATE (BEFORE UPDATES)
-            # ==========================================
-            
-            # Fetch from store_stock (primary source)
-            res_store = self.db.fetch_one(
-                "SELECT SUM(quantity) FROM store_stock WHERE item_detail_id=?", 
-                (item_id,)
-            )
-            old_qty_store = res_store[0] if res_store and res_store[0] is not None else 0
+            # Joins the caller's transaction when called from save_purchase
+            with self.db.transaction():
+                # ==========================================
+                # STEP 1: FETCH CURRENT STATE (BEFORE UPDATES)
+                # ==========================================
             
-            # Fetch from item_details (backup/validation)
-            res_item = self.db.fetch_one(
-                "SELECT buy_price, stock_qty FROM item_details WHERE id=?", 
-                (item_id,)
-            )
-            
-            if not res_item:
-                raise ValueError(f"Item ID {item_id} not found in database!")
+                # stock_qty = on-hand total across all stores (kept equal to SUM(store_stock) by triggers)
+                res_item = self.db.fetch_one(
+                    "SELECT buy_price, stock_qty FROM item_details WHERE id=?", 
+                    (item_id,)
+                )
             
-            old_cost = res_item[0] if res_item[0] is not None else 0
-            old_qty_master = res_item[1] if res_item[1] is not None else 0
+                if not res_item:
+                    raise ValueError(f"Item ID {item_id} not found in database!")
             
-            # Determine which quantity to use for WAC calculation
-            # Priority: store_stock > item_details.stock_qty
-            old_qty = old_qty_store if old_qty_store > 0 else old_qty_master
+                old_cost = res_item[0] if res_item[0] is not None else 0
+                old_qty = res_item[1] if res_item[1] is not None else 0
             
-            # ==========================================
-            # STEP 2: CALCULATE WAC
-            # ==========================================
+                # ==========================================
+                # STEP 2: CALCULATE WAC
+                # ==========================================
             
-            if old_qty > 0 and old_cost > 0:
-                # Standard WAC formula
-                total_value = (old_qty * old_cost) + (new_qty * new_cost)
-                total_qty = old_qty + new_qty
-                final_cost = total_value / total_qty
+                if old_qty > 0 and old_cost > 0:
+                    # Standard WAC formula
+                    total_value = (old_qty * old_cost) + (new_qty * new_cost)
+                    total_qty = old_qty + new_qty
+                    final_cost = total_value / total_qty
                 
-                # FIX: Round to 2 decimal places (Egyptian Piasters standard) to prevent floating-point drift
-                final_cost = round(final_cost, 2)
+                    # FIX: Round to 2 decimal places (Egyptian Piasters standard) to prevent floating-point drift
+                    final_cost = round(final_cost, 2)
                 
-                # DEBUG LOGGING
-                print(f"\n{'='*60}")
-                print(f"🔍 WAC CALCULATION - Item ID: {item_id}")
-                print(f"{'='*60}")
-                print(f"📊 BEFORE:")
-                print(f"   Stock (store_stock): {old_qty_store} units")
-                print(f"   Stock (item_details): {old_qty_master} units")
-                print(f"   Using for WAC: {old_qty} units")
-                print(f"   Current Cost: {old_cost:.2f}")
-                print(f"   Current Value: {old_qty * old_cost:.2f}")
-                print(f"\n📦 NEW PURCHASE:")
-                print(f"   Quantity: {new_qty} units")
-                print(f"   Unit Cost: {new_cost:.2f}")
-                print(f"   Total Value: {new_qty * new_cost:.2f}")
-                print(f"\n🧮 WAC FORMULA:")
-                print(f"   ({old_qty} × {old_cost:.2f}) + ({new_qty} × {new_cost:.2f})")
-                print(f"   = {old_qty * old_cost:.2f} + {new_qty * new_cost:.2f}")
-                print(f"   = {total_value:.2f}")
-                print(f"   ÷ ({old_qty} + {new_qty})")
-                print(f"   = {total_value:.2f} ÷ {total_qty}")
-                print(f"   = {final_cost:.2f}")
-                print(f"\n✅ FINAL WEIGHTED AVERAGE COST: {final_cost:.2f}")
+                    # DEBUG LOGGING
+                    print(f"\n{'='*60}")
+                    print(f"🔍 WAC CALCULATION - Item ID: {item_id}")
+                    print(f"{'='*60}")
+                    print(f"📊 BEFORE:")
+                    print(f"   Stock (all stores): {old_qty} units")
+                    print(f"   Current Cost: {old_cost:.2f}")
+                    print(f"   Current Value: {old_qty * old_cost:.2f}")
+                    print(f"\n📦 NEW PURCHASE:")
+                    print(f"   Quantity: {new_qty} units")
+                    print(f"   Unit Cost: {new_cost:.2f}")
+                    print(f"   Total Value: {new_qty * new_cost:.2f}")
+                    print(f"\n🧮 WAC FORMULA:")
+                    print(f"   ({old_qty} × {old_cost:.2f}) + ({new_qty} × {new_cost:.2f})")
+                    print(f"   = {old_qty * old_cost:.2f} + {new_qty * new_cost:.2f}")
+                    print(f"   = {total_value:.2f}")
+                    print(f"   ÷ ({old_qty} + {new_qty})")
+                    print(f"   = {total_value:.2f} ÷ {total_qty}")
+                    print(f"   = {final_cost:.2f}")
+                    print(f"\n✅ FINAL WEIGHTED AVERAGE COST: {final_cost:.2f}")
                 
-            elif old_qty > 0 and old_cost == 0:
-                # Has stock but no cost (unusual, but handle it)
-                final_cost = round(new_cost, 2)
-                print(f"\n⚠️  WARNING - Item ID {item_id}:")
-                print(f"   Has stock ({old_qty} units) but ZERO cost!")
-                print(f"   Setting cost to NEW COST: {new_cost:.2f}")
+                elif old_qty > 0 and old_cost == 0:
+                    # Has stock but no cost (unusual, but handle it)
+                    final_cost = round(new_cost, 2)
+                    print(f"\n⚠️  WARNING - Item ID {item_id}:")
+                    print(f"   Has stock ({old_qty} units) but ZERO cost!")
+                    print(f"   Setting cost to NEW COST: {new_cost:.2f}")
                 
-            else:
-                # First purchase (no existing stock)
-                final_cost = round(new_cost, 2)
-                print(f"\n📍 FIRST PURCHASE - Item ID {item_id}:")
-                print(f"   No existing stock (old_qty={old_qty})")
-                print(f"   Setting initial cost: {new_cost:.2f}")
+                else:
+                    # First purchase (no existing stock)
+                    final_cost = round(new_cost, 2)
+                    print(f"\n📍 FIRST PURCHASE - Item ID {item_id}:")
+                    print(f"   No existing stock (old_qty={old_qty})")
+                    print(f"   Setting initial cost: {new_cost:.2f}")
             
-            # ==========================================
-            # STEP 3: UPDATE DATABASE
-            # ==========================================
+                # ==========================================
+                # STEP 3: UPDATE DATABASE
+                # ==========================================
             
-            # Update master cost
-            self.db.execute(
-                "UPDATE item_details SET buy_price=? WHERE id=?", 
-                (final_cost, item_id)
-            )
-            print(f"✅ Updated item_details.buy_price = {final_cost:.2f}")
-            
-            # Update or insert store_stock
-            exists = self.db.fetch_one(
-                "SELECT quantity FROM store_stock WHERE item_detail_id=? AND store_id=?", 
-                (item_id, store_id)
-            )
-            
-            if exists:
-                old_store_qty = exists[0]
-                self.db.execute(
-                    "UPDATE store_stock SET quantity = quantity + ? WHERE item_detail_id=? AND store_id=?", 
-                    (new_qty, item_id, store_id)
-                )
-                print(f"✅ Updated store_stock: {old_store_qty} + {new_qty} = {old_store_qty + new_qty} units")
-            else:
+                # Update master cost
                 self.db.execute(
-                    "INSERT INTO store_stock (item_detail_id, store_id, quantity) VALUES (?,?,?)", 
-                    (item_id, store_id, new_qty)
+                    "UPDATE item_details SET buy_price=? WHERE id=?", 
+                    (final_cost, item_id)
                 )
-                print(f"✅ Inserted new store_stock record: {new_qty} units")
+                print(f"✅ Updated item_details.buy_price = {final_cost:.2f}")
             
-            # Sync item_details.stock_qty
-            self.db.execute(
-                "UPDATE item_details SET stock_qty = stock_qty + ? WHERE id=?", 
-                (new_qty, item_id)
-            )
-            print(f"✅ Synced item_details.stock_qty: +{new_qty} units")
+                # Update or insert store_stock (item_details.stock_qty follows via trigger)
+                self.db.move_stock(item_id, store_id, new_qty)
+                print(f"✅ Updated store_stock (store {store_id}): +{new_qty} units")
             
-            # ==========================================
-            # STEP 4: VERIFICATION
-            # ==========================================
+                # ==========================================
+                # STEP 4: VERIFICATION
+                # ==========================================
             
-            # Verify the update
-            verify = self.db.fetch_one(
-                "SELECT buy_price, stock_qty FROM item_details WHERE id=?", 
-                (item_id,)
-            )
-            verify_store = self.db.fetch_one(
-                "SELECT SUM(quantity) FROM store_stock WHERE item_detail_id=?", 
-                (item_id,)
-            )
+                # Verify the update
+                verify = self.db.fetch_one(
+                    "SELECT buy_price, stock_qty FROM item_details WHERE id=?", 
+                    (item_id,)
+                )
             
-            print(f"\n📋 VERIFICATION:")
-            print(f"   Master Cost: {verify[0]:.2f}")
-            print(f"   Master Stock: {verify[1]}")
-            print(f"   Store Stock: {verify_store[0]}")
-            print(f"{'='*60}\n")
+                print(f"\n📋 VERIFICATION:")
+                print(f"   Master Cost: {verify[0]:.2f}")
+                print(f"   Master Stock: {verify[1]}")
+                print(f"{'='*60}\n")
             
         except Exception as e:
             print(f"\n❌ ERROR in apply_wac_and_stock:")
@@ -744,8 +659,7 @@ class PurchaseInvoicePage(ctk.CTkFrame):
         self.var_is_manufacturing.set(False)
         self.toggle_manufacturing_mode()
         
-        for item in self.cart_items:
-            item['frame'].destroy()
-        self.cart_items = []
+        self.cart_view.clear()  # rows go, the pooled row widgets stay for the next invoice
+        self.cart.clear()
         self.add_row()
         self.grand_total()
@@ -1,15 +1,15 @@
 
 import customtkinter as ctk
 from tkinter import ttk, messagebox
-from app.database import DB
+from app.database import get_db
 from app.utils import fix_text
 from .purchase_return_popup import PurchaseReturnPopup
 
 class PurchaseReturnPage(ctk.CTkFrame):
-    def __init__(self, parent, controller=None):
+    def __init__(self, parent, controller=None, db=None):
         super().__init__(parent)
         self.controller = controller
-        self.db = DB()
+        self.db = db or get_db()
         
         # Title
         ctk.CTkLabel(self, text="إدارة مرتجع المشتريات", font=("Arial", 22, "bold"), text_color="#D35400").pack(pady=10)
@@ -206,24 +206,20 @@ class PurchaseReturnPage(ctk.CTkFrame):
                 self.load_history()
                 return
 
-            for pd_id, qty in details:
-                # Reverse purchase_details
-                self.db.execute("UPDATE purchase_details SET returned_qty = returned_qty - ? WHERE id=?", (qty, pd_id))
+            with self.db.transaction() as tx:
+                for pd_id, qty in details:
+                    # Reverse purchase_details
+                    tx.execute("UPDATE purchase_details SET returned_qty = returned_qty - ? WHERE id=?", (qty, pd_id))
                 
-                # Get item_detail_id
-                ires = self.db.fetch_one("SELECT item_detail_id FROM purchase_details WHERE id=?", (pd_id,))
-                if ires:
-                    did = ires[0]
-                    # Add back to Stock
-                    # Check if row exists
-                    exists = self.db.fetch_one("SELECT 1 FROM store_stock WHERE item_detail_id=? AND store_id=?", (did, store_id))
-                    if exists:
-                        self.db.execute("UPDATE store_stock SET quantity = quantity + ? WHERE item_detail_id=? AND store_id=?", (qty, did, store_id))
-                    else:
-                        self.db.execute("INSERT INTO store_stock (item_detail_id, store_id, quantity) VALUES (?,?,?)", (did, store_id, qty))
+                    # Get item_detail_id
+                    ires = tx.fetch_one("SELECT item_detail_id FROM purchase_details WHERE id=?", (pd_id,))
+                    if ires:
+                        did = ires[0]
+                        # Add back to Stock
+                        tx.move_stock(did, store_id, qty)
 
-            self.db.execute("DELETE FROM purchase_return_details WHERE purchase_return_id=?", (ret_id,))
-            self.db.execute("DELETE FROM purchase_returns WHERE id=?", (ret_id,))
+                tx.execute("DELETE FROM purchase_return_details WHERE purchase_return_id=?", (ret_id,))
+                tx.execute("DELETE FROM purchase_returns WHERE id=?", (ret_id,))
             
             messagebox.showinfo("Success", "Return Deleted and Stock Restored.")
             self.load_history()
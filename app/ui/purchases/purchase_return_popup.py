@@ -1,7 +1,7 @@
 
 import customtkinter as ctk
 from tkinter import messagebox
-from app.database import DB
+from app.database import get_db
 from datetime import date
 
 class PurchaseReturnPopup(ctk.CTkToplevel):
@@ -10,7 +10,7 @@ class PurchaseReturnPopup(ctk.CTkToplevel):
         self.controller = controller
         self.title(f"Purchase Return - Invoice #{purchase_id}")
         self.geometry("900x650")
-        self.db = DB()
+        self.db = get_db()
         self.purchase_id = purchase_id
         self.grab_set()
         
@@ -112,45 +112,47 @@ class PurchaseReturnPopup(ctk.CTkToplevel):
         if not items_to_return: return messagebox.showerror("Error", "No items selected.")
         
         try:
-            for pd_id, qty in items_to_return:
-                # Update purchase_details
-                self.db.execute("UPDATE purchase_details SET returned_qty = IFNULL(returned_qty, 0) + ? WHERE id=?", (qty, pd_id))
+            # Stock check can fail half-way through the list -> nothing is written unless every line passes
+            with self.db.transaction() as tx:
+                for pd_id, qty in items_to_return:
+                    # Update purchase_details
+                    tx.execute("UPDATE purchase_details SET returned_qty = IFNULL(returned_qty, 0) + ? WHERE id=?", (qty, pd_id))
                 
-                # Update Stock (Remove from store because we are returning to supplier)
-                res = self.db.fetch_one("SELECT item_detail_id FROM purchase_details WHERE id=?", (pd_id,))
-                item_detail_id = res[0]
+                    # Update Stock (Remove from store because we are returning to supplier)
+                    res = tx.fetch_one("SELECT item_detail_id FROM purchase_details WHERE id=?", (pd_id,))
+                    item_detail_id = res[0]
                 
-                # Check if stock exists
-                stock = self.db.fetch_one("SELECT quantity FROM store_stock WHERE item_detail_id=? AND store_id=?", (item_detail_id, self.store_id))
-                current_qty = stock[0] if stock else 0
+                    # Check if stock exists
+                    stock = tx.fetch_one("SELECT quantity FROM store_stock WHERE item_detail_id=? AND store_id=?", (item_detail_id, self.store_id))
+                    current_qty = stock[0] if stock else 0
                 
-                if current_qty < qty:
-                     raise ValueError(f"Not enough stock in store to return item (ID: {item_detail_id})")
+                    if current_qty < qty:
+                         raise ValueError(f"Not enough stock in store to return item (ID: {item_detail_id})")
 
-                self.db.execute("UPDATE store_stock SET quantity = quantity - ? WHERE item_detail_id=? AND store_id=?", (qty, item_detail_id, self.store_id))
+                    tx.move_stock(item_detail_id, self.store_id, -qty)
             
-            notes = self.txt_notes.get('1.0', 'end').strip()
-            # self.db.execute("INSERT INTO purchase_returns (date, invoice_id, qty, refund_amount, notes) VALUES (?,?,?,?,?)", ...)
-            # Wait, table is purchase_returns. Columns?
-            # From Delete Logic: "DELETE FROM purchase_returns WHERE id=?"
-            # Schema not fully visible but likely similar to returns.
-            # Assuming columns: date, purchase_id, qty, refund_amount, notes
-            # 'invoice_id' in returns table corresponds to 'purchase_id' here? Or 'purchase_id' column?
-            # Let's assume 'purchase_id' column for transparency, or 'invoice_id' if reused (but likely separate table).
-            # From `main.py` lines 4104: `SELECT ... FROM returns r` (Sales Returns).
-            # I haven't seen `purchase_returns` schema creation.
-            # But line 2927 deletes from `purchase_returns`.
-            # I will assume `purchase_id` column.
+                notes = self.txt_notes.get('1.0', 'end').strip()
+                # self.db.execute("INSERT INTO purchase_returns (date, invoice_id, qty, refund_amount, notes) VALUES (?,?,?,?,?)", ...)
+                # Wait, table is purchase_returns. Columns?
+                # From Delete Logic: "DELETE FROM purchase_returns WHERE id=?"
+                # Schema not fully visible but likely similar to returns.
+                # Assuming columns: date, purchase_id, qty, refund_amount, notes
+                # 'invoice_id' in returns table corresponds to 'purchase_id' here? Or 'purchase_id' column?
+                # Let's assume 'purchase_id' column for transparency, or 'invoice_id' if reused (but likely separate table).
+                # From `main.py` lines 4104: `SELECT ... FROM returns r` (Sales Returns).
+                # I haven't seen `purchase_returns` schema creation.
+                # But line 2927 deletes from `purchase_returns`.
+                # I will assume `purchase_id` column.
             
-            # Insert Master Return Record
-            # qty here is just count of items or total pieces? Usually row count or total pieces. 
-            # Original code logged len(items). Let's stick effectively to that or total qty.
-            ret_id = self.db.execute("INSERT INTO purchase_returns (date, purchase_id, qty, refund_amount, notes) VALUES (?,?,?,?,?)", 
-                           (date.today(), self.purchase_id, sum(q for _, q in items_to_return), refund_val, notes))
+                # Insert Master Return Record
+                # qty here is just count of items or total pieces? Usually row count or total pieces. 
+                # Original code logged len(items). Let's stick effectively to that or total qty.
+                ret_id = tx.execute("INSERT INTO purchase_returns (date, purchase_id, qty, refund_amount, notes) VALUES (?,?,?,?,?)", 
+                               (date.today(), self.purchase_id, sum(q for _, q in items_to_return), refund_val, notes))
             
-            # Insert Return Details
-            for pd_id, qty in items_to_return:
-                self.db.execute("INSERT INTO purchase_return_details (purchase_return_id, purchase_detail_id, qty) VALUES (?,?,?)", (ret_id, pd_id, qty))
+                # Insert Return Details
+                for pd_id, qty in items_to_return:
+                    tx.execute("INSERT INTO purchase_return_details (purchase_return_id, purchase_detail_id, qty) VALUES (?,?,?)", (ret_id, pd_id, qty))
             
             messagebox.showinfo("Success", "Purchase Return Processed Successfully!")
             self.destroy()
@@ -0,0 +1,73 @@
+import customtkinter as ctk
+from tkinter import ttk, messagebox, filedialog
+from app.database import get_db
+from app.utils import fix_text
+from app import query_stats
+
+class QueryStatsPopup(ctk.CTkToplevel):
+    """Admin view: slowest query shapes since the app started (see app/query_stats.py)."""
+    def __init__(self, parent, top_n=50):
+        super().__init__(parent)
+        self.title(fix_text("أداء قاعدة البيانات"))
+        self.geometry("1100x600")
+        self.db = get_db()
+        self.top_n = top_n
+        self.shown = []
+
+        header = ctk.CTkFrame(self, height=50)
+        header.pack(fill="x", padx=10, pady=10)
+        ctk.CTkLabel(header, text=fix_text(f"أبطأ {top_n} استعلام"), font=("Segoe UI", 18, "bold")).pack(side="right", padx=20)
+        self.cb_sort = ctk.CTkComboBox(header, values=["total_ms", "avg_ms", "max_ms", "calls"], width=120,
+                                       command=lambda _: self.load())
+        self.cb_sort.pack(side="left", padx=10)
+        self.cb_sort.set("total_ms")
+        slow = f"{query_stats.SLOW_MS:g} ms" if query_stats.SLOW_MS > 0 else "off"
+        ctk.CTkLabel(header, text=f"Slow log: {slow} -> {query_stats.SLOW_LOG_PATH}", text_color="gray60").pack(side="left", padx=10)
+
+        cols = ("Calls", "Total", "Avg", "Max", "Rows", "Caller", "Shape")
+        self.tree = ttk.Treeview(self, columns=cols, show="headings")
+        self.tree.pack(fill="both", expand=True, padx=10, pady=5)
+        for c, w in zip(cols, [60, 90, 80, 80, 70, 220, 500]):
+            self.tree.heading(c, text=c if c in ("Calls", "Rows", "Caller", "Shape") else f"{c} ms")
+            self.tree.column(c, width=w, anchor="w" if c in ("Caller", "Shape") else "center")
+        self.tree.bind("<Double-1>", lambda e: self.explain_selected())
+
+        footer = ctk.CTkFrame(self, height=50)
+        footer.pack(fill="x", padx=10, pady=10)
+        ctk.CTkButton(footer, text="Refresh", command=self.load, width=100).pack(side="left", padx=10)
+        ctk.CTkButton(footer, text="Explain", command=self.explain_selected, fg_color="#8E44AD", width=100).pack(side="left", padx=10)
+        ctk.CTkButton(footer, text="Export CSV", command=self.export, fg_color="#27AE60", width=100).pack(side="left", padx=10)
+        ctk.CTkButton(footer, text="Reset", command=self.reset, fg_color="#C0392B", width=100).pack(side="right", padx=10)
+
+        self.load()
+
+    def load(self):
+        self.tree.delete(*self.tree.get_children())
+        self.shown = query_stats.top(self.top_n, self.cb_sort.get())
+        for idx, s in enumerate(self.shown):
+            self.tree.insert("", "end", iid=str(idx), values=(
+                s.calls, f"{s.total_ms:,.1f}", f"{s.avg_ms:,.2f}", f"{s.max_ms:,.1f}", s.rows, s.caller, s.shape))
+
+    def explain_selected(self):
+        sel = self.tree.selection()
+        if not sel: return
+        stat = self.shown[int(sel[0])]
+        query, params = stat.sample
+        try:
+            plan = self.db.explain(query, params)
+        except Exception as e:
+            plan = [f"n/a: {e}"]
+        messagebox.showinfo("EXPLAIN QUERY PLAN", f"{stat.shape}\n\n" + "\n".join(plan), parent=self)
+
+    def export(self):
+        path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV", "*.csv")], parent=self)
+        if not path: return
+        try:
+            query_stats.export_csv(path, self.top_n)
+            messagebox.showinfo("Success", "Saved", parent=self)
+        except Exception as e:
+            messagebox.showerror("Error", f"Export failed: {e}", parent=self)
+
+    def reset(self):
+        query_stats.reset()
+        self.load()
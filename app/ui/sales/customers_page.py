@@ -1,13 +1,13 @@
 
 import customtkinter as ctk
 from tkinter import ttk, messagebox
-from app.database import DB
+from app.database import get_db
 
 class CustomersPage(ctk.CTkFrame):
-    def __init__(self, parent, controller=None):
+    def __init__(self, parent, controller=None, db=None):
         super().__init__(parent)
         self.controller = controller
-        self.db = DB()
+        self.db = db or get_db()
         
         header = ctk.CTkFrame(self, height=50)
         header.pack(fill="x", padx=10, pady=10)
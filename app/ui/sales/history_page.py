@@ -1,14 +1,14 @@
 
 import customtkinter as ctk
 from tkinter import ttk, messagebox
-from app.database import DB
+from app.database import get_db
 from .invoice_viewer import InvoiceViewer
 
 class HistoryPage(ctk.CTkFrame):
-    def __init__(self, parent, controller):
+    def __init__(self, parent, controller, db=None):
         super().__init__(parent)
         self.controller = controller
-        self.db = DB()  
+        self.db = db or get_db()
         
         header = ctk.CTkFrame(self, height=50)
         header.pack(fill="x", padx=10, pady=10)
@@ -57,27 +57,24 @@ class HistoryPage(ctk.CTkFrame):
         if not messagebox.askyesno("Confirm", "Delete Invoice? This will RESTORE items to their original store."): return
         
         iid = self.tree_inv.item(sel[0])['values'][0]
-        store_res = self.db.fetch_one("SELECT store_id FROM invoices WHERE id=?", (iid,))
-        sid = store_res[0] if store_res and store_res[0] else 1
+        with self.db.transaction() as tx:
+            store_res = tx.fetch_one("SELECT store_id FROM invoices WHERE id=?", (iid,))
+            sid = store_res[0] if store_res and store_res[0] else 1
         
-        details = self.db.fetch_all("SELECT item_detail_id, qty, IFNULL(returned_qty, 0) FROM invoice_details WHERE invoice_id=?", (iid,))
+            details = tx.fetch_all("SELECT item_detail_id, qty, IFNULL(returned_qty, 0) FROM invoice_details WHERE invoice_id=?", (iid,))
         
-        for did, qty, ret_qty in details:
-            restore_qty = qty - ret_qty
-            if restore_qty > 0:
-                exists = self.db.fetch_one("SELECT quantity FROM store_stock WHERE item_detail_id=? AND store_id=?", (did, sid))
-                if exists:
-                    self.db.execute("UPDATE store_stock SET quantity = quantity + ? WHERE item_detail_id=? AND store_id=?", (restore_qty, did, sid))
-                else:
-                    self.db.execute("INSERT INTO store_stock (item_detail_id, store_id, quantity) VALUES (?,?,?)", (did, sid, restore_qty))
+            for did, qty, ret_qty in details:
+                restore_qty = qty - ret_qty
+                if restore_qty > 0:
+                    tx.move_stock(did, sid, restore_qty)
 
-        # Delete related returns if any (optional but cleaner)
-        # self.db.execute("DELETE FROM returns WHERE invoice_id=?", (iid,)) 
-        # But we might keep them for logs? No, if invoice is gone, return links break.
-        # But cascading delete usually handles this. Let's just do the main cleanup.
+            # Delete related returns if any (optional but cleaner)
+            # self.db.execute("DELETE FROM returns WHERE invoice_id=?", (iid,)) 
+            # But we might keep them for logs? No, if invoice is gone, return links break.
+            # But cascading delete usually handles this. Let's just do the main cleanup.
 
-        self.db.execute("DELETE FROM invoices WHERE id=?", (iid,))
-        self.db.execute("DELETE FROM invoice_details WHERE invoice_id=?", (iid,))
+            tx.execute("DELETE FROM invoices WHERE id=?", (iid,))
+            tx.execute("DELETE FROM invoice_details WHERE invoice_id=?", (iid,))
         messagebox.showinfo("Success", "Invoice Deleted & Stock Restored")
         self.load()
         if hasattr(self.controller, 'refresh_views'): self.controller.refresh_views()
@@ -1,14 +1,14 @@
 
 import customtkinter as ctk
 from tkinter import ttk
-from app.database import DB
+from app.database import get_db
 
 class InvoiceViewer(ctk.CTkToplevel):
     def __init__(self, parent, invoice_id):
         super().__init__(parent)
         self.title(f"Invoice Details #{invoice_id}")
         self.geometry("1000x700")
-        self.db = DB()
+        self.db = get_db()
         self.invoice_id = invoice_id
         self.grab_set()
         
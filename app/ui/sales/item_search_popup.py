@@ -1,6 +1,7 @@
 
 import customtkinter as ctk
-from app.database import DB
+from app.database import get_db
+from app.search import SEARCH_FILTER, search_match
 
 class ItemSearchPopup(ctk.CTkToplevel):
     def __init__(self, parent, callback):
@@ -8,11 +9,16 @@ class ItemSearchPopup(ctk.CTkToplevel):
         self.title("بحث متطور عن صنف")
         self.geometry("500x400")
         self.callback = callback
-        self.db = DB()
+        self.db = get_db()
         self.grab_set()
         
         ctk.CTkLabel(self, text="اختر مواصفات المنتج:", font=("Arial", 16, "bold")).pack(pady=10)
         
+        # 0. Quick filter (item_search index): narrows the names list as you type
+        self.ent_filter = ctk.CTkEntry(self, width=300, placeholder_text="بحث بالاسم أو اللون أو الكود...", font=("Arial", 12), justify="right")
+        self.ent_filter.pack(pady=5)
+        self.ent_filter.bind("<KeyRelease>", lambda e: self.load_names())
+        
         # 1. Product Name
         ctk.CTkLabel(self, text="اسم الصنف:", font=("Arial", 12)).pack(pady=(10,0))
         self.cb_name = ctk.CTkComboBox(self, width=300, command=self.on_name_change, font=("Arial", 12), dropdown_font=("Arial", 12))
@@ -46,14 +52,23 @@ class ItemSearchPopup(ctk.CTkToplevel):
             FROM items i
             JOIN item_details d ON i.id = d.item_id
             WHERE d.barcode NOT LIKE 'HD%'
-            ORDER BY i.name
         """
-        names = self.db.fetch_all(sql)
+        params = []
+        match = search_match(self.ent_filter.get())
+        if match:
+            sql += f" AND {SEARCH_FILTER}"
+            params.append(match)
+        names = self.db.fetch_all(sql + " ORDER BY i.name", params)
         vals = [n[0] for n in names]
         self.cb_name.configure(values=vals)
         if vals: 
             self.cb_name.set(vals[0])
             self.on_name_change(vals[0])
+        else:
+            self.cb_name.set("")
+            self.current_barcode = None
+            self.lbl_info.configure(text="غير موجود")
+            self.btn_add.configure(state="disabled")
 
     def on_name_change(self, choice):
         sql = """
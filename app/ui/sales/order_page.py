@@ -4,32 +4,31 @@ from tkinter import messagebox
 from datetime import date
 import sqlite3
 import os
-import urllib.parse
 import tempfile
 import webbrowser
 import subprocess
 from tkinter import filedialog
 from app.config_manager import ConfigManager
 
-from app.database import DB
+from app.database import get_db
+from app.catalog import get_catalog
+from app.cart import Cart, to_float
+from app.ui.cart_view import CartView, Column
+from app.invoices import SaleLine, stock_shortfalls, write_sale_lines, edit_sale_lines
+from app.invoice_pdf import whatsapp_url
+from app.pdf_queue import get_pdf_queue
 from app.config import COLS
 from app.utils import fix_text, WHATSAPP_AVAILABLE, REPORTLAB_AVAILABLE
 from .item_search_popup import ItemSearchPopup
 from app.ui.sales.design_gallery_popup import DesignGalleryPopup
 
-# Conditional Import for ReportLab
-if REPORTLAB_AVAILABLE:
-    from app.utils import (
-        SimpleDocTemplate, A4, A5, Table, TableStyle, Paragraph, Spacer, 
-        colors, getSampleStyleSheet, ParagraphStyle, pdfmetrics, TTFont, RLImage as Image
-    )
-
 class OrderPage(ctk.CTkFrame):
-    def __init__(self, parent, controller):
+    def __init__(self, parent, controller, db=None):
         super().__init__(parent)
         self.controller = controller
-        self.db = DB()
-        self.cart_items = []
+        self.db = db or get_db()
+        self.catalog = get_catalog()
+        self.cart = Cart()  # lines + running totals; each row dict holds its line key in d["line"]
         self.editing_id = None
         
         # Flag to track if user manually typed in Paid field
@@ -38,6 +37,7 @@ class OrderPage(ctk.CTkFrame):
         # For WhatsApp integration
         self.last_saved_invoice_id = None
         self.last_saved_customer_phone = None
+        self.last_pdf_path = None
 
         # --- Top Panel ---
         self.top_panel = ctk.CTkFrame(self, fg_color="gray20", corner_radius=10)
@@ -98,8 +98,31 @@ class OrderPage(ctk.CTkFrame):
         for text, width in [("Barcode", COLS["barcode"]), ("Item Name", COLS["name"]), ("Color", COLS["color"]), ("Size", COLS["size"]), ("Design/Print", COLS["design"]), ("Qty", COLS["qty"]), ("Price", COLS["price"]), ("Total", COLS["total"]), ("Del", COLS["action"])]:
             ctk.CTkLabel(self.grid_header, text=text, width=width, font=("Arial", 12, "bold")).pack(side="left", padx=2)
         
-        self.scroll_frame = ctk.CTkScrollableFrame(self, height=200)
-        self.scroll_frame.pack(fill="both", expand=True, padx=15, pady=5)
+        # Virtualized rows: widgets only for the visible lines, pooled across invoices (app/ui/cart_view.py)
+        self.vcmd = (self.register(self.validate_number), '%P')
+        entry = {"height": 28, "font": ("Arial", 12)}
+        self.cart_view = CartView(self, [
+            Column("barcode", "entry", COLS["barcode"]-35, {**entry, "placeholder_text": "Scan"}),
+            Column("search", "button", 30, {"text": "🔍", "height": 28, "fg_color": "#3498DB", "font": ("Arial", 12)}),
+            Column("name", "entry", COLS["name"], {**entry, "state": "readonly"}),
+            Column("color", "entry", COLS["color"], {**entry, "state": "readonly"}),
+            Column("size", "entry", COLS["size"], {**entry, "state": "readonly"}),
+            Column("design", "combo", 120, {"font": ("Arial", 12), "dropdown_font": ("Arial", 12)}),
+            Column("gallery", "button", 30, {"text": "🖼️", "height": 28, "fg_color": "#E74C3C", "font": ("Arial", 12)}),
+            Column("qty", "entry", COLS["qty"], {**entry, "validate": "key", "validatecommand": self.vcmd}),
+            Column("price", "entry", COLS["price"], {**entry, "validate": "key", "validatecommand": self.vcmd}), # This will hold Base + Design Price
+            Column("total_lbl", "label", COLS["total"], {"font": ("Arial", 12)}),
+            Column("delete", "button", 30, {"text": "X", "height": 25, "fg_color": "#C0392B", "font": ("Arial", 10)}),
+        ], commands={"search": self.open_search_popup, "design": self.on_design_change,
+                     "gallery": self.open_design_gallery, "delete": self.del_row},
+           bindings={"barcode": {"<Return>": self.lookup},
+                     "qty": {"<KeyRelease>": self.calc_row}, "price": {"<KeyRelease>": self.calc_row},
+                     # Bind FocusOut or Return to handle typed barcodes
+                     "design": {"<Return>": lambda d: self.on_design_change(d, d["design"].get()),
+                                "<FocusOut>": lambda d: self.on_design_change(d, d["design"].get())}},
+           height=200)
+        self.cart_view.pack(fill="both", expand=True, padx=15, pady=5)
+        self.cart_items = self.cart_view.rows  # row dicts: Fields + "id" / "line"
 
         # --- Footer ---
         self.footer = ctk.CTkFrame(self, height=180, fg_color="gray20", border_width=1, border_color="gray40")
@@ -158,8 +181,10 @@ class OrderPage(ctk.CTkFrame):
         ctk.CTkButton(btn_row, text="+ Item (F2)", command=self.add_row, width=80, fg_color="#3B8ED0", font=("Arial", 12)).pack(side="left")
         self.btn_save = ctk.CTkButton(btn_row, text="SAVE (F5)", command=self.save_invoice, fg_color="#2CC985", text_color="black", font=("Arial", 14, "bold"), width=120)
         self.btn_save.pack(side="right")
-        
-        self.vcmd = (self.register(self.validate_number), '%P')
+        # Invoice PDFs are written in the background; this shows what's pending / failed
+        self.lbl_pdf_queue = ctk.CTkLabel(btn_row, text="", font=("Arial", 11), cursor="hand2")
+        self.lbl_pdf_queue.pack(side="right", padx=8)
+        self.lbl_pdf_queue.bind("<Button-1>", self.on_pdf_status_click)
         
         # Apply validation
         self.ent_disc_pct.configure(validate="key", validatecommand=self.vcmd)
@@ -190,7 +215,7 @@ class OrderPage(ctk.CTkFrame):
         ItemSearchPopup(self, cb)
 
     def validate_rules(self, store_id):
-        error_messages = []
+        wanted, names = {}, {}
         has_hoodie = False
         has_hd_design = False
         for item in self.cart_items:
@@ -202,36 +227,53 @@ class OrderPage(ctk.CTkFrame):
                 if barcode.startswith("HD"): has_hd_design = True
                 else: has_hoodie = True
                 if barcode.startswith("HD"): continue 
-                res = self.db.fetch_one("SELECT quantity FROM store_stock WHERE item_detail_id=? AND store_id=?", (item['id'], store_id))
-                current_stock = res[0] if res else 0
-                if self.editing_id:
-                    old = self.db.fetch_one("SELECT qty FROM invoice_details WHERE invoice_id=? AND item_detail_id=?", (self.editing_id, item['id']))
-                    if old: current_stock += old[0]
-                if current_stock < req_qty:
-                    error_messages.append(f"• {name}: Req {int(req_qty)} / Avail {int(current_stock)}")
+                # Same SKU on several rows: checked against its total
+                wanted[item['id']] = wanted.get(item['id'], 0) + req_qty
+                names.setdefault(item['id'], name)
         if has_hd_design and not has_hoodie: return False, "❌ Error: Cannot sell HD design without a hoodie in the invoice!"
+        # One query for the whole cart (the edited invoice's own lines count as available)
+        error_messages = [f"• {names[sku_id]}: Req {int(req_qty)} / Avail {int(current_stock)}"
+                          for sku_id, req_qty, current_stock in stock_shortfalls(self.db, store_id, wanted, self.editing_id)]
         if error_messages: return False, "Insufficient Stock for:\n" + "\n".join(error_messages)
         return True, None
 
+    def sale_lines(self):
+        """The cart as SaleLine batch rows (app/invoices.py), parsed before the transaction opens."""
+        lines = []
+        for item in self.cart_items:
+            if item['id']:
+                qty = float(item['qty'].get()); price = float(item['price'].get())
+                
+                # Store Design Name in item_note if selected
+                design_name = ""
+                design_val = item.get("design").get().strip() # Combobox value
+                hd_key = None
+                
+                if design_val and design_val != "Plain / سادة":
+                     # Check if it's a full key or a barcode
+                     if hasattr(self, 'hd_map') and design_val in self.hd_map:
+                         hd_key = design_val
+                     elif hasattr(self, 'hd_barcode_lookup') and design_val.upper() in self.hd_barcode_lookup:
+                         hd_key = self.hd_barcode_lookup[design_val.upper()]
+                
+                hd_id = None
+                if hd_key and hasattr(self, 'hd_map'):
+                     design_name = f" [{self.hd_map[hd_key]['name']}]"
+                     hd_id = self.hd_map[hd_key]["id"]  # HD Design Stock is ALWAYS deducted from Main Stock
+                
+                lines.append(SaleLine(item['id'], qty, price, design_name, hd_id, item.get('detail_id')))
+        return lines
+
     def save_invoice(self):
         try:
             cust = self.ent_cust_name.get()
             if not cust: return messagebox.showerror("Error", "Customer name required")
             if not self.cart_items: return messagebox.showerror("Error", "Invoice is empty")
-            store_res = self.db.fetch_one("SELECT id FROM stores WHERE name=?", (self.cb_store.get(),))
-            if not store_res: return messagebox.showerror("Error", "Select a store")
-            store_id = store_res[0]
+            store_id = self.db.dim_id("stores", self.cb_store.get())
+            if not store_id: return messagebox.showerror("Error", "Select a store")
             valid, msg = self.validate_rules(store_id)
             if not valid: return messagebox.showerror("Warning", msg)
-            safe_id = None
-            if self.cb_safe.get():
-                safe_res = self.db.fetch_one("SELECT id FROM safes WHERE name=?", (self.cb_safe.get(),))
-                if safe_res: safe_id = safe_res[0]
-            if not self.cust_id:
-                self.cust_id = self.db.execute("INSERT INTO customers (name, phone, address) VALUES (?,?,?)", (cust, self.phone_var.get(), self.ent_cust_addr.get()))
-            else:
-                 self.db.execute("UPDATE customers SET phone=?, address=? WHERE id=?", (self.phone_var.get(), self.ent_cust_addr.get(), self.cust_id))
-            
+            safe_id = self.db.dim_id("safes", self.cb_safe.get())
             net = float(self.out_net.get())
             disc_val = float(self.ent_disc_pct.get() or 0)
             ship = float(self.ent_shipping.get() or 0)
@@ -239,72 +281,38 @@ class OrderPage(ctk.CTkFrame):
             except: paid = 0.0
             remaining = net - paid
             notes = self.txt_notes.get("1.0", "end").strip()
-            
-            inv_id = self.editing_id
-            if inv_id:
-                old_store_id = self.db.fetch_one("SELECT store_id FROM invoices WHERE id=?", (inv_id,))[0]
-                old_items = self.db.fetch_all("SELECT item_detail_id, qty FROM invoice_details WHERE invoice_id=?", (inv_id,))
-                for did, qty in old_items:
-                    self.db.execute("UPDATE store_stock SET quantity = quantity + ? WHERE item_detail_id=? AND store_id=?", (qty, did, old_store_id))
-                self.db.execute("DELETE FROM invoice_details WHERE invoice_id=?", (inv_id,))
-                self.db.execute("""UPDATE invoices SET date=?, customer_id=?, net_total=?, paid_amount=?, remaining_amount=?, store_id=?, safe_id=?, payment_method=?, delegate_name=?, channel=?, discount_percent=?, shipping_cost=?, notes=? WHERE id=?""", 
-                                (date.today(), self.cust_id, net, paid, remaining, store_id, safe_id, self.cb_pay_method.get(), self.cb_delivery_agent.get(), self.cb_channel.get(), disc_val, ship, notes, inv_id))
-            else:
-                inv_id = self.db.execute("""INSERT INTO invoices (date, customer_id, net_total, paid_amount, remaining_amount, store_id, safe_id, payment_method, delegate_name, channel, discount_percent, shipping_cost, notes) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)""", 
-                                         (date.today(), self.cust_id, net, paid, remaining, store_id, safe_id, self.cb_pay_method.get(), self.cb_delivery_agent.get(), self.cb_channel.get(), disc_val, ship, notes))
+            lines = self.sale_lines()
             # Find Central "Main Stock" ID for HD Designs
-            main_stock_res = self.db.fetch_one("SELECT id FROM stores WHERE name LIKE 'Main Stock%' ORDER BY id ASC")
             # Default to ID 1 if not found, as per business logic (Raw materials in Main)
-            main_stock_id = main_stock_res[0] if main_stock_res else 1
-
-            for item in self.cart_items:
-                if item['id']:
-                    qty = float(item['qty'].get()); price = float(item['price'].get())
-                    
-                    # Store Design Name in item_note if selected
-                    design_name = ""
-                    design_val = item.get("design").get().strip() # Combobox value
-                    hd_key = None
-                    
-                    if design_val and design_val != "Plain / سادة":
-                         # Check if it's a full key or a barcode
-                         if hasattr(self, 'hd_map') and design_val in self.hd_map:
-                             hd_key = design_val
-                         elif hasattr(self, 'hd_barcode_lookup') and design_val.upper() in self.hd_barcode_lookup:
-                             hd_key = self.hd_barcode_lookup[design_val.upper()]
-                    
-                    if hd_key and hasattr(self, 'hd_map'):
-                         raw_name = self.hd_map[hd_key]["name"]
-                         design_name = f" [{raw_name}]"
-                    
-                    # ========================================
-                    # FETCH CURRENT COST (For Profit Calculation)
-                    # ========================================
-                    current_cost = self.db.fetch_one("SELECT buy_price FROM item_details WHERE id=?", (item['id'],))
-                    cost_at_sale_val = current_cost[0] if current_cost else 0
-                    
-                    # Insert into invoice_details with item_note AND cost_at_sale
-                    self.db.execute("""INSERT INTO invoice_details 
-                        (invoice_id, item_detail_id, qty, price, total, item_note, cost_at_sale) 
-                        VALUES (?,?,?,?,?,?,?)""", 
-                        (inv_id, item['id'], qty, price, qty*price, design_name, cost_at_sale_val))
-                    
-                    # Deduct Main Item Stock (From Sales Store)
-                    exists = self.db.fetch_one("SELECT 1 FROM store_stock WHERE item_detail_id=? AND store_id=?", (item['id'], store_id))
-                    if exists: self.db.execute("UPDATE store_stock SET quantity = quantity - ? WHERE item_detail_id=? AND store_id=?", (qty, item['id'], store_id))
-                    else: self.db.execute("INSERT INTO store_stock (item_detail_id, store_id, quantity) VALUES (?,?,?)", (item['id'], store_id, -qty))
-                    
-                    # Deduct HD Design Stock (ALWAYS From Main Stock)
-                    if hd_key and hasattr(self, 'hd_map'):
-                        hd_id = self.hd_map[hd_key]["id"]
-                        # Check exist in Main Stock
-                        hd_exists = self.db.fetch_one("SELECT 1 FROM store_stock WHERE item_detail_id=? AND store_id=?", (hd_id, main_stock_id))
-                        if hd_exists: self.db.execute("UPDATE store_stock SET quantity = quantity - ? WHERE item_detail_id=? AND store_id=?", (qty, hd_id, main_stock_id))
-                        else: self.db.execute("INSERT INTO store_stock (item_detail_id, store_id, quantity) VALUES (?,?,?)", (hd_id, main_stock_id, -qty))
-            
+            main_stock_id = min((sid for name, sid in self.db.dim_map("stores").items()
+                                 if name and name.lower().startswith("main stock")), default=1)  # stores.name may be NULL
+            
+            # One unit of work: customer, header, details and stock commit together or not at all
+            with self.db.transaction() as tx:
+                cust_id = self.cust_id
+                if not cust_id:
+                    cust_id = tx.execute("INSERT INTO customers (name, phone, address) VALUES (?,?,?)", (cust, self.phone_var.get(), self.ent_cust_addr.get()))
+                else:
+                     tx.execute("UPDATE customers SET phone=?, address=? WHERE id=?", (self.phone_var.get(), self.ent_cust_addr.get(), cust_id))
+
+                inv_id = self.editing_id
+                if inv_id:
+                    old_store_id = tx.fetch_one("SELECT store_id FROM invoices WHERE id=?", (inv_id,))[0]
+                    # Only the lines that changed are rewritten; kept lines keep cost_at_sale and returned_qty
+                    edit_sale_lines(tx, inv_id, old_store_id, store_id, lines, main_stock_id)
+                    tx.execute("""UPDATE invoices SET date=?, customer_id=?, net_total=?, paid_amount=?, remaining_amount=?, store_id=?, safe_id=?, payment_method=?, delegate_name=?, channel=?, discount_percent=?, shipping_cost=?, notes=? WHERE id=?""", 
+                                    (date.today(), cust_id, net, paid, remaining, store_id, safe_id, self.cb_pay_method.get(), self.cb_delivery_agent.get(), self.cb_channel.get(), disc_val, ship, notes, inv_id))
+                else:
+                    inv_id = tx.execute("""INSERT INTO invoices (date, customer_id, net_total, paid_amount, remaining_amount, store_id, safe_id, payment_method, delegate_name, channel, discount_percent, shipping_cost, notes) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)""", 
+                                             (date.today(), cust_id, net, paid, remaining, store_id, safe_id, self.cb_pay_method.get(), self.cb_delivery_agent.get(), self.cb_channel.get(), disc_val, ship, notes))
+                    # Details (with cost_at_sale) and stock (sales store + HD designs from Main Stock) as one batch
+                    write_sale_lines(tx, inv_id, store_id, lines, main_stock_id)
+            self.cust_id = cust_id
+
             self.last_saved_invoice_id = inv_id
             self.last_saved_customer_phone = self.phone_var.get()
             
+            # The PDF is queued, not waited on: the form resets for the next customer right away
             if WHATSAPP_AVAILABLE and self.last_saved_customer_phone and self.last_saved_customer_phone.strip() != "+20":
                 msg = messagebox.askyesno("Saved", f"Invoice #{inv_id} Saved!\nPaid: {paid} | Due: {remaining}\n\nSend via WhatsApp?")
                 self.generate_invoice_pdf(inv_id, open_whatsapp=msg)
@@ -324,13 +332,11 @@ class OrderPage(ctk.CTkFrame):
 
     def grand_total(self, e=None):
         try:
-            sub = sum(float(i['total_lbl'].cget('text')) for i in self.cart_items)
-            self.update_field(self.out_subtotal, sub)
-            try: disc_val = float(self.ent_disc_pct.get())
-            except: disc_val = 0.0
-            try: ship_val = float(self.ent_shipping.get())
-            except: ship_val = 0.0
-            net = (sub - disc_val) + ship_val
+            # Totals are running sums in the cart model, nothing is re-added per keystroke
+            self.cart.discount = to_float(self.ent_disc_pct.get())
+            self.cart.shipping = to_float(self.ent_shipping.get())
+            self.update_field(self.out_subtotal, self.cart.subtotal)
+            net = self.cart.net
             self.update_field(self.out_net, net)
             
             if not self.paid_manually_edited:
@@ -355,257 +361,58 @@ class OrderPage(ctk.CTkFrame):
         widget.configure(state="normal"); widget.delete(0, "end"); widget.insert(0, f"{value:.2f}"); widget.configure(state="readonly")
     
     def generate_invoice_pdf(self, invoice_id, open_whatsapp=False):
-        try:
-            if not REPORTLAB_AVAILABLE:
-                messagebox.showerror("Error", "ReportLab library not installed")
-                return
-            
-            # Ensure directory exists
-            cm = ConfigManager()
-            save_dir = cm.get_save_dir()
-            if not save_dir or not os.path.exists(save_dir):
-                messagebox.showinfo("Settings", "Please select a folder to save invoices (will be default)")
-                save_dir = filedialog.askdirectory(title="Select Invoice Folder")
-                if save_dir:
-                    cm.set_save_dir(save_dir)
-                else:
-                    return # User cancelled
-            
-            # Helper to fetch data (unchanged)
-            sql = """SELECT i.date, c.name, c.phone, c.address, s.name, i.payment_method, i.delegate_name, i.discount_percent, i.tax_percent, i.shipping_cost, i.notes, i.paid_amount, i.remaining_amount, i.net_total FROM invoices i LEFT JOIN customers c ON i.customer_id=c.id LEFT JOIN stores s ON i.store_id=s.id WHERE i.id=?"""
-            inv_data = self.db.fetch_one(sql, (invoice_id,))
-            if not inv_data: 
-                messagebox.showerror("Error", "Invoice not found")
-                return
-
-            cust_name = inv_data[1] or "Client"
-            safe_cust_name = "".join([c for c in cust_name if c.isalnum() or c in (' ', '_', '-')]).strip()
-            pdf_filename = f"Inv_{invoice_id}_{safe_cust_name}.pdf"
-            pdf_path = os.path.join(save_dir, pdf_filename)
-
-            # Updated query to fetch item_note
-            items = self.db.fetch_all("""SELECT d.barcode, i.name, c.name, s.name, id.qty, id.price, id.total, id.item_note FROM invoice_details id JOIN item_details d ON id.item_detail_id = d.id JOIN items i ON d.item_id = i.id LEFT JOIN colors c ON d.color_id = c.id LEFT JOIN sizes s ON d.size_id = s.id WHERE id.invoice_id = ?""", (invoice_id,))
-            
-            # --- Professional PDF Design using ReportLab (A5) ---
-            doc = SimpleDocTemplate(pdf_path, pagesize=A5, rightMargin=20, leftMargin=20, topMargin=20, bottomMargin=20)
-            elements = []
-            
-            # Styles
-            styles = getSampleStyleSheet()
-            font_name = 'Helvetica' # English Only
-            title_style = ParagraphStyle(name='TitleStyle', fontName='Helvetica-Bold', fontSize=16, leading=20, alignment=1, textColor=colors.HexColor("#2C3E50"))
-            normal_center = ParagraphStyle(name='NormalCenter', fontName='Helvetica', fontSize=10, alignment=1, textColor=colors.black)
-            normal_right = ParagraphStyle(name='NormalRight', fontName='Helvetica', fontSize=9, alignment=2)
-            normal_left = ParagraphStyle(name='NormalLeft', fontName='Helvetica', fontSize=9, alignment=0)
-            
-            # --- 1. Header Section ---
-            # Logo (Left) | Invoice Info (Right) - 2 Columns
-            logo_path = os.path.join("assets", "logo.png")
-            logo_obj = None
-            if os.path.exists(logo_path):
-                 try:
-                    from reportlab.lib.utils import ImageReader
-                    img = ImageReader(logo_path)
-                    iw, ih = img.getSize()
-                    aspect = ih / float(iw)
-                    logo_w = 80
-                    logo_h = logo_w * aspect
-                    logo_obj = Image(logo_path, width=logo_w, height=logo_h)
-                 except: pass
-
-            if not logo_obj:
-                logo_obj = Paragraph("<b>HISTORIA</b>", ParagraphStyle('LogoText', fontName='Helvetica-Bold', fontSize=18, textColor=colors.HexColor("#2C3E50")))
-
-            date_str = inv_data[0]
-            inv_num_text = Paragraph(f"<b>INVOICE #{invoice_id}</b><br/>Date: {date_str}", 
-                                     ParagraphStyle('InvNum', fontName='Helvetica', fontSize=11, alignment=2, leading=14))
-            
-            # Header Table (2 Cols: Logo, Info)
-            # Total A5 width ~420. Margins 20+20=40. Usable ~380.
-            # Logo Col: 190, Info Col: 190
-            header_data = [[logo_obj, inv_num_text]]
-            header_table = Table(header_data, colWidths=[190, 190])
-            header_table.setStyle(TableStyle([
-                ('ALIGN', (0,0), (0,0), 'LEFT'),   # Logo
-                ('ALIGN', (1,0), (1,0), 'RIGHT'),  # Info
-                ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-            ]))
-            elements.append(header_table)
-            elements.append(Spacer(1, 10))
-            elements.append(Paragraph("_"*65, normal_center)) 
-            elements.append(Spacer(1, 10))
-
-            # --- 2. Information Section (2 Columns) ---
-            cust_name = inv_data[1] or 'Unknown'
-            cust_phone = inv_data[2] or '-'
-            cust_addr = inv_data[3] or '-'
-            
-            store_name = inv_data[4] or 'Main Branch'
-            pay_method = inv_data[5] or 'Cash'
-            
-            # Left: Customer, Right: Store/Payment (Swapped for English LTR flow)
-            # Actually standard English invoice: Customer on Left usually.
-            
-            left_col_text = [
-                f"<b>Customer:</b> {cust_name}",
-                f"<b>Phone:</b> {cust_phone}",
-                f"<b>Address:</b> {cust_addr}"
-            ]
-            right_col_text = [
-                f"<b>Store:</b> {store_name}",
-                f"<b>Payment:</b> {pay_method}"
-            ]
-            
-            p_left = Paragraph("<br/>".join(left_col_text), ParagraphStyle('InfoLeft', fontName='Helvetica', fontSize=10, leading=14, alignment=0))
-            p_right = Paragraph("<br/>".join(right_col_text), ParagraphStyle('InfoRight', fontName='Helvetica', fontSize=10, leading=14, alignment=2)) # Align right for balance
-            
-            # 2 Columns of ~190 each
-            info_data = [[p_left, p_right]]
-            info_table = Table(info_data, colWidths=[190, 190])
-            info_table.setStyle(TableStyle([
-                ('VALIGN', (0,0), (-1,-1), 'TOP'),
-                ('LEFTPADDING', (0,0), (-1,-1), 5),
-                ('RIGHTPADDING', (0,0), (-1,-1), 5),
-            ]))
-            elements.append(info_table)
-            elements.append(Spacer(1, 15))
-
-            # --- 3. Items Grid ---
-            headers = ["Item", "Color", "Size", "Qty", "Price", "Total"]
-            table_data = [headers]
-            
-            subtotal = 0
-            for item in items:
-                barcode, name, color, size, qty, price, total, item_note = item
-                
-                # Append item_note if exists
-                display_name = name
-                if item_note:
-                    display_name += f" {item_note}"
-
-                row = [
-                    # name[:20] + '..' if len(name)>20 else name, # Item Name (Barcode removed to save space or merge?)
-                    # User requested: "Item", "Color", "Size", "Qty", "Price", "Total"
-                    # I will put Item Name in first col.
-                    display_name[:30] + '..' if len(display_name)>30 else display_name,
-                    color or '-',
-                    size or '-',
-                    str(int(qty)),
-                    f"{price:.2f}",
-                    f"{total:.2f}"
-                ]
-                table_data.append(row)
-                subtotal += total
-                
-            # Adjusted Column Widths for A5 (Total ~380)
-            # [130, 45, 35, 35, 60, 75] = 380
-            col_widths = [130, 45, 35, 35, 60, 75]
-            t = Table(table_data, colWidths=col_widths, repeatRows=1)
-            
-            t.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#2C3E50")),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10), 
-                ('FONTSIZE', (0, 1), (-1, -1), 9), 
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.whitesmoke]),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-                ('TOPPADDING', (0, 0), (-1, -1), 4),
-            ]))
-            elements.append(t)
-            elements.append(Spacer(1, 15))
-
-            # --- 4. Totals Footer ---
-            discount_amount = inv_data[7] or 0 # Correct index check? 
-            # SQL: date, c.name, c.phone, c.address, s.name, i.payment_method, i.delegate_name, i.discount_percent...
-            # Indices: 0, 1, 2, 3, 4, 5, 6, 7 (disc), 8 (tax), 9 (ship), 10 (notes), 11 (paid), 12 (rem), 13 (net)
-            
-            tax_percent = inv_data[8] or 0
-            shipping_cost = inv_data[9] or 0
-            
-            # Discount is Fixed Amount (LE)
-            discount_value = discount_amount
-            after_discount = subtotal - discount_value
-            tax_value = after_discount * (tax_percent / 100)
-            net_total = after_discount + tax_value + shipping_cost
-            # Align totals to the Left (or visual right for Arabic, but let's stack them nicely)
-            
-            totals_data = []
-            totals_data.append(["Subtotal:", f"{subtotal:,.2f}"])
-            
-            # Always show Discount, Shipping, Tax
-            disc_str = f"-{discount_value:,.2f}" if discount_value > 0 else "0.00"
-            totals_data.append(["Discount:", disc_str])
-            
-            totals_data.append(["Shipping:", f"{shipping_cost:,.2f}"])
-            totals_data.append(["Tax:", f"{tax_value:,.2f}"])
-                
-            totals_data.append(["NET TOTAL:", f"{net_total:,.2f}"])
-            
-            totals_table = Table(totals_data, colWidths=[100, 120])
-            totals_table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('ALIGN', (0, 0), (0, -1), 'RIGHT'), # Labels
-                ('ALIGN', (1, 0), (1, -1), 'LEFT'),  # Values
-                ('FONTSIZE', (0, 0), (-1, -2), 10),
-                ('FONTSIZE', (0, -1), (-1, -1), 14), # Net Total Big
-                ('TEXTCOLOR', (0, -1), (-1, -1), colors.HexColor("#2C3E50")),
-                ('LINEABOVE', (0, -1), (-1, -1), 1, colors.black),
-                ('TOPPADDING', (0, -1), (-1, -1), 5),
-                ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-            ]))
-            
-            # Wrap totals table
-            wrapper_table = Table([[None, totals_table]], colWidths=[160, 220])
-            wrapper_table.setStyle(TableStyle([('VALIGN', (0,0), (-1,-1), 'TOP')]))
-            elements.append(wrapper_table)
-
-            # Paid/Remaining
-            elements.append(Spacer(1, 10))
-            paid_amount = inv_data[11] or 0
-            remaining_amount = inv_data[12] or 0
-            if paid_amount > 0 or remaining_amount > 0:
-                payment_info = [
-                    f"Paid: {paid_amount:,.2f}",
-                    f"Remaining: {remaining_amount:,.2f}"
-                ]
-                elements.append(Paragraph("  |  ".join(payment_info), ParagraphStyle('PayInfo', fontName='Helvetica', fontSize=11, alignment=1)))
-            
-            # Notes
-            if inv_data[10]:
-                elements.append(Spacer(1, 10))
-                elements.append(Paragraph(f"Notes: {inv_data[10]}", ParagraphStyle('Notes', fontName='Helvetica', fontSize=10, textColor=colors.grey)))
-            
-            # --- 5. Footer Slogan ---
-            elements.append(Spacer(1, 20))
-            elements.append(Paragraph("_"*65, normal_center))
-            elements.append(Spacer(1, 10))
-            elements.append(Paragraph("Thank you for shopping with HISTORIA", ParagraphStyle('Footer1', fontName='Helvetica', fontSize=10, alignment=1)))
-            elements.append(Spacer(1, 15)) # Increased spacing as requested
-            elements.append(Paragraph("Fashion that tells a story", ParagraphStyle('FooterEn', fontName='Helvetica-Oblique', fontSize=10, alignment=1, textColor=colors.grey)))
-
-            doc.build(elements)
-            
-            # --- WhatsApp Desktop Protocol ---
-            if open_whatsapp:
-                phone = self.last_saved_customer_phone.replace(" ", "").replace("-", "")
-                if not phone.startswith("+"):
-                    phone = f"+{phone}"
-                
-                invoice_msg = f"Invoice #{invoice_id}"
-                encoded_msg = urllib.parse.quote(invoice_msg)
-                
-                whatsapp_url = f"whatsapp://send?phone={phone}&text={encoded_msg}"
-                webbrowser.open(whatsapp_url)
-                messagebox.showinfo("Done", f"Saved to:\n{pdf_path}\n\nWhatsApp opened. Please attach file manually.")
+        """Queues the invoice's PDF (app/pdf_queue.py); the form doesn't wait for it."""
+        if not REPORTLAB_AVAILABLE:
+            messagebox.showerror("Error", "ReportLab library not installed")
+            return
+
+        # Ensure directory exists
+        cm = ConfigManager()
+        save_dir = cm.get_save_dir()
+        if not save_dir or not os.path.exists(save_dir):
+            messagebox.showinfo("Settings", "Please select a folder to save invoices (will be default)")
+            save_dir = filedialog.askdirectory(title="Select Invoice Folder")
+            if save_dir:
+                cm.set_save_dir(save_dir)
             else:
-                messagebox.showinfo("Done", f"Saved to:\n{pdf_path}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Error: {e}")
-            import traceback
-            traceback.print_exc()
+                return # User cancelled
+
+        # The phone is taken now: by the time the PDF is written the form holds the next customer
+        phone = self.last_saved_customer_phone if open_whatsapp else None
+        get_pdf_queue().render(self, invoice_id, save_dir,
+                               on_done=lambda path: self.on_pdf_done(invoice_id, path, phone),
+                               on_error=lambda err: self.update_pdf_status())
+        self.update_pdf_status()
+
+    def on_pdf_done(self, invoice_id, pdf_path, phone):
+        self.last_pdf_path = pdf_path
+        if phone:
+            # --- WhatsApp Desktop Protocol --- (the PDF is attached manually)
+            webbrowser.open(whatsapp_url(phone, invoice_id))
+        self.update_pdf_status()
+
+    def update_pdf_status(self):
+        """Queue indicator next to SAVE: PDFs pending / failed, else the last one written (click to open)."""
+        queue = get_pdf_queue()
+        parts = []
+        if queue.jobs: parts.append(f"PDF: {len(queue.jobs)} pending")
+        if queue.failed: parts.append(f"{len(queue.failed)} failed (click)")
+        if not parts and self.last_pdf_path: parts.append(os.path.basename(self.last_pdf_path))
+        color = "#E74C3C" if queue.failed else "#E67E22" if queue.jobs else "#27AE60"
+        self.lbl_pdf_queue.configure(text=" | ".join(parts), text_color=color)
+
+    def on_pdf_status_click(self, e=None):
+        queue = get_pdf_queue()
+        if queue.failed:
+            errors = "\n".join(f"Invoice #{iid}: {err}" for iid, err in queue.failed.items())
+            if messagebox.askyesno("PDF Failed", f"{errors}\n\nRetry? (No = dismiss)"):
+                for iid in list(queue.failed):
+                    self.generate_invoice_pdf(iid)
+            else:
+                queue.failed.clear()
+            self.update_pdf_status()
+        elif self.last_pdf_path and os.path.exists(self.last_pdf_path):
+            webbrowser.open(self.last_pdf_path)
 
     def load_for_edit(self, iid):
         self.editing_id = iid
@@ -630,67 +437,29 @@ class OrderPage(ctk.CTkFrame):
         self.ent_paid.delete(0, "end"); self.ent_paid.insert(0, str(row[13] or 0))
         self.paid_manually_edited = True 
         
-        for w in self.scroll_frame.winfo_children(): w.destroy()
-        self.cart_items = []
-        items = self.db.fetch_all("""SELECT d.barcode, i.name, c.name, s.name, id.qty, id.price, d.id, id.item_note FROM invoice_details id JOIN item_details d ON id.item_detail_id=d.id JOIN items i ON d.item_id=i.id LEFT JOIN colors c ON d.color_id=c.id LEFT JOIN sizes s ON d.size_id=s.id WHERE id.invoice_id=?""", (iid,))
+        self.cart_view.clear()
+        self.cart.clear()
+        items = self.db.fetch_all("""SELECT d.barcode, i.name, c.name, s.name, id.qty, id.price, d.id, id.item_note, id.id FROM invoice_details id JOIN item_details d ON id.item_detail_id=d.id JOIN items i ON d.item_id=i.id LEFT JOIN colors c ON d.color_id=c.id LEFT JOIN sizes s ON d.size_id=s.id WHERE id.invoice_id=?""", (iid,))
         for it in items: self.add_row_populated(it)
         self.grand_total()
 
     def add_row_populated(self, data):
-        row = ctk.CTkFrame(self.scroll_frame, height=35, fg_color="transparent")
-        row.pack(fill="x", pady=2); row.pack_propagate(False)
-        entries = {}
-        def mk(key, w, state="normal", val=""):
-            e = ctk.CTkEntry(row, width=w, height=28, state=state, font=("Arial", 12))
-            if key in ["qty", "price"]: e.configure(validate="key", validatecommand=self.vcmd)
-            e.pack(side="left", padx=2)
-            e.insert(0, str(val))
-            if state=="readonly": e.configure(state="readonly")
-            entries[key] = e
-            return e
-        d = {"frame": row, "id": data[6]}
-        
-        barcode_frame = ctk.CTkFrame(row, fg_color="transparent", width=COLS["barcode"])
-        barcode_frame.pack(side="left", padx=2); barcode_frame.pack_propagate(False)
-        d["barcode"] = ctk.CTkEntry(barcode_frame, width=COLS["barcode"]-35, height=28, font=("Arial", 12))
-        d["barcode"].insert(0, str(data[0]))
-        d["barcode"].pack(side="left", padx=2)
-        ctk.CTkButton(barcode_frame, text="🔍", width=30, height=28, fg_color="#3498DB", command=lambda: self.open_search_popup(d), font=("Arial", 12)).pack(side="left", padx=2)
-        
-        d["name"] = mk("name", COLS["name"], "readonly", data[1])
-        d["color"] = mk("color", COLS["color"], "readonly", data[2] or "-")
-        d["size"] = mk("size", COLS["size"], "readonly", data[3] or "-")
-        
         # --- Display Design as Plain for Edit Mode (Safe Fallback) ---
-        d["design"] = ctk.CTkComboBox(row, values=["Plain / سادة"], width=120, font=("Arial", 12), state="disabled")
         # If item_note exists, try to set the design combobox to that value, otherwise "Plain / سادة"
+        design = "Plain / سادة"
         item_note_val = data[7] # item_note is the 8th element in the data tuple (index 7)
         if item_note_val and item_note_val.startswith(" [") and item_note_val.endswith("]"):
-            design_name_from_note = item_note_val[2:-1]
             # Reconstruct the combobox value if possible, e.g., "Name (+Price)"
             # This is tricky without the price. For now, just display the name.
-            # Or, better, just set it to "Plain / سادة" and disable it, as changing design in edit mode is complex.
-            # The price is already loaded correctly.
-            d["design"].set(design_name_from_note) # Display the name from the note
-        else:
-            d["design"].set("Plain / سادة")
-        d["design"].pack(side="left", padx=2)
-        
-        d["qty"] = mk("qty", COLS["qty"], "normal", data[4])
-        d["price"] = mk("price", COLS["price"], "normal", data[5])
-        
-        # Don't set base_price here because we don't know if design is included.
-        # Changing Design in Edit Mode is disabled for safety.
-        d["base_price"] = data[5] 
+            # Changing Design in Edit Mode is disabled for safety; the price is already loaded correctly.
+            design = item_note_val[2:-1] # Display the name from the note
         
-        lbl = ctk.CTkLabel(row, text=f"{data[4]*data[5]:.2f}", width=COLS["total"], font=("Arial", 12))
-        lbl.pack(side="left", padx=2)
-        d["total_lbl"] = lbl
-        ctk.CTkButton(row, text="X", width=30, height=25, fg_color="#C0392B", command=lambda: self.del_row(d), font=("Arial", 10)).pack(side="left", padx=2)
-        self.cart_items.append(d)
-        d["barcode"].bind("<Return>", lambda x: self.lookup(d))
-        d["qty"].bind("<KeyRelease>", lambda x: self.calc_row(d))
-        d["price"].bind("<KeyRelease>", lambda x: self.calc_row(d))
+        # The saved price is the base price here because we don't know if design is included.
+        self.cart_view.new_row(
+            {"barcode": data[0], "name": data[1], "color": data[2] or "-", "size": data[3] or "-", "design": design,
+             "qty": data[4], "price": data[5], "total_lbl": f"{data[4]*data[5]:.2f}"},
+            {"design": {"values": ["Plain / سادة"], "state": "disabled"}},
+            id=data[6], detail_id=data[8], line=self.cart.add(data[6], data[4], data[5]))  # detail_id: the saved row save_invoice diffs against
 
     def load_data(self):
         stores = self.db.fetch_all("SELECT name FROM stores")
@@ -706,8 +475,8 @@ class OrderPage(ctk.CTkFrame):
         self.load_hd_data()
 
     def load_hd_data(self):
-        # Fetch HD items with Barcode
-        hd_items = self.db.fetch_all("SELECT d.id, i.name, d.sell_price, d.barcode FROM item_details d JOIN items i ON d.item_id=i.id WHERE d.barcode LIKE 'HD%'")
+        # HD items with Barcode, from the in-memory catalog (restored from the warm-start snapshot)
+        hd_items = self.catalog.designs()
         self.hd_map = {}
         self.hd_barcode_lookup = {}
         
@@ -760,59 +529,12 @@ class OrderPage(ctk.CTkFrame):
         else: self.cust_id = None
 
     def add_row(self, e=None):
-        row = ctk.CTkFrame(self.scroll_frame, height=35, fg_color="transparent")
-        row.pack(fill="x", pady=2); row.pack_propagate(False)
-        entries = {}
-        def mk(key, w, state="normal", ph=""):
-            e = ctk.CTkEntry(row, width=w, height=28, state=state, placeholder_text=ph, font=("Arial", 12))
-            e.pack(side="left", padx=2)
-            entries[key] = e
-            return e
-        d = {"frame": row, "id": None}
-        
-        barcode_frame = ctk.CTkFrame(row, fg_color="transparent", width=COLS["barcode"])
-        barcode_frame.pack(side="left", padx=2); barcode_frame.pack_propagate(False)
-        d["barcode"] = ctk.CTkEntry(barcode_frame, width=COLS["barcode"]-35, height=28, placeholder_text="Scan", font=("Arial", 12))
-        d["barcode"].pack(side="left", padx=2)
-        ctk.CTkButton(barcode_frame, text="🔍", width=30, height=28, fg_color="#3498DB", command=lambda: self.open_search_popup(d), font=("Arial", 12)).pack(side="left", padx=2)
-        
-        d["name"] = mk("name", COLS["name"], "readonly")
-        d["color"] = mk("color", COLS["color"], "readonly")
-        d["size"] = mk("size", COLS["size"], "readonly")
-        
         # --- HD Design Combobox ---
         # Data pre-loaded in load_hd_data()
         options = getattr(self, "hd_options", ["Plain / سادة"])
-        
-        d["design"] = ctk.CTkComboBox(row, values=options, width=120, font=("Arial", 12), dropdown_font=("Arial", 12), command=lambda val: self.on_design_change(d, val))
-        d["design"].pack(side="left", padx=2)
-        d["design"].set("Plain / سادة")
-        
-        # Gallery Button
-        ctk.CTkButton(row, text="🖼️", width=30, height=28, fg_color="#E74C3C", command=lambda: self.open_design_gallery(d), font=("Arial", 12)).pack(side="left", padx=2)
-
-        # Bind FocusOut or Return to handle typed barcodes
-        d["design"].bind("<Return>", lambda e: self.on_design_change(d, d["design"].get()))
-        d["design"].bind("<FocusOut>", lambda e: self.on_design_change(d, d["design"].get()))
-
-        d["qty"] = mk("qty", COLS["qty"])
-        d["qty"].configure(validate="key", validatecommand=self.vcmd)
-        d["qty"].insert(0, "1")
-        
-        d["price"] = mk("price", COLS["price"]) # This will hold Base + Design Price
-        d["price"].configure(validate="key", validatecommand=self.vcmd)
-        
-        # Hidden field to store Base Price of the sweater/hoodie to revert changes
-        d["base_price"] = 0.0 
-        
-        lbl = ctk.CTkLabel(row, text="0.00", width=COLS["total"], font=("Arial", 12))
-        lbl.pack(side="left", padx=2)
-        d["total_lbl"] = lbl
-        ctk.CTkButton(row, text="X", width=30, height=25, fg_color="#C0392B", command=lambda: self.del_row(d), font=("Arial", 10)).pack(side="left", padx=2)
-        self.cart_items.append(d)
-        d["barcode"].bind("<Return>", lambda x: self.lookup(d))
-        d["qty"].bind("<KeyRelease>", lambda x: self.calc_row(d))
-        d["price"].bind("<KeyRelease>", lambda x: self.calc_row(d))
+        # Base Price of the sweater/hoodie (to revert design changes) is kept on the cart line
+        d = self.cart_view.new_row({"design": "Plain / سادة", "qty": "1", "total_lbl": "0.00"},
+                                   {"design": {"values": options}}, id=None, line=self.cart.add())
         d["barcode"].focus()
 
     def on_design_change(self, d, val):
@@ -827,14 +549,13 @@ class OrderPage(ctk.CTkFrame):
             try: d["design"].set(final_val)
             except: pass
         
-        # Update Price based on Design
+        # Update Price based on Design (cart line: price = base + design markup)
         try:
-            base_p = float(d["base_price"])
             design_cost = 0.0
             if final_val != "Plain / سادة" and final_val in self.hd_map:
                 design_cost = self.hd_map[final_val]["price"]
             
-            new_price = base_p + design_cost
+            new_price = self.cart.update(d["line"], markup=float(design_cost)).price
             d["price"].configure(state="normal")
             d["price"].delete(0, "end")
             d["price"].insert(0, str(new_price))
@@ -843,6 +564,7 @@ class OrderPage(ctk.CTkFrame):
         except: pass
 
     def open_design_gallery(self, d):
+        if d["design"].cget("state") == "disabled": return  # saved line being edited
         def on_select(barcode):
             # Formatted key for lookup (needs helper to find fast, or just iterate map)
             # The gallery returns Barcode (e.g. HD212).
@@ -862,15 +584,13 @@ class OrderPage(ctk.CTkFrame):
         d['barcode'].insert(0, code)
         
         store = self.cb_store.get()
-        sql = """SELECT d.id, i.name, c.name, s.name, d.sell_price FROM item_details d JOIN items i ON d.item_id=i.id LEFT JOIN colors c ON d.color_id=c.id LEFT JOIN sizes s ON d.size_id=s.id WHERE d.barcode=?"""
-        res = self.db.fetch_one(sql, (code,))
+        res = self.catalog.lookup(code)  # in-memory barcode index (app/catalog.py), no SQL per scan
         if res:
-            d['id'] = res[0]
-            for k, v in zip(["name", "color", "size"], [res[1], res[2], res[3]]):
+            d['id'] = res.id
+            for k, v in zip(["name", "color", "size"], [res.name, res.color, res.size]):
                 d[k].configure(state="normal"); d[k].delete(0, "end"); d[k].insert(0, str(v or "-")); d[k].configure(state="readonly")
             
-            base_sell = float(res[4])
-            d['base_price'] = base_sell
+            base_sell = float(res.sell_price)
             
             # Apply existing design markup if selected
             design_cost = 0.0
@@ -878,7 +598,7 @@ class OrderPage(ctk.CTkFrame):
             if curr_design != "Plain / سادة" and hasattr(self, 'hd_map') and curr_design in self.hd_map:
                 design_cost = self.hd_map[curr_design]["price"]
             
-            total_sell = base_sell + design_cost
+            total_sell = self.cart.update(d["line"], sku_id=res.id, base_price=base_sell, markup=float(design_cost)).price
             
             d['price'].delete(0, "end"); d['price'].insert(0, str(total_sell))
             self.calc_row(d); d['qty'].focus()
@@ -886,15 +606,14 @@ class OrderPage(ctk.CTkFrame):
             d['barcode'].configure(text_color="red")
             
     def calc_row(self, d):
-        try:
-            q = float(d['qty'].get()); p = float(d['price'].get())
-            d['total_lbl'].configure(text=f"{q*p:.2f}")
-            self.grand_total()
-        except: pass
+        # O(1): only this line's contribution to the cart totals changes
+        line = self.cart.update(d["line"], qty=to_float(d['qty'].get()), price=to_float(d['price'].get()))
+        d['total_lbl'].configure(text=f"{line.total:.2f}")
+        self.grand_total()
 
     def del_row(self, d):
-        d['frame'].destroy()
-        self.cart_items.remove(d)
+        self.cart_view.remove(d)
+        self.cart.remove(d["line"])
         self.grand_total()
 
     def reset_form(self):
@@ -912,8 +631,7 @@ class OrderPage(ctk.CTkFrame):
         self.cust_id = None
         self.paid_manually_edited = False
         
-        for item in self.cart_items:
-            item['frame'].destroy()
-        self.cart_items = []
+        self.cart_view.clear()  # rows go, the pooled row widgets stay for the next invoice
+        self.cart.clear()
         self.add_row()
         self.grand_total()
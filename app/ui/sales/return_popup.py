@@ -1,7 +1,7 @@
 
 import customtkinter as ctk
 from tkinter import messagebox
-from app.database import DB
+from app.database import get_db
 from datetime import date
 
 class ReturnPopup(ctk.CTkToplevel):
@@ -9,7 +9,7 @@ class ReturnPopup(ctk.CTkToplevel):
         super().__init__(parent)
         self.title(f"Process Return - Invoice #{invoice_id}")
         self.geometry("900x650")
-        self.db = DB()
+        self.db = get_db()
         self.invoice_id = invoice_id
         self.grab_set()
         
@@ -131,23 +131,23 @@ class ReturnPopup(ctk.CTkToplevel):
         
         # Safe Check
         safe_name = self.cb_safe.get()
-        safe_res = self.db.fetch_one("SELECT id FROM safes WHERE name=?", (safe_name,))
-        if not safe_res: return messagebox.showerror("Error", "Invalid Safe Selected")
-        safe_id = safe_res[0]
+        safe_id = self.db.dim_id("safes", safe_name)
+        if not safe_id: return messagebox.showerror("Error", "Invalid Safe Selected")
 
         try:
-            for detail_id, qty in items_to_return:
-                self.db.execute("UPDATE invoice_details SET returned_qty = IFNULL(returned_qty, 0) + ? WHERE id=?", (qty, detail_id))
-                res = self.db.fetch_one("SELECT item_detail_id FROM invoice_details WHERE id=?", (detail_id,))
-                self.db.execute("UPDATE store_stock SET quantity = quantity + ? WHERE item_detail_id=? AND store_id=?", (qty, res[0], self.store_id))
+            with self.db.transaction() as tx:
+                for detail_id, qty in items_to_return:
+                    tx.execute("UPDATE invoice_details SET returned_qty = IFNULL(returned_qty, 0) + ? WHERE id=?", (qty, detail_id))
+                    res = tx.fetch_one("SELECT item_detail_id FROM invoice_details WHERE id=?", (detail_id,))
+                    tx.move_stock(res[0], self.store_id, qty)
             
-            notes = f"Method: {self.cb_refund_method.get()} | {self.txt_notes.get('1.0', 'end').strip()}"
-            self.db.execute("INSERT INTO returns (date, invoice_id, qty, refund_amount, notes) VALUES (?,?,?,?,?)", (date.today(), self.invoice_id, len(items_to_return), refund_val, notes))
+                notes = f"Method: {self.cb_refund_method.get()} | {self.txt_notes.get('1.0', 'end').strip()}"
+                tx.execute("INSERT INTO returns (date, invoice_id, qty, refund_amount, notes) VALUES (?,?,?,?,?)", (date.today(), self.invoice_id, len(items_to_return), refund_val, notes))
             
-            # --- CREATE VOUCHER FOR REFUND (Money Out) ---
-            if refund_val > 0:
-                self.db.execute("INSERT INTO vouchers (date, voucher_type, safe_id, amount, description) VALUES (?,?,?,?,?)", 
-                               (date.today(), 'Payment', safe_id, refund_val, f"Refund for Invoice #{self.invoice_id}"))
+                # --- CREATE VOUCHER FOR REFUND (Money Out) ---
+                if refund_val > 0:
+                    tx.execute("INSERT INTO vouchers (date, voucher_type, safe_id, amount, description) VALUES (?,?,?,?,?)", 
+                                   (date.today(), 'Payment', safe_id, refund_val, f"Refund for Invoice #{self.invoice_id}"))
 
             messagebox.showinfo("Success", "Return Processed Successfully (Stock Updated + Voucher Created)")
             self.destroy()
@@ -1,13 +1,13 @@
 import customtkinter as ctk
 from tkinter import ttk, messagebox
-from app.database import DB
+from app.database import get_db
 from datetime import date
 
 class ReturnsPage(ctk.CTkFrame):
-    def __init__(self, parent, controller=None):
+    def __init__(self, parent, controller=None, db=None):
         super().__init__(parent)  # <--- FIXED: These lines are now indented correctly
         self.controller = controller
-        self.db = DB()
+        self.db = db or get_db()
         
         # Header
         header = ctk.CTkFrame(self, height=50)
@@ -66,7 +66,7 @@ class ReturnPopup(ctk.CTkToplevel):
         super().__init__(parent)
         self.title(f"Process Return - Invoice #{invoice_id}")
         self.geometry("1000x650")
-        self.db = DB()
+        self.db = get_db()
         self.invoice_id = invoice_id
         self.grab_set()
         
@@ -255,29 +255,30 @@ class ReturnPopup(ctk.CTkToplevel):
             return messagebox.showerror("Error", "No items selected")
             
         try:
-            for detail_id, qty in items_to_return:
-                # Update Invoice Detail
-                self.db.execute("UPDATE invoice_details SET returned_qty = IFNULL(returned_qty, 0) + ? WHERE id=?", (qty, detail_id))
+            with self.db.transaction() as tx:
+                for detail_id, qty in items_to_return:
+                    # Update Invoice Detail
+                    tx.execute("UPDATE invoice_details SET returned_qty = IFNULL(returned_qty, 0) + ? WHERE id=?", (qty, detail_id))
                 
-                # Get Item ID to return to stock
-                res = self.db.fetch_one("SELECT item_detail_id FROM invoice_details WHERE id=?", (detail_id,))
+                    # Get Item ID to return to stock
+                    res = tx.fetch_one("SELECT item_detail_id FROM invoice_details WHERE id=?", (detail_id,))
                 
-                # Return stock to original store
-                self.db.execute("UPDATE store_stock SET quantity = quantity + ? WHERE item_detail_id=? AND store_id=?", (qty, res[0], self.store_id))
+                    # Return stock to original store
+                    tx.move_stock(res[0], self.store_id, qty)
             
-            notes = f"Method: {self.cb_refund_method.get()} | {self.txt_notes.get('1.0', 'end').strip()}"
-            self.db.execute("INSERT INTO returns (date, invoice_id, qty, refund_amount, notes) VALUES (?,?,?,?,?)", 
-                           (date.today(), self.invoice_id, len(items_to_return), refund_val, notes))
+                notes = f"Method: {self.cb_refund_method.get()} | {self.txt_notes.get('1.0', 'end').strip()}"
+                tx.execute("INSERT INTO returns (date, invoice_id, qty, refund_amount, notes) VALUES (?,?,?,?,?)", 
+                               (date.today(), self.invoice_id, len(items_to_return), refund_val, notes))
             
-            # FINANCIAL TRANSACTION (Deduct from Safe)
-            method = self.cb_refund_method.get()
-            if method != "Store Credit" and refund_val > 0:
-                safe_name = self.cb_safe.get()
-                if safe_name in self.safe_map:
-                    safe_id = self.safe_map[safe_name]
-                    desc = f"Return/Refund for Invoice #{self.invoice_id}"
-                    self.db.execute("INSERT INTO vouchers (date, voucher_type, safe_id, amount, description, customer_id) VALUES (?,?,?,?,?,?)",
-                                   (date.today(), "Payment", safe_id, refund_val, desc, self.customer_id))
+                # FINANCIAL TRANSACTION (Deduct from Safe)
+                method = self.cb_refund_method.get()
+                if method != "Store Credit" and refund_val > 0:
+                    safe_name = self.cb_safe.get()
+                    if safe_name in self.safe_map:
+                        safe_id = self.safe_map[safe_name]
+                        desc = f"Return/Refund for Invoice #{self.invoice_id}"
+                        tx.execute("INSERT INTO vouchers (date, voucher_type, safe_id, amount, description, customer_id) VALUES (?,?,?,?,?,?)",
+                                       (date.today(), "Payment", safe_id, refund_val, desc, self.customer_id))
                            
             messagebox.showinfo("Success", "Return Processed Successfully!")
             self.destroy()
@@ -2,15 +2,16 @@
 import customtkinter as ctk
 from tkinter import ttk, messagebox
 from app.utils import fix_text
-from app.database import DB
+from app.database import get_db
 from app.auth import LoginManager
+from app.ui.query_stats_popup import QueryStatsPopup
 
 class UsersPage(ctk.CTkFrame):
-    def __init__(self, parent, controller=None):
+    def __init__(self, parent, controller=None, db=None):
         super().__init__(parent)
         self.controller = controller
-        self.db = DB()
-        self.auth = LoginManager()
+        self.db = db or get_db()
+        self.auth = LoginManager(self.db)
         
         # Fonts
         self.AR_FONT = ("Segoe UI", 12, "bold")
@@ -23,6 +24,8 @@ class UsersPage(ctk.CTkFrame):
         ctk.CTkLabel(header, text=fix_text("إدارة المستخدمين"), font=("Segoe UI", 20, "bold")).pack(side="right", padx=20)
         ctk.CTkButton(header, text=fix_text("+ إضافة مستخدم جديد"), command=self.open_add_popup, 
                      fg_color="#27AE60", font=self.AR_FONT, width=150).pack(side="left", padx=10)
+        ctk.CTkButton(header, text=fix_text("أداء قاعدة البيانات"), command=lambda: QueryStatsPopup(self), 
+                     fg_color="#8E44AD", font=self.AR_FONT, width=150).pack(side="left", padx=10)
         
         # --- Treeview ---
         self.tree = ttk.Treeview(self, columns=("ID", "Username", "Role"), show="headings")
@@ -4,6 +4,7 @@ import sys
 import pandas as pd
 import webbrowser
 from datetime import datetime
+from functools import lru_cache
 
 # --- Arabic Text Fixer ---
 try:
@@ -14,12 +15,17 @@ except ImportError:
     ARABIC_AVAILABLE = False
     print("Warning: arabic_reshaper or python-bidi not installed. Arabic text may not display correctly.")
 
+@lru_cache(maxsize=8192)
+def _shape(text):
+    reshaped_text = arabic_reshaper.reshape(text)
+    return get_display(reshaped_text)
+
 def fix_text(text):
     if not text: return ""
     if not ARABIC_AVAILABLE: return text
     try:
-        reshaped_text = arabic_reshaper.reshape(str(text))
-        return get_display(reshaped_text)
+        # Memoized: labels, report headings and names repeat the same strings all session
+        return _shape(str(text))
     except:
         return text
 
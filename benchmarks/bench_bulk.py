@@ -0,0 +1,55 @@
+"""
+Bulk write benchmark: row-by-row DB.execute vs the batched API.
+
+  insert   -> N x db.execute("INSERT ...") (one commit each) vs db.insert_many()
+  update   -> UPDATE ... WHERE id IN (all ids) vs db.execute_in() in IN_CHUNK slices
+
+Runs against a throw-away database in a temp folder, never touches data/inventory.db.
+
+    python benchmarks/bench_bulk.py [rows]
+"""
+import os
+import sys
+import time
+import sqlite3
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.database import DB, IN_CHUNK
+
+
+def timed(label, fn):
+    t0 = time.perf_counter()
+    result = fn()
+    print(f"{label:<40}{(time.perf_counter() - t0) * 1000:>10.1f} ms")
+    return result
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DB(os.path.join(tmp, "bench.db"))
+        rows = [(1, i + 1, 2, 10.0, 20.0) for i in range(n)]
+        cols = ("invoice_id", "item_detail_id", "qty", "price", "total")
+
+        print(f"\n== {n} invoice_details rows ==")
+        timed("before: execute() per row", lambda: [
+            db.execute("INSERT INTO invoice_details (invoice_id, item_detail_id, qty, price, total) VALUES (?,?,?,?,?)", r)
+            for r in rows])
+        ids = timed("after: insert_many()", lambda: db.insert_many("invoice_details", rows, cols))
+        assert len(ids) == n and db.fetch_one("SELECT item_detail_id FROM invoice_details WHERE id=?", (ids[-1],))[0] == n
+
+        print(f"\n== UPDATE over {n} ids ==")
+        try:
+            timed("before: one unbounded IN (...)", lambda: db.execute(
+                f"UPDATE invoice_details SET price = 11 WHERE id IN ({','.join('?' * n)})", ids))
+        except sqlite3.Error as e:
+            print(f"{'before: one unbounded IN (...)':<40}{'FAILED':>10}  ({e})")
+        changed = timed(f"after: execute_in() ({IN_CHUNK}/chunk)", lambda: db.execute_in(
+            "UPDATE invoice_details SET price = ? WHERE id IN ({in})", ids, (12,)))
+        assert changed == n
+        db.close_connection()
+
+
+if __name__ == "__main__":
+    main()
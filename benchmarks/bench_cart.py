@@ -0,0 +1,72 @@
+"""
+Cart totals benchmark: re-adding every row per keystroke vs the running sums in app/cart.py.
+
+  before -> what grand_total() / calc_mfg_unit_cost() did on each keystroke: parse
+            every row's total label and (manufacturing purchases) every qty entry
+  after  -> Cart.update() of the edited line, then subtotal / net / unit_cost()
+
+Row texts stand in for the Tk widgets. Reports the cost of one keystroke (best of 3
+over 2000 keystrokes on random rows), and checks both give the same totals.
+
+    python benchmarks/bench_cart.py
+"""
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.cart import Cart, to_float
+
+SIZES = (10, 100, 1000)
+KEYS = 2000
+
+
+def per_key_us(fn, keys, runs=3):
+    best = None
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        for k in keys:
+            fn(k)
+        us = (time.perf_counter() - t0) * 1e6 / len(keys)
+        best = us if best is None else min(best, us)
+    return best
+
+
+def main():
+    rnd = random.Random(9)
+    print(f"\n{'rows':<10}{'before':>14}{'after':>14}{'speed-up':>12}")
+    for n in SIZES:
+        rows = [{"qty": str(rnd.randint(1, 5)), "price": f"{rnd.randint(50, 900)}.5"} for _ in range(n)]
+        for r in rows:
+            r["total"] = f"{float(r['qty']) * float(r['price']):.2f}"
+        cart = Cart()
+        cart.discount, cart.tax_pct, cart.shipping = 20.0, 14.0, 35.0
+        for r in rows:
+            r["line"] = cart.add(7, float(r["qty"]), float(r["price"]))
+        keys = [(rnd.randrange(n), str(rnd.randint(1, 9))) for _ in range(KEYS)]
+
+        def before(key):
+            i, qty = key
+            r = rows[i]
+            r["qty"] = qty
+            r["total"] = f"{float(qty) * float(r['price']):.2f}"
+            sub = sum(float(x["total"]) for x in rows)
+            after_disc = sub - 20.0
+            units = sum(float(x["qty"]) for x in rows)
+            return after_disc + after_disc * 0.14 + 35.0, 1000 / units
+
+        def after(key):
+            i, qty = key
+            line = cart.update(rows[i]["line"], qty=to_float(qty))
+            return f"{line.total:.2f}", cart.net, cart.unit_cost(1000)
+
+        old_us = per_key_us(before, keys)
+        new_us = per_key_us(after, keys)
+        net, unit = before(keys[-1])
+        assert abs(net - cart.net) < 0.01 * n and abs(unit - cart.unit_cost(1000)) < 1e-9
+        print(f"{n:<10}{old_us:>11.1f} us{new_us:>11.1f} us{old_us / new_us:>11.0f}x")
+
+
+if __name__ == "__main__":
+    main()
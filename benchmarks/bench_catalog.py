@@ -0,0 +1,81 @@
+"""
+Barcode scan benchmark: the per-scan five-table join vs the in-memory Catalog.
+
+Builds a throw-away catalog of N SKUs (default 500k), then reports the catalog's
+load time and memory, the warm start from its snapshot (app/snapshot.py), the
+cost of one scan both ways (best of 3 over 2000 scans) and an incremental
+refresh after a price edit.
+
+    python benchmarks/bench_catalog.py [skus]
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.database import DB
+from app.catalog import Catalog
+from app import snapshot
+
+SCAN_SQL = """SELECT d.id, i.name, c.name, s.name, d.sell_price FROM item_details d JOIN items i ON d.item_id=i.id
+              LEFT JOIN colors c ON d.color_id=c.id LEFT JOIN sizes s ON d.size_id=s.id WHERE d.barcode=?"""
+
+
+def timed(label, fn, per=1, runs=1):
+    best = None
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        result = fn()
+        ms = (time.perf_counter() - t0) * 1000
+        best = ms if best is None else min(best, ms)
+    ms = best
+    print(f"{label:<44}{ms / per:>10.3f} ms" + (f"  ({per} runs)" if per > 1 else ""))
+    return result
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    rnd = random.Random(3)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DB(os.path.join(tmp, "bench.db"))
+        with db.transaction() as tx:
+            tx.execute_many("INSERT INTO colors (name) VALUES (?)", [(f"لون {i}",) for i in range(30)])
+            tx.execute_many("INSERT INTO sizes (name) VALUES (?)", [(f"{i}",) for i in range(20)])
+            tx.insert_many("items", [(f"صنف رقم {i}",) for i in range(n // 20)], ("name",))
+            tx.insert_many("item_details", [(i // 20 + 1, rnd.randint(1, 30), rnd.randint(1, 20), f"B{i:08d}", 100 + i % 50, 60)
+                                            for i in range(n)], ("item_id", "color_id", "size_id", "barcode", "sell_price", "buy_price"))
+        codes = [f"B{rnd.randrange(n):08d}" for _ in range(2000)]
+        print(f"\n== {n} SKUs ==")
+
+        catalog = Catalog(db)
+        timed("Catalog.load()", catalog.load)
+        tracemalloc.start()
+        copy = Catalog(db)
+        copy.load()  # a second copy, measured (tracemalloc slows the load down)
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del copy
+        print(f"{'catalog memory':<44}{size / 2**20:>10.1f} MB  ({size / n:.0f} bytes/SKU)")
+
+        timed("snapshot.save()", lambda: snapshot.save(db, catalog))
+        db.execute("UPDATE item_details SET sell_price = 998 WHERE barcode = ?", (codes[1],))
+        warm = Catalog(db)
+        timed("warm start: snapshot.restore() + refresh()", lambda: snapshot.restore(db, warm))
+        assert len(warm) == len(catalog) and warm.lookup(codes[1]).sell_price == 998
+
+        timed("before: join per scan", lambda: [db.fetch_one(SCAN_SQL, (c,)) for c in codes], len(codes), runs=3)
+        timed("after: catalog.lookup() per scan", lambda: [catalog.lookup(c) for c in codes], len(codes), runs=3)
+        assert catalog.lookup(codes[0]).id == db.fetch_one(SCAN_SQL, (codes[0],))[0]
+
+        db.execute("UPDATE item_details SET sell_price = 999 WHERE barcode = ?", (codes[0],))
+        timed("refresh() after one price edit", catalog.refresh)
+        timed("refresh() with nothing changed", catalog.refresh)
+        assert catalog.lookup(codes[0]).sell_price == 999
+        db.close_connection()
+
+
+if __name__ == "__main__":
+    main()
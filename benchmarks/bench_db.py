@@ -0,0 +1,102 @@
+"""
+DB micro-benchmark: per-statement latency of the DB wrapper.
+
+  before -> a fresh sqlite3.connect() per statement, default pragmas (old DB behaviour)
+  after  -> DB(): one long-lived connection per thread + WAL/synchronous/cache/mmap pragmas
+
+Runs against a throw-away database in a temp folder, never touches data/inventory.db.
+
+    python benchmarks/bench_db.py [iterations]
+"""
+import os
+import sys
+import time
+import sqlite3
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.database import DB
+
+ITEMS = 2000
+
+
+def seed(db):
+    db.execute("INSERT INTO stores (name) VALUES ('Main Stock')")
+    with db.get_connection() as conn:
+        conn.executemany("INSERT INTO items (name) VALUES (?)", [(f"Item {i}",) for i in range(ITEMS)])
+        conn.executemany(
+            "INSERT INTO item_details (item_id, barcode, buy_price, sell_price) VALUES (?,?,?,?)",
+            [(i + 1, f"B{i:06d}", 50, 100) for i in range(ITEMS)])
+        conn.executemany("INSERT INTO store_stock (store_id, item_detail_id, quantity) VALUES (1,?,10)",
+                         [(i + 1,) for i in range(ITEMS)])
+
+
+class LegacyDB:
+    """The pre-pooling wrapper: open, run, (implicitly) close on every call."""
+    def __init__(self, path):
+        self.name = path
+
+    def execute(self, query, params=()):
+        with sqlite3.connect(self.name) as conn:
+            cur = conn.execute(query, params)
+            conn.commit()
+            return cur.lastrowid
+
+    def fetch_one(self, query, params=()):
+        with sqlite3.connect(self.name) as conn:
+            return conn.execute(query, params).fetchone()
+
+    def fetch_all(self, query, params=()):
+        with sqlite3.connect(self.name) as conn:
+            return conn.execute(query, params).fetchall()
+
+
+def measure(fn, n):
+    samples = []
+    for i in range(n):
+        t0 = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - t0) * 1e6)
+    samples.sort()
+    return statistics.mean(samples), samples[len(samples) // 2], samples[int(len(samples) * 0.95)]
+
+
+def run(label, db, n):
+    cases = {
+        "fetch_one (barcode)": lambda i: db.fetch_one(
+            "SELECT d.id, i.name, d.sell_price FROM item_details d JOIN items i ON d.item_id=i.id WHERE d.barcode=?",
+            (f"B{i % ITEMS:06d}",)),
+        "fetch_all (stock)": lambda i: db.fetch_all(
+            "SELECT quantity FROM store_stock WHERE store_id=1 AND item_detail_id=?", (i % ITEMS + 1,)),
+        "execute (update)": lambda i: db.execute(
+            "UPDATE store_stock SET quantity = quantity - 1 WHERE store_id=1 AND item_detail_id=?", (i % ITEMS + 1,)),
+    }
+    print(f"\n== {label} ==")
+    print(f"{'statement':<22}{'mean µs':>10}{'p50 µs':>10}{'p95 µs':>10}")
+    for name, fn in cases.items():
+        mean, p50, p95 = measure(fn, n)
+        print(f"{name:<22}{mean:>10.1f}{p50:>10.1f}{p95:>10.1f}")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        db = DB(path)
+        seed(db)
+        db.close_connection()
+
+        # "before" must not see WAL, otherwise it measures the new journal mode
+        with sqlite3.connect(path) as conn:
+            conn.execute("PRAGMA journal_mode=DELETE")
+        conn.close()
+        run("before: connection per statement", LegacyDB(path), n)
+
+        db = DB(path)
+        run("after: persistent connection + pragmas", db, n)
+        db.close_connection()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Invoice PDF benchmark: how long the checkout form waits for the invoice's PDF.
+
+  before -> render_invoice_pdf() on the Tk thread, as save_invoice used to
+  after  -> PDFQueue: the page queues the invoice id and resets; the worker renders
+
+Reports ms per invoice over a run of 20 sales invoices (3 lines each): the wait at
+the till, and for the queue also how long until every PDF is on disk. Runs against a
+throw-away database and folder, never touches data/ or the invoice folder.
+
+Then the shared resources (app/pdf_resources.py), each built per document before:
+the first invoice of a session vs the ones after it, the logo embedded from the
+full PNG vs the cached one, registering the Arabic font per export vs once, and
+fix_text() shaping vs its memo.
+
+    python benchmarks/bench_invoice_pdf.py
+"""
+import os
+import sys
+import time
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # assets/ paths are relative, as when the app runs
+from app.database import DB
+from app.utils import REPORTLAB_AVAILABLE, fix_text, SimpleDocTemplate, A5, RLImage, pdfmetrics, TTFont
+from app.pdf_resources import FONT_PATHS, LOGO_PATH, pdf_font, logo_image
+from app.invoices import SaleLine, write_sale_lines
+from app.invoice_pdf import render_invoice_pdf
+from app.pdf_queue import PDFQueue
+
+INVOICES = 20
+
+
+def seed(db):
+    with db.transaction() as tx:
+        tx.execute_many("INSERT INTO stores (name) VALUES (?)", [("Main Stock",), ("Shop",)])
+        tx.insert_many("items", [(f"صنف {i}",) for i in range(3)], ("name",))
+        tx.insert_many("item_details", [(i + 1, f"B{i:07d}", 250, 120) for i in range(3)],
+                       ("item_id", "barcode", "sell_price", "buy_price"))
+        cust = tx.execute("INSERT INTO customers (name, phone) VALUES ('Client', '+201000000000')")
+        ids = []
+        for _ in range(2 * INVOICES):
+            inv = tx.execute("INSERT INTO invoices (date, customer_id, net_total, store_id) VALUES (date('now'), ?, 750, 2)", (cust,))
+            write_sale_lines(tx, inv, 2, [SaleLine(i + 1, 1, 250.0, "", None) for i in range(3)], 1)
+            ids.append(inv)
+    return ids
+
+
+def ms(fn, runs=INVOICES):
+    t0 = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - t0) * 1000 / runs
+
+
+def logo_doc(path, logo):
+    SimpleDocTemplate(path, pagesize=A5).build([logo()])
+
+
+def main():
+    if not REPORTLAB_AVAILABLE:
+        print("reportlab not installed")
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DB(os.path.join(tmp, "bench.db"))
+        ids = seed(db)
+        sync_ids, queued_ids = ids[:INVOICES], ids[INVOICES:]
+
+        first_ms = ms(lambda: render_invoice_pdf(db, sync_ids[0], tmp), runs=1)
+        t0 = time.perf_counter()
+        for inv in sync_ids:
+            render_invoice_pdf(db, inv, tmp)
+        sync_ms = (time.perf_counter() - t0) * 1000 / INVOICES
+
+        queue = PDFQueue(db.reader())
+        t0 = time.perf_counter()
+        futures = [queue.submit(lambda rdb, inv=inv: render_invoice_pdf(rdb, inv, tmp)) for inv in queued_ids]
+        wait_ms = (time.perf_counter() - t0) * 1000 / INVOICES
+        paths = [f.result() for f in futures]
+        done_ms = (time.perf_counter() - t0) * 1000 / INVOICES
+        queue.shutdown()
+        assert all(os.path.exists(p) for p in paths)
+
+        print(f"\n== {INVOICES} invoices, ms per invoice ==")
+        print(f"{'before: render on the Tk thread':<38}{sync_ms:>9.2f} ms at the till")
+        print(f"{'after: queued':<38}{wait_ms:>9.2f} ms at the till{done_ms:>9.2f} ms until written")
+
+        print("\n== shared PDF resources, ms per document ==")
+        print(f"{'invoice #1 of the session':<38}{first_ms:>9.2f} ms")
+        print(f"{'invoice #2..#21':<38}{sync_ms:>9.2f} ms")
+        if os.path.exists(LOGO_PATH):
+            full = ms(lambda: logo_doc(os.path.join(tmp, "logo.pdf"), lambda: RLImage(LOGO_PATH, width=80, height=80)))
+            cached = ms(lambda: logo_doc(os.path.join(tmp, "logo.pdf"), lambda: logo_image(80)))
+            print(f"{'logo: full PNG -> cached':<38}{full:>9.2f} ms{cached:>9.2f} ms")
+        font_path = next((p for p in FONT_PATHS if os.path.exists(p)), None)
+        if font_path:
+            per_doc = ms(lambda: pdfmetrics.registerFont(TTFont("BenchFont", font_path)))
+            pdf_font()  # the session's one registration
+            once = ms(pdf_font)
+            print(f"{'Arabic font: register -> pdf_font()':<38}{per_doc:>9.2f} ms{once:>9.4f} ms")
+        names = [f"تقرير المبيعات {i}" for i in range(500)]
+        shape = ms(lambda: [fix_text(n) for n in names], runs=1)
+        memo = ms(lambda: [fix_text(n) for n in names], runs=1)
+        print(f"{'fix_text x500: shape -> memo':<38}{shape:>9.2f} ms{memo:>9.2f} ms")
+        db.close_connection()
+
+
+if __name__ == "__main__":
+    main()
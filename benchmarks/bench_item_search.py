@@ -0,0 +1,72 @@
+"""
+Item search benchmark: StockPage's old LIKE '%x%' scan vs the item_search FTS5 index.
+
+Builds a throw-away catalog of N SKUs (default 200k: items x colors x sizes with
+Arabic names), then times each search term both ways (best of 5, SKU ids only).
+
+    python benchmarks/bench_item_search.py [skus]
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.database import DB
+from app.search import SEARCH_FILTER, search_match, rebuild_item_search
+
+WORDS = ["قميص", "بنطلون", "فستان", "عباية", "إسدال", "جاكيت", "بلوزة", "طرحة", "شنطة", "حذاء"]
+TAGS = ["قطن", "كتان", "شتوي", "صيفي", "مطرز", "سادة", "كلاسيك", "أطفال", "رجالي", "حريمي"]
+COLORS = ["أسود", "أبيض", "أحمر", "أزرق", "كحلي", "بيج", "رمادي", "أخضر"]
+SIZES = ["S", "M", "L", "XL", "XXL", "38", "40", "42", "44", "46"]
+TERMS = ["قميص", "اسدال مطرز", "بلوزه", "كحلي", "اح", "B0012", "عباية سادة اسود"]
+
+LIKE_SQL = """SELECT d.id FROM item_details d JOIN items i ON d.item_id=i.id
+              WHERE (i.name LIKE ? OR d.barcode LIKE ?)"""
+FTS_SQL = f"SELECT d.id FROM item_details d WHERE {SEARCH_FILTER}"
+
+
+def best_ms(fn, runs=5):
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return min(times), result
+
+
+def seed(db, n):
+    rnd = random.Random(5)
+    per_item = len(COLORS) * len(SIZES) // 4
+    n_items = max(1, n // per_item)
+    with db.transaction() as tx:
+        tx.execute_many("INSERT INTO colors (name) VALUES (?)", [(c,) for c in COLORS])
+        tx.execute_many("INSERT INTO sizes (name) VALUES (?)", [(s,) for s in SIZES])
+        tx.insert_many("items", [(f"{rnd.choice(WORDS)} {rnd.choice(TAGS)} {i}", f"C{i}") for i in range(n_items)], ("name", "code"))
+        tx.insert_many("item_details", [(i // per_item + 1, rnd.randint(1, len(COLORS)), rnd.randint(1, len(SIZES)), f"B{i:07d}")
+                                        for i in range(n)], ("item_id", "color_id", "size_id", "barcode"))
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DB(os.path.join(tmp, "bench.db"))
+        t0 = time.perf_counter()
+        seed(db, n)
+        print(f"\n== {n} SKUs, seeded + indexed by triggers in {time.perf_counter() - t0:.1f} s ==")
+        with db.transaction() as tx:
+            t0 = time.perf_counter()
+            rebuild_item_search(tx.conn)
+        print(f"full rebuild_item_search(): {(time.perf_counter() - t0) * 1000:.0f} ms\n")
+
+        print(f"{'term':<20}{'LIKE scan':>12}{'FTS5':>12}{'rows LIKE/FTS':>18}")
+        for term in TERMS:
+            like_ms, like_rows = best_ms(lambda: db.fetch_all(LIKE_SQL, (f"%{term}%", f"%{term}%")))
+            fts_ms, fts_rows = best_ms(lambda: db.fetch_all(FTS_SQL, (search_match(term),)))
+            print(f"{term:<20}{like_ms:>9.1f} ms{fts_ms:>9.1f} ms{f'{len(like_rows)}/{len(fts_rows)}':>18}")
+        db.close_connection()
+
+
+if __name__ == "__main__":
+    main()
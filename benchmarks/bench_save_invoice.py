@@ -0,0 +1,159 @@
+"""
+Invoice save benchmark: the old per-line save vs the batched write_sale_lines().
+
+  before -> per cart line: SELECT buy_price, INSERT the detail, upsert store_stock,
+            and again for the HD design's Main Stock row
+  after  -> one cost query, one executemany of the details, one batched stock upsert
+
+Both run the whole invoice (header included) in one transaction and commit, like
+OrderPage.save_invoice. Half the lines carry an HD design. Reports ms per invoice
+(best of 3 rounds of 20 invoices) for 1-, 20- and 200-line invoices.
+
+Then editing one qty on a 100-line invoice: the old put-everything-back, delete
+and re-insert vs edit_sale_lines(), with the rows each one writes (trigger-maintained
+totals included), and a check that edits land on the saved rows they were loaded
+from when the invoice has designed and plain lines of the same SKU. Runs against a
+throw-away database in a temp folder, never touches data/inventory.db.
+
+    python benchmarks/bench_save_invoice.py [skus]
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.database import DB
+from app.invoices import SaleLine, DETAIL_COLUMNS, write_sale_lines, edit_sale_lines
+
+SIZES = (1, 20, 200)
+INVOICES = 20
+STORE, MAIN_STOCK = 2, 1
+
+
+def save_per_line(db, lines):
+    with db.transaction() as tx:
+        inv_id = tx.execute("INSERT INTO invoices (date, customer_id, net_total, store_id) VALUES (date('now'), 1, 0, ?)", (STORE,))
+        for line in lines:
+            cost = tx.fetch_one("SELECT buy_price FROM item_details WHERE id=?", (line.item_detail_id,))
+            tx.execute(f"INSERT INTO invoice_details ({', '.join(DETAIL_COLUMNS)}) VALUES (?,?,?,?,?,?,?)",
+                       (inv_id, line.item_detail_id, line.qty, line.price, line.qty * line.price, line.note, cost[0] if cost else 0))
+            tx.move_stock(line.item_detail_id, STORE, -line.qty)
+            if line.design_id:
+                tx.move_stock(line.design_id, MAIN_STOCK, -line.qty)
+    return inv_id
+
+
+def save_batched(db, lines):
+    with db.transaction() as tx:
+        inv_id = tx.execute("INSERT INTO invoices (date, customer_id, net_total, store_id) VALUES (date('now'), 1, 0, ?)", (STORE,))
+        write_sale_lines(tx, inv_id, STORE, lines, MAIN_STOCK)
+    return inv_id
+
+
+def edit_reinsert(db, inv_id, lines):
+    with db.transaction() as tx:
+        old_items = tx.fetch_all("SELECT item_detail_id, qty FROM invoice_details WHERE invoice_id=?", (inv_id,))
+        tx.move_stock_many((did, STORE, qty) for did, qty in old_items)
+        tx.execute("DELETE FROM invoice_details WHERE invoice_id=?", (inv_id,))
+        write_sale_lines(tx, inv_id, STORE, lines, MAIN_STOCK)
+
+
+def edit_delta(db, inv_id, lines):
+    with db.transaction() as tx:
+        edit_sale_lines(tx, inv_id, STORE, STORE, lines, MAIN_STOCK)
+
+
+def reloaded(db, inv_id, lines):
+    """lines as load_for_edit() brings them back: each with its saved row's id, designs not re-resolved."""
+    ids = [r[0] for r in db.fetch_all("SELECT id FROM invoice_details WHERE invoice_id=? ORDER BY id", (inv_id,))]
+    return [line._replace(note="", design_id=None, detail_id=rid) for line, rid in zip(lines, ids)]
+
+
+def check_edit_same_sku(db, sku, design):
+    """Two Eagle-printed lines and a plain one of one SKU: drop the first, change the plain one's qty."""
+    lines = [SaleLine(sku, 1, 300.0, " [Eagle]", design), SaleLine(sku, 1, 250.0, "", None), SaleLine(sku, 2, 300.0, " [Eagle]", design)]
+    inv_id = save_batched(db, lines)
+    first, plain, second = reloaded(db, inv_id, lines)
+    before = stock(db)
+    with db.transaction() as tx:
+        assert edit_sale_lines(tx, inv_id, STORE, STORE, [plain._replace(qty=3), second], MAIN_STOCK) == (0, 1, 1)
+    saved = db.fetch_all("SELECT id, qty, price, item_note FROM invoice_details WHERE invoice_id=? ORDER BY id", (inv_id,))
+    assert saved == [(plain.detail_id, 3, 250.0, ""), (second.detail_id, 2, 300.0, " [Eagle]")], saved
+    moved = {(s, d): q1 - q0 for (s, d, q0), (_, _, q1) in zip(before, stock(db)) if q1 != q0}
+    assert moved == {(STORE, sku): -1}, moved  # first line's 1 back, the plain line's 2 more out
+
+
+def rows_written(db, fn):
+    conn = db.get_connection()
+    before = conn.total_changes
+    fn()
+    return conn.total_changes - before
+
+
+def seed(db, n, designs):
+    with db.transaction() as tx:
+        tx.execute_many("INSERT INTO stores (name) VALUES (?)", [("Main Stock",), ("Shop",)])
+        tx.insert_many("items", [(f"صنف {i}",) for i in range(n // 10 + 1)], ("name",))
+        tx.insert_many("item_details", [(i // 10 + 1, f"{'HD' if i < designs else 'B'}{i:07d}", 250, 120) for i in range(n)],
+                       ("item_id", "barcode", "sell_price", "buy_price"))
+        tx.move_stock_many([(i + 1, s, 10 ** 6) for i in range(n) for s in (STORE, MAIN_STOCK)])
+
+
+def stock(db):
+    return db.fetch_all("SELECT store_id, item_detail_id, quantity FROM store_stock ORDER BY 1, 2")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    designs = 50
+    rnd = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DB(os.path.join(tmp, "bench.db"))
+        seed(db, n, designs)
+        print(f"\n== {n} SKUs, {INVOICES} invoices per round, ms per invoice ==")
+        print(f"{'lines':<10}{'before':>12}{'after':>12}{'speed-up':>12}")
+        for size in SIZES:
+            invoices = [[SaleLine(rnd.randint(designs + 1, n), rnd.randint(1, 3), 250.0, "", rnd.randint(1, designs) if rnd.random() < 0.5 else None)
+                         for _ in range(size)] for _ in range(INVOICES)]
+            best = {}
+            for label, save in (("before", save_per_line), ("after", save_batched)):
+                for _ in range(3):
+                    t0 = time.perf_counter()
+                    for lines in invoices:
+                        save(db, lines)
+                    ms = (time.perf_counter() - t0) * 1000 / INVOICES
+                    best[label] = min(best.get(label, ms), ms)
+            print(f"{size:<10}{best['before']:>9.2f} ms{best['after']:>9.2f} ms{best['before'] / best['after']:>11.1f}x")
+
+        print("\n== edit one qty on a 100-line invoice (plain lines, as reloaded for editing) ==")
+        lines = [SaleLine(rnd.randint(designs + 1, n), 2, 250.0, "", None) for _ in range(100)]
+        for label, edit in (("before: restore all + re-insert", edit_reinsert), ("after: edit_sale_lines()", edit_delta)):
+            inv_id = save_batched(db, lines)
+            times = []
+            for i in range(10):
+                cart = reloaded(db, inv_id, lines)
+                cart[50] = cart[50]._replace(qty=3 + i % 2)
+                t0 = time.perf_counter()
+                rows = rows_written(db, lambda: edit(db, inv_id, cart))
+                times.append((time.perf_counter() - t0) * 1000)
+            print(f"{label:<36}{min(times):>9.2f} ms{rows:>8} rows")
+
+        # Same effect on details and stock either way
+        lines = invoices[0]
+        before_stock = stock(db)
+        a = save_per_line(db, lines)
+        per_line_stock = stock(db)
+        b = save_batched(db, lines)
+        detail = "SELECT item_detail_id, qty, price, total, item_note, cost_at_sale FROM invoice_details WHERE invoice_id=? ORDER BY id"
+        assert db.fetch_all(detail, (a,)) == db.fetch_all(detail, (b,))
+        delta = lambda x, y: {(s, d): q1 - q0 for (s, d, q0), (_, _, q1) in zip(x, y) if q1 != q0}
+        assert delta(before_stock, per_line_stock) == delta(per_line_stock, stock(db))
+        check_edit_same_sku(db, designs + 1, 1)
+        print("\n✅ designed + plain lines of one SKU: the edit kept each saved row")
+        db.close_connection()
+
+
+if __name__ == "__main__":
+    main()
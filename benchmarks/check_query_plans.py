@@ -0,0 +1,202 @@
+"""
+EXPLAIN QUERY PLAN check for the report, dashboard and rollup (safe_balances, sales_daily) queries.
+
+Builds a throw-away database through DB() (so every migration/index is applied),
+seeds it with enough rows for the planner to prefer indexes, then asks SQLite
+for the plan of each query below and fails on any full table scan that is not
+explicitly allowed.
+
+When you add or change a query in ReportsPage.generate_report, DashboardPage.load,
+SafesPage, the StockPage search or the OrderPage stock check, add it here (with the filters it is built with).
+While developing, "db_plan_check": true in config.json prints the same warning
+live for every new query the app runs.
+
+    python benchmarks/check_query_plans.py
+"""
+import os
+import sys
+import random
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.database import DB, in_query
+from app.invoices import STOCK_CHECK_SQL
+from app.rollups import SAFE_BALANCE, SAFE_BALANCES_SQL
+from app.search import SEARCH_FILTER, search_match
+
+D = ("2024-01-01", "2024-12-31")
+STORE = ("Main Stock",)
+HD = " AND d.barcode NOT LIKE 'HD%'"
+
+# (source, sql, params, allowed full scans)
+# Allowed scans are the small dimension tables (stores, safes, ...) and queries
+# whose job *is* to read the whole table (catalog-wide totals and listings - for
+# those any of the catalog tables may drive the join).
+QUERIES = [
+    # --- SafesPage / DashboardPage: trigger-maintained safe_balances (app/rollups.py) ---
+    ("safes.all", SAFE_BALANCES_SQL, (), ("s",)),
+    ("safes.one", f"SELECT {SAFE_BALANCE} FROM safe_balances WHERE safe_id=?", (1,), ()),
+
+    # --- StockPage.load: item_search FTS5 index (app/search.py) ---
+    ("stock.search", f"""SELECT d.id, d.barcode, i.name, IFNULL(c.name, '-'), IFNULL(s.name, '-'), IFNULL(d.stock_qty, 0), d.buy_price, d.sell_price
+        FROM item_details d JOIN items i ON d.item_id=i.id LEFT JOIN colors c ON d.color_id=c.id LEFT JOIN sizes s ON d.size_id=s.id
+        WHERE 1=1 AND {SEARCH_FILTER} ORDER BY d.id DESC""", (search_match("Item 12"),), ()),
+
+    # --- OrderPage.validate_rules: whole-cart stock check (app/invoices.py) ---
+    ("order.stock_check", in_query(STOCK_CHECK_SQL, 3), (7, 1, 1, 10, 20, 30), ()),
+
+    # --- DashboardPage.load ---
+    ("dash.items", "SELECT COUNT(*) FROM items", (), ("items",)),
+    ("dash.qty", "SELECT SUM(quantity) FROM store_stock", (), ("store_stock",)),
+    ("dash.value", "SELECT SUM(stock_qty * buy_price) FROM item_details", (), ("item_details",)),
+    ("dash.sales", "SELECT SUM(net_total), SUM(refunds), SUM(cogs) FROM sales_daily", (), ("sales_daily",)),
+    ("dash.expenses", "SELECT SUM(amount) FROM vouchers WHERE voucher_type='Payment'", (), ()),
+    ("dash.stores", "SELECT s.id, s.name, IFNULL(SUM(ss.quantity), 0) FROM stores s LEFT JOIN store_stock ss ON s.id=ss.store_id GROUP BY s.id", (), ("s",)),
+    ("dash.sales_7d", "SELECT date, SUM(net_total) FROM sales_daily WHERE date >= date('now', '-7 days') GROUP BY date HAVING SUM(invoices) > 0", (), ()),
+    ("dash.top_items", """SELECT i.name, SUM(sd.qty) as total_qty FROM sales_daily sd
+        JOIN item_details d ON sd.item_detail_id = d.id JOIN items i ON d.item_id = i.id
+        WHERE sd.date >= date('now', '-30 days') GROUP BY i.name ORDER BY total_qty DESC LIMIT 5""", (), ()),
+    ("dash.receipts", "SELECT SUM(amount) FROM vouchers WHERE voucher_type='Receipt'", (), ()),
+    ("dash.purchases", "SELECT SUM(net_total) FROM purchases", (), ("purchases",)),
+    ("dash.pay_methods", "SELECT NULLIF(payment_method, ''), SUM(net_total) FROM sales_daily WHERE date >= date('now', '-30 days') GROUP BY payment_method HAVING SUM(invoices) > 0", (), ()),
+
+    # --- ReportsPage.generate_report ---
+    ("rep.sales", """SELECT i.id, i.date, c.name, COUNT(DISTINCT CASE WHEN d.barcode NOT LIKE 'HD%' THEN id.id END),
+        i.net_total, i.paid_amount, i.remaining_amount, i.delegate_name
+        FROM invoices i LEFT JOIN customers c ON i.customer_id = c.id
+        LEFT JOIN invoice_details id ON i.id = id.invoice_id LEFT JOIN item_details d ON id.item_detail_id = d.id
+        LEFT JOIN stores s ON i.store_id = s.id
+        WHERE i.date BETWEEN ? AND ? AND s.name = ? GROUP BY i.id ORDER BY i.date DESC""", D + STORE, ("s",)),
+    ("rep.stock", """SELECT d.barcode, i.name, IFNULL(c.name,'-'), IFNULL(siz.name,'-'), s.name, ss.quantity, d.buy_price, (ss.quantity * d.buy_price)
+        FROM store_stock ss JOIN item_details d ON ss.item_detail_id = d.id JOIN items i ON d.item_id = i.id
+        JOIN stores s ON ss.store_id = s.id LEFT JOIN colors c ON d.color_id = c.id LEFT JOIN sizes siz ON d.size_id = siz.id
+        WHERE ss.quantity != 0""" + HD + " ORDER BY i.name", (), ("ss", "s", "d", "i")),
+    ("rep.stock_store", """SELECT d.barcode, i.name, IFNULL(c.name,'-'), IFNULL(siz.name,'-'), s.name, ss.quantity, d.buy_price, (ss.quantity * d.buy_price)
+        FROM store_stock ss JOIN item_details d ON ss.item_detail_id = d.id JOIN items i ON d.item_id = i.id
+        JOIN stores s ON ss.store_id = s.id LEFT JOIN colors c ON d.color_id = c.id LEFT JOIN sizes siz ON d.size_id = siz.id
+        WHERE ss.quantity != 0""" + HD + " AND s.name = ? ORDER BY i.name", STORE, ("s", "d", "i")),
+    ("rep.low_stock", """SELECT d.barcode, i.name, s.name, ss.quantity FROM store_stock ss
+        JOIN item_details d ON ss.item_detail_id = d.id JOIN items i ON d.item_id = i.id JOIN stores s ON ss.store_id = s.id
+        WHERE ss.quantity <= 5 AND ss.quantity > 0""" + HD + " AND s.name = ?", STORE, ("s",)),
+    ("rep.profit", """SELECT i.name, SUM(sd.qty), SUM(sd.cogs) / NULLIF(SUM(sd.qty), 0), SUM(sd.revenue) / NULLIF(SUM(sd.qty), 0), SUM(sd.revenue - sd.cogs)
+        FROM sales_daily sd JOIN item_details d ON sd.item_detail_id = d.id JOIN items i ON d.item_id = i.id
+        WHERE sd.date BETWEEN ? AND ?""" + HD + """ AND sd.store_id = (SELECT id FROM stores WHERE name = ?)
+        GROUP BY i.id HAVING SUM(sd.qty) <> 0 ORDER BY SUM(sd.revenue - sd.cogs) DESC""", D + STORE, ("stores",)),
+    ("rep.customers", """SELECT c.id, c.name, c.phone, COUNT(i.id), SUM(i.net_total), SUM(i.remaining_amount)
+        FROM customers c LEFT JOIN invoices i ON c.id = i.customer_id
+        WHERE (i.date BETWEEN ? AND ? OR i.date IS NULL) GROUP BY c.id ORDER BY SUM(i.net_total) DESC""", D, ("c",)),
+    ("rep.suppliers", """SELECT s.id, s.name, s.phone, COUNT(p.id), SUM(p.net_total)
+        FROM suppliers s LEFT JOIN purchases p ON s.id = p.supplier_id
+        WHERE (p.date BETWEEN ? AND ? OR p.date IS NULL) GROUP BY s.id ORDER BY SUM(p.net_total) DESC""", D, ("s",)),
+    ("rep.pending", """SELECT i.id, i.date, c.name, i.net_total, i.paid_amount, i.remaining_amount
+        FROM invoices i LEFT JOIN customers c ON i.customer_id = c.id
+        WHERE i.remaining_amount > 0.01""", (), ("i",)),
+    ("rep.cash_invoices", """SELECT 'مبيعات', i.date, ('فاتورة #' || i.id || ' - ' || COALESCE(c.name, 'غير معروف')), i.paid_amount, NULL
+        FROM invoices i LEFT JOIN customers c ON i.customer_id = c.id
+        WHERE i.date BETWEEN ? AND ? AND i.safe_id = ?""", D + (1,), ()),
+    ("rep.cash_receipts", """SELECT 'سند قبض', date, description, amount, NULL FROM vouchers
+        WHERE voucher_type = 'Receipt' AND date BETWEEN ? AND ? AND safe_id = ?""", D + (1,), ()),
+    ("rep.cash_purchases", """SELECT 'مشتريات', p.date, ('فاتورة شراء #' || p.id || ' - ' || COALESCE(s.name, 'غير معروف')), -p.net_total, NULL
+        FROM purchases p LEFT JOIN suppliers s ON p.supplier_id = s.id
+        WHERE p.payment_method != 'أجل' AND p.date BETWEEN ? AND ? AND p.safe_id = ?""", D + (1,), ()),
+    ("rep.cash_payments", """SELECT 'سند صرف', date, description, -amount, NULL FROM vouchers
+        WHERE voucher_type = 'Payment' AND date BETWEEN ? AND ? AND safe_id = ?""", D + (1,), ()),
+    ("rep.cash_returns", """SELECT 'مرتجع مبيعات', r.date, ('مرتجع فاتورة #' || r.invoice_id), -r.refund_amount, NULL
+        FROM returns r JOIN invoices i ON r.invoice_id = i.id WHERE r.date BETWEEN ? AND ? AND i.safe_id = ?""", D + (1,), ()),
+    ("rep.best_selling", """SELECT i.name, SUM(sd.qty), SUM(sd.revenue), SUM(sd.revenue) / NULLIF(SUM(sd.qty), 0)
+        FROM sales_daily sd JOIN item_details d ON sd.item_detail_id = d.id JOIN items i ON d.item_id = i.id
+        WHERE sd.date BETWEEN ? AND ?""" + HD + " GROUP BY i.id HAVING SUM(sd.qty) <> 0 ORDER BY SUM(sd.qty) DESC LIMIT 50", D, ()),
+    ("rep.daily", """SELECT sd.date, SUM(sd.invoices), SUM(CASE WHEN d.barcode NOT LIKE 'HD%' THEN sd.qty ELSE 0 END),
+        SUM(sd.net_total), SUM(sd.net_total) / NULLIF(SUM(sd.invoices), 0)
+        FROM sales_daily sd LEFT JOIN item_details d ON sd.item_detail_id = d.id
+        WHERE sd.date BETWEEN ? AND ? GROUP BY sd.date HAVING SUM(sd.invoices) > 0 ORDER BY sd.date DESC""", D, ()),
+    ("rep.returns", """SELECT r.id, r.date, r.invoice_id, c.name, COUNT(DISTINCT r.item_detail_id), SUM(r.refund_amount)
+        FROM returns r JOIN invoices i ON r.invoice_id = i.id LEFT JOIN customers c ON i.customer_id = c.id
+        WHERE r.date BETWEEN ? AND ? GROUP BY r.id ORDER BY r.date DESC""", D, ()),
+    ("rep.dead_stock", """SELECT d.barcode, i.name, s.name, ss.quantity, MAX(inv.date) as last_sale_date,
+        CASE WHEN MAX(inv.date) IS NULL THEN 9999 ELSE (julianday('now') - julianday(MAX(inv.date))) END as days_since
+        FROM store_stock ss JOIN item_details d ON ss.item_detail_id = d.id JOIN items i ON d.item_id = i.id
+        JOIN stores s ON ss.store_id = s.id LEFT JOIN invoice_details id ON d.id = id.item_detail_id
+        LEFT JOIN invoices inv ON id.invoice_id = inv.id
+        WHERE ss.quantity > 0""" + HD + """ GROUP BY d.id, ss.store_id
+        HAVING days_since > ? OR last_sale_date IS NULL ORDER BY days_since DESC""", (30,), ("ss", "s", "d", "i")),
+    ("rep.pnl_sales", "SELECT SUM(net_total), SUM(cogs), SUM(refunds) FROM sales_daily WHERE date BETWEEN ? AND ?", D, ()),
+    ("rep.pnl_expenses", "SELECT SUM(amount) FROM vouchers WHERE voucher_type='Payment' AND date BETWEEN ? AND ?", D, ()),
+    ("rep.hierarchy", """SELECT i.id, i.name, c.name, sz.name, SUM(ss.quantity)
+        FROM store_stock ss JOIN item_details d ON ss.item_detail_id = d.id JOIN items i ON d.item_id = i.id
+        LEFT JOIN colors c ON d.color_id = c.id LEFT JOIN sizes sz ON d.size_id = sz.id
+        LEFT JOIN stores st ON ss.store_id = st.id
+        WHERE ss.quantity > 0""" + HD + " GROUP BY i.id, c.id, d.size_id ORDER BY i.name, c.name", (), ("ss", "d", "i")),
+    ("rep.delegates", """SELECT NULLIF(sd.channel, ''), NULLIF(sd.delegate_name, ''), SUM(sd.invoices), SUM(sd.net_total)
+        FROM sales_daily sd WHERE sd.date BETWEEN ? AND ? AND sd.store_id = (SELECT id FROM stores WHERE name = ?)
+        GROUP BY sd.channel, sd.delegate_name HAVING SUM(sd.invoices) > 0 ORDER BY SUM(sd.net_total) DESC""", D + STORE, ("stores",)),
+    ("rep.delegates_hd", """SELECT NULLIF(sd.channel, ''), NULLIF(sd.delegate_name, ''), SUM(sd.invoices),
+        SUM(CASE WHEN d.barcode NOT LIKE 'HD%' THEN sd.revenue ELSE 0 END)
+        FROM sales_daily sd LEFT JOIN item_details d ON sd.item_detail_id = d.id WHERE sd.date BETWEEN ? AND ?
+        GROUP BY sd.channel, sd.delegate_name ORDER BY 4 DESC""", D, ()),
+    ("rep.stmt_invoices", """SELECT date, 'فاتورة', ('فاتورة #' || id), net_total, 0, NULL FROM invoices
+        WHERE customer_id = ? AND date BETWEEN ? AND ? ORDER BY date, id""", (1,) + D, ()),
+    ("rep.stmt_returns", """SELECT r.date, 'مرتجع', r.invoice_id, 0, r.refund_amount, NULL
+        FROM returns r JOIN invoices i ON r.invoice_id = i.id
+        WHERE i.customer_id = ? AND r.date BETWEEN ? AND ? GROUP BY r.id ORDER BY r.date, r.id""", (1,) + D, ()),
+    ("rep.stmt_receipts", """SELECT date, 'سند قبض', ('سند #' || id || ' - ' || COALESCE(description, '')), 0, amount, NULL
+        FROM vouchers WHERE customer_id = ? AND voucher_type = 'Receipt' AND date BETWEEN ? AND ? ORDER BY date, id""", (1,) + D, ()),
+]
+
+
+def seed(db, n=3000):
+    rnd = random.Random(7)
+    with db.transaction() as tx:
+        for name in ("Main Stock", "Shop 1", "Shop 2"):
+            tx.execute("INSERT INTO stores (name) VALUES (?)", (name,))
+        for name in ("Cash", "Bank", "Visa"):
+            tx.execute("INSERT INTO safes (name) VALUES (?)", (name,))
+        c = tx.conn
+        c.executemany("INSERT INTO customers (name, phone) VALUES (?,?)", [(f"C{i}", f"+20{i:010d}") for i in range(n // 3)])
+        c.executemany("INSERT INTO suppliers (name) VALUES (?)", [(f"S{i}",) for i in range(50)])
+        c.executemany("INSERT INTO items (name) VALUES (?)", [(f"Item {i}",) for i in range(n // 10)])
+        c.executemany("INSERT INTO item_details (item_id, barcode, buy_price, sell_price) VALUES (?,?,?,?)",
+                      [(i % (n // 10) + 1, f"B{i:06d}", 50, 100) for i in range(n)])
+        c.executemany("INSERT INTO store_stock (store_id, item_detail_id, quantity) VALUES (?,?,?)",
+                      [(s, i + 1, rnd.randint(0, 20)) for i in range(n) for s in (1, 2, 3)])
+        c.executemany("""INSERT INTO invoices (date, customer_id, net_total, paid_amount, remaining_amount, store_id, safe_id, payment_method)
+                         VALUES (?,?,?,?,?,?,?,?)""",
+                      [(f"2024-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}", rnd.randint(1, n // 3), 500, 500, 0,
+                        rnd.randint(1, 3), rnd.randint(1, 3), "Cash") for _ in range(n * 2)])
+        c.executemany("INSERT INTO invoice_details (invoice_id, item_detail_id, qty, price, total, cost_at_sale) VALUES (?,?,?,?,?,?)",
+                      [(rnd.randint(1, n * 2), rnd.randint(1, n), 1, 100, 100, 50) for _ in range(n * 6)])
+        c.executemany("INSERT INTO returns (date, invoice_id, qty, refund_amount) VALUES (?,?,?,?)",
+                      [(f"2024-{rnd.randint(1, 12):02d}-10", rnd.randint(1, n * 2), 1, 100) for _ in range(n // 10)])
+        c.executemany("INSERT INTO vouchers (date, voucher_type, safe_id, amount, customer_id) VALUES (?,?,?,?,?)",
+                      [(f"2024-{rnd.randint(1, 12):02d}-05", rnd.choice(("Receipt", "Payment")), rnd.randint(1, 3), 100,
+                        rnd.randint(1, n // 3)) for _ in range(n)])
+        c.executemany("INSERT INTO transfers (date, from_safe_id, to_safe_id, amount) VALUES (?,?,?,?)",
+                      [("2024-03-01", 1, 2, 10)] * 200)
+        c.executemany("INSERT INTO purchases (date, supplier_id, store_id, safe_id, payment_method, net_total) VALUES (?,?,?,?,?,?)",
+                      [(f"2024-{rnd.randint(1, 12):02d}-01", rnd.randint(1, 50), 1, rnd.randint(1, 3), "Cash", 1000) for _ in range(n // 5)])
+        c.executemany("INSERT INTO purchase_returns (date, purchase_id, qty, refund_amount) VALUES (?,?,?,?)",
+                      [("2024-06-01", rnd.randint(1, n // 5), 1, 50) for _ in range(100)])
+    db.execute("ANALYZE")
+
+
+def main():
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DB(os.path.join(tmp, "plans.db"))
+        seed(db)
+        for source, sql, params, allowed in QUERIES:
+            scans = [t for t in db.full_scans(sql, params) if t not in allowed]
+            if scans:
+                failures += 1
+                print(f"❌ {source}: full scan on {', '.join(scans)}")
+                for line in db.explain(sql, params):
+                    print(f"      {line}")
+            else:
+                print(f"✅ {source}")
+        db.close_connection()
+    print(f"\n{len(QUERIES) - failures}/{len(QUERIES)} queries use indexes for their filters")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
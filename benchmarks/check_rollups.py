@@ -0,0 +1,139 @@
+"""
+Consistency check for the trigger-maintained totals in app/rollups.py and the
+item search index in app/search.py.
+
+Recomputes every total from the source tables and compares it with the stored
+one. Exits 1 on drift; --rebuild recomputes the stored totals afterwards.
+
+    python benchmarks/check_rollups.py [--rebuild] [path/to/inventory.db]
+    python benchmarks/check_rollups.py --selftest
+
+--selftest runs random inserts, edits and deletes against a throw-away database
+and checks the triggers kept up with all of them.
+"""
+import os
+import sys
+import random
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.database import DB
+from app import rollups, search
+from app.invoices import SaleLine, edit_sale_lines
+
+CHECKS = [
+    ("safe_balances", rollups.check_safe_balances, rollups.rebuild_safe_balances),
+    ("stock_qty", rollups.check_stock_totals, rollups.rebuild_stock_totals),
+    ("sales_daily", rollups.check_sales_daily, rollups.rebuild_sales_daily),
+    ("item_search", search.check_item_search, search.rebuild_item_search),
+]
+
+
+def check(db, rebuild=False):
+    drift = 0
+    conn = db.get_connection()
+    for name, check_fn, rebuild_fn in CHECKS:
+        diffs = check_fn(conn)
+        drift += len(diffs)
+        print(f"{'✅' if not diffs else '❌'} {name}: {len(diffs)} drifted totals")
+        for diff in diffs[:20]:
+            print(f"      {diff}")
+        if rebuild:
+            with db.transaction() as tx:
+                n = rebuild_fn(tx.conn)
+            print(f"🔧 {name}: rebuilt ({n} rows)")
+    return drift
+
+
+def selftest(db, n=2000):
+    rnd = random.Random(11)
+    with db.transaction() as tx:
+        for name in ("Cash", "Bank", "Visa"):
+            tx.execute("INSERT INTO safes (name) VALUES (?)", (name,))
+        tx.execute_many("INSERT INTO items (name, code) VALUES (?, ?)", [(f"قميص إسلامي {i}", f"C{i}") for i in range(10)])
+        tx.execute_many("INSERT INTO colors (name) VALUES (?)", [("أسود",), ("أبيض",), ("كُحلي",)])
+        tx.execute_many("INSERT INTO sizes (name) VALUES (?)", [("XL",), ("L",)])
+        tx.execute_many("INSERT INTO item_details (item_id, color_id, size_id, barcode) VALUES (?, ?, ?, ?)",
+                        [(i % 10 + 1, i % 4 or None, i % 3 or None, f"B{i:03d}") for i in range(50)])
+    safe = lambda: rnd.choice((1, 2, 3, None))
+    for _ in range(n):
+        op = rnd.random()
+        with db.transaction() as tx:
+            if op < 0.25:
+                inv = tx.execute("""INSERT INTO invoices (date, net_total, paid_amount, safe_id, store_id, channel, payment_method)
+                                    VALUES (?, 100, ?, ?, ?, ?, ?)""",
+                                 (f"2024-01-{rnd.randint(1, 5):02d}", rnd.choice((0, 50, 100)), safe(), rnd.choice((1, 2, None)),
+                                  rnd.choice(("Shop", "Online", None)), rnd.choice(("Cash", "Visa"))))
+                tx.insert_many("invoice_details", [(inv, rnd.randint(1, 50), rnd.randint(1, 3), 40, 40, 25) for _ in range(rnd.randint(0, 4))],
+                               ("invoice_id", "item_detail_id", "qty", "price", "total", "cost_at_sale"))
+            elif op < 0.3:
+                tx.execute("UPDATE invoices SET paid_amount = paid_amount + 10, safe_id = ? WHERE id = ?", (safe(), rnd.randint(1, n)))
+            elif op < 0.35:
+                # invoice edit: moves its lines and returns to another day/store, or deletes + re-adds lines
+                inv = rnd.randint(1, n // 4)
+                if rnd.random() < 0.4:
+                    tx.execute("UPDATE invoices SET date = ?, store_id = ?, net_total = net_total + 5 WHERE id = ?",
+                               (f"2024-01-{rnd.randint(1, 5):02d}", rnd.choice((1, 2)), inv))
+                elif rnd.random() < 0.5:
+                    # OrderPage's edit path: the cart diffed against the saved lines (qty changes, removals, new lines)
+                    old = tx.fetch_all("SELECT id, item_detail_id, qty, price, IFNULL(item_note, ''), IFNULL(returned_qty, 0) FROM invoice_details WHERE invoice_id = ?", (inv,))
+                    cart = [SaleLine(did, max(ret, qty + rnd.choice((-1, 0, 1))), price, note, None, rid) for rid, did, qty, price, note, ret in old
+                            if ret or rnd.random() < 0.8]
+                    cart += [SaleLine(rnd.randint(1, 50), 1, 40, rnd.choice(("", " [HD]")), rnd.choice((None, 50))) for _ in range(rnd.randint(0, 2))]
+                    old_store = tx.fetch_one("SELECT store_id FROM invoices WHERE id = ?", (inv,))
+                    store = rnd.choice((1, 2))
+                    edit_sale_lines(tx, inv, old_store[0] if old_store else 1, store, cart, 1)
+                    tx.execute("UPDATE invoices SET store_id = ? WHERE id = ?", (store, inv))
+                else:
+                    tx.execute("DELETE FROM invoice_details WHERE invoice_id = ?", (inv,))
+                    tx.execute("INSERT INTO invoice_details (invoice_id, item_detail_id, qty, price, total, cost_at_sale) VALUES (?, ?, 2, 40, 80, 25)",
+                               (inv, rnd.randint(1, 50)))
+                    tx.execute("UPDATE invoice_details SET returned_qty = 1 WHERE invoice_id = ?", (inv,))
+            elif op < 0.45:
+                tx.execute("INSERT INTO returns (date, invoice_id, refund_amount) VALUES ('2024-01-02', ?, 20)", (rnd.randint(1, n // 4),))
+            elif op < 0.6:
+                tx.execute("INSERT INTO vouchers (date, voucher_type, safe_id, amount) VALUES ('2024-01-03', ?, ?, 30)",
+                           (rnd.choice(("Receipt", "Payment")), safe()))
+            elif op < 0.65:
+                tx.execute("UPDATE vouchers SET voucher_type = CASE voucher_type WHEN 'Receipt' THEN 'Payment' ELSE 'Receipt' END WHERE id = ?",
+                           (rnd.randint(1, n // 4),))
+            elif op < 0.75:
+                tx.execute("INSERT INTO transfers (date, from_safe_id, to_safe_id, amount) VALUES ('2024-01-04', ?, ?, 15)", (safe(), safe()))
+            elif op < 0.8:
+                # stock: upserts (+/-) through the app's own path, and deletes
+                tx.move_stock(rnd.randint(1, 50), rnd.randint(1, 3), rnd.choice((-2, -1, 1, 5)))
+                if rnd.random() < 0.05:
+                    tx.execute("DELETE FROM store_stock WHERE item_detail_id = ?", (rnd.randint(1, 50),))
+            elif op < 0.85:
+                tx.execute("INSERT INTO purchases (date, safe_id, net_total) VALUES ('2024-01-05', ?, 200)", (safe(),))
+            elif op < 0.92:
+                tx.execute("INSERT INTO purchase_returns (date, purchase_id, refund_amount) VALUES ('2024-01-06', ?, 25)", (rnd.randint(1, n // 8),))
+            elif op < 0.95:
+                # catalog edits: renames re-index every SKU using the item/color/size
+                table = rnd.choice(("items", "colors", "sizes"))
+                tx.execute(f"UPDATE {table} SET name = name || ' ة' WHERE id = ?", (rnd.randint(1, 3),))
+                tx.execute("UPDATE item_details SET color_id = ?, barcode = barcode || 'x' WHERE id = ?", (rnd.randint(1, 4), rnd.randint(1, 50)))
+                if rnd.random() < 0.1:
+                    tx.execute(f"DELETE FROM {rnd.choice(('items', 'colors', 'sizes', 'item_details'))} WHERE id = ?", (rnd.randint(1, 50),))
+            else:
+                table = rnd.choice(("invoices", "invoice_details", "returns", "vouchers", "transfers", "purchases", "purchase_returns"))
+                tx.execute(f"DELETE FROM {table} WHERE id = ?", (rnd.randint(1, n // 4),))
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if "--selftest" in sys.argv:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = DB(os.path.join(tmp, "rollups.db"))
+            selftest(db)
+            drift = check(db)
+            db.close_connection()
+    else:
+        db = DB(args[0] if args else None)
+        drift = check(db, rebuild="--rebuild" in sys.argv)
+        db.close_connection()
+    sys.exit(1 if drift else 0)
+
+
+if __name__ == "__main__":
+    main()